@@ -80,6 +80,8 @@ from galacteek.core.signaltowers import DAGSignalsTower
 from galacteek.core.signaltowers import URLSchemesTower
 from galacteek.core.signaltowers import DIDTower
 from galacteek.core.analyzer import ResourceAnalyzer
+from galacteek.core.startupprof import startupProfiler
+from galacteek.core.stallwatch import stallWatchdog
 
 from galacteek.browser.schemes import SCHEME_MANUAL
 from galacteek.browser.schemes import DWebSchemeHandlerGateway
@@ -110,6 +112,7 @@ from galacteek.ipfs.cidhelpers import IPFSPath
 from galacteek.ipfs.ipfsops import *
 from galacteek.ipfs.wrappers import *
 from galacteek.ipfs.feeds import FeedFollower
+from galacteek.ipfs.rscmanifest import ResourceManifest
 from galacteek.ipfs import distipfsfetch
 from galacteek.ipfs import ipfsVersionsGenerator
 
@@ -283,7 +286,6 @@ class GalacteekApplication(ApplicationDaemonStarterMixin,
         self._shuttingDown = False
         self._freshInstall = False
         self._process = psutil.Process(os.getpid())
-        self._ldSchemasImporter = LDSchemasImporter()
         self._fsWatcherContexts = FileWatcher()
         self._fsWatcherContexts.pathChanged.connect(
             self.onLdContextsChanged)
@@ -295,6 +297,8 @@ class GalacteekApplication(ApplicationDaemonStarterMixin,
 
         self.sqliteDb = None
         self.scheduler = None
+        self.urlHistory = None
+        self.marksLocal = None
         self.orbitConnector = None
         self.netProxy = None
 
@@ -313,6 +317,9 @@ class GalacteekApplication(ApplicationDaemonStarterMixin,
         self.setupAsyncLoop()
         self.setupPaths()
 
+        self._ldSchemasImporter = LDSchemasImporter(
+            rscManifest=self.rscManifest)
+
         self.themes = ThemesManager()
         self.ipfsCtx = IPFSContext(self)
         self.peersTracker = peers.PeersTracker(self.ipfsCtx)
@@ -328,6 +335,10 @@ class GalacteekApplication(ApplicationDaemonStarterMixin,
     def nsCache(self) -> IPNSCache:
         return IPNSCache(self.nsCacheLocation)
 
+    @cached_property
+    def rscManifest(self) -> ResourceManifest:
+        return ResourceManifest(self._rscManifestLocation)
+
     @cached_property
     def eth(self):
         return self.s.ethService
@@ -638,6 +649,8 @@ class GalacteekApplication(ApplicationDaemonStarterMixin,
         if show is True:
             self.mainWindow.show()
 
+        startupProfiler.mark('ui: main window created')
+
     def onSystemTrayIconClicked(self, reason):
         if reason == QSystemTrayIcon.Unknown:
             pass
@@ -654,6 +667,11 @@ class GalacteekApplication(ApplicationDaemonStarterMixin,
 
     async def startCoreServices(self):
         # By starting the top service, all subservices will be started
+        # (the non-essential ones are started later by the app service)
+
+        if startupProfiler.enabled:
+            self.s.sDeferredServicesStarted.connectTo(
+                self.onDeferredServicesStarted)
 
         try:
             async with asyncSigWait(self.s.sServiceStarted,
@@ -675,6 +693,11 @@ class GalacteekApplication(ApplicationDaemonStarterMixin,
             'type': 'ApplicationServiceReady'
         })
 
+    async def onDeferredServicesStarted(self):
+        startupProfiler.uninstall()
+
+        log.info(startupProfiler.report())
+
     async def importCommonResources(self):
         self.ipfsCtx.resources['ipfs-logo-ice'] = await self.importQtResource(
             '/share/icons/ipfs-logo-128-ice.png')
@@ -691,7 +714,8 @@ class GalacteekApplication(ApplicationDaemonStarterMixin,
         vPath = pkgResourcesRscFilename(
             'galacteek.extapps', 'video-rendezvous')
         # CHANGE
-        self.ipfsCtx.resources['videocall'] = await op.addPath(vPath)
+        self.ipfsCtx.resources['videocall'] = \
+            await self.rscManifest.addPath(op, 'videocall', vPath)
 
         await self.qSchemeHandler.start()
 
@@ -702,6 +726,8 @@ class GalacteekApplication(ApplicationDaemonStarterMixin,
         self.feedFollowerTask = await self.scheduler.spawn(
             self.feedFollower.process())
 
+        startupProfiler.mark('ipfs: repository ready')
+
         await self.ipfsCtx.ipfsRepositoryReady.emit()
         self.ipfsCtx._ipfsRepositoryReady.emit()
 
@@ -776,7 +802,8 @@ class GalacteekApplication(ApplicationDaemonStarterMixin,
             return
 
         # TTL renderers
-        entry = await ipfsop.addPath(
+        entry = await self.rscManifest.addPath(
+            ipfsop, 'ld-renderers',
             rdrsPath, recursive=True,
             hidden=False
         )
@@ -791,7 +818,8 @@ class GalacteekApplication(ApplicationDaemonStarterMixin,
         try:
             if rscFile.open(QFile.ReadOnly):
                 data = rscFile.readAll().data()
-                entry = await op.addBytes(data)
+                entry = await self.rscManifest.addBytes(
+                    op, f'qrc:{path}', data)
         except Exception as e:
             log.debug('importQtResource: {}'.format(str(e)))
         else:
@@ -1112,8 +1140,22 @@ class GalacteekApplication(ApplicationDaemonStarterMixin,
         ignore_aiohttp_ssl_error(loop)
 
         self.loop = loop
+        self.setupStallWatchdog(loop)
         return loop
 
+    def setupStallWatchdog(self, loop):
+        cfg = self.cAsyncio.get('stallWatchdog')
+
+        if not cfg or not cfg.enabled:
+            return
+
+        stallWatchdog.threshold = cfg.threshold
+        stallWatchdog.interval = cfg.interval
+        stallWatchdog.sampleInterval = cfg.sampleInterval
+
+        # Start watching once the loop runs
+        loop.call_soon(stallWatchdog.start, loop)
+
     def signalHandler(self, signame):
         self.debug(f'Handling signal: {signame}')
 
@@ -1197,6 +1239,8 @@ class GalacteekApplication(ApplicationDaemonStarterMixin,
             'pinstatus.json')
         self._nsCacheLocation = self.dataLocation.joinpath(
             'nscache.json')
+        self._rscManifestLocation = self.dataLocation.joinpath(
+            'rscmanifest.json')
         self._torrentStateLocation = self.dataLocation.joinpath(
             'torrent_state.pickle')
         self._bitMessageDataLocation = self.dataLocation.joinpath(
@@ -1463,8 +1507,23 @@ class GalacteekApplication(ApplicationDaemonStarterMixin,
         except Exception:
             pass
 
+        # Save the profiles' EDAGs (deferred saves) while IPFS is up
+        if self.ipfsCtx:
+            for profile in list(self.ipfsCtx.profiles.values()):
+                await profile.edagsFlush()
+
         await self.stopIpfsServices()
 
+        await self.nsCache.nsCacheFlush()
+
+        if self.urlHistory:
+            await self.urlHistory.flush()
+
+        if self.marksLocal:
+            await self.marksLocal.flush()
+
+        stallWatchdog.stop()
+
         # Asyncio shutdown
         await self.loop.shutdown_asyncgens()
 
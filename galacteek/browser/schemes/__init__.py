@@ -33,7 +33,7 @@ from galacteek import AsyncSignal
 from galacteek.core import runningApp
 from galacteek.core.asynccache import cachedcoromethod
 
-from galacteek.config import cGet
+from galacteek.config import configHandle
 
 from galacteek.dweb.render import renderTemplate
 from galacteek.dweb.enswhois import ensContentHash
@@ -51,6 +51,8 @@ from galacteek.ipfs.ipfsops import APIErrorDecoder
 from galacteek.ipdapps import dappsRegisterSchemes
 
 
+schemesConfig = configHandle(__name__, prefix='byScheme')
+
 # Core schemes (the URL schemes your children will soon teach you how to use)
 SCHEME_DWEB = 'dweb'
 SCHEME_DWEBGW = 'dwebgw'
@@ -350,9 +352,9 @@ class BaseURLSchemeHandler(QWebEngineUrlSchemeHandler):
     @property
     def schemeConfig(self):
         try:
-            return cGet(f'byScheme.{self.schemeConfigName}')
+            return schemesConfig.get(self.schemeConfigName)
         except Exception:
-            return cGet('byScheme.default')
+            return schemesConfig.get('default')
 
     def getBuffer(self, request: QWebEngineUrlRequestJob):
         buf = QBuffer(parent=request)
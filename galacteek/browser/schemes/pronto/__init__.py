@@ -1,13 +1,12 @@
-import pydotplus
 from io import StringIO
 from io import BytesIO
-from rdflib.tools.rdf2dot import rdf2dot
 
 from pygments import highlight
 from pygments.lexers import TurtleLexer
 from pygments.formatters import HtmlFormatter
 
 from galacteek import log
+from galacteek.core.lazyimport import lazyImport
 from galacteek.ipfs import ipfsOp
 from galacteek.core.pygments import LinkedDataStyle
 
@@ -18,6 +17,11 @@ from galacteek.services import getByDotName
 from PyQt5.QtCore import QUrlQuery
 
 
+# Only needed to render graphs, imported on first use
+pydotplus = lazyImport('pydotplus')
+rdf2dot = lazyImport('rdflib.tools.rdf2dot')
+
+
 class ProntoGraphsSchemeHandler(BaseURLSchemeHandler):
     """
     Renders pronto graphs in the browser (in ttl, xml or via pydot)
@@ -95,7 +99,7 @@ class ProntoGraphsSchemeHandler(BaseURLSchemeHandler):
                 def dotRender():
                     png = BytesIO()
                     stream = StringIO()
-                    rdf2dot(graph, stream)
+                    rdf2dot.rdf2dot(graph, stream)
                     dg = pydotplus.graph_from_dot_data(stream.getvalue())
 
                     dg.set_size('1024,768!')
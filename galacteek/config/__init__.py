@@ -1,6 +1,7 @@
 import asyncio
 import attr
-import inspect
+import sys
+import weakref
 import functools
 import traceback
 from pathlib import Path
@@ -37,6 +38,12 @@ class NestedNamespace(SimpleNamespace):
 
 cCache = {}
 
+# Flattened config snapshots, by module
+cSnapshots = {}
+
+# Bound config handles, by module
+cHandles = {}
+
 configSaveRootPath = None
 yamlExt = 'yaml'
 configYamlName = f'config.{yamlExt}'
@@ -112,6 +119,8 @@ def regConfigFromFile(pkgName: str, fpath: Path,
     }
     OmegaConf.save(cfgAll, str(savePath))
 
+    configSnapshotInvalidate(pkgName)
+
     return cCache[pkgName]
 
 
@@ -202,39 +211,201 @@ def cAttr(mod, cfg, attr, value=None, merge=False):
         except Exception:
             log.debug(f'{mod}: cannot set value for attribute {attr}')
         else:
+            configSnapshotInvalidate(mod)
             configSavePackage(mod)
     else:
         # Get
         return OmegaConf.select(conf, attr)
 
 
-def callerMod():
+def callerMod(depth: int = 2):
     try:
-        frm = inspect.stack()[2]
-        mod = inspect.getmodule(frm[0])
-        return mod.__name__
+        return sys._getframe(depth).f_globals['__name__']
     except Exception as err:
         # Unlikely
         log.debug(f'Cannot determine caller module: {err}')
         return None
 
 
+class DynamicValue:
+    """
+    Marks (in a snapshot) a config value that has to be resolved on
+    every access (interpolations, missing values)
+    """
+
+
+dynamicValue = DynamicValue()
+
+
+def configFlatten(node, prefix: str = '', flat: dict = None) -> dict:
+    """
+    Flattens a config node to a dict: dotted attribute -> value (or
+    config node for maps and lists)
+    """
+
+    flat = flat if flat is not None else {}
+
+    for key in node.keys():
+        path = f'{prefix}{key}'
+
+        try:
+            if OmegaConf.is_interpolation(node, key):
+                flat[path] = dynamicValue
+                continue
+
+            value = node.get(key)
+        except Exception:
+            flat[path] = dynamicValue
+            continue
+
+        flat[path] = value
+
+        if isinstance(value, DictConfig):
+            configFlatten(value, prefix=f'{path}.', flat=flat)
+
+    return flat
+
+
+def configSnapshot(mod: str):
+    """
+    Returns the flattened config snapshot for a module (None if the
+    module has no config)
+    """
+
+    snap = cSnapshots.get(mod)
+    if snap is not None:
+        return snap
+
+    regConfigFromPyPkg(mod)
+
+    cEntry = cCache.get(mod)
+    if not cEntry:
+        return None
+
+    env = environment()['env']
+    conf = cEntry['configAll']['envs'].setdefault(env, empty())
+
+    snap = cSnapshots[mod] = configFlatten(conf)
+    return snap
+
+
+def configSnapshotInvalidate(mod: str):
+    cSnapshots.pop(mod, None)
+
+    for handle in cHandles.get(mod, []):
+        handle.invalidate()
+
+
+class ConfigHandle:
+    """
+    Config handle bound to a module (and optionally to a prefix in the
+    module's config), resolved once (usually at import time).
+
+    Values are served from a flattened snapshot of the module's
+    config, invalidated when the config of the module changes,
+    so a lookup is a single dict access.
+    """
+
+    __slots__ = ('mod', 'prefix', '_snap', '__weakref__')
+
+    def __init__(self, mod: str, prefix: str = None):
+        self.mod = mod
+        self.prefix = prefix
+        self._snap = None
+
+    def invalidate(self):
+        self._snap = None
+
+    def snapshot(self):
+        snap = configSnapshot(self.mod)
+
+        if snap is None or not self.prefix:
+            return snap
+
+        pfx = f'{self.prefix}.'
+        return {
+            key[len(pfx):]: value for key, value in snap.items()
+            if key.startswith(pfx)
+        }
+
+    def path(self, attr: str):
+        return f'{self.prefix}.{attr}' if self.prefix else attr
+
+    def get(self, attr: str):
+        snap = self._snap
+
+        if snap is None:
+            snap = self._snap = self.snapshot()
+
+            if snap is None:
+                return None
+
+        value = snap.get(attr, dynamicValue)
+
+        if value is dynamicValue:
+            # Not flattened (interpolation, list item, missing ..)
+            cEntry = cCache.get(self.mod)
+            if not cEntry:
+                return None
+
+            value = cAttr(self.mod, cEntry['configAll'], self.path(attr))
+
+            if value is None and attr not in snap:
+                snap[attr] = None
+
+        return value
+
+    def sub(self, prefix: str):
+        return configHandle(self.mod, prefix=self.path(prefix))
+
+    def __repr__(self):
+        return f'ConfigHandle({self.mod}, prefix: {self.prefix})'
+
+
+def configHandle(mod: str = None, prefix: str = None) -> ConfigHandle:
+    """
+    Returns a config handle bound to mod (by default, the calling module)
+    """
+
+    mod = mod if mod else callerMod()
+    handle = ConfigHandle(mod, prefix=prefix)
+
+    cHandles.setdefault(mod, weakref.WeakSet()).add(handle)
+    return handle
+
+
+def configParentHandle(mod: str = None,
+                       prefix: str = None) -> ConfigHandle:
+    """
+    Returns a config handle bound to the parent package of mod
+    (by default, the calling module)
+    """
+
+    mod = mod if mod else callerMod()
+    return configHandle('.'.join(mod.split('.')[:-1]), prefix=prefix)
+
+
 def cGet(attr: str, mod=None):
     if not mod:
         mod = callerMod()
 
-    cEntry = regConfigFromPyPkg(mod)
-    if cEntry:
-        return cAttr(mod, cEntry['configAll'], attr)
+    snap = configSnapshot(mod)
+    if snap is None:
+        return None
+
+    value = snap.get(attr, dynamicValue)
+
+    if value is dynamicValue:
+        return cAttr(mod, cCache[mod]['configAll'], attr)
+
+    return value
 
 
 def cParentGet(attr: str):
     mod = callerMod()
     parentMod = '.'.join(mod.split('.')[:-1])
 
-    cEntry = regConfigFromPyPkg(parentMod)
-    if cEntry:
-        return cAttr(parentMod, cEntry['configAll'], attr)
+    return cGet(attr, mod=parentMod)
 
 
 def cSet(attr: str, value, mod=None,
@@ -12,6 +12,8 @@ cfgInitTable = [
 
     'galacteek.core.ctx',
 
+    'galacteek.crypto',
+
     'galacteek.did.ipid',
 
     'galacteek.ipfs',
@@ -0,0 +1,235 @@
+import asyncio
+import heapq
+import itertools
+import time
+
+from typing import Callable
+
+
+class DueScheduler:
+    """
+    Schedules the processing of keyed items (peers, feeds ..) by
+    their own next-due time, using a min-heap.
+
+    Up to concurrency handlers run at the same time. The handler
+    is a coroutine function called with the item's key, which returns:
+
+    - True (or None): success, the item is due again after interval
+    - False: failure, the item is retried with exponential backoff
+    - a number: the item is due again after that delay (in seconds)
+
+    :param int concurrency: max number of handlers running concurrently
+    :param float interval: default delay between two runs of an item
+    :param float backoffFactor: backoff multiplier for failing items
+    :param float backoffMax: max delay for failing items
+    :param clock: time function (loop time by default)
+    """
+
+    def __init__(self, concurrency: int = 8,
+                 interval: float = 180.0,
+                 backoffFactor: float = 2.0,
+                 backoffMax: float = 3600.0,
+                 clock: Callable = None):
+        self.concurrency = concurrency
+        self.interval = interval
+        self.backoffFactor = backoffFactor
+        self.backoffMax = backoffMax
+        self.clock = clock if clock else self._loopTime
+
+        self._heap = []
+        self._seq = itertools.count()
+
+        # key -> heap entry (entries removed lazily from the heap)
+        self._entries = {}
+        self._failures = {}
+        self._running = set()
+        self._removedWhileRunning = set()
+        self._wakeup = asyncio.Event()
+
+    def _loopTime(self):
+        try:
+            return asyncio.get_event_loop().time()
+        except RuntimeError:
+            return time.monotonic()
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def runningCount(self):
+        return len(self._running)
+
+    def isRunning(self, key):
+        """
+        True if the handler for key is running, or waiting for
+        a slot to run
+        """
+        return key in self._running
+
+    def failures(self, key):
+        return self._failures.get(key, 0)
+
+    def clearFailures(self, key):
+        self._failures.pop(key, None)
+
+    def schedule(self, key, delay: float = 0):
+        """
+        Schedules (or reschedules) key to be due in delay seconds
+        """
+
+        entry = self._entries.pop(key, None)
+        if entry:
+            # Invalidate the previous heap entry
+            entry[2] = None
+
+        entry = [self.clock() + delay, next(self._seq), key]
+        self._entries[key] = entry
+        heapq.heappush(self._heap, entry)
+
+        self._wakeup.set()
+
+    def remove(self, key):
+        """
+        Unschedules key. If its handler is running, it won't be
+        rescheduled when the handler returns.
+        """
+
+        entry = self._entries.pop(key, None)
+        if entry:
+            entry[2] = None
+
+        self._failures.pop(key, None)
+
+        if key in self._running:
+            self._removedWhileRunning.add(key)
+
+    def nextDueIn(self):
+        """
+        Returns the delay until the next item is due, or None
+        if no item is scheduled
+        """
+
+        while self._heap and self._heap[0][2] is None:
+            heapq.heappop(self._heap)
+
+        if self._heap:
+            return max(0, self._heap[0][0] - self.clock())
+
+    def popDue(self, limit: int = 0):
+        """
+        Pops and returns the keys of the items which are due
+        """
+
+        now = self.clock()
+        due = []
+
+        while self._heap and (limit == 0 or len(due) < limit):
+            dueTime, _seq, key = self._heap[0]
+
+            if key is None:
+                heapq.heappop(self._heap)
+                continue
+
+            if dueTime > now:
+                break
+
+            heapq.heappop(self._heap)
+            del self._entries[key]
+            due.append(key)
+
+        return due
+
+    def backoffDelay(self, key):
+        return min(
+            self.interval * (self.backoffFactor ** self.failures(key)),
+            self.backoffMax
+        )
+
+    def reschedule(self, key, result):
+        """
+        Reschedules key according to the result returned by its handler
+        """
+
+        if isinstance(result, bool) and result is False:
+            self._failures[key] = self.failures(key) + 1
+            self.schedule(key, self.backoffDelay(key))
+        elif isinstance(result, (int, float)) and \
+                not isinstance(result, bool):
+            self.schedule(key, result)
+        else:
+            self._failures.pop(key, None)
+            self.schedule(key, self.interval)
+
+    async def _process(self, handler, key, sem):
+        try:
+            result = await handler(key)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            result = False
+        finally:
+            sem.release()
+            self._running.discard(key)
+
+        if key in self._removedWhileRunning:
+            self._removedWhileRunning.discard(key)
+            return
+
+        self.reschedule(key, result)
+
+    async def run(self, handler, shouldStop: Callable = None,
+                  idleWait: float = 60.0):
+        """
+        Runs the scheduler until shouldStop() returns True
+
+        :param handler: coroutine function called with an item's key
+        :param shouldStop: stop condition callable
+        :param float idleWait: max wait time when no item is due
+        """
+
+        sem = asyncio.Semaphore(self.concurrency)
+        tasks = set()
+        pending = []
+
+        try:
+            while not (shouldStop and shouldStop()):
+                # The due keys count as running while they wait for a
+                # slot, so that they're not scheduled again meanwhile
+                pending = self.popDue()
+                self._running.update(pending)
+
+                while pending:
+                    await sem.acquire()
+
+                    task = asyncio.ensure_future(
+                        self._process(handler, pending.pop(0), sem))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+
+                delay = self.nextDueIn()
+
+                self._wakeup.clear()
+
+                try:
+                    await asyncio.wait_for(
+                        self._wakeup.wait(),
+                        min(delay, idleWait) if delay is not None
+                        else idleWait
+                    )
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            for task in list(tasks):
+                task.cancel()
+
+            # Keys that never got a slot are due again
+            for key in pending:
+                self._running.discard(key)
+
+                if key in self._removedWhileRunning:
+                    self._removedWhileRunning.discard(key)
+                else:
+                    self.schedule(key)
@@ -25,6 +25,7 @@ from galacteek import services
 from galacteek.config import cGet
 
 from galacteek.ipfs import pinning
+from galacteek.ipfs.pinning.pinset import PinSetIndex
 from galacteek.ipfs import kilobytes
 from galacteek.ipfs.paths import posixIpfsPath
 from galacteek.ipfs.cidhelpers import joinIpns
@@ -54,6 +55,7 @@ from galacteek.did.ipid import IPIdentifier
 from galacteek.ui.helpers import getImageFromIpfs
 
 from galacteek.core.profile import UserProfile
+from galacteek.core.asynclib.scheduler import DueScheduler
 from galacteek.core.softident import gSoftIdent
 from galacteek.core.iphandle import SpaceHandle
 
@@ -173,17 +175,26 @@ class PeerIdentityCtx:
         self._authFailedLtLast = loopTime()
 
     @property
-    def pingedRecently(self):
+    def pingDueIn(self):
+        """
+        Delay (in seconds) before the peer should be pinged again
+        (0 if it should be pinged now)
+        """
+
         pDelay = self.cfgPeers.liveness.didPingEvery
 
         if self.ipid.local:
-            return True
+            return pDelay
 
         try:
             prec = self.pinghist[-1]
-            return int(loopTime()) - prec[1] < pDelay
+            return max(0, pDelay - (int(loopTime()) - prec[1]))
         except:
-            return False
+            return 0
+
+    @property
+    def pingedRecently(self):
+        return self.pingDueIn > 0
 
     def pingAvg(self):
         try:
@@ -199,7 +210,8 @@ class PeerIdentityCtx:
     @ipfsOp
     async def defaultRsaPubKey(self, ipfsop):
         if self.ident and self.ident.defaultRsaPubKeyCid:
-            return await ipfsop.catObject(self.ident.defaultRsaPubKeyCid)
+            return await ipfsop.ctx.rsaExec.pubKeyFromCid(
+                self.ident.defaultRsaPubKeyCid)
 
     @ipfsOp
     async def defaultCurve25519PubKey(self, ipfsop):
@@ -225,12 +237,18 @@ class PeerIdentityCtx:
         return await self.ipid.pubKeyPemGet()
 
     async def watch(self, ipfsop):
+        """
+        Checks the liveness of the peer. Returns True if the peer
+        responded, False if it's unresponsive, and None if it
+        could not be checked yet
+        """
+
         if self.ipid.local:
             self.pinghist.append((
                 0,
                 int(loopTime())
             ))
-            return
+            return True
 
         if self.ident is None:
             return
@@ -247,7 +265,7 @@ class PeerIdentityCtx:
                 ms, pong = pongReply
                 if not pong:
                     # Retry later
-                    return
+                    return False
 
                 self._didPongLast = pong['didpong'][self.ipid.did]
 
@@ -257,10 +275,12 @@ class PeerIdentityCtx:
                 ))
 
                 await self.sStatusChanged.emit()
+                return True
             else:
-                self.debug('Could not ping DID {self.ipid.did}')
+                self.debug(f'Could not ping DID {self.ipid.did}')
 
                 await self.sStatusChanged.emit()
+                return False
         else:
             return await self.watchOldStyle(ipfsop)
 
@@ -270,7 +290,7 @@ class PeerIdentityCtx:
                 0,
                 int(loopTime())
             ))
-            return
+            return True
 
         pingAvg = await ipfsop.waitFor(
             ipfsop.pingAvg(self.peerId, count=2), 10)
@@ -282,10 +302,12 @@ class PeerIdentityCtx:
             ))
 
             await self.sStatusChanged.emit()
+            return True
         else:
             self.debug('Could not ping peer')
 
             await self.sStatusChanged.emit()
+            return False
 
     def defaultAvatarImage(self):
         if isinstance(self.spaceHandle.vPlanet, str):
@@ -381,6 +403,21 @@ class Peers(GService):
     def pgScanCount(self):
         return self._pgScanCount
 
+    @cached_property
+    def didLoadSem(self):
+        return asyncio.Semaphore(cGet('peers.didLoadConcurrency'))
+
+    @cached_property
+    def livenessScheduler(self):
+        wCfg = cGet('peers.watcherTask')
+
+        return DueScheduler(
+            concurrency=wCfg.concurrency,
+            interval=cGet('peers.liveness.didPingEvery'),
+            backoffFactor=wCfg.backoffFactor,
+            backoffMax=wCfg.backoffMax
+        )
+
     @property
     def byPeerId(self):
         return self._byPeerId
@@ -450,16 +487,15 @@ class Peers(GService):
                         continue
 
                     if did in self._didGraphLStatus:
-                        await ipfsop.sleep()
                         continue
 
+                    # DIDs are loaded concurrently (the number of
+                    # concurrent loads is limited by loadDidFromGraph)
                     ensure(
                         self.loadDidFromGraph(ipfsop, peerId, did, sHandle))
                     self._didGraphLStatus.append(did)
 
-                    await ipfsop.sleep(0.1)
-
-                await ipfsop.sleep(0.05)
+                await ipfsop.sleep()
 
         self._pgScanCount += 1
 
@@ -471,12 +507,13 @@ class Peers(GService):
         peersService = ipfsop.ctx.pubsub.byTopic(TOPIC_PEERS)
 
         for attempt in range(0, max(2, loadAttempts)):
-            ipid = await self.app.ipidManager.load(
-                did,
-                track=True,
-                timeout=loadTimeout,
-                localIdentifier=(peerId == ipfsop.ctx.node.id)
-            )
+            async with self.didLoadSem:
+                ipid = await self.app.ipidManager.load(
+                    did,
+                    track=True,
+                    timeout=loadTimeout,
+                    localIdentifier=(peerId == ipfsop.ctx.node.id)
+                )
 
             if not ipid:
                 log.debug(f'Cannot load IPID: {did}, attempt {attempt}')
@@ -510,6 +547,7 @@ class Peers(GService):
 
             if piCtx.peerId not in self._byPeerId:
                 self._byPeerId[piCtx.peerId] = piCtx
+                self.livenessSchedule(piCtx.peerId)
 
             if piCtx.ipid.did not in self._byDid:
                 self._byDid[piCtx.ipid.did] = piCtx
@@ -666,6 +704,7 @@ class Peers(GService):
                 if piCtx:
                     self._byPeerId[piCtx.peerId] = piCtx
                     self._byDid[piCtx.ipid.did] = piCtx
+                    self.livenessSchedule(piCtx.peerId)
 
                     piCtx.ident = iMsg
                     await piCtx.ipid.refresh()
@@ -862,29 +901,58 @@ class Peers(GService):
     async def on_start(self):
         pass
 
+    def livenessSchedule(self, peerId, delay=0):
+        """
+        Schedules the liveness check of a peer, unless it's
+        already scheduled or being watched
+        """
+
+        if peerId not in self.livenessScheduler and \
+                not self.livenessScheduler.isRunning(peerId):
+            self.livenessScheduler.schedule(peerId, delay)
+
     @GService.task
     async def peersWatcherTask(self):
-        interval = cGet('peers.watcherTask.sleepInterval')
-
-        while not self.should_stop:
-            await asyncio.sleep(interval)
+        await asyncio.sleep(cGet('peers.watcherTask.startDelay'))
 
-            await self.peersWatcherRun()
+        async with self.lock.reader_lock:
+            for peerId in self._byPeerId.keys():
+                self.livenessSchedule(peerId)
+
+        # Each peer is watched according to its own next-due time,
+        # with up to watcherTask.concurrency watches running at once
+        await self.livenessScheduler.run(
+            self.peerWatch,
+            shouldStop=lambda: self.should_stop
+        )
 
     @ipfsOp
-    async def peersWatcherRun(self, ipfsop):
+    async def peerWatch(self, ipfsop, peerId):
+        """
+        Liveness scheduler handler: watches a single peer.
+        The peers lock is only held to look up the peer.
+        """
+
         if ipfsop.noPeers:
             # No need
-            log.debug('Peers watch: no peers, skipping')
-            return
+            return cGet('peers.watcherTask.retryDelay')
 
         async with self.lock.reader_lock:
-            for peerId, piCtx in self._byPeerId.items():
-                if not piCtx.identLast:
-                    continue
+            piCtx = self._byPeerId.get(peerId)
+
+        if not piCtx:
+            # Gone
+            self.livenessScheduler.remove(peerId)
+            return None
 
-                if not piCtx.pingedRecently:
-                    await piCtx.watch(ipfsop)
+        if not piCtx.identLast:
+            return cGet('peers.watcherTask.retryDelay')
+
+        if piCtx.pingedRecently:
+            # Already pinged (or local peer), due again later
+            return piCtx.pingDueIn
+
+        return await piCtx.watch(ipfsop)
 
     def getByPeerId(self, peerId):
         return self._byPeerId.get(peerId, None)
@@ -1096,12 +1164,16 @@ class IPFSContext(QObject):
         self.pinnerTask = None
         self.orbitConnector = None
 
-        self.rsaExec = RSAExecutor(loop=self.loop,
-                                   executor=self.app.executor)
-        self.eccExec = ECCExecutor(loop=self.loop,
-                                   executor=self.app.executor)
-        self.curve25Exec = Curve25519(loop=self.loop,
-                                      executor=self.app.executor)
+        self.pinSet = PinSetIndex(
+            indirect=cGet('pinSet.indexIndirect',
+                          mod='galacteek.ipfs.pinning')
+        )
+        self.pinSetTask = None
+
+        # Crypto executors (shared crypto worker pool and key store)
+        self.rsaExec = RSAExecutor(loop=self.loop)
+        self.eccExec = ECCExecutor(loop=self.loop)
+        self.curve25Exec = Curve25519(loop=self.loop)
 
     @property
     def app(self):
@@ -1171,12 +1243,26 @@ class IPFSContext(QObject):
 
         await self.pinner.start()
 
+        self.pinSetTask = await self.app.scheduler.spawn(
+            self.pinSetReconcile())
+
         await self.p2p.startServices()
 
+    @ipfsOp
+    async def pinSetReconcile(self, ipfsop):
+        await self.pinSet.reconcileTask(
+            ipfsop,
+            interval=cGet('pinSet.reconcileInterval',
+                          mod='galacteek.ipfs.pinning')
+        )
+
     async def shutdown(self):
         if self.pinner:
             await self.pinner.stop()
 
+        if self.pinSetTask:
+            await self.pinSetTask.close()
+
         await self.peers.stop()
         await self.p2p.stop()
         await self.pubsub.stop()
@@ -30,6 +30,8 @@ def _merge_dictionaries(dict1, dict2):
 
 
 class AggregateDAG(EvolvingDAG):
+    shardedMaps = ['nodes']
+
     async def initDag(self, ipfsop):
         return {
             'params': {},
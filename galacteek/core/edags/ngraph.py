@@ -3,6 +3,8 @@ from galacteek.ipfs.dag import EvolvingDAG
 
 
 class PeersGraphDAG(EvolvingDAG):
+    shardedMaps = ['peers']
+
     async def initDag(self, ipfsop):
         return {
             'peers': {},
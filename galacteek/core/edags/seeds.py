@@ -1,16 +1,24 @@
+import asyncio
 import hashlib
 
 from galacteek import ensure
 from galacteek import log
 from galacteek import AsyncSignal
+from galacteek.database import seedsIndexNodes
+from galacteek.database import seedsIndexNodeRemove
+from galacteek.database import seedsIndexNodeStore
 from galacteek.ipfs.dag import EvolvingDAG
 from galacteek.ipfs.dag import DAGPortal
 from galacteek.ipfs.dag import DAGError
 from galacteek.ipfs.wrappers import ipfsOp
 from galacteek.ipfs.cidhelpers import cidValid
+from galacteek.ipfs.cidhelpers import stripIpfs
+from galacteek.ipfs.pinning.bounded import BoundedPinQueue
 from galacteek.core.edags.aggregate import AggregateDAG
+from galacteek.core.edags.seedsindex import SeedIndexEntry
+from galacteek.core.edags.seedsindex import SeedsIndex
+from galacteek.core.edags.seedsindex import seedsDagEntries
 from galacteek.core import utcDatetimeIso
-from galacteek.core import parseDate
 from galacteek.core import jsonSchemaValidate
 from galacteek.core import doubleUid4
 
@@ -293,61 +301,101 @@ class MegaSeedsEDag(AggregateDAG):
 
         self.megaMergeHistory = {}
 
+        self.seedsIndex = SeedsIndex()
+
+        # Seeds descriptors are pinned by a bounded queue
+        self.resolveConcurrency = 8
+        self.pinQueue = BoundedPinQueue(workers=4, maxsize=128, timeout=20)
+
+        self._seedsIndexLoaded = False
+        self._seedsIndexLock = asyncio.Lock()
+
     def udbHash(self, peerId, dagUid):
         return seedUdlHash(peerId, dagUid)
 
-    async def _searchSubDag(self, pdag, root, regexp, path=None,
-                            dateFrom=None,
-                            dateTo=None):
+    async def seedsIndexLoad(self):
+        # Load the seeds index from the database (once)
 
-        for sname, section in root.items():
-            lkeys = [key for key in section.keys() if not key.startswith('_')]
+        async with self._seedsIndexLock:
+            if self._seedsIndexLoaded:
+                return
 
-            for key in lkeys:
-                ma = regexp.search(key)
+            for node in await seedsIndexNodes():
+                self.seedsIndex.indexNode(node.udh, node.dagCid, [
+                    SeedIndexEntry(node.udh, e.section, e.name,
+                                   e.dateCreated, e.seedCid, meta=e.meta)
+                    for e in node.entries
+                ])
 
-                if not ma:
-                    continue
+            self._seedsIndexLoaded = True
 
-                seeds = section[key]
+    async def seedsIndexUpdate(self, udh: str, dagCid: str, seeds: dict):
+        """
+        Index the seeds of the seeds DAG udh (if it changed)
+        """
 
-                for idx, entry in enumerate(seeds):
-                    meta = entry['_metadata']
-                    datecreated = meta['datecreated']
+        if self.seedsIndex.nodeCid(udh) == dagCid:
+            return
 
-                    link = entry['seedlink'].get('/')
+        entries = seedsDagEntries(udh, seeds)
+        self.seedsIndex.indexNode(udh, dagCid, entries)
 
-                    if not cidValid(link):
-                        continue
+        await seedsIndexNodeStore(udh, dagCid,
+                                  [entry.asDict() for entry in entries])
 
-                    date = parseDate(datecreated)
+        log.debug(f'Seeds index: indexed {len(entries)} seeds '
+                  f'for {udh} ({dagCid})')
 
-                    if date and dateFrom and dateTo:
-                        if date >= dateFrom and date <= dateTo:
-                            yield sname, key, datecreated, link
-                    else:
-                        yield sname, key, datecreated, link
+    def nodeSeedsCid(self, udh: str):
+        try:
+            return stripIpfs(self.nodes[udh]['link']['/'])
+        except Exception:
+            return None
 
-    async def search(self, regexp, dateFrom=None, dateTo=None):
-        for peer in self.nodes:
-            try:
-                async with self.portalToPath(
-                        f'nodes/{peer}/link',
-                        dagClass=SeedsPortal) as pdag:
-                    async for found in self._searchSubDag(
-                            pdag,
-                            pdag.root['c']['seeds'],
-                            regexp,
-                            dateFrom=dateFrom,
-                            dateTo=dateTo):
-                        yield found
-            except DAGError:
-                log.debug(f'Searching on node {peer} failed: dag error')
+    async def seedsIndexSync(self):
+        """
+        Make sure the index is in sync with the nodes of the DAG
+        (index the seeds DAGs that were linked but not indexed yet)
+        """
+
+        await self.seedsIndexLoad()
+
+        for udh in list(self.seedsIndex.nodes):
+            if udh not in self.nodes:
+                self.seedsIndex.removeNode(udh)
+                await seedsIndexNodeRemove(udh)
+
+        for udh in list(self.nodes.keys()):
+            dagCid = self.nodeSeedsCid(udh)
+
+            if not dagCid or self.seedsIndex.nodeCid(udh) == dagCid:
                 continue
+
+            try:
+                async with SeedsPortal(dagCid=dagCid) as pdag:
+                    await self.seedsIndexUpdate(
+                        udh, dagCid, pdag.root['c']['seeds'])
             except Exception as e:
-                log.debug(f'Searching on node {peer} failed: {e}')
+                log.debug(f'Seeds index: cannot index {udh}: {e}')
+
+    async def search(self, regexp, dateFrom=None, dateTo=None):
+        """
+        Search the seeds (names and metadata) with a regexp. Results
+        come from the local seeds index.
+        """
+
+        await self.seedsIndexSync()
+
+        for entry in self.seedsIndex.search(regexp,
+                                            dateFrom=dateFrom,
+                                            dateTo=dateTo,
+                                            nodes=set(self.nodes.keys())):
+            if not cidValid(entry.seedCid):
                 continue
 
+            yield entry.section, entry.name, entry.dateCreated, \
+                entry.seedCid
+
     async def getSeed(self, seedCid):
         try:
             portal = SeedPortal(dagCid=seedCid)
@@ -369,6 +417,15 @@ class MegaSeedsEDag(AggregateDAG):
         async with self as d:
             d.root['nodes'] = {}
 
+    @ipfsOp
+    async def pinSeedsDescriptors(self, ipfsop, cids: list):
+        # Pinned objects are skipped (checked with the pinset index)
+        for cid in cids:
+            if await ipfsop.isPinned(cid, pinType='direct'):
+                continue
+
+            await self.pinQueue.submit(cid, recursive=False)
+
     @ipfsOp
     async def analyze(self, ipfsop, peerId, dagCid, pubKeyPem):
         try:
@@ -396,23 +453,30 @@ class MegaSeedsEDag(AggregateDAG):
                 else:
                     log.debug(f'Analyzing DAG: {dagCid}: SIG OK !')
 
+                await self.seedsIndexLoad()
+                await self.seedsIndexUpdate(
+                    pdag.root['params']['seedudbh'],
+                    dagCid,
+                    pdag.root['c']['seeds']
+                )
+
                 # Pin seeds descriptors
+                paths = []
+
                 for sname, section in pdag.root['c']['seeds'].items():
                     lkeys = [key for key in section.keys() if
                              not key.startswith('_')]
                     for key in lkeys:
-                        seeds = section[key]
-
-                        for idx, entry in enumerate(seeds):
-                            path = f'c/seeds/{sname}/{key}/{idx}/seedlink'
-                            resolved = await pdag.resolve(path)
-                            if resolved:
-                                ensure(ipfsop.pin(
-                                    resolved, recursive=False, timeout=20))
+                        paths += [
+                            f'c/seeds/{sname}/{key}/{idx}/seedlink'
+                            for idx in range(0, len(section[key]))
+                        ]
 
-                        await ipfsop.sleep()
+                resolved = await pdag.resolveMany(
+                    paths, concurrency=self.resolveConcurrency)
 
-                    await ipfsop.sleep()
+                ensure(self.pinSeedsDescriptors(
+                    [cid for cid in resolved.values() if cid]))
         except DAGError as dage:
             log.debug(f'Analyzing DAG: {dagCid}: DAG error {dage}')
             return False
@@ -489,6 +553,13 @@ class MegaSeedsEDag(AggregateDAG):
                                         # Branch
                                         mega.root['nodes'][udh] = node
 
+                                        await self.seedsIndexLoad()
+                                        await self.seedsIndexUpdate(
+                                            udh,
+                                            stripIpfs(seedsCid),
+                                            pdag.root['c']['seeds']
+                                        )
+
                                         self.debug(
                                             f'Mega merge {mDagCid} : '
                                             f'Merged udh {udh}')
@@ -0,0 +1,221 @@
+"""
+Local inverted (trigram) index of the seeds of the peers' seeds DAGs
+"""
+
+import re
+
+try:
+    from re import _constants as sre_constants
+    from re import _parser as sre_parse
+except ImportError:
+    import sre_constants
+    import sre_parse
+
+from typing import Iterator
+
+from galacteek.core import parseDate
+
+
+def trigrams(text: str) -> set:
+    text = text.lower()
+    return {text[idx:idx + 3] for idx in range(0, len(text) - 2)}
+
+
+def regexpLiterals(regexp) -> list:
+    """
+    Returns the literal strings that any string matched by the
+    regexp contains (maximal runs of literals in the top-level
+    sequence of the pattern). Returns an empty list when nothing
+    can be deduced (alternations, etc).
+    """
+
+    try:
+        parsed = sre_parse.parse(regexp.pattern, regexp.flags)
+    except Exception:
+        return []
+
+    literals = []
+    current = []
+
+    for op, arg in parsed:
+        if op == sre_constants.LITERAL:
+            current.append(chr(arg))
+            continue
+
+        # Anything else (groups, alternations, repeats ..) ends the run
+        if current:
+            literals.append(''.join(current))
+            current = []
+
+    if current:
+        literals.append(''.join(current))
+
+    return [lit for lit in literals if len(lit) >= 3]
+
+
+class SeedIndexEntry:
+    __slots__ = ('udh', 'section', 'name', 'dateCreated', 'seedCid',
+                 'meta', 'date')
+
+    def __init__(self, udh: str, section: str, name: str,
+                 dateCreated: str, seedCid: str, meta: str = ''):
+        self.udh = udh
+        self.section = section
+        self.name = name
+        self.dateCreated = dateCreated
+        self.seedCid = seedCid
+        self.meta = meta
+        self.date = parseDate(dateCreated) if dateCreated else None
+
+    @property
+    def text(self):
+        return f'{self.name} {self.meta}' if self.meta else self.name
+
+    def asDict(self):
+        return {
+            'section': self.section,
+            'name': self.name,
+            'dateCreated': self.dateCreated,
+            'seedCid': self.seedCid,
+            'meta': self.meta
+        }
+
+
+def seedsDagEntries(udh: str, seeds: dict) -> list:
+    """
+    Returns the index entries for the seeds of a seeds DAG
+    (the 'c/seeds' map)
+    """
+
+    entries = []
+
+    for sname, section in seeds.items():
+        for key in [k for k in section.keys() if not k.startswith('_')]:
+            for entry in section[key]:
+                try:
+                    meta = entry.get('_metadata', {})
+                    link = entry['seedlink'].get('/')
+
+                    words = (meta.get('tags') or []) + \
+                        (meta.get('keywords') or [])
+
+                    entries.append(SeedIndexEntry(
+                        udh, sname, key,
+                        meta.get('datecreated'),
+                        link,
+                        meta=' '.join(str(w) for w in words)
+                    ))
+                except Exception:
+                    continue
+
+    return entries
+
+
+class SeedsIndex:
+    """
+    Trigram index of the seeds (names and metadata), by seeds DAG
+    (identified by its udh). Regexp searches are answered from the
+    index: the literal parts of the regexp select the candidates
+    via their trigrams, then the regexp is matched on the candidates.
+    """
+
+    def __init__(self):
+        self._nodes = {}
+        self._entries = []
+        self._free = []
+        self._trigrams = {}
+
+    def nodeCid(self, udh: str):
+        node = self._nodes.get(udh)
+        return node[0] if node else None
+
+    @property
+    def nodes(self):
+        return list(self._nodes.keys())
+
+    def __len__(self):
+        return len(self._entries) - len(self._free)
+
+    def _addEntry(self, entry: SeedIndexEntry) -> int:
+        if self._free:
+            eid = self._free.pop()
+            self._entries[eid] = entry
+        else:
+            eid = len(self._entries)
+            self._entries.append(entry)
+
+        for tg in trigrams(entry.text):
+            self._trigrams.setdefault(tg, set()).add(eid)
+
+        return eid
+
+    def _removeEntry(self, eid: int):
+        entry = self._entries[eid]
+
+        for tg in trigrams(entry.text):
+            ids = self._trigrams.get(tg)
+            if ids:
+                ids.discard(eid)
+                if not ids:
+                    del self._trigrams[tg]
+
+        self._entries[eid] = None
+        self._free.append(eid)
+
+    def removeNode(self, udh: str):
+        node = self._nodes.pop(udh, None)
+
+        if node:
+            for eid in node[1]:
+                self._removeEntry(eid)
+
+    def indexNode(self, udh: str, dagCid: str, entries: list):
+        """
+        (Re)index the entries of the seeds DAG udh at dagCid
+        """
+
+        self.removeNode(udh)
+        self._nodes[udh] = (
+            dagCid,
+            [self._addEntry(entry) for entry in entries]
+        )
+
+    def _candidates(self, regexp) -> Iterator[int]:
+        literals = regexpLiterals(regexp)
+
+        if not literals:
+            return (eid for eid, e in enumerate(self._entries)
+                    if e is not None)
+
+        ids = None
+
+        for literal in literals:
+            for tg in trigrams(literal):
+                tgIds = self._trigrams.get(tg, set())
+                ids = set(tgIds) if ids is None else ids & tgIds
+
+                if not ids:
+                    return iter([])
+
+        return iter(sorted(ids))
+
+    def search(self, regexp, dateFrom=None, dateTo=None,
+               nodes: list = None) -> Iterator[SeedIndexEntry]:
+        if isinstance(regexp, str):
+            regexp = re.compile(regexp, re.IGNORECASE)
+
+        for eid in self._candidates(regexp):
+            entry = self._entries[eid]
+
+            if nodes is not None and entry.udh not in nodes:
+                continue
+
+            if not regexp.search(entry.name) and \
+                    not (entry.meta and regexp.search(entry.meta)):
+                continue
+
+            if entry.date and dateFrom and dateTo:
+                if entry.date < dateFrom or entry.date > dateTo:
+                    continue
+
+            yield entry
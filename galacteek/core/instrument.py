@@ -0,0 +1,398 @@
+"""
+Runtime instrumentation: latency histograms of the IPFS operator calls,
+the pubsub message handlers and the event loop callbacks (task steps),
+and event loop lag monitoring
+
+Instrumentation is off by default and can be switched at runtime
+(instruments.enable() / instruments.disable()). When it's off, the
+timers are no-ops, and the registered classes and the event loop's
+callback handles are not patched (the patches are only installed
+while it's on).
+"""
+
+import asyncio
+import collections
+import functools
+import inspect
+import time
+
+from galacteek import log
+
+
+def callbackName(callback):
+    """
+    Returns (name, coroutine) for an event loop callback. Task steps
+    and wakeups are attributed to the task's coroutine.
+    """
+
+    owner = getattr(callback, '__self__', None)
+
+    if isinstance(owner, asyncio.Task):
+        coro = owner._coro
+        return 'task.' + getattr(coro, '__qualname__', repr(coro)), coro
+
+    func = getattr(callback, '__func__', callback)
+    return 'callback.' + getattr(func, '__qualname__', repr(func)), None
+
+
+def coroutineLocation(coro):
+    """
+    Where a coroutine is suspended (file:line of the innermost
+    awaited coroutine), or None
+    """
+
+    frame = None
+
+    while coro is not None:
+        frame = getattr(coro, 'cr_frame', None) or frame
+        coro = getattr(coro, 'cr_await', None)
+
+    if frame is None:
+        return None
+
+    return f'{frame.f_code.co_filename}:{frame.f_lineno}'
+
+
+class LatencyHistogram:
+    """
+    Log-linear (HDR-style) latency histogram
+
+    Latencies are recorded in microseconds. Values below 2 * subCount
+    are counted exactly, larger values in subCount buckets per power
+    of two (the relative error is below 1 / subCount).
+    """
+
+    subBits = 4
+    subCount = 1 << subBits
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    @classmethod
+    def bucketIndex(cls, value: int):
+        shift = max(0, value.bit_length() - cls.subBits - 1)
+        return (shift << cls.subBits) + (value >> shift)
+
+    @classmethod
+    def bucketValue(cls, idx: int):
+        """
+        Middle of the range of values of a bucket (microseconds)
+        """
+
+        shift = max(0, (idx >> cls.subBits) - 1)
+        low = (idx - (shift << cls.subBits)) << shift
+        return low + ((1 << shift) - 1) / 2
+
+    def record(self, seconds: float):
+        value = int(seconds * 1000000)
+        idx = self.bucketIndex(value)
+
+        self.counts[idx] = self.counts.get(idx, 0) + 1
+        self.count += 1
+        self.total += value
+
+        if self.min is None or value < self.min:
+            self.min = value
+
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, pct: float):
+        """
+        Value (microseconds) at the given percentile (0-100)
+        """
+
+        if self.count == 0:
+            return 0
+
+        rank = max(1, int(self.count * pct / 100 + 0.5))
+        seen = 0
+
+        for idx in sorted(self.counts):
+            seen += self.counts[idx]
+
+            if seen >= rank:
+                return min(self.bucketValue(idx), self.max)
+
+        return self.max
+
+    def summary(self) -> dict:
+        """
+        Histogram summary (latencies in milliseconds)
+        """
+
+        return {
+            'count': self.count,
+            'mean': self.total / self.count / 1000 if self.count else 0,
+            'min': (self.min or 0) / 1000,
+            'p50': self.percentile(50) / 1000,
+            'p90': self.percentile(90) / 1000,
+            'p99': self.percentile(99) / 1000,
+            'max': self.max / 1000
+        }
+
+
+class NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+class Timer:
+    __slots__ = ('instruments', 'name', 'start')
+
+    def __init__(self, instruments, name: str):
+        self.instruments = instruments
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.instruments.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+nullTimer = NullTimer()
+
+
+class Instruments:
+    """
+    Registry of the latency histograms (by name)
+
+    When enabled:
+
+    - the coroutine methods of the registered classes (see
+      instrumentClass()) are timed ('<prefix>.<method>')
+    - the event loop callbacks are timed, task steps being attributed
+      to the task's coroutine ('task.<coroutine>'). The callbacks
+      that take more than slowCallbackThreshold seconds are kept
+      in slowCallbacks (with the location of the coroutine)
+    - the event loop lag (how late the loop wakes up a coroutine
+      sleeping lagInterval seconds) is recorded ('loop.lag')
+    """
+
+    def __init__(self,
+                 slowCallbackThreshold: float = 0.05,
+                 lagInterval: float = 0.25,
+                 slowCallbacksMax: int = 128):
+        self.enabled = False
+        self.enabledSince = None
+        self.slowCallbackThreshold = slowCallbackThreshold
+        self.lagInterval = lagInterval
+
+        self.histograms = {}
+        self.slowCallbacks = collections.deque(maxlen=slowCallbacksMax)
+
+        # (class, name prefix)
+        self._classes = []
+
+        # (owner, attribute name, original value or None)
+        self._patches = []
+
+        self._lagTask = None
+
+    def histogram(self, name: str):
+        hist = self.histograms.get(name)
+
+        if hist is None:
+            hist = self.histograms[name] = LatencyHistogram()
+
+        return hist
+
+    def record(self, name: str, seconds: float):
+        if self.enabled:
+            self.histogram(name).record(seconds)
+
+    def timer(self, name: str):
+        """
+        Context manager timing its block (no-op when disabled)
+        """
+
+        return Timer(self, name) if self.enabled else nullTimer
+
+    def reset(self):
+        self.histograms.clear()
+        self.slowCallbacks.clear()
+
+    def instrumentClass(self, cls, prefix: str):
+        """
+        Time the calls of the public coroutine methods of cls (and of
+        its bases) when instrumentation is enabled
+        """
+
+        self._classes.append((cls, prefix))
+
+        if self.enabled:
+            self.patchClass(cls, prefix)
+
+    def enable(self):
+        if self.enabled:
+            return
+
+        self.enabled = True
+        self.enabledSince = time.time()
+
+        for cls, prefix in self._classes:
+            self.patchClass(cls, prefix)
+
+        self.patch(asyncio.events.Handle, '_run',
+                   self.timedHandleRun(asyncio.events.Handle._run))
+
+        try:
+            self._lagTask = asyncio.ensure_future(self.lagMonitor())
+        except RuntimeError:
+            # No event loop
+            self._lagTask = None
+
+        log.info('Instrumentation enabled')
+
+    def disable(self):
+        if not self.enabled:
+            return
+
+        self.enabled = False
+        self.enabledSince = None
+
+        for owner, attr, original in reversed(self._patches):
+            if original is None:
+                delattr(owner, attr)
+            else:
+                setattr(owner, attr, original)
+
+        self._patches.clear()
+
+        if self._lagTask:
+            self._lagTask.cancel()
+            self._lagTask = None
+
+        log.info('Instrumentation disabled')
+
+    def patch(self, owner, attr: str, value):
+        self._patches.append((owner, attr, owner.__dict__.get(attr)))
+        setattr(owner, attr, value)
+
+    def patchClass(self, cls, prefix: str):
+        for attr in dir(cls):
+            if attr.startswith('_'):
+                continue
+
+            method = inspect.getattr_static(cls, attr, None)
+
+            if inspect.iscoroutinefunction(method):
+                self.patch(cls, attr,
+                           self.timedCoroutine(method, f'{prefix}.{attr}'))
+
+    def timedCoroutine(self, coroFn, name: str):
+        @functools.wraps(coroFn)
+        async def timed(*args, **kw):
+            start = time.perf_counter()
+
+            try:
+                return await coroFn(*args, **kw)
+            finally:
+                self.record(name, time.perf_counter() - start)
+
+        return timed
+
+    def timedHandleRun(self, run):
+        def timedRun(handle):
+            start = time.perf_counter()
+
+            try:
+                return run(handle)
+            finally:
+                elapsed = time.perf_counter() - start
+                self.callbackDone(handle._callback, elapsed)
+
+        return timedRun
+
+    def callbackDone(self, callback, elapsed: float):
+        name, coro = callbackName(callback)
+
+        self.record(name, elapsed)
+
+        if elapsed >= self.slowCallbackThreshold:
+            self.slowCallbacks.append({
+                'date': time.time(),
+                'duration': elapsed,
+                'name': name,
+                'location': coroutineLocation(coro)
+            })
+
+    async def lagMonitor(self):
+        loop = asyncio.get_event_loop()
+
+        while self.enabled:
+            start = loop.time()
+            await asyncio.sleep(self.lagInterval)
+            self.record('loop.lag',
+                        max(0, loop.time() - start - self.lagInterval))
+
+    def snapshot(self) -> dict:
+        return {
+            'enabled': self.enabled,
+            'enabledSince': self.enabledSince,
+            'histograms': {
+                name: hist.summary() for name, hist in
+                sorted(self.histograms.items())
+            },
+            'slowCallbacks': list(self.slowCallbacks)
+        }
+
+    def exposition(self) -> str:
+        """
+        Histogram summaries in the Prometheus text format
+        """
+
+        lines = [
+            '# TYPE galacteek_latency_seconds summary'
+        ]
+
+        for name, hist in sorted(self.histograms.items()):
+            label = name.replace('\\', '\\\\').replace('"', '\\"')
+
+            for quantile in [50, 90, 99]:
+                value = hist.percentile(quantile) / 1000000
+                lines.append(
+                    f'galacteek_latency_seconds{{name="{label}",'
+                    f'quantile="{quantile / 100}"}} {value:.6f}')
+
+            lines.append(f'galacteek_latency_seconds_sum{{name="{label}"}} '
+                         f'{hist.total / 1000000:.6f}')
+            lines.append(f'galacteek_latency_seconds_count'
+                         f'{{name="{label}"}} {hist.count}')
+
+        return '\n'.join(lines) + '\n'
+
+    def report(self, top: int = 40, sortBy: str = 'p99') -> str:
+        lines = [
+            f'{"Name":60} {"count":>8} {"mean":>9} {"p50":>9} '
+            f'{"p90":>9} {"p99":>9} {"max":>9}'
+        ]
+
+        summaries = sorted(
+            ((name, hist.summary()) for name, hist in
+             self.histograms.items()),
+            key=lambda e: e[1][sortBy], reverse=True)
+
+        for name, s in summaries[:top]:
+            lines.append(
+                f'{name[:60]:60} {s["count"]:8} {s["mean"]:9.2f} '
+                f'{s["p50"]:9.2f} {s["p90"]:9.2f} {s["p99"]:9.2f} '
+                f'{s["max"]:9.2f}')
+
+        return '\n'.join(lines)
+
+
+instruments = Instruments()
@@ -1,4 +1,5 @@
 import json
+import os
 import time
 import sys
 import collections
@@ -12,9 +13,10 @@ from datetime import datetime
 from jsonschema import validate
 from jsonschema.exceptions import ValidationError
 
-import aiofiles
+import orjson
 
 from galacteek import log
+from galacteek import ensure
 from galacteek.core import utcDatetimeIso
 from galacteek.core import parseDate
 from galacteek.ipfs.cidhelpers import IPFSPath
@@ -30,6 +32,13 @@ class MarksEncoder(json.JSONEncoder):
         return json.JSONEncoder.default(self, obj)
 
 
+def marksJsonDefault(obj):
+    # orjson serializer for the objects that are not JSON types
+    if isinstance(obj, IPFSHashMark):
+        return obj.data
+    raise TypeError
+
+
 marksKey = '_marks'
 pyramidsKey = '_pyramids'
 pyramidsMarksKey = '_pyramidmarks'
@@ -348,6 +357,110 @@ class QuickAccessMapping(collections.UserDict):
         return mapping
 
 
+marksWordRe = re.compile(r'\w+')
+marksLiteralRe = re.compile(r'^\w+$')
+
+
+class MarksSearchIndex:
+    """
+    In-memory index of the hashmarks, used by searchAllByMetadata()
+
+    Each indexed mark gets an entry (path, mark data, path without the
+    /ipfs/ or /ipns/ prefix), and the words of the title, description
+    and comment of the marks are mapped to the entries they appear in.
+    A literal (words only) query is matched against the words of a
+    field instead of the value of the field in every mark.
+
+    The index is rebuilt lazily, after the marks have changed.
+    """
+
+    fields = ['title', 'description', 'comment']
+
+    def __init__(self):
+        self.entries = []
+        self.words = {field: {} for field in self.fields}
+        self.valid = False
+
+    def invalidate(self):
+        self.valid = False
+
+    async def build(self, marks):
+        entries = []
+        words = {field: {} for field in self.fields}
+
+        self.valid = True
+
+        for cat in marks.getCategories():
+            await asyncio.sleep(0)
+
+            cMarks = marks.getCategoryMarks(cat)
+            if not cMarks:
+                continue
+
+            for mPath, mark in cMarks.items():
+                if not isinstance(mPath, str):
+                    continue
+
+                meta = mark.get('metadata')
+                if not isinstance(meta, dict):
+                    continue
+
+                idx = len(entries)
+
+                # Remove root prefix or you'd end up with a
+                # lot of stuff when searching for 'ipfs' or 'ipns'
+                entries.append((
+                    mPath, mark,
+                    mPath.replace('/ipfs/', '').replace('/ipns/', '')
+                ))
+
+                for field in self.fields:
+                    value = meta.get(field)
+
+                    if not isinstance(value, str):
+                        continue
+
+                    for word in set(marksWordRe.findall(value.lower())):
+                        words[field].setdefault(word, set()).add(idx)
+
+        # Only use this build if the marks haven't changed meanwhile
+        if self.valid:
+            self.entries = entries
+            self.words = words
+
+        return self.valid
+
+    def candidates(self, field, query):
+        """
+        Returns the indexes of the entries that can match query on
+        field, or None if the query is not literal (regular expression)
+        """
+
+        comps = query.split()
+
+        if len(comps) == 1:
+            if not marksLiteralRe.match(query):
+                return None
+
+            # Single word: case-insensitive
+            comps = [query.lower()]
+
+        matched = None
+
+        for comp in comps:
+            if not marksLiteralRe.match(comp):
+                continue
+
+            found = set()
+            for word, idxs in self.words[field].items():
+                if comp in word:
+                    found |= idxs
+
+            matched = found if matched is None else matched & found
+
+        return matched
+
+
 class IPFSMarks(QObject):
     changed = pyqtSignal()
     markDeleted = pyqtSignal(str, str)
@@ -361,16 +474,25 @@ class IPFSMarks(QObject):
     pyramidChanged = pyqtSignal(str)
     pyramidEmpty = pyqtSignal(str)
 
+    # Min delay (seconds) between two backups
+    backupInterval = 60 * 5
+
     def __init__(self, path, parent=None, data=None, autosave=True,
-                 backup=False):
+                 backup=False, saveDelay=2.0):
         super().__init__(parent)
 
         self._path = path
         self._autosave = autosave
         self._backup = backup
+        self._saveDelay = saveDelay
+        self._saveTask = None
+        self._saveLock = None
+        self._unsaved = False
+        self._searchIndex = MarksSearchIndex()
         self._marks = data if data else self.load()
         self.changed.connect(self.onChanged)
         self.lastsaved = None
+        self.lastbackup = None
         self.changed.emit()
 
         self.pyramidCapstoned.connect(self.onPyramidCapstone)
@@ -387,6 +509,10 @@ class IPFSMarks(QObject):
     def backup(self):
         return self._backup
 
+    @property
+    def unsaved(self):
+        return self._unsaved
+
     @property
     def root(self):
         return self._marks
@@ -421,8 +547,8 @@ class IPFSMarks(QObject):
         if not self.path:
             return self.skeleton()
         try:
-            with open(self.path, 'rt') as fd:
-                marks = json.load(fd)
+            with open(self.path, 'rb') as fd:
+                marks = orjson.loads(fd.read())
 
             if 'qamappings' not in marks:
                 marks['qamappings'] = []
@@ -440,41 +566,135 @@ class IPFSMarks(QObject):
         return marks
 
     def onChanged(self):
+        self._searchIndex.invalidate()
+
         if self.autosave is True:
+            self.saveLater()
+
+    def saveLater(self):
+        """
+        Schedule a save. The changes made until the save (saveDelay
+        seconds after the first change) are written at once.
+        """
+
+        self._unsaved = True
+
+        if self._saveTask and not self._saveTask.done():
+            return
+
+        try:
+            running = asyncio.get_event_loop().is_running()
+        except RuntimeError:
+            running = False
+
+        if running:
+            self._saveTask = ensure(self.saveDelayed())
+        else:
             self.save()
 
+    async def saveDelayed(self):
+        while self._unsaved:
+            await asyncio.sleep(self._saveDelay)
+
+            if self._unsaved:
+                await self.saveAsync()
+
+    def backupDue(self, now):
+        return self.backup and (not self.lastbackup or
+                                (now - self.lastbackup) > self.backupInterval)
+
+    def write(self, backup=False):
+        """
+        Serialize the hashmarks and write them to the file (written to
+        a temporary file first and renamed, so the hashmarks file is
+        never left truncated). Returns the number of bytes written.
+
+        orjson doesn't release the GIL while it serializes plain
+        objects, so the marks can't change while they're serialized,
+        even when this runs in a thread.
+        """
+
+        data = orjson.dumps(self.root, default=marksJsonDefault,
+                            option=orjson.OPT_INDENT_2)
+
+        paths = [str(self.path)]
+        if backup:
+            paths.append('{0}.bkp'.format(self.path))
+
+        for path in paths:
+            tmpPath = path + '.tmp'
+
+            with open(tmpPath, 'wb') as fd:
+                fd.write(data)
+                fd.flush()
+                os.fsync(fd.fileno())
+
+            os.replace(tmpPath, path)
+
+        return len(data)
+
     def save(self):
         """ Save synchronously """
         if not self.path:  # don't save
             return
+
+        now = time.time()
+        backup = self.backupDue(now)
+        self._unsaved = False
+
         try:
-            with open(self.path, 'w+t') as fd:
-                self.serialize(fd)
+            self.write(backup=backup)
         except BaseException:
             log.debug('Could not save hashmarks ({0}'.format(
                 self.path))
         else:
-            if not self.backup:
-                return
+            self.lastsaved = now
+
+            if backup:
+                self.lastbackup = now
+                log.debug('Hashmarks backup saved: {}.bkp'.format(self.path))
+
+    async def saveAsync(self):
+        """
+        Save from a thread (the event loop is not blocked by the
+        file writes)
+        """
+
+        if not self.path:
+            return False
 
+        if not self._saveLock:
+            self._saveLock = asyncio.Lock()
+
+        async with self._saveLock:
             now = time.time()
-            if not self.lastsaved or (now - self.lastsaved) > (60 * 5):
-                bkpPath = '{0}.bkp'.format(self.path)
+            backup = self.backupDue(now)
 
-                try:
-                    with open(bkpPath, 'w+t') as fd:
-                        self.serialize(fd)
-                except:
-                    log.debug('Could not save backup file {0}'.format(bkpPath))
-                else:
-                    log.debug('Hashmarks backup saved: {}'.format(bkpPath))
+            # Changes made from now on need another save
+            self._unsaved = False
+
+            try:
+                await asyncio.get_event_loop().run_in_executor(
+                    None, self.write, backup)
+            except Exception as err:
+                log.debug('Could not save hashmarks ({0}): {1}'.format(
+                    self.path, err))
+                return False
 
             self.lastsaved = now
 
-    async def saveAsync(self):
-        async with aiofiles.open(self.path, 'w+t') as fd:
-            await fd.write(json.dumps(self.root, indent=4, cls=MarksEncoder))
-            self.lastsaved = time.time()
+            if backup:
+                self.lastbackup = now
+
+            return True
+
+    async def flush(self):
+        """
+        Save now if there are unsaved changes
+        """
+
+        if self._unsaved:
+            await self.saveAsync()
 
     def hasCategory(self, category, parent=None):
         if parent is None:
@@ -581,78 +801,83 @@ class IPFSMarks(QObject):
         loop = asyncio.get_event_loop()
         return await loop.run_in_executor(None, self.isValid)
 
+    async def searchIndex(self):
+        """
+        Returns the search index (rebuilt if the marks have changed)
+        """
+
+        while not self._searchIndex.valid:
+            await self._searchIndex.build(self)
+
+        return self._searchIndex
+
     async def searchAllByMetadata(self, metadata):
         # todo: deprecate searchSingleByMetadata
         if not isinstance(metadata, dict):
             raise ValueError('Metadata needs to be a dictionary')
 
-        categories = self.getCategories()
-
-        title = metadata.get('title')
-        descr = metadata.get('description')
         path = metadata.get('path')
-        comment = metadata.get('comment')
+        queries = [(field, metadata.get(field)) for field in
+                   MarksSearchIndex.fields if metadata.get(field)]
 
-        def metaMatch(mark, field, searchQuery):
-            if field not in mark['metadata'] or not isinstance(
-                    mark['metadata'][field], str):
-                return
+        def regexp(query, flags=0):
+            try:
+                return re.compile(query, flags)
+            except re.error:
+                return re.compile(re.escape(query), flags)
 
-            comps = searchQuery.split()
+        def fieldMatcher(query):
+            comps = query.split()
             if len(comps) == 1:
-                if re.search(searchQuery, mark['metadata'][field],
-                             re.IGNORECASE):
-                    return True
-                else:
-                    return False
+                rx = regexp(query, re.IGNORECASE)
+                return lambda value: rx.search(value) is not None
             else:
-                lowered = mark['metadata'][field].lower()
-                for comp in comps:
-                    try:
-                        lowered.index(comp)
-                    except:
-                        return False
+                return lambda value: all(comp in value.lower()
+                                         for comp in comps)
 
-                return True
+        matchers = [(field, fieldMatcher(query)) for field, query in queries]
+        pathRx = regexp(path) if path else None
 
-        for cat in categories:
-            await asyncio.sleep(0)
+        index = await self.searchIndex()
 
-            marks = self.getCategoryMarks(cat)
-            if not marks:
-                continue
+        # Entries that can match (all of them if a query is a regexp)
+        candidates = set()
 
-            for mPath, mark in marks.items():
-                if not isinstance(mPath, str):
-                    continue
+        if pathRx:
+            candidates.update(idx for idx, entry in enumerate(index.entries)
+                              if pathRx.search(entry[2]))
 
-                if 'metadata' not in mark:
-                    continue
+        for field, query in queries:
+            found = index.candidates(field, query)
 
-                # Remove root prefix or you'd end up with a
-                # lot of stuff when searching for 'ipfs' or 'ipns'
-                mPathClear = mPath.replace(
-                    '/ipfs/', '').replace('/ipns/', '')
+            if found is None:
+                candidates = range(len(index.entries))
+                break
 
-                if path and re.search(path, mPathClear):
-                    yield IPFSHashMark.fromJson(mPath, mark)
-                    await asyncio.sleep(0)
-                    continue
+            candidates.update(found)
 
-                if title and metaMatch(mark, 'title', title):
-                    yield IPFSHashMark.fromJson(mPath, mark)
-                    await asyncio.sleep(0)
-                    continue
+        for count, idx in enumerate(sorted(candidates)):
+            if count % 256 == 0:
+                await asyncio.sleep(0)
 
-                if descr and metaMatch(mark, 'description', descr):
-                    yield IPFSHashMark.fromJson(mPath, mark)
-                    await asyncio.sleep(0)
-                    continue
+            mPath, mark, mPathClear = index.entries[idx]
+            meta = mark.get('metadata')
+
+            if not isinstance(meta, dict):
+                continue
+
+            if pathRx and pathRx.search(mPathClear):
+                yield IPFSHashMark.fromJson(mPath, mark)
+                await asyncio.sleep(0)
+                continue
 
-                if comment and metaMatch(mark, 'comment', comment):
+            for field, match in matchers:
+                value = meta.get(field)
+
+                if isinstance(value, str) and match(value):
                     yield IPFSHashMark.fromJson(mPath, mark)
                     await asyncio.sleep(0)
-                    continue
+                    break
 
     def searchSingleByMetadata(self, metadata):
         if not isinstance(metadata, dict):
@@ -865,7 +1090,9 @@ class IPFSMarks(QObject):
                 return fData[marksKey]
 
     def serialize(self, fd):
-        return json.dump(self.root, fd, indent=4, cls=MarksEncoder)
+        fd.write(orjson.dumps(
+            self.root, default=marksJsonDefault,
+            option=orjson.OPT_INDENT_2).decode())
 
     def dump(self):
         print(self.serialize(sys.stdout))
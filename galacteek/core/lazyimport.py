@@ -0,0 +1,36 @@
+"""
+Import-on-first-use for optional subsystems
+"""
+
+import importlib.util
+import sys
+
+from types import ModuleType
+
+
+def lazyImport(name: str) -> ModuleType:
+    """
+    Returns the module named name, which will only be executed when
+    one of its attributes is first accessed.
+
+    If the module was already imported, returns it.
+
+    :raises ImportError: if the module cannot be found
+    """
+
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError(f'No module named {name}', name=name)
+
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+
+    return module
@@ -44,6 +44,7 @@ class MFSItem(UneditableItem):
         self._parentHash = parenthash
         self._parentItem = weakref.ref(parent) if parent else None
         self._cidCache = []
+        self._pendingRows = []
 
     @property
     def parentItem(self):
@@ -137,6 +138,50 @@ class MFSItem(UneditableItem):
 
         self.appendRow([nameItem, sizeItem])
 
+    def queueEntry(self, nameItem, sizeItem):
+        """
+        Queues an entry, to be inserted with flushEntries()
+        """
+
+        if nameItem.cidString:
+            self._cidCache.append(nameItem.cidString)
+
+        self._pendingRows.append((nameItem, sizeItem))
+
+    def flushEntries(self):
+        """
+        Inserts the queued entries with a single rows insertion
+        """
+
+        if not self._pendingRows:
+            return
+
+        rows, self._pendingRows = self._pendingRows, []
+        rowStart = self.rowCount()
+        rowEnd = rowStart + len(rows) - 1
+
+        if self.columnCount() < 2:
+            self.setColumnCount(2)
+
+        # Insert the rows with their name items (one rows insertion)
+        self.insertRows(rowStart, [nameItem for nameItem, _s in rows])
+
+        # Set the size items without a change notification per cell,
+        # and notify the change of the whole column once
+        model = self.model()
+        blocked = model.blockSignals(True) if model else None
+
+        try:
+            for rIdx, (_n, sizeItem) in enumerate(rows):
+                self.setChild(rowStart + rIdx, 1, sizeItem)
+        finally:
+            if model:
+                model.blockSignals(blocked)
+
+        if model:
+            model.dataChanged.emit(self.child(rowStart, 1).index(),
+                                   self.child(rowEnd, 1).index())
+
     def setParentHash(self, pHash):
         self._parentHash = pHash
 
@@ -158,6 +203,10 @@ class MFSItem(UneditableItem):
             if item.entry['Hash'] == cid:
                 return item
 
+        for item, _size in self._pendingRows:
+            if item.entry['Hash'] == cid:
+                return item
+
     def findChildByName(self, name):
         for item in self.childrenItems():
             if isinstance(item, MFSNameItem):
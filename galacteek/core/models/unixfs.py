@@ -1,3 +1,6 @@
+import asyncio
+from collections import deque
+
 from PyQt5.QtWidgets import QApplication
 from PyQt5.QtCore import QAbstractListModel
 from PyQt5.QtCore import QModelIndex
@@ -13,6 +16,7 @@ from galacteek.ipfs.cidhelpers import getCID
 from galacteek.ipfs.cidhelpers import IPFSPath
 from galacteek.ipfs.cidhelpers import joinIpfs
 from galacteek.ipfs.cidhelpers import cidConvertBase32
+from galacteek.ipfs.ipfsops import UnixFSTimeoutError
 
 from galacteek.ui.helpers import getIcon
 from galacteek.ui.helpers import getMimeIcon
@@ -21,6 +25,84 @@ from galacteek.ui.helpers import sizeFormat
 from galacteek.ui.i18n import iUnixFSFileToolTip
 
 
+async def unixFsEntriesFramed(ipfsop, eGenerator,
+                              frameMaxEntries=256,
+                              frameMaxTime=0.1,
+                              genTimeout=None):
+    """
+    Regroups the lists of entries yielded by a streamed unixfs
+    listing generator (IPFSOperator.listStreamed) into frames.
+
+    A frame is yielded when it holds frameMaxEntries entries, or when
+    frameMaxTime seconds have elapsed since its first entry was
+    received (even if the generator doesn't produce anything else),
+    so that the caller can insert a whole frame in a model with a
+    single rows insertion.
+
+    If genTimeout is set, UnixFSTimeoutError is raised when the
+    generator does not produce entries within that delay.
+    """
+
+    loop = asyncio.get_event_loop()
+    frame, frameStart = [], None
+    pending, waitStart = None, None
+
+    try:
+        while True:
+            if pending is None:
+                # Wait for the next entries in a task, so that the frame
+                # can be flushed while the generator is still waiting
+                pending = asyncio.ensure_future(eGenerator.__anext__())
+                waitStart = loop.time()
+
+            delays = []
+            if frame:
+                delays.append(frameStart + frameMaxTime - loop.time())
+            if genTimeout:
+                delays.append(waitStart + genTimeout - loop.time())
+
+            done, _ = await asyncio.wait(
+                [pending],
+                timeout=max(0, min(delays)) if delays else None
+            )
+
+            if not done:
+                if frame and (loop.time() - frameStart) >= frameMaxTime:
+                    yield frame
+                    frame, frameStart = [], None
+                    continue
+
+                # No entries were produced
+                raise UnixFSTimeoutError()
+
+            task, pending = pending, None
+
+            try:
+                entries = task.result()
+            except StopAsyncIteration:
+                break
+
+            for entry in entries:
+                if not entry:
+                    continue
+
+                if frameStart is None:
+                    frameStart = loop.time()
+
+                frame.append(entry)
+
+                if len(frame) >= frameMaxEntries:
+                    yield frame
+                    frame, frameStart = [], None
+    finally:
+        if pending:
+            pending.cancel()
+
+    if frame:
+        # Remaining entries
+        yield frame
+
+
 class UnixFSEntryInfo:
     def __init__(self, entry, parentCid):
         self._entry = entry
@@ -131,11 +213,17 @@ class UnixFSDirectoryModel(QAbstractListModel):
     COL_UNIXFS_MIME = 2
     COL_UNIXFS_HASH = 3
 
+    # Number of rows exposed to the views by a fetchMore() call
+    fetchBatchSize = 512
+
     def __init__(self, parent=None):
         super(UnixFSDirectoryModel, self).__init__(parent)
 
         self.app = QApplication.instance()
+
+        # Rows exposed to the views, and entries waiting to be fetched
         self.entries = []
+        self.entriesPending = deque()
 
         self.iconFolder = getIcon('folder-open.png')
         self.iconFile = getIcon('file.png')
@@ -168,16 +256,66 @@ class UnixFSDirectoryModel(QAbstractListModel):
         return True
 
     def clearModel(self):
-        self.beginRemoveRows(QModelIndex(), 0, len(self.entries))
+        self.entriesPending.clear()
+
+        if not self.entries:
+            return
+
+        self.beginRemoveRows(QModelIndex(), 0, len(self.entries) - 1)
         self.entries.clear()
         self.endRemoveRows()
 
+    def appendEntries(self, entries: list):
+        """
+        Queues a frame of entries. Entries are exposed to the views
+        lazily (with fetchMore()), except for the first rows, which
+        are inserted right away to fill the view.
+        """
+
+        self.entriesPending.extend(entries)
+
+        if len(self.entries) < self.fetchBatchSize:
+            self.exposePending(self.fetchBatchSize - len(self.entries))
+
+    def exposePending(self, count: int):
+        """
+        Inserts up to count pending entries in the model, with a
+        single rows insertion
+        """
+
+        count = min(count, len(self.entriesPending))
+
+        if count <= 0:
+            return
+
+        rowStart = len(self.entries)
+
+        self.beginInsertRows(QModelIndex(), rowStart, rowStart + count - 1)
+
+        for _i in range(count):
+            self.entries.append(self.entriesPending.popleft())
+
+        self.endInsertRows()
+
+    def exposeAll(self):
+        self.exposePending(len(self.entriesPending))
+
+    def canFetchMore(self, parent):
+        if parent.isValid():
+            return False
+
+        return len(self.entriesPending) > 0
+
+    def fetchMore(self, parent):
+        if not parent.isValid():
+            self.exposePending(self.fetchBatchSize)
+
     def getHashFromIdx(self, idx):
         eInfo = self.getUnixFSEntryInfoFromIdx(idx)
         if eInfo:
             return eInfo.cid
 
-    def rowCount(self, parent):
+    def rowCount(self, parent=QModelIndex()):
         return len(self.entries)
 
     def columnCount(self, parent):
@@ -194,6 +332,8 @@ class UnixFSDirectoryModel(QAbstractListModel):
 
         for eInfo in self.entries:
             doc.append(eInfo.entry)
+        for eInfo in self.entriesPending:
+            doc.append(eInfo.entry)
         return doc
 
     def data(self, index, role):
@@ -235,6 +375,9 @@ class UnixFSDirectoryModel(QAbstractListModel):
             return QSize(64, 64)
 
     def searchByFilename(self, filename):
+        # match() only looks at the rows exposed to the views
+        self.exposeAll()
+
         return self.match(
             self.index(0, 0, QModelIndex()),
             Qt.DisplayRole,
@@ -260,46 +403,33 @@ class UnixFSModelAgent:
                             resolve_type=True,
                             clearModel=True,
                             generatorTimeout=9,
-                            maxEntries=2048):
+                            maxEntries=2048,
+                            frameMaxEntries=256,
+                            frameMaxTime=0.1):
         eCount = 0
 
         eGenerator = ipfsop.listStreamed(path, resolve_type)
-        fetching = True
 
         if clearModel:
             self.model.clearModel()
 
-        while fetching:
-            try:
-                entries = await ipfsop.waitFor(
-                    eGenerator.__anext__(),
-                    generatorTimeout
-                )
-                if entries is None:
-                    raise ValueError('Entries generator timeout')
-
-                for entry in entries:
-                    if not entry:
-                        continue
-
-                    eCount += 1
-
-                    if eCount >= maxEntries:
-                        # Limit reached
-                        fetching = False
-                        break
-
-                    rowStart = self.model.rowCount(QModelIndex())
-
-                    self.model.beginInsertRows(
-                        QModelIndex(), rowStart, rowStart)
-                    self.model.entries.append(entry)
-                    self.model.endInsertRows()
-            except StopAsyncIteration:
-                fetching = False
-            except Exception as err:
-                log.warning(
-                    f'UnixFS list({path}): error: {err}')
-                return False
+        try:
+            async for frame in unixFsEntriesFramed(
+                    ipfsop, eGenerator,
+                    frameMaxEntries=frameMaxEntries,
+                    frameMaxTime=frameMaxTime,
+                    genTimeout=generatorTimeout):
+                if eCount + len(frame) >= maxEntries:
+                    # Limit reached
+                    self.model.appendEntries(
+                        frame[0:max(0, maxEntries - eCount - 1)])
+                    break
+
+                eCount += len(frame)
+                self.model.appendEntries(frame)
+        except Exception as err:
+            log.warning(
+                f'UnixFS list({path}): error: {err}')
+            return False
 
         return True
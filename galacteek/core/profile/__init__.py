@@ -21,6 +21,7 @@ from galacteek import logUser
 from galacteek import ensure
 from galacteek import ensureLater
 from galacteek import AsyncSignal
+from galacteek.config import cGet
 
 from galacteek.ipfs.mutable import CipheredIPFSJson
 from galacteek.ipfs.wrappers import ipfsOp
@@ -380,6 +381,10 @@ class UserProfile(QObject):
         self._filesModel = None
 
         self._dagUser = None
+        self._dagChatChannels = None
+        self._dagNetwork = None
+        self.dagSeedsMain = None
+        self.dagSeedsAll = None
 
         self.userInfo = None
 
@@ -446,6 +451,33 @@ class UserProfile(QObject):
     def dagNetwork(self):
         return self._dagNetwork
 
+    @property
+    def edags(self):
+        """
+        The profile's EDAGs (those which were created)
+        """
+
+        return [dag for dag in [
+            self.dagUser,
+            self.dagChatChannels,
+            self.dagNetwork,
+            self.dagSeedsMain,
+            self.dagSeedsAll,
+            self.userInfo
+        ] if dag is not None]
+
+    async def edagsFlush(self):
+        """
+        Saves the pending changes of the profile's EDAGs
+        (saves are deferred)
+        """
+
+        for dag in self.edags:
+            try:
+                await dag.flush()
+            except Exception as err:
+                self.debug(f'{dag}: flush error: {err}')
+
     @property
     def root(self):
         return self._rootDir  # profile's root dir in the MFS
@@ -695,9 +727,12 @@ class UserProfile(QObject):
         self._dagChatChannels = ChannelsDAG(
             self.pathChatChannelsDagMeta, loop=self.ctx.loop)
 
+        edagsSharding = cGet('edags.sharding', mod='galacteek.ipfs')
+
         self._dagNetwork = PeersGraphDAG(
             self.pathEDagNetwork, loop=self.ctx.loop,
-            autoUpdateDates=True
+            autoUpdateDates=True,
+            sharding=edagsSharding
         )
 
         # Seeds
@@ -707,7 +742,8 @@ class UserProfile(QObject):
         )
         self.dagSeedsAll = MegaSeedsEDag(
             self.pathEdagSeedsAll, loop=self.ctx.loop,
-            cipheredMeta=True
+            cipheredMeta=True,
+            sharding=edagsSharding
         )
 
         yield 50, 'Loading EDAGs ..'
@@ -0,0 +1,259 @@
+"""
+Event loop stall detector
+
+A watchdog thread pings the event loop (a callback scheduled with
+call_soon_threadsafe()) every interval seconds. When the loop hasn't
+run the callback after threshold seconds, the loop is stalled: until
+it does, the thread samples the Python stack of the loop's thread
+every sampleInterval seconds.
+
+Each stall is recorded in a ring buffer (StallWatchdog.records), with
+its duration, the task that was running and the call sites found by
+the sampler: the most sampled frame, the most sampled frame in
+galacteek's code, and the most sampled stack.
+
+The buffer of the running application is served by the metrics
+endpoint (GET /stalls, see galacteek.services.core.metrics).
+"""
+
+import asyncio
+import collections
+import os.path
+import sys
+import threading
+import time
+
+from galacteek import log
+from galacteek.core.instrument import instruments
+
+
+# Root directory of the galacteek package
+pkgRoot = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + os.sep
+
+
+def frameSite(frame):
+    filename, lineno, name = frame
+    return f'{filename}:{lineno} ({name})'
+
+
+def stallsReport(snapshot: dict, last: int = 10,
+                 stacks: bool = False) -> str:
+    """
+    Text report of the last stalls of a watchdog snapshot
+    (see StallWatchdog.snapshot())
+    """
+
+    lines = [f'{snapshot["count"]} stall(s) detected '
+             f'(threshold: {snapshot["threshold"]}s)']
+
+    for record in snapshot['records'][-last:]:
+        date = time.strftime('%H:%M:%S', time.localtime(record['date']))
+
+        lines.append('')
+        lines.append(f'{date} stalled {record["duration"] * 1000:.0f} ms'
+                     f' ({record["samples"]} samples)')
+        lines.append(f'  coroutine: {record["coroutine"]} '
+                     f'(task: {record["task"]})')
+        lines.append(f'  site:      {record["site"]}')
+        lines.append(f'  app site:  {record["appSite"]}')
+
+        if stacks:
+            lines.append('  stack (innermost first):')
+            lines += [f'    {site}' for site in record['stack']]
+
+    return '\n'.join(lines)
+
+
+class StallWatchdog:
+    """
+    Watchdog thread detecting the event loop stalls
+
+    :param float threshold: the loop is stalled when a ping hasn't
+        been handled after this delay (seconds)
+    :param float interval: delay between two pings (seconds)
+    :param float sampleInterval: stack sampling interval (seconds)
+    :param int maxRecords: size of the stalls ring buffer
+    :param int maxSamples: max number of samples for a stall
+    :param int stackDepth: max number of frames of a sampled stack
+    """
+
+    def __init__(self,
+                 threshold: float = 0.25,
+                 interval: float = 0.1,
+                 sampleInterval: float = 0.005,
+                 maxRecords: int = 64,
+                 maxSamples: int = 400,
+                 stackDepth: int = 48):
+        self.threshold = threshold
+        self.interval = interval
+        self.sampleInterval = sampleInterval
+        self.maxSamples = maxSamples
+        self.stackDepth = stackDepth
+
+        self.records = collections.deque(maxlen=maxRecords)
+        self.stallsCount = 0
+
+        self.loop = None
+        self.threadId = None
+
+        self._thread = None
+        self._stop = threading.Event()
+        self._acked = threading.Event()
+        self._seq = 0
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, loop=None):
+        """
+        Start watching the loop (call this from the loop's thread)
+        """
+
+        if self.running:
+            return
+
+        self.loop = loop if loop else asyncio.get_event_loop()
+        self.threadId = threading.get_ident()
+
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self.watch,
+            name='stallwatch',
+            daemon=True
+        )
+        self._thread.start()
+
+        log.debug(f'Stall watchdog: started (threshold: {self.threshold})')
+
+    def stop(self):
+        self._stop.set()
+        self._acked.set()
+
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1)
+
+        self._thread = None
+
+    def clear(self):
+        self.records.clear()
+
+    def pong(self, seq: int):
+        # Runs in the loop
+        if seq == self._seq:
+            self._acked.set()
+
+    def watch(self):
+        while not self._stop.wait(self.interval):
+            if not self.loop.is_running():
+                continue
+
+            self._seq += 1
+            self._acked.clear()
+
+            sent = time.monotonic()
+
+            try:
+                self.loop.call_soon_threadsafe(self.pong, self._seq)
+            except RuntimeError:
+                # Loop closed
+                break
+
+            if self._acked.wait(self.threshold):
+                continue
+
+            # Stalled
+            task = self.currentTask()
+            samples = []
+
+            while not self._acked.wait(self.sampleInterval):
+                if len(samples) < self.maxSamples:
+                    stack = self.sampleStack()
+
+                    if stack:
+                        samples.append(stack)
+
+            if not self._stop.is_set():
+                self.stallRecord(time.monotonic() - sent, task, samples)
+
+    def currentTask(self):
+        try:
+            return asyncio.current_task(self.loop)
+        except Exception:
+            return None
+
+    def sampleStack(self):
+        """
+        Stack of the loop's thread (innermost frame first), as a tuple
+        of (filename, lineno, function name)
+        """
+
+        frame = sys._current_frames().get(self.threadId)
+        stack = []
+
+        while frame is not None and len(stack) < self.stackDepth:
+            code = frame.f_code
+            stack.append((code.co_filename, frame.f_lineno, code.co_name))
+            frame = frame.f_back
+
+        return tuple(stack)
+
+    def stallRecord(self, duration: float, task, samples: list):
+        sites = collections.Counter(stack[0] for stack in samples)
+        appSites = collections.Counter()
+
+        for stack in samples:
+            for frame in stack:
+                if frame[0].startswith(pkgRoot):
+                    appSites[frame] += 1
+                    break
+
+        stacks = collections.Counter(samples)
+
+        coro = task._coro if task else None
+        taskName = task.get_name() if hasattr(task, 'get_name') else None
+
+        record = {
+            'date': time.time(),
+            'duration': duration,
+            'task': taskName,
+            'coroutine': getattr(coro, '__qualname__', None),
+            'samples': len(samples),
+            'site': frameSite(sites.most_common(1)[0][0]) if sites else None,
+            'appSite': frameSite(appSites.most_common(1)[0][0])
+            if appSites else None,
+            'stack': [frameSite(frame) for frame in
+                      stacks.most_common(1)[0][0]] if stacks else []
+        }
+
+        self.records.append(record)
+        self.stallsCount += 1
+
+        try:
+            # The instruments are not thread-safe: record in the loop
+            self.loop.call_soon_threadsafe(
+                instruments.record, 'loop.stall', duration)
+        except RuntimeError:
+            # Loop closed
+            pass
+
+        log.debug(
+            f'Event loop stalled for {duration:.3f}s: '
+            f'coroutine: {record["coroutine"]}, site: {record["appSite"]}')
+
+    def snapshot(self) -> dict:
+        """
+        Stalls count and records (JSON-serializable)
+        """
+
+        return {
+            'count': self.stallsCount,
+            'threshold': self.threshold,
+            'records': list(self.records)
+        }
+
+    def report(self, last: int = 10, stacks: bool = False) -> str:
+        return stallsReport(self.snapshot(), last=last, stacks=stacks)
+
+
+stallWatchdog = StallWatchdog()
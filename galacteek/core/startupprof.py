@@ -0,0 +1,147 @@
+"""
+Startup profiler: per-module import time, per-service start latency
+and startup milestones
+"""
+
+import sys
+import time
+import importlib.abc
+
+
+class ImportTimer(importlib.abc.MetaPathFinder):
+    """
+    Meta path finder that times the execution of the modules
+    imported while it's installed (it only patches the loader of
+    the modules found by the other finders).
+    """
+
+    def __init__(self, profiler):
+        self.profiler = profiler
+        self._finding = set()
+        self._stack = []
+
+    def find_spec(self, fullname, path, target=None):
+        if fullname in self._finding:
+            return None
+
+        self._finding.add(fullname)
+
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, 'find_spec'):
+                    continue
+
+                spec = finder.find_spec(fullname, path, target)
+
+                if spec is not None:
+                    self.patchLoader(spec)
+                    return spec
+        finally:
+            self._finding.discard(fullname)
+
+        return None
+
+    def patchLoader(self, spec):
+        loader = spec.loader
+
+        # Don't patch shared (class) loaders like the builtin importer,
+        # and patch instance attributes only (the loader's type is
+        # used by pkg_resources to find the resource provider)
+        if loader is None or isinstance(loader, type) or \
+                not hasattr(loader, 'exec_module'):
+            return
+
+        execModule = loader.exec_module
+
+        def timedExecModule(module):
+            self._stack.append(0.0)
+            start = time.perf_counter()
+
+            try:
+                return execModule(module)
+            finally:
+                elapsed = time.perf_counter() - start
+                children = self._stack.pop()
+
+                if self._stack:
+                    self._stack[-1] += elapsed
+
+                self.profiler.moduleImported(
+                    spec.name, elapsed, elapsed - children)
+
+        try:
+            loader.exec_module = timedExecModule
+        except Exception:
+            pass
+
+
+class StartupProfiler:
+    def __init__(self):
+        self.enabled = False
+        self.t0 = time.perf_counter()
+        self.modules = {}
+        self.services = {}
+        self.milestones = []
+        self._timer = None
+
+    def install(self):
+        """
+        Enable the profiler (modules imported from now on are timed)
+        """
+
+        if self.enabled:
+            return
+
+        self.enabled = True
+        self.t0 = time.perf_counter()
+        self._timer = ImportTimer(self)
+        sys.meta_path.insert(0, self._timer)
+
+    def uninstall(self):
+        if self._timer in sys.meta_path:
+            sys.meta_path.remove(self._timer)
+
+        self._timer = None
+
+    def moduleImported(self, name: str, cumulative: float, selfTime: float):
+        self.modules[name] = (cumulative, selfTime)
+
+    def serviceStarted(self, name: str, latency: float):
+        if self.enabled:
+            self.services[name] = latency
+
+    def mark(self, label: str):
+        if self.enabled:
+            self.milestones.append((label, time.perf_counter() - self.t0))
+
+    def report(self, top: int = 30) -> str:
+        lines = ['Startup profile', '']
+
+        lines.append('Milestones (seconds since start):')
+        for label, when in self.milestones:
+            lines.append(f'  {when:8.3f}  {label}')
+
+        def section(title, entries):
+            lines.append('')
+            lines.append(title)
+            for name, value in entries[:top]:
+                lines.append(f'  {value * 1000:10.1f} ms  {name}')
+
+        section('Imports (self time):', sorted(
+            ((n, t[1]) for n, t in self.modules.items()),
+            key=lambda e: e[1], reverse=True))
+        section('Imports (cumulative):', sorted(
+            ((n, t[0]) for n, t in self.modules.items()),
+            key=lambda e: e[1], reverse=True))
+        section('Services start latency (with sub-services):', sorted(
+            self.services.items(), key=lambda e: e[1], reverse=True))
+
+        total = sum(t[1] for t in self.modules.values())
+
+        lines.append('')
+        lines.append(f'{len(self.modules)} modules imported, '
+                     f'total: {total:.3f}s')
+        return '\n'.join(lines)
+
+
+startupProfiler = StartupProfiler()
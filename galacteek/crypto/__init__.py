@@ -1,24 +1,232 @@
 import asyncio
 import concurrent.futures
 import functools
+import hashlib
+import threading
+import time
 
-from cachetools import TTLCache
+from cachetools import LRUCache
+
+from galacteek.core import SingletonDecorator
+from galacteek.config import cGet
+from galacteek.ipfs import ipfsOp
+
+
+class CryptoWorkerPool:
+    """
+    Worker pool shared by the crypto executors (RSA, ECC, Curve25519),
+    keeping track of the queue and execution times
+    """
+
+    def __init__(self, maxWorkers=6):
+        self.maxWorkers = maxWorkers
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=maxWorkers,
+            thread_name_prefix='gcrypto'
+        )
+
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.queuedMax = 0
+        self.active = 0
+        self.completed = 0
+        self.failed = 0
+        self.waitTimeTotal = 0.0
+        self.execTimeTotal = 0.0
+
+    def _run(self, fn, tQueued):
+        tStart = time.monotonic()
+
+        with self._lock:
+            self.queued -= 1
+            self.active += 1
+            self.waitTimeTotal += tStart - tQueued
+
+        try:
+            return fn()
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            raise
+        finally:
+            with self._lock:
+                self.active -= 1
+                self.completed += 1
+                self.execTimeTotal += time.monotonic() - tStart
+
+    async def run(self, loop, fn, *args, **kw):
+        with self._lock:
+            self.queued += 1
+            self.queuedMax = max(self.queuedMax, self.queued)
+
+        return await loop.run_in_executor(
+            self.executor,
+            functools.partial(
+                self._run,
+                functools.partial(fn, *args, **kw),
+                time.monotonic()
+            )
+        )
+
+    def metrics(self):
+        with self._lock:
+            done = max(self.completed, 1)
+
+            return {
+                'maxWorkers': self.maxWorkers,
+                'queued': self.queued,
+                'queuedMax': self.queuedMax,
+                'active': self.active,
+                'completed': self.completed,
+                'failed': self.failed,
+                'waitTimeAvg': self.waitTimeTotal / done,
+                'execTimeAvg': self.execTimeTotal / done
+            }
+
+
+class CryptoKeyStore:
+    """
+    Store of parsed key objects (RSA keys, JWKs, nacl boxes ..),
+    keyed by CID or fingerprint. Least recently used keys are evicted.
+    """
+
+    def __init__(self, maxSize=512):
+        self._keys = LRUCache(maxsize=maxSize)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def fingerprint(keyData):
+        if isinstance(keyData, str):
+            keyData = keyData.encode()
+
+        return hashlib.sha3_256(bytes(keyData)).hexdigest()
+
+    def get(self, keyId):
+        with self._lock:
+            key = self._keys.get(keyId)
+
+            if key is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+            return key
+
+    def put(self, keyId, key):
+        with self._lock:
+            self._keys[keyId] = key
+
+    def evict(self, keyId):
+        with self._lock:
+            self._keys.pop(keyId, None)
+
+    def metrics(self):
+        with self._lock:
+            return {
+                'size': len(self._keys),
+                'maxSize': self._keys.maxsize,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+@SingletonDecorator
+class CryptoRuntime:
+    """
+    Crypto runtime shared by all the crypto executors: one worker pool
+    and one store of parsed keys.
+
+    The sizes are read from the config, whichever executor creates
+    the runtime first.
+    """
+
+    def __init__(self):
+        workers = cGet('runtime.workers')
+        keyStoreSize = cGet('runtime.keyStoreSize')
+
+        self.pool = CryptoWorkerPool(
+            maxWorkers=workers if workers else 6)
+        self.keyStore = CryptoKeyStore(
+            maxSize=keyStoreSize if keyStoreSize else 512)
+
+    def metrics(self):
+        return {
+            'pool': self.pool.metrics(),
+            'keyStore': self.keyStore.metrics()
+        }
 
 
 class BaseCryptoExec:
-    def __init__(self, loop=None, executor=None,
-                 cacheSize=128, cacheTTL=120):
+    """
+    Base crypto executor.
+
+    Operations run in the shared crypto worker pool, unless a
+    dedicated executor is passed.
+    """
+
+    def __init__(self, loop=None, executor=None, runtime=None):
         self.loop = loop if loop else asyncio.get_event_loop()
-        self.executor = executor if executor else \
-            concurrent.futures.ThreadPoolExecutor(max_workers=4)
-        self._keysCache = TTLCache(maxsize=cacheSize, ttl=cacheTTL)
+        self.executor = executor
+        self.runtime = runtime if runtime else CryptoRuntime()
+
+    @property
+    def keyStore(self):
+        return self.runtime.keyStore
 
     async def _exec(self, fn, *args, **kw):
-        return await self.loop.run_in_executor(
-            self.executor, functools.partial(fn, *args, **kw))
+        if self.executor:
+            return await self.loop.run_in_executor(
+                self.executor, functools.partial(fn, *args, **kw))
+
+        return await self.runtime.pool.run(self.loop, fn, *args, **kw)
+
+    async def parsedKey(self, keyType: str, keyData, parser, keyId=None):
+        """
+        Returns the parsed key object for keyData, from the key store
+        if we have it, otherwise by running parser (in the pool) and
+        storing the result
+
+        :param str keyType: key type, used as a key store namespace
+        :param keyData: the key's data, passed to the parser
+        :param parser: callable parsing the key's data
+        :param keyId: key ID (CID ..). Defaults to the data's fingerprint
+        """
+
+        storeId = '{0}:{1}'.format(
+            keyType,
+            keyId if keyId else self.keyStore.fingerprint(keyData)
+        )
+
+        key = self.keyStore.get(storeId)
+
+        if key is None:
+            key = await self._exec(parser, keyData)
+
+            if key is not None:
+                self.keyStore.put(storeId, key)
+
+        return key
+
+    @ipfsOp
+    async def pubKeyFromCid(self, ipfsop, pubKeyCid, timeout=None):
+        """
+        Returns the data of the public key referenced by pubKeyCid.
+        CIDs being immutable, keys stay in the key store until evicted.
+        """
+
+        cached = self.cachedKey(pubKeyCid)
+        if cached:
+            return cached
+
+        key = await ipfsop.catObject(pubKeyCid, timeout=timeout)
+        if key:
+            self.cacheKey(pubKeyCid, key)
+            return key
 
     def cachedKey(self, keyId):
-        return self._keysCache.get(keyId)
+        return self.keyStore.get(f'cid:{keyId}')
 
     def cacheKey(self, keyId, data):
-        self._keysCache[keyId] = data
+        self.keyStore.put(f'cid:{keyId}', data)
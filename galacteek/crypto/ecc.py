@@ -1,7 +1,6 @@
 from Cryptodome.PublicKey import ECC
 
 from galacteek.crypto import BaseCryptoExec
-from galacteek.ipfs import ipfsOp
 
 from nacl.public import Box
 from nacl.public import SealedBox
@@ -18,22 +17,30 @@ class Curve25519(BaseCryptoExec):
 
         return await self._exec(_generateKeypair)
 
-    @ipfsOp
-    async def pubKeyFromCid(self, ipfsop, pubKeyCid, timeout=None):
-        cached = self.cachedKey(pubKeyCid)
-        if cached:
-            return cached
+    async def box(self, privKey, pubKey):
+        """
+        Returns the (cached) Box for this pair of keys. Creating a Box
+        computes the shared key, so we keep them in the key store.
+        """
 
-        key = await ipfsop.catObject(pubKeyCid, timeout=timeout)
-        if key:
-            self.cacheKey(pubKeyCid, key)
-            return key
+        fp = self.keyStore.fingerprint
+
+        return await self.parsedKey(
+            'c25519box',
+            (privKey, pubKey),
+            lambda keys: Box(PrivateKey(keys[0]), PublicKey(keys[1])),
+            keyId=f'{fp(privKey)}:{fp(pubKey)}'
+        )
 
     async def encrypt(self, msg: bytes, privKey, pubKey):
+        try:
+            box = await self.box(privKey, pubKey)
+        except Exception:
+            return
+
         def _box():
             try:
                 nonce = nacl.utils.random(Box.NONCE_SIZE)
-                box = Box(PrivateKey(privKey), PublicKey(pubKey))
                 return box.encrypt(msg, nonce)
             except Exception:
                 return
@@ -41,15 +48,44 @@ class Curve25519(BaseCryptoExec):
         return await self._exec(_box)
 
     async def decrypt(self, enc, privKey, pubKey):
+        try:
+            box = await self.box(privKey, pubKey)
+        except Exception:
+            return
+
         def _dec():
             try:
-                box = Box(PrivateKey(privKey), PublicKey(pubKey))
                 return box.decrypt(enc)
             except Exception:
                 return
 
         return await self._exec(_dec)
 
+    async def decryptBatch(self, encs: list, privKey, pubKey):
+        """
+        Decrypt a list of messages from the same sender in one
+        pool job. Returns the list of decrypted messages (None
+        for messages that could not be decrypted).
+        """
+
+        try:
+            box = await self.box(privKey, pubKey)
+        except Exception:
+            return [None] * len(encs)
+
+        def _decAll():
+            results = []
+
+            for enc in encs:
+                try:
+                    results.append(box.decrypt(enc))
+                except Exception:
+                    results.append(None)
+
+            return results
+
+        return await self._exec(_decAll)
+
     async def encryptSealed(self, msg: bytes, pubKey):
         def _box():
             try:
@@ -74,7 +110,7 @@ class Curve25519(BaseCryptoExec):
 
 class ECCExecutor(BaseCryptoExec):
     async def importKey(self, keyData):
-        return await self._exec(lambda: ECC.import_key(keyData))
+        return await self.parsedKey('ecc', keyData, ECC.import_key)
 
     async def genKeys(self, curve='P-521'):
         def _generateKeypair(size):
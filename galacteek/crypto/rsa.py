@@ -1,11 +1,6 @@
 import traceback
-import asyncio
-import concurrent.futures
-import functools
 import base64
-import hashlib
-
-from cachetools import TTLCache
+import struct
 
 from jwcrypto import jws
 from jwcrypto import jwk
@@ -21,21 +16,27 @@ from Cryptodome.Util.Padding import unpad
 from Cryptodome.Hash import SHA256
 
 from galacteek import log
+from galacteek.crypto import BaseCryptoExec
+
 
+# Streamed encryption format (see RSAExecutor.encryptStream)
+STREAM_MAGIC = b'GSE1'
+STREAM_NONCE_PREFIX_LEN = 8
+STREAM_RECORD_HDR = struct.Struct('>BI')
+STREAM_TAG_LEN = 16
+STREAM_CHUNK_SIZE = 1048576
+STREAM_RECORD_MAXLEN = 4 * STREAM_CHUNK_SIZE
 
-class RSAExecutor(object):
+
+class RSAExecutor(BaseCryptoExec):
     """
     RSA Executor.
 
-    The default executor used is a ThreadPoolExecutor
+    Operations run in the shared crypto worker pool (unless a
+    dedicated executor is passed), and parsed keys are kept in
+    the shared key store.
     """
 
-    def __init__(self, loop=None, executor=None):
-        self.loop = loop if loop else asyncio.get_event_loop()
-        self.executor = executor if executor else \
-            concurrent.futures.ThreadPoolExecutor(max_workers=6)
-        self._keysCache = TTLCache(maxsize=128, ttl=240)
-
     def randBytes(self, rlen=16):
         return get_random_bytes(rlen)
 
@@ -43,23 +44,27 @@ class RSAExecutor(object):
         if isinstance(key, RSA.RsaKey):
             return key
         else:
-            return await self.importKey(key)
+            return await self.importKeyCached(key)
 
-    async def _exec(self, fn, *args, **kw):
-        return await self.loop.run_in_executor(
-            self.executor, functools.partial(fn, *args, **kw))
+    def _importKey(self, key, pphrase=None):
+        try:
+            assert key is not None
+            assert isinstance(key, bytes) or isinstance(key, str)
 
-    async def importKey(self, keyData, passphrase=None):
-        def _import(key, pphrase):
-            try:
-                assert key is not None
-                assert isinstance(key, bytes) or isinstance(key, str)
+            return RSA.import_key(key, passphrase=pphrase)
+        except Exception as err:
+            log.debug(f'Could not import RSA key: {err}')
 
-                return RSA.import_key(key, passphrase=pphrase)
-            except Exception as err:
-                log.debug(f'Could not import RSA key: {err}')
+    async def importKeyCached(self, keyData):
+        """
+        Import an (unprotected) RSA key, returning the parsed key
+        from the key store if it was already imported
+        """
 
-        return await self._exec(_import, keyData, passphrase)
+        return await self.parsedKey('rsa', keyData, self._importKey)
+
+    async def importKey(self, keyData, passphrase=None):
+        return await self._exec(self._importKey, keyData, passphrase)
 
     async def genKeys(self, keysize=2048, passphrase=None):
         """
@@ -82,19 +87,10 @@ class RSAExecutor(object):
         if not isinstance(data, BytesIO):
             raise ValueError('Need BytesIO')
 
+        # Parsed keys are always cached now (cacheKey is kept for
+        # compatibility)
         try:
-            if cacheKey:
-                hasher = hashlib.sha3_256()
-                hasher.update(recipientKeyData)
-                dig = hasher.hexdigest()
-
-                key = self._keysCache.get(dig)
-
-                if not key:
-                    key = await self._getKey(recipientKeyData)
-                    self._keysCache[dig] = key
-            else:
-                key = await self._getKey(recipientKeyData)
+            key = await self._getKey(recipientKeyData)
         except Exception as err:
             log.debug(f'Cannot load RSA key: {err}')
             return
@@ -229,6 +225,169 @@ class RSAExecutor(object):
             log.debug('Type error on decryption, check privkey')
             return None
 
+    def isStreamEncrypted(self, data: bytes):
+        return data[0:len(STREAM_MAGIC)] == STREAM_MAGIC
+
+    async def encryptStream(self, chunks, recipientKeyData, sessionKey=None):
+        """
+        Async generator that encrypts the byte chunks produced by
+        the async iterable chunks, without holding more than a chunk
+        in memory.
+
+        The session key (AES-256) is wrapped once with the
+        recipient's RSA key (PKCS1-OAEP) in the stream header::
+
+            magic (4) | nonce prefix (8) | RSA-encrypted session key
+
+        Each chunk is then encrypted with AES-GCM (the nonce is made
+        of the nonce prefix and the chunk counter) and yielded as a
+        record::
+
+            final flag (1) | ciphertext length (4) | ciphertext | tag (16)
+
+        Chunks larger than STREAM_RECORD_MAXLEN are split in
+        several records.
+
+        The nonce prefix, the chunk counter and the final flag are
+        authenticated, so reordering or truncating records is detected
+        when decrypting.
+        """
+
+        key = await self._getKey(recipientKeyData)
+
+        if not key:
+            raise ValueError('Invalid key')
+
+        sessionKey = sessionKey if sessionKey else get_random_bytes(32)
+        noncePrefix = get_random_bytes(STREAM_NONCE_PREFIX_LEN)
+
+        yield await self._exec(self._streamHeader, key, sessionKey,
+                               noncePrefix)
+
+        counter, prev = 0, None
+
+        # Read ahead one chunk to know which one is the last
+        async for data in chunks:
+            for pos in range(0, len(data), STREAM_RECORD_MAXLEN):
+                chunk = data[pos:pos + STREAM_RECORD_MAXLEN]
+
+                if prev is not None:
+                    yield await self._exec(self._encryptStreamChunk,
+                                           sessionKey, noncePrefix,
+                                           counter, prev, False)
+                    counter += 1
+
+                prev = chunk
+
+        yield await self._exec(self._encryptStreamChunk,
+                               sessionKey, noncePrefix,
+                               counter, prev if prev else b'', True)
+
+    async def decryptStream(self, chunks, privKeyData):
+        """
+        Async generator that decrypts a stream produced by
+        encryptStream(), chunks being an async iterable yielding the
+        encrypted stream's data (in chunks of any size).
+
+        Raises ValueError if the stream is invalid, truncated or
+        was tampered with, or if a record is larger than
+        STREAM_RECORD_MAXLEN.
+        """
+
+        privKey = await self._getKey(privKeyData)
+
+        if not privKey:
+            raise ValueError('Invalid key')
+
+        hdrLen = len(STREAM_MAGIC) + STREAM_NONCE_PREFIX_LEN + \
+            privKey.size_in_bytes()
+        buff = bytearray()
+        sessionKey, noncePrefix = None, None
+        counter, final = 0, False
+
+        async for data in chunks:
+            buff.extend(data)
+
+            if sessionKey is None:
+                if len(buff) < hdrLen:
+                    continue
+
+                sessionKey, noncePrefix = await self._exec(
+                    self._streamHeaderOpen, bytes(buff[0:hdrLen]), privKey)
+                del buff[0:hdrLen]
+
+            while len(buff) >= STREAM_RECORD_HDR.size:
+                if final:
+                    raise ValueError('Trailing data after final record')
+
+                isFinal, ctLen = STREAM_RECORD_HDR.unpack_from(buff)
+
+                if ctLen > STREAM_RECORD_MAXLEN:
+                    raise ValueError('Invalid record length')
+
+                recLen = STREAM_RECORD_HDR.size + ctLen + STREAM_TAG_LEN
+
+                if len(buff) < recLen:
+                    break
+
+                record = bytes(buff[0:recLen])
+                del buff[0:recLen]
+
+                yield await self._exec(self._decryptStreamChunk,
+                                       sessionKey, noncePrefix,
+                                       counter, record)
+
+                counter += 1
+                final = bool(isFinal)
+
+        if not final or buff:
+            raise ValueError('Truncated stream')
+
+    def _streamHeader(self, recipientKey, sessionKey, noncePrefix):
+        cipherRsa = PKCS1_OAEP.new(recipientKey)
+        return STREAM_MAGIC + noncePrefix + cipherRsa.encrypt(sessionKey)
+
+    def _streamHeaderOpen(self, header: bytes, privKey):
+        if not self.isStreamEncrypted(header):
+            raise ValueError('Not an encrypted stream')
+
+        nOffset = len(STREAM_MAGIC)
+        noncePrefix = header[nOffset:nOffset + STREAM_NONCE_PREFIX_LEN]
+
+        cipherRsa = PKCS1_OAEP.new(privKey)
+        sessionKey = cipherRsa.decrypt(
+            header[nOffset + STREAM_NONCE_PREFIX_LEN:])
+
+        return sessionKey, noncePrefix
+
+    def _streamChunkCipher(self, sessionKey, noncePrefix, counter, final):
+        if counter > 0xffffffff:
+            raise ValueError('Stream chunk counter overflow')
+
+        cipherAes = AES.new(sessionKey, AES.MODE_GCM,
+                            nonce=noncePrefix + struct.pack('>I', counter))
+        cipherAes.update(noncePrefix + struct.pack('>IB', counter, final))
+        return cipherAes
+
+    def _encryptStreamChunk(self, sessionKey, noncePrefix, counter,
+                            chunk: bytes, final: bool):
+        cipherAes = self._streamChunkCipher(sessionKey, noncePrefix,
+                                            counter, final)
+        ciphertext, tag = cipherAes.encrypt_and_digest(chunk)
+
+        return STREAM_RECORD_HDR.pack(final, len(ciphertext)) + \
+            ciphertext + tag
+
+    def _decryptStreamChunk(self, sessionKey, noncePrefix, counter,
+                            record: bytes):
+        final, ctLen = STREAM_RECORD_HDR.unpack_from(record)
+        ciphertext = record[STREAM_RECORD_HDR.size:-STREAM_TAG_LEN]
+        tag = record[-STREAM_TAG_LEN:]
+
+        cipherAes = self._streamChunkCipher(sessionKey, noncePrefix,
+                                            counter, final)
+        return cipherAes.decrypt_and_verify(ciphertext, tag)
+
     async def pssSign(self, message: bytes, privRsaKey):
         privKey = await self._getKey(privRsaKey)
         return await self._exec(self._pssSign, message, privKey)
@@ -291,12 +450,100 @@ class RSAExecutor(object):
 
         return await self._exec(_verify, signature, key)
 
-    async def jwsVerifyFromPem(self, signature, pem: str):
-        def _verify(sig, pem):
+    async def pssVerifBatch(self, items: list):
+        """
+        Verify a list of PSS signatures in one pool job.
+
+        :param list items: list of (message, signature, pubKey) tuples
+        :return: list of verification results (in the same order)
+        """
+
+        jobs = []
+
+        for message, signature, pubKey in items:
+            jobs.append((message, signature, await self._getKey(pubKey)))
+
+        def _verifyAll():
+            return [
+                self._pssVerif(message, signature, key) if key else None
+                for message, signature, key in jobs
+            ]
+
+        return await self._exec(_verifyAll)
+
+    async def decryptBatch(self, datas: list, privKeyData):
+        """
+        Decrypt a list of messages (encrypted with encryptData())
+        in one pool job. Returns the list of decrypted messages
+        (None for messages that could not be decrypted).
+        """
+
+        privKey = await self._getKey(privKeyData)
+
+        if not privKey:
+            raise ValueError('Invalid key')
+
+        def _decryptAll():
+            results = []
+
+            for data in datas:
+                dec = self._decryptPkcs1OAEP_AES256CBC(
+                    BytesIO(data), privKey)
+
+                if not dec:
+                    dec = self._decryptPkcs1OAEP_AES128EAX(
+                        BytesIO(data), privKey)
+
+                results.append(dec)
+
+            return results
+
+        return await self._exec(_decryptAll)
+
+    async def jsonldVerifyBatch(self, items: list):
+        """
+        Verify a list of JSON-LD signatures (RsaSignatureSuite2017)
+        in one pool job, the public keys being parsed once through
+        the key store.
+
+        :param list items: list of (document, JWS signature value,
+            pubKey) tuples
+        :return: list of verification results (in the same order)
+        """
+
+        from galacteek.ld.signatures import jsonldsig
+
+        jobs = []
+
+        for document, jwsValue, pubKey in items:
+            jobs.append((document, jwsValue, await self._getKey(pubKey)))
+
+        def _verify(document, jwsValue, key):
             try:
-                key = jwk.JWK()
-                key.import_from_pem(pem.encode())
+                return jsonldsig.verifysa(document, jwsValue, key)
+            except Exception as err:
+                log.debug(f'Exception on JSON-LD verification: {err}')
+                return None
+
+        def _verifyAll():
+            return [
+                _verify(document, jwsValue, key) if key else None
+                for document, jwsValue, key in jobs
+            ]
 
+        return await self._exec(_verifyAll)
+
+    def _jwkFromPem(self, pem: str):
+        try:
+            key = jwk.JWK()
+            key.import_from_pem(pem.encode())
+            return key
+        except Exception as err:
+            log.debug(f'Cannot import JWK from PEM: {err}')
+
+    async def jwsVerifyFromPem(self, signature, pem: str):
+        def _verify(sig, key):
+            try:
                 token = jws.JWS()
                 token.deserialize(sig, alg='RS256')
                 token.verify(key, alg='RS256')
@@ -305,4 +552,7 @@ class RSAExecutor(object):
                 traceback.print_exc()
                 log.debug(f'Cannot verify JWS: {err}')
 
-        return await self._exec(_verify, signature, pem)
+        key = await self.parsedKey('jwk', pem, self._jwkFromPem)
+
+        if key:
+            return await self._exec(_verify, signature, key)
@@ -7,6 +7,7 @@ from datetime import timedelta
 from tortoise import Tortoise
 from tortoise.query_utils import Q
 from tortoise.functions import Count
+from tortoise.transactions import in_transaction
 
 from PyQt5.QtCore import QUrl
 
@@ -17,10 +18,19 @@ from galacteek.core.asynclib import loopTime
 from galacteek.ipfs.cidhelpers import IPFSPath
 
 from galacteek.database.models import *  # noqa
+from galacteek.database import fts
+from galacteek.database.connections import dbConfig
+from galacteek.database.connections import dbIndexesCreate
+from galacteek.database.connections import ormConfig
+from galacteek.database.connections import readDb
+from galacteek.database.connections import readPool
+from galacteek.database.urlhistory import urlHistoryItemNew
 
 from galacteek.database.ops.bm import *  # noqa
 from galacteek.database.ops.pinning import *  # noqa
 
+# Serializes the callers of write sequences that must not interleave
+# (the read-only queries go through the read pool, see readDb())
 databaseLock = asyncio.Lock()
 
 
@@ -33,16 +43,28 @@ def dbLock(func):
     return wrapper
 
 
-async def initOrm(dbpath):
+async def initOrm(dbpath, tuned=True):
+    """
+    Open the database. With tuned, the connections use the pragmas
+    from the sqlite config, the indexes on the hot lookups are
+    created and the read pool is opened.
+    """
+
     log.debug('ORM init: {}'.format(dbpath))
 
     try:
-        await Tortoise.init(
-            db_url='sqlite://{}'.format(dbpath),
-            modules={'models': ['galacteek.database.models']}
-        )
+        await Tortoise.init(config=ormConfig(dbpath, tuned=tuned))
 
         await Tortoise.generate_schemas()
+
+        if tuned:
+            await dbIndexesCreate()
+
+        await fts.ftsSetup()
+
+        if tuned:
+            await readPool.open(
+                dbpath, dbConfig.get('readPool.size') or 0)
     except Exception:
         traceback.print_exc()
         return False
@@ -51,6 +73,7 @@ async def initOrm(dbpath):
 
 
 async def closeOrm():
+    await readPool.close()
     await Tortoise.close_connections()
 
 
@@ -60,11 +83,11 @@ IPNSFeedMarkAdded = AsyncSignal(IPNSFeed, Hashmark)
 
 
 async def hashmarksAll():
-    return await Hashmark.all()
+    return await Hashmark.all().using_db(readDb())
 
 
 async def hashmarksCount():
-    return await Hashmark.all().count()
+    return await Hashmark.all().using_db(readDb()).count()
 
 
 async def hashmarksByPath(ref):
@@ -76,15 +99,23 @@ async def hashmarksByPath(ref):
 async def hashmarksSearch(query=None, category=None):
     filter = Q(active=True)
 
-    if query:
+    if category:
+        filter = filter & Q(category__name=category)
+
+    if query and fts.ftsEnabled and fts.ftsQuery(query):
+        ids = await fts.ftsHashmarkIds(query)
+        ranks = {id: rank for rank, id in enumerate(ids)}
+
+        marks = await Hashmark.filter(
+            filter & Q(id__in=ids)).using_db(readDb())
+        return sorted(marks, key=lambda mark: ranks[mark.id])
+    elif query:
         filter = filter & (Q(path__icontains=query) |
                            Q(title__icontains=query) |
                            Q(description__icontains=query) |
                            Q(url__icontains=query))
-    if category:
-        filter = filter & Q(category__name=category)
 
-    return await Hashmark.filter(filter)
+    return await Hashmark.filter(filter).using_db(readDb())
 
 
 async def hashmarksExists(pathorurl):
@@ -110,7 +141,7 @@ async def hashmarksByTags(taglist, strict=False, limit=0, **kw):
         else:
             filter = filter | Q(iptags__name__icontains=tag)
 
-    return await Hashmark.filter(filter).limit(
+    return await Hashmark.filter(filter).using_db(readDb()).limit(
         limit if limit > 0 else 32768)
 
 
@@ -122,12 +153,12 @@ async def hashmarksByObjTags(taglist, **kw):
     for tag in tags:
         filter = filter | Q(objtags__name__icontains=tag)
 
-    return await Hashmark.filter(filter)
+    return await Hashmark.filter(filter).using_db(readDb())
 
 
 async def hashmarksPopularTags(min=1, limit=64):
     return await IPTag.annotate(
-        marks_count=Count('revhashmarks')).filter(
+        marks_count=Count('revhashmarks')).using_db(readDb()).filter(
             marks_count__gte=min).limit(limit).order_by('-marks_count')
 
 
@@ -303,11 +334,20 @@ async def ipTagAdd(tag):
     return ex
 
 
-async def urlHistorySearch(query):
+async def urlHistorySearch(query, limit=16):
+    """
+    Search the URL history (prefix search on the URL and title
+    words), ranked by frecency. Returns a list of dicts
+    (url, title, visits, frecency)
+    """
+
+    if fts.ftsEnabled:
+        return await fts.ftsHistorySearch(query, limit=limit)
+
     return await URLHistoryVisit.filter(
         Q(historyitem__url__icontains=query) |
-        Q(title__icontains=query)).order_by(
-            '-dateaccess').distinct().values(
+        Q(title__icontains=query)).using_db(readDb()).order_by(
+            '-dateaccess').distinct().limit(limit).values(
             'title',
             url='historyitem__url'
     )
@@ -318,26 +358,10 @@ async def urlHistoryGet(url):
 
 
 async def urlHistoryRecord(url, title):
-    from galacteek.browser.schemes import isIpfsUrl
-
     item = await urlHistoryGet(url)
 
     if not item:
-        qUrl = QUrl(url)
-        scheme = qUrl.scheme() if qUrl.isValid() else ''
-
-        rootcid = ''
-        rootcidv = 0
-
-        if isIpfsUrl(qUrl):
-            ipfsPath = IPFSPath(url)
-            if ipfsPath.valid and ipfsPath.rootCid:
-                rootcid = str(ipfsPath.rootCid)
-                rootcidv = ipfsPath.rootCid.version
-
-        item = URLHistoryItem(
-            url=url, rootcid=rootcid, rootcidv=rootcidv,
-            scheme=scheme)
+        item = urlHistoryItemNew(url)
         await item.save()
 
     visit = URLHistoryVisit(historyitem=item, title=title)
@@ -416,7 +440,28 @@ async def ipnsFeedsNeedSync(minutes=10):
     filter = Q(active=True) & \
         (Q(resolvenext__lt=maxdate) | Q(resolvenext__isnull=True))
 
-    return await IPNSFeed.filter(filter).order_by('-resolvedlast')
+    return await IPNSFeed.filter(filter).using_db(readDb()).order_by(
+        '-resolvedlast')
+
+
+async def ipnsFeedsActive():
+    return await IPNSFeed.filter(active=True).using_db(
+        readDb()).prefetch_related('feedhashmark')
+
+
+async def ipnsFeedGet(feedId: int):
+    return await IPNSFeed.filter(id=feedId).prefetch_related(
+        'feedhashmark').first()
+
+
+async def ipnsFeedMarkPaths(feed: IPNSFeed):
+    """
+    Returns the paths of the hashmarks registered by an IPNS feed
+    """
+
+    return await Hashmark.filter(
+        parent__id=feed.feedhashmark.id
+    ).using_db(readDb()).values_list('path', flat=True)
 
 
 async def seedAdd(cid: str):
@@ -458,6 +503,34 @@ async def seedsAll():
     return await IPSeed.all()
 
 
+async def seedsIndexNodes():
+    return await IPSeedsIndexNode.all().prefetch_related('entries')
+
+
+async def seedsIndexNodeStore(udh: str, dagCid: str, entries: list):
+    """
+    Store the index entries (list of dicts) of the seeds DAG udh
+    """
+
+    async with in_transaction():
+        node = await IPSeedsIndexNode.filter(udh=udh).first()
+
+        if node:
+            await IPSeedsIndexEntry.filter(node=node).delete()
+            node.dagCid = dagCid
+            await node.save()
+        else:
+            node = await IPSeedsIndexNode.create(udh=udh, dagCid=dagCid)
+
+        await IPSeedsIndexEntry.bulk_create([
+            IPSeedsIndexEntry(node=node, **entry) for entry in entries
+        ])
+
+
+async def seedsIndexNodeRemove(udh: str):
+    await IPSeedsIndexNode.filter(udh=udh).delete()
+
+
 # Pub chat tokens
 
 
@@ -0,0 +1,243 @@
+"""
+Benchmark of the common database queries, with the default SQLite
+settings ('before') and with the performance profile ('after': tuned
+pragmas, indexes, read pool)
+
+    python -m galacteek.database.bench --size 20000
+"""
+
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+from datetime import datetime
+from datetime import timedelta
+from pathlib import Path
+
+from tortoise.transactions import in_transaction
+
+from galacteek import database
+from galacteek.database.models import *  # noqa
+from galacteek.database.psmanager import psManagerForTopic
+
+
+async def benchPopulate(size: int):
+    """
+    Populate the database: size hashmarks and history items (5 visits
+    per item), a few IPNS feeds and size pubsub records
+    """
+
+    source = await database.hashmarkSourceLocal()
+    now = datetime.now()
+
+    await Hashmark.bulk_create([
+        Hashmark(
+            path=f'/ipfs/bafybench{idx:08}',
+            url=f'ipfs://bafybench{idx:08}',
+            title=f'Hashmark {idx} planet{idx % 97}',
+            description=f'Benchmark hashmark {idx}',
+            source=source
+        ) for idx in range(size)
+    ], batch_size=1000)
+
+    feedMarks = await Hashmark.filter(id__lte=16)
+
+    for mark in feedMarks:
+        await IPNSFeed.create(
+            name=f'feed{mark.id}', feedhashmark=mark,
+            resolvenext=now - timedelta(minutes=mark.id))
+
+    for idx in range(size, size + size // 10):
+        await Hashmark.create(
+            path=f'/ipfs/bafyfeedentry{idx:08}',
+            source=source,
+            parent=feedMarks[idx % len(feedMarks)]
+        )
+
+    await URLHistoryItem.bulk_create([
+        URLHistoryItem(url=f'https://site{idx % 211}.org/page/{idx}',
+                       scheme='https')
+        for idx in range(size)
+    ], batch_size=1000)
+
+    ids = await URLHistoryItem.all().values_list('id', flat=True)
+
+    async with in_transaction() as conn:
+        await URLHistoryVisit.bulk_create([
+            URLHistoryVisit(
+                historyitem_id=ids[idx % len(ids)],
+                title=f'Page {idx} galaxy{idx % 31}',
+                dateaccess=now - timedelta(hours=idx % 2000)
+            ) for idx in range(size * 5)
+        ], batch_size=1000, using_db=conn)
+
+    ps = await psManagerForTopic('galacteek.bench')
+
+    async with in_transaction() as conn:
+        await PubSubMsgRecord.bulk_create([
+            PubSubMsgRecord(channel=ps.channel, senderPeerId=f'peer{idx}',
+                            sizeRaw=idx)
+            for idx in range(size)
+        ], batch_size=1000, using_db=conn)
+
+    records = await PubSubMsgRecord.all().values_list('id', flat=True)
+
+    async with in_transaction() as conn:
+        await PubSubMsgAttrRecord.bulk_create([
+            PubSubMsgAttrRecord(
+                msgrecord_id=records[idx % len(records)],
+                msgType='ChatRoomMessage',
+                attrName='uid',
+                attrStrValue=f'uid{idx}'
+            ) for idx in range(size)
+        ], batch_size=1000, using_db=conn)
+
+
+def benchQueries(size: int):
+    rand = random.Random(size)
+
+    async def pathLookup():
+        await database.hashmarksByPath(
+            f'/ipfs/bafybench{rand.randrange(size):08}')
+
+    async def urlLookup():
+        await database.hashmarksByPath(
+            f'ens://bench{rand.randrange(size)}.eth')
+
+    async def feedPaths():
+        feed = await database.ipnsFeedGet(rand.randint(1, 16))
+        await database.ipnsFeedMarkPaths(feed)
+
+    async def feedsNeedSync():
+        await database.ipnsFeedsNeedSync()
+
+    async def historyGet():
+        await database.urlHistoryGet(
+            f'https://site{rand.randrange(211)}.org/page/'
+            f'{rand.randrange(size)}')
+
+    async def historyLastVisit():
+        await URLHistoryVisit.filter(
+            historyitem_id=rand.randint(1, size)
+        ).order_by('-dateaccess').first()
+
+    async def psAttrSearch():
+        ps = await psManagerForTopic('galacteek.bench')
+        await ps.searchMsgAttribute(
+            'ChatRoomMessage', 'uid', f'uid{rand.randrange(size)}',
+            dateMin=datetime.now() - timedelta(days=1))
+
+    async def hashmarksSearch():
+        await database.hashmarksSearch(f'planet{rand.randrange(97)}')
+
+    async def historySearch():
+        await database.urlHistorySearch(f'galaxy{rand.randrange(31)}')
+
+    return [
+        ('Hashmark by path', pathLookup),
+        ('Hashmark by URL', urlLookup),
+        ('IPNS feed entries', feedPaths),
+        ('IPNS feeds to resolve', feedsNeedSync),
+        ('History item by URL', historyGet),
+        ('History item last visit', historyLastVisit),
+        ('Pubsub attribute search', psAttrSearch),
+        ('Hashmarks search', hashmarksSearch),
+        ('History search', historySearch)
+    ]
+
+
+async def benchWriteLoad(stop: asyncio.Event, writer: int):
+    # Visits recorded one by one
+    idx = 0
+    while not stop.is_set():
+        await database.urlHistoryRecord(
+            f'https://load{writer}.org/{idx % 500}', f'Load {idx}')
+        idx += 1
+
+
+async def benchRun(size: int, iterations: int = 200) -> dict:
+    """
+    Returns the mean time (ms) of each query
+    """
+
+    results = {}
+
+    for name, query in benchQueries(size):
+        start = time.perf_counter()
+
+        for _ in range(iterations):
+            await query()
+
+        results[name] = (time.perf_counter() - start) * 1000 / iterations
+
+    # Searches while the writer is busy
+    stop = asyncio.Event()
+    writers = [asyncio.ensure_future(benchWriteLoad(stop, writer))
+               for writer in range(4)]
+
+    await asyncio.sleep(0.1)
+
+    try:
+        for name, query in benchQueries(size)[-2:]:
+            start = time.perf_counter()
+
+            for _ in range(iterations // 4):
+                await query()
+
+            results[f'{name} (during writes)'] = \
+                (time.perf_counter() - start) * 1000 / (iterations // 4)
+    finally:
+        stop.set()
+        await asyncio.gather(*writers)
+
+    return results
+
+
+async def benchmark(dbpath: Path, size: int = 20000,
+                    iterations: int = 200) -> dict:
+    """
+    Runs the queries benchmark on a new database, returns a dict:
+    query name -> (mean time before, mean time after)
+    """
+
+    assert await database.initOrm(dbpath, tuned=False)
+
+    await benchPopulate(size)
+
+    before = await benchRun(size, iterations)
+    await database.closeOrm()
+
+    assert await database.initOrm(dbpath, tuned=True)
+
+    after = await benchRun(size, iterations)
+    await database.closeOrm()
+
+    return {name: (before[name], after[name]) for name in before}
+
+
+def benchReport(results: dict) -> str:
+    lines = [f'{"Query":40} {"before (ms)":>12} {"after (ms)":>12}']
+
+    for name, (before, after) in results.items():
+        lines.append(f'{name:40} {before:12.3f} {after:12.3f}')
+
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Database benchmark')
+    parser.add_argument('--size', type=int, default=20000)
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        results = asyncio.get_event_loop().run_until_complete(
+            benchmark(Path(tmpdir).joinpath('bench.sqlite3'),
+                      size=args.size, iterations=args.iterations))
+
+    print(benchReport(results))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+"""
+SQLite connections: tuned pragmas, explicit indexes on the hot
+lookups, and a pool of read-only connections.
+
+Tortoise runs all the queries of a connection on a single thread, one
+at a time. The single writer connection (Tortoise's 'default') is kept
+for writes and transactions, while the read-only searches and listings
+are spread over the read pool: in WAL mode, readers don't block the
+writer (and vice versa), so searches no longer queue behind writes.
+
+Data read from the pool is the last committed state (don't use the
+pool for reads that must see the writes of an ongoing transaction).
+"""
+
+from tortoise import Tortoise
+from tortoise.backends.sqlite import SqliteClient
+
+from galacteek import log
+from galacteek.config import configParentHandle
+
+
+dbConfig = configParentHandle(__name__, prefix='sqlite')
+
+
+INDEXES = [
+    # Hashmarks lookups by path/URL, IPNS feed entries
+    ('hashmark_path_active', 'hashmark', ['path', 'active']),
+    ('hashmark_url', 'hashmark', ['url']),
+    ('hashmark_parent_path', 'hashmark', ['parent_id', 'path']),
+
+    # History: visits of an item, by date
+    ('urlhistoryvisit_item_date', 'urlhistoryvisit',
+     ['historyitem_id', 'dateaccess']),
+
+    # IPNS feeds due for a resolve
+    ('ipnsfeed_active_next', 'ipnsfeed', ['active', 'resolvenext']),
+
+    # Pubsub records
+    ('pubsubmsgrecord_channel_date', 'pubsubmsgrecord',
+     ['channel_id', 'dateRcv']),
+    ('pubsubmsgattrrecord_lookup', 'pubsubmsgattrrecord',
+     ['msgType', 'attrName', 'attrStrValue', 'date']),
+    ('pubsubmsgattrrecord_msg', 'pubsubmsgattrrecord', ['msgrecord_id']),
+
+    ('pubchatsessiontoken_channel', 'pubchatsessiontoken', ['channel']),
+]
+
+
+def dbPragmas(tuned: bool = True) -> dict:
+    if not tuned:
+        return {}
+
+    pragmas = dbConfig.get('pragmas')
+    return dict(pragmas.items()) if pragmas else {}
+
+
+def ormConfig(dbpath: str, tuned: bool = True) -> dict:
+    return {
+        'connections': {
+            'default': {
+                'engine': 'tortoise.backends.sqlite',
+                'credentials': {
+                    'file_path': str(dbpath),
+                    **dbPragmas(tuned)
+                }
+            }
+        },
+        'apps': {
+            'models': {
+                'models': ['galacteek.database.models'],
+                'default_connection': 'default'
+            }
+        }
+    }
+
+
+async def dbIndexesCreate(conn=None):
+    conn = conn if conn else Tortoise.get_connection('default')
+
+    for name, table, columns in INDEXES:
+        cols = ', '.join(f'"{col}"' for col in columns)
+
+        try:
+            await conn.execute_script(
+                f'CREATE INDEX IF NOT EXISTS "idx_{name}" '
+                f'ON "{table}" ({cols})'
+            )
+        except Exception as err:
+            log.debug(f'Could not create index {name}: {err}')
+
+    try:
+        await conn.execute_script('PRAGMA optimize')
+    except Exception:
+        pass
+
+
+class ReadPool:
+    """
+    Pool of read-only (query_only) SQLite connections. acquire()
+    returns the connections in turn, skipping the busy ones.
+    """
+
+    def __init__(self):
+        self.clients = []
+        self._next = 0
+
+    @property
+    def opened(self):
+        return len(self.clients) > 0
+
+    async def open(self, dbpath: str, size: int, tuned: bool = True):
+        await self.close()
+
+        if size <= 0 or str(dbpath) == ':memory:':
+            # Readers can't share an in-memory database
+            return
+
+        pragmas = dbPragmas(tuned)
+        pragmas['query_only'] = 'ON'
+
+        for idx in range(size):
+            client = SqliteClient(
+                str(dbpath),
+                connection_name=f'read{idx}',
+                **pragmas
+            )
+
+            try:
+                await client.create_connection(with_db=True)
+            except Exception as err:
+                log.warning(f'Could not open read connection: {err}')
+                break
+
+            self.clients.append(client)
+
+    async def close(self):
+        for client in self.clients:
+            try:
+                await client.close()
+            except Exception:
+                pass
+
+        self.clients = []
+
+    def acquire(self):
+        """
+        Returns a read connection, or the default connection
+        if the pool is not opened
+        """
+
+        if not self.clients:
+            return Tortoise.get_connection('default')
+
+        count = len(self.clients)
+        self._next = (self._next + 1) % count
+
+        for idx in range(count):
+            client = self.clients[(self._next + idx) % count]
+
+            if not client._lock.locked():
+                return client
+
+        return self.clients[self._next]
+
+
+readPool = ReadPool()
+
+
+def readDb():
+    """
+    Connection for read-only queries (use with QuerySet.using_db())
+    """
+
+    return readPool.acquire()
@@ -0,0 +1,269 @@
+"""
+Full-text indexes (SQLite FTS5) for hashmarks and the URL history
+
+The indexes are kept in sync with the hashmark, urlhistoryitem and
+urlhistoryvisit tables by SQL triggers, so every write path (ORM,
+bulk deletes, cascades) updates them.
+
+URL history entries are ranked by frecency, the visit count of the
+URL weighted by the recency of the last visit:
+
+    frecency = visits / (1 + age(days) / FRECENCY_DECAY)
+
+The FTS row of a URL is rewritten (with a new, increasing rowid) on
+each visit, so the rowid order of the history index is the recency
+order. A completion only ranks the most recently visited matches
+(up to HISTORY_CANDIDATES), which keeps the cost of a lookup bounded
+whatever the size of the history and the number of matches.
+"""
+
+import re
+
+from tortoise import Tortoise
+
+from galacteek import log
+from galacteek.database.connections import readDb
+
+
+# Recency decay of the history frecency (days)
+FRECENCY_DECAY = 14
+
+# Max number of (most recently visited) matches ranked by frecency
+HISTORY_CANDIDATES = 256
+
+# Hashmarks ranking: the bm25 score (negative, lower is better) is
+# multiplied by 1 + visits / (visits + VISITS_BOOST_HALF), a factor
+# between 1 and 2 (1.5 with VISITS_BOOST_HALF visits)
+VISITS_BOOST_HALF = 8.0
+
+ftsEnabled = False
+
+ftsTokenRe = re.compile(r'\w+', re.UNICODE)
+
+
+FTS_SCHEMA = '''
+CREATE VIRTUAL TABLE IF NOT EXISTS hashmark_fts USING fts5(
+    path, url, title, description,
+    content='hashmark', content_rowid='id',
+    prefix='1 2 3 4'
+);
+
+CREATE TRIGGER IF NOT EXISTS hashmark_fts_insert
+AFTER INSERT ON hashmark BEGIN
+    INSERT INTO hashmark_fts(rowid, path, url, title, description)
+    VALUES (new.id, new.path, new.url, new.title, new.description);
+END;
+
+CREATE TRIGGER IF NOT EXISTS hashmark_fts_delete
+AFTER DELETE ON hashmark BEGIN
+    INSERT INTO hashmark_fts(hashmark_fts, rowid, path, url,
+                             title, description)
+    VALUES ('delete', old.id, old.path, old.url, old.title,
+            old.description);
+END;
+
+CREATE TRIGGER IF NOT EXISTS hashmark_fts_update
+AFTER UPDATE OF path, url, title, description ON hashmark BEGIN
+    INSERT INTO hashmark_fts(hashmark_fts, rowid, path, url,
+                             title, description)
+    VALUES ('delete', old.id, old.path, old.url, old.title,
+            old.description);
+    INSERT INTO hashmark_fts(rowid, path, url, title, description)
+    VALUES (new.id, new.path, new.url, new.title, new.description);
+END;
+
+CREATE VIRTUAL TABLE IF NOT EXISTS urlhistory_fts USING fts5(
+    url, title, itemid UNINDEXED,
+    prefix='1 2 3 4'
+);
+
+CREATE TABLE IF NOT EXISTS urlhistory_frecency (
+    itemid INTEGER PRIMARY KEY,
+    ftsrowid INTEGER NOT NULL,
+    visits INTEGER NOT NULL DEFAULT 0,
+    lastvisit REAL
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS urlhistory_frecency_ftsrowid
+ON urlhistory_frecency(ftsrowid);
+
+CREATE TRIGGER IF NOT EXISTS urlhistory_fts_item_insert
+AFTER INSERT ON urlhistoryitem BEGIN
+    INSERT INTO urlhistory_fts(rowid, url, title, itemid)
+    SELECT coalesce(max(ftsrowid), 0) + 1, new.url, '', new.id
+    FROM urlhistory_frecency;
+
+    INSERT INTO urlhistory_frecency(itemid, ftsrowid)
+    SELECT new.id, coalesce(max(ftsrowid), 0) + 1
+    FROM urlhistory_frecency;
+END;
+
+CREATE TRIGGER IF NOT EXISTS urlhistory_fts_item_delete
+AFTER DELETE ON urlhistoryitem BEGIN
+    DELETE FROM urlhistory_fts WHERE rowid = (
+        SELECT ftsrowid FROM urlhistory_frecency WHERE itemid = old.id);
+    DELETE FROM urlhistory_frecency WHERE itemid = old.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS urlhistory_fts_visit_insert
+AFTER INSERT ON urlhistoryvisit BEGIN
+    INSERT INTO urlhistory_fts(rowid, url, title, itemid)
+    SELECT (SELECT max(ftsrowid) + 1 FROM urlhistory_frecency),
+           s.url, coalesce(new.title, s.title), s.itemid
+    FROM urlhistory_frecency f
+    JOIN urlhistory_fts s ON s.rowid = f.ftsrowid
+    WHERE f.itemid = new.historyitem_id;
+
+    DELETE FROM urlhistory_fts WHERE rowid = (
+        SELECT ftsrowid FROM urlhistory_frecency
+        WHERE itemid = new.historyitem_id);
+
+    UPDATE urlhistory_frecency SET
+        ftsrowid = (SELECT max(ftsrowid) + 1 FROM urlhistory_frecency),
+        visits = visits + 1,
+        lastvisit = julianday(new.dateaccess)
+    WHERE itemid = new.historyitem_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS urlhistory_fts_visit_delete
+AFTER DELETE ON urlhistoryvisit BEGIN
+    UPDATE urlhistory_frecency SET visits = max(visits - 1, 0)
+    WHERE itemid = old.historyitem_id;
+END;
+'''
+
+# Index the rows that existed before the FTS tables were created
+FTS_BACKFILL = '''
+INSERT INTO hashmark_fts(hashmark_fts) VALUES ('rebuild');
+
+INSERT INTO urlhistory_frecency(itemid, ftsrowid, visits, lastvisit)
+SELECT i.id,
+       row_number() OVER (ORDER BY max(julianday(v.dateaccess)), i.id),
+       count(v.id),
+       max(julianday(v.dateaccess))
+FROM urlhistoryitem i
+LEFT JOIN urlhistoryvisit v ON v.historyitem_id = i.id
+GROUP BY i.id;
+
+INSERT INTO urlhistory_fts(rowid, url, title, itemid)
+SELECT f.ftsrowid, i.url,
+       coalesce((SELECT v.title FROM urlhistoryvisit v
+                 WHERE v.historyitem_id = i.id
+                 ORDER BY v.dateaccess DESC LIMIT 1), ''),
+       i.id
+FROM urlhistoryitem i
+JOIN urlhistory_frecency f ON f.itemid = i.id;
+'''
+
+
+def ftsConnection():
+    return Tortoise.get_connection('default')
+
+
+def ftsQuery(text: str):
+    """
+    Converts user input to an FTS5 query (all the words must match).
+    The last word (the one being typed) is matched as a prefix, the
+    words that are followed by a separator are matched exactly.
+
+    Returns None if the input has no searchable word.
+    """
+
+    tokens = ftsTokenRe.findall(text) if text else []
+
+    if not tokens:
+        return None
+
+    terms = [f'"{token}"' for token in tokens]
+
+    if text[-1].isalnum() or text[-1] == '_':
+        terms[-1] += '*'
+
+    return ' '.join(terms)
+
+
+async def ftsSetup(conn=None):
+    """
+    Creates the FTS tables and triggers (if needed). When FTS5
+    is not available in this SQLite build, the search functions
+    fall back to LIKE queries.
+    """
+
+    global ftsEnabled
+
+    conn = conn if conn else ftsConnection()
+
+    try:
+        rows = await conn.execute_query_dict(
+            "SELECT name FROM sqlite_master WHERE name = 'urlhistory_fts'"
+        )
+        exists = len(rows) > 0
+
+        await conn.execute_script(FTS_SCHEMA)
+
+        if not exists:
+            await conn.execute_script(FTS_BACKFILL)
+    except Exception as err:
+        log.warning(f'Full-text search indexes unavailable: {err}')
+        ftsEnabled = False
+    else:
+        ftsEnabled = True
+
+    return ftsEnabled
+
+
+async def ftsHashmarkIds(query: str, limit: int = 512):
+    """
+    Returns the IDs of the hashmarks matching query (prefix
+    search), best matches first (title matches weigh more, and
+    frequently visited hashmarks rank higher)
+    """
+
+    match = ftsQuery(query)
+    if not match:
+        return []
+
+    rows = await readDb().execute_query_dict(
+        f'''
+        SELECT h.id FROM hashmark_fts s
+        JOIN hashmark h ON h.id = s.rowid
+        WHERE hashmark_fts MATCH ?
+        ORDER BY bm25(hashmark_fts, 1.0, 1.0, 4.0, 2.0) *
+                 (1 + h.visitcount / (h.visitcount + {VISITS_BOOST_HALF}))
+        LIMIT ?
+        ''',
+        [match, limit]
+    )
+
+    return [row['id'] for row in rows]
+
+
+async def ftsHistorySearch(query: str, limit: int = 16):
+    """
+    Ranked URL history prefix search
+
+    Returns a list of dicts (url, title, visits, frecency), the
+    highest frecency first
+    """
+
+    match = ftsQuery(query)
+    if not match:
+        return []
+
+    return await readDb().execute_query_dict(
+        f'''
+        SELECT s.url, s.title, f.visits,
+               f.visits / (1.0 + (julianday('now') - f.lastvisit)
+                           / {FRECENCY_DECAY}) AS frecency
+        FROM (
+            SELECT url, title, itemid FROM urlhistory_fts
+            WHERE urlhistory_fts MATCH ?
+            ORDER BY rowid DESC LIMIT {HISTORY_CANDIDATES}
+        ) s
+        JOIN urlhistory_frecency f ON f.itemid = s.itemid
+        WHERE f.visits > 0
+        ORDER BY frecency DESC
+        LIMIT ?
+        ''',
+        [match, limit]
+    )
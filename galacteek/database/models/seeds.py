@@ -51,3 +51,31 @@ class IPSeedObject(Model):
         'models.IPSeed',
         related_name='seed',
         through='ipseed_object')
+
+
+class IPSeedsIndexNode(Model):
+    """
+    Seeds DAG of a peer, indexed locally
+    """
+
+    id = fields.IntField(pk=True)
+
+    udh = fields.CharField(max_length=128, unique=True)
+    dagCid = fields.CharField(max_length=512)
+    dateIndexed = fields.DatetimeField(auto_now=True)
+
+
+class IPSeedsIndexEntry(Model):
+    id = fields.IntField(pk=True)
+
+    section = fields.CharField(max_length=256)
+    name = fields.CharField(max_length=1024)
+    dateCreated = fields.CharField(max_length=64, null=True)
+    seedCid = fields.CharField(max_length=512)
+
+    # Tags and keywords
+    meta = fields.TextField(default='')
+
+    node = fields.ForeignKeyField(
+        'models.IPSeedsIndexNode',
+        related_name='entries')
@@ -0,0 +1,318 @@
+"""
+Write-batched URL history recording
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+
+from tortoise import timezone
+from tortoise.transactions import in_transaction
+
+from PyQt5.QtCore import QUrl
+
+from galacteek import log
+from galacteek import ensure
+from galacteek.ipfs.cidhelpers import IPFSPath
+
+from galacteek.database.models import URLHistoryItem
+from galacteek.database.models import URLHistoryVisit
+
+
+def urlHistoryItemNew(url: str):
+    """
+    Returns a new (unsaved) history item for url
+    """
+
+    from galacteek.browser.schemes import isIpfsUrl
+
+    qUrl = QUrl(url)
+    scheme = qUrl.scheme() if qUrl.isValid() else ''
+
+    rootcid = ''
+    rootcidv = 0
+
+    if isIpfsUrl(qUrl):
+        ipfsPath = IPFSPath(url)
+        if ipfsPath.valid and ipfsPath.rootCid:
+            rootcid = str(ipfsPath.rootCid)
+            rootcidv = ipfsPath.rootCid.version
+
+    return URLHistoryItem(
+        url=url, rootcid=rootcid, rootcidv=rootcidv,
+        scheme=scheme)
+
+
+class URLHistoryWriter:
+    """
+    Queues the URL history visits and writes them periodically,
+    in a single transaction.
+
+    Visits of the same URL queued within collapseWindow seconds are
+    collapsed (only the latest title is kept). The IDs of the history
+    items of recently visited URLs are kept in an LRU cache, so the
+    writer only looks up (or creates) the items of URLs it hasn't
+    seen recently.
+
+    :param float flushInterval: delay (seconds) between the first
+        queued visit and the flush
+    :param float collapseWindow: visits of the same URL within this
+        window (seconds) are recorded once
+    :param int cacheSize: size of the URL -> item ID cache
+    :param int maxPending: flush right away when this many visits
+        are queued
+    :param int maxAttempts: a visit that could not be written after
+        this many flushes is dropped
+    """
+
+    def __init__(self,
+                 flushInterval: float = 3.0,
+                 collapseWindow: float = 30.0,
+                 cacheSize: int = 2048,
+                 maxPending: int = 256,
+                 maxAttempts: int = 3):
+        self.flushInterval = flushInterval
+        self.collapseWindow = collapseWindow
+        self.cacheSize = cacheSize
+        self.maxPending = maxPending
+        self.maxAttempts = maxAttempts
+
+        # url -> [title, date]
+        self._pending = OrderedDict()
+
+        # url -> number of failed writes
+        self._failures = {}
+
+        # url -> time of the last recorded visit
+        self._lastVisit = {}
+
+        # url -> history item id (LRU)
+        self._itemIds = OrderedDict()
+
+        self._flushTask = None
+        self._wakeup = asyncio.Event()
+        self._lock = asyncio.Lock()
+
+    @property
+    def pendingCount(self):
+        return len(self._pending)
+
+    def record(self, url: str, title: str):
+        """
+        Queue a visit (returns False if the visit was collapsed
+        with a previous visit of the same URL)
+        """
+
+        now = time.monotonic()
+        pending = self._pending.get(url)
+
+        if pending:
+            # Not written yet, just update the title
+            pending[0] = title
+            return False
+
+        last = self._lastVisit.get(url)
+
+        if last and (now - last) < self.collapseWindow:
+            return False
+
+        self._lastVisit[url] = now
+        self._pending[url] = [title, timezone.now()]
+
+        if len(self._pending) >= self.maxPending:
+            self.flushSoon(0)
+        else:
+            self.flushSoon(self.flushInterval)
+
+        return True
+
+    def flushSoon(self, delay: float):
+        if self._flushTask and not self._flushTask.done():
+            if delay == 0:
+                self._wakeup.set()
+
+            return
+
+        self._wakeup.clear()
+        self._flushTask = ensure(self.flushLater(delay))
+
+    async def flushLater(self, delay: float):
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), delay)
+        except asyncio.TimeoutError:
+            pass
+
+        self._wakeup.clear()
+
+        await self.flush()
+
+        if self._pending:
+            # Visits queued during the flush
+            self._flushTask = ensure(self.flushLater(self.flushInterval))
+
+    def cacheItemId(self, url: str, itemId: int):
+        self._itemIds[url] = itemId
+        self._itemIds.move_to_end(url)
+
+        while len(self._itemIds) > self.cacheSize:
+            self._itemIds.popitem(last=False)
+
+    async def itemIds(self, urls: list, conn) -> dict:
+        """
+        Returns the history item IDs for urls (creating the
+        missing items)
+        """
+
+        ids = {}
+
+        for url in urls:
+            itemId = self._itemIds.get(url)
+
+            if itemId is not None:
+                self._itemIds.move_to_end(url)
+                ids[url] = itemId
+
+        missing = [url for url in urls if url not in ids]
+
+        if missing:
+            rows = await URLHistoryItem.filter(
+                url__in=missing
+            ).using_db(conn).values('id', 'url')
+
+            ids.update({row['url']: row['id'] for row in rows})
+
+            new = [url for url in missing if url not in ids]
+
+            if new:
+                await URLHistoryItem.bulk_create(
+                    [urlHistoryItemNew(url) for url in new],
+                    using_db=conn
+                )
+
+                rows = await URLHistoryItem.filter(
+                    url__in=new
+                ).using_db(conn).values('id', 'url')
+
+                ids.update({row['url']: row['id'] for row in rows})
+
+            for url in missing:
+                if url in ids:
+                    self.cacheItemId(url, ids[url])
+
+        return ids
+
+    async def writeVisits(self, visits: dict):
+        """
+        Write visits (url -> [title, date]) in a single transaction
+        """
+
+        async with in_transaction() as conn:
+            ids = await self.itemIds(list(visits.keys()), conn)
+
+            await URLHistoryVisit.bulk_create([
+                URLHistoryVisit(
+                    historyitem_id=ids[url],
+                    title=title,
+                    dateaccess=date
+                ) for url, (title, date) in visits.items()
+                if url in ids
+            ], using_db=conn)
+
+        return len(visits)
+
+    async def flush(self):
+        """
+        Write the queued visits
+
+        If the batch can't be written, the visits are written one by
+        one (with the item IDs looked up again), and the visits that
+        still fail are queued again, until they've failed maxAttempts
+        times.
+        """
+
+        async with self._lock:
+            if not self._pending:
+                return 0
+
+            pending, self._pending = self._pending, OrderedDict()
+
+            try:
+                written = await self.writeVisits(pending)
+            except asyncio.CancelledError:
+                self.requeue(pending)
+                raise
+            except Exception as err:
+                log.warning(f'URL history: could not write visits: {err}')
+
+                # The cached IDs could refer to rolled back items
+                self._itemIds.clear()
+            else:
+                for url in pending:
+                    self._failures.pop(url, None)
+
+                return written
+            finally:
+                self.pruneLastVisits()
+
+            written, failed = 0, OrderedDict()
+
+            while pending:
+                url, visit = pending.popitem(last=False)
+
+                try:
+                    written += await self.writeVisits({url: visit})
+                except asyncio.CancelledError:
+                    pending[url] = visit
+                    self.requeue(pending)
+                    raise
+                except Exception as err:
+                    log.debug(f'URL history: {url}: write failed: {err}')
+                    failed[url] = visit
+                else:
+                    self._failures.pop(url, None)
+
+            self.requeue(failed, failure=True)
+
+            if self._pending:
+                self.flushSoon(self.flushInterval)
+
+            return written
+
+    def requeue(self, visits: dict, failure: bool = False):
+        """
+        Queue again visits that were not written (visits of the
+        same URLs queued since then are kept)
+        """
+
+        for url, visit in visits.items():
+            if failure:
+                attempts = self._failures.get(url, 0) + 1
+
+                if attempts >= self.maxAttempts:
+                    log.warning(f'URL history: {url}: dropping the visit')
+                    self._failures.pop(url, None)
+                    continue
+
+                self._failures[url] = attempts
+
+            if url not in self._pending:
+                self._pending[url] = visit
+
+    def pruneLastVisits(self):
+        limit = time.monotonic() - self.collapseWindow
+
+        for url in [u for u, t in self._lastVisit.items() if t < limit]:
+            del self._lastVisit[url]
+
+    def clear(self):
+        """
+        Drop the queued visits and the caches (history cleared)
+        """
+
+        if self._flushTask:
+            self._flushTask.cancel()
+
+        self._pending.clear()
+        self._failures.clear()
+        self._lastVisit.clear()
+        self._itemIds.clear()
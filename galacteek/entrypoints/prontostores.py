@@ -0,0 +1,61 @@
+import argparse
+import sys
+import time
+
+from pathlib import Path
+
+from galacteek.ld.rdf.migrate import storesMigrate
+
+
+def prontoStoresMigrate():
+    """
+    Migrates the pronto graphs stores from Sleepycat (BerkeleyDB)
+    to Oxigraph. Once migrated, set ld.pronto's
+    defaultRdflibStorePlugin to Oxigraph.
+    """
+
+    parser = argparse.ArgumentParser(
+        description='Migrate the pronto graphs stores to Oxigraph')
+    parser.add_argument(
+        dest='storespath',
+        help='Path of the pronto stores (e.g: '
+             '<profile-data>/ld/pronto/stores/<chain-env>)'
+    )
+    parser.add_argument(
+        '--batch-size',
+        dest='batchsize',
+        type=int,
+        default=10000
+    )
+    parser.add_argument(
+        '--from',
+        dest='srcplugin',
+        default='Sleepycat'
+    )
+    parser.add_argument(
+        '--to',
+        dest='dstplugin',
+        default='Oxigraph'
+    )
+
+    args = parser.parse_args()
+    storesPath = Path(args.storespath)
+
+    if not storesPath.is_dir():
+        print(f'{storesPath}: not a directory', file=sys.stderr)
+        sys.exit(1)
+
+    start = time.monotonic()
+
+    results = storesMigrate(
+        storesPath,
+        srcPlugin=args.srcplugin,
+        dstPlugin=args.dstplugin,
+        batchSize=args.batchsize,
+        progress=lambda count: print(f'... {count} quads', end='\r')
+    )
+
+    for path, count in results.items():
+        print(f'{path}: {count} quads migrated')
+
+    print(f'Done in {time.monotonic() - start:.1f} secs')
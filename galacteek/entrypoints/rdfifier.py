@@ -31,6 +31,9 @@ from galacteek.ipfs import ipfsOpFn
 from galacteek.ipfs.cidhelpers import IPFSPath
 
 from galacteek.ui_console import ptconfig
+from galacteek.ui_console.stalls import stalls  # noqa
+from galacteek.ui_console.stalls import stallsRecords  # noqa
+from galacteek.ui_console.stalls import stallsClear  # noqa
 
 
 app = None
@@ -8,23 +8,14 @@ import os
 import gc
 import tracemalloc
 
-import rdflib.plugin
-from rdflib.parser import Parser
-from rdflib.serializer import Serializer
-
 from PyQt5.QtCore import QProcess
 from PyQt5.QtCore import QProcessEnvironment
-from PyQt5.QtWebEngine import QtWebEngine
 
 from galacteek.__version__ import __version__
 from galacteek.core import glogger
 from galacteek.core import inPyInstaller
 from galacteek.core import pyInstallerBundleFolder
-from galacteek.browser.schemes import initializeSchemes
-
-from galacteek.ui.helpers import *  # noqa
-from galacteek import application
-from galacteek.appsettings import *  # noqa
+from galacteek.core.startupprof import startupProfiler
 
 try:
     import aiomonitor
@@ -62,6 +53,13 @@ class ApplicationStarter:
 
 
 def galacteekGui(args):
+    # Imported here so that the startup profiler (if enabled)
+    # can time these imports
+    from PyQt5.QtWebEngine import QtWebEngine
+
+    from galacteek.browser.schemes import initializeSchemes
+    from galacteek import application
+
     progName = args.binaryname if args.binaryname else sys.argv[0]
 
     gc.enable()
@@ -100,6 +98,8 @@ def galacteekGui(args):
         cmdArgs=args
     )
 
+    startupProfiler.mark('app: created')
+
     level = 'DEBUG' if args.debug else 'INFO'
     if args.logstderr:
         glogger.basicConfig(level=level, colorized=args.logcolorized,
@@ -269,6 +269,12 @@ def buildArgsParser(fromParser=None):
         action='store_true',
         dest='memprofiling',
         help="Enable memory profiling")
+    parser.add_argument(
+        '--startup-profile',
+        action='store_true',
+        dest='startupprofile',
+        help="Report per-module import time and per-service start "
+             "latency on startup")
     parser.add_argument(
         '--asyncio-tasks-debug',
         action='store_true',
@@ -334,9 +340,21 @@ def start():
         # Hide the console window when running with pyinstaller
         hideConsoleWindow()
 
+    args = gArgsParse()
+
+    if args.version is True:
+        print(__version__)
+        sys.exit()
+
+    if args.startupprofile or os.environ.get('GALACTEEK_STARTUP_PROFILE'):
+        startupProfiler.install()
+
     if platform.system() == 'Windows' and inPyInstaller():
         # Register json-ld plugin manually if running in pyinstaller
         # TODO: move this to a function in galacteek.ld.rdf
+        import rdflib.plugin
+        from rdflib.parser import Parser
+        from rdflib.serializer import Serializer
 
         for name in ['json-ld', 'application/ld+json']:
             rdflib.plugin.register(
@@ -352,11 +370,5 @@ def start():
                 'JsonLDSerializer'
             )
 
-    args = gArgsParse()
-
-    if args.version is True:
-        print(__version__)
-        sys.exit()
-
     appStarter = ApplicationStarter(args)
     appStarter.start()
@@ -72,6 +72,10 @@ def iEventLog():
     return QCoreApplication.translate('GalacteekWindow', 'Event Log')
 
 
+def iMetrics():
+    return QCoreApplication.translate('GalacteekWindow', 'Metrics')
+
+
 def iNewProfile():
     return QCoreApplication.translate('GalacteekWindow', 'New Profile')
 
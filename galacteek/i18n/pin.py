@@ -7,6 +7,13 @@ def iItemsInPinningQueue(itemsCount):
         'Items queued for pinning: {}'.format(itemsCount))
 
 
+def iPinSetCounts(recursive, direct, indirect):
+    return QCoreApplication.translate(
+        'GalacteekWindow',
+        'Pinned objects: {0} recursive, {1} direct, {2} indirect').format(
+            recursive, direct, indirect)
+
+
 def iBrowseAutoPin():
     return QCoreApplication.translate('GalacteekWindow', 'Browse (auto-pin)')
 
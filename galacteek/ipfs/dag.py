@@ -9,7 +9,7 @@ from async_generator import async_generator, yield_, yield_from_
 from PyQt5.QtCore import (pyqtSignal, QObject)
 
 from galacteek import log
-from galacteek import partialEnsure
+from galacteek import ensure
 from galacteek import AsyncSignal
 
 from galacteek.core.asynccache import selfcachedcoromethod
@@ -20,8 +20,15 @@ from galacteek.ipfs.paths import posixIpfsPath
 from galacteek.ipfs.wrappers import ipfsOp
 from galacteek.ipfs.cidhelpers import joinIpfs
 from galacteek.ipfs.cidhelpers import IPFSPath
+from galacteek.ipfs.cidhelpers import stripIpfs
 from galacteek.ipfs.ipfsops import *  # noqa
 from galacteek.ipfs import pb
+from galacteek.ipfs.dagshards import DAGShardsWriter
+from galacteek.ipfs.dagshards import getIn
+from galacteek.ipfs.dagshards import pathComps
+from galacteek.ipfs.dagshards import objFingerprint
+from galacteek.ipfs.dagshards import physicalPath
+from galacteek.ipfs.dagshards import readShards
 
 from galacteek.ld import ipsContextUri
 
@@ -67,15 +74,22 @@ class DeadEnd(object):
 
 
 class DAGOperations:
+    # Sharded maps layout (path -> depth)
+    shardsLayout: dict = {}
+
     def debug(self, msg):
         log.debug(msg)
 
+    def dagPathJoin(self, path):
+        # Path in the stored DAG (sharded maps are stored in buckets)
+        return posixIpfsPath.join(
+            self.dagCid, physicalPath(self.shardsLayout, path))
+
     @ipfsOp
     async def get(self, op, path):
         self.debug('DAG get: {}'.format(posixIpfsPath.join(self.dagCid, path)))
         try:
-            dagNode = await op.dagGet(
-                posixIpfsPath.join(self.dagCid, path))
+            dagNode = await op.dagGet(self.dagPathJoin(path))
         except aioipfs.APIError as err:
             log.debug('DAG get: {0}. An error occured: {1}'.format(
                 path, err.message))
@@ -94,8 +108,7 @@ class DAGOperations:
     @ipfsOp
     async def cat(self, op, path):
         try:
-            return await op.client.cat(
-                posixIpfsPath.join(self.dagCid, path))
+            return await op.client.cat(self.dagPathJoin(path))
         except aioipfs.APIError as err:
             self.debug(f'Cat error ({path}): {err.message}')
             return None
@@ -128,8 +141,42 @@ class DAGOperations:
 
     @ipfsOp
     async def resolve(self, op, path=''):
-        return await op.resolve(
-            posixIpfsPath.join(self.dagCid, path), recursive=True)
+        return await op.resolve(self.dagPathJoin(path), recursive=True)
+
+    @ipfsOp
+    async def resolveMany(self, op, paths: list, concurrency: int = 8):
+        """
+        Resolves a list of paths in the DAG, with at most concurrency
+        resolutions running at a time. Paths leading to an IPLD link
+        of the loaded DAG are resolved without asking the daemon.
+
+        :rtype: dict
+        :return: path -> CID (None if unresolved)
+        """
+
+        sem = asyncio.Semaphore(concurrency)
+        root = getattr(self, 'dagRoot', None)
+        resolved = {}
+
+        async def resolveRemote(path):
+            async with sem:
+                try:
+                    resolved[path] = stripIpfs(await self.resolve(path))
+                except Exception:
+                    resolved[path] = None
+
+        remote = []
+
+        for path in paths:
+            node = getIn(root, pathComps(path)) if root else None
+
+            if isinstance(node, dict) and isinstance(node.get('/'), str):
+                resolved[path] = node['/']
+            else:
+                remote.append(path)
+
+        await asyncio.gather(*[resolveRemote(path) for path in remote])
+        return resolved
 
     @async_generator
     async def walk(self, op, path='', maxObjSize=0, depth=1):
@@ -229,7 +276,8 @@ class DAGPortal(QObject, DAGOperations):
 
     def __init__(self, dagCid=None, dagRoot=None, offline=False,
                  edag=None,
-                 parent=None, lock=None, timeoutLoad=10):
+                 parent=None, lock=None, timeoutLoad=10,
+                 shardsLayout=None):
         super().__init__(parent)
         self._dagCid = dagCid
         self._dagRoot = dagRoot
@@ -239,6 +287,7 @@ class DAGPortal(QObject, DAGOperations):
         self.evLoaded = asyncio.Event()
         self.offline = offline
         self.timeoutLoad = timeoutLoad
+        self.shardsLayout = shardsLayout if shardsLayout else {}
 
     @property
     def d(self):
@@ -286,11 +335,18 @@ class DAGPortal(QObject, DAGOperations):
 
     @ipfsOp
     async def load(self, op, timeout=None):
-        self._dagRoot = await op.waitFor(
+        root = await op.waitFor(
             op.dagGet(self.dagCid),
             timeout if timeout else self.timeoutLoad
         )
 
+        try:
+            self._dagRoot, self.shardsLayout = await readShards(
+                root, op.dagGet)
+        except Exception as err:
+            self.debug(f'Cannot load sharded maps: {err}')
+            self._dagRoot = None
+
         if self.dagRoot:
             self.evLoaded.set()
             self.loaded.emit(self.dagCid)
@@ -336,6 +392,12 @@ class EvolvingDAG(QObject, DAGOperations):
 
     :param str dagMetaMfsPath: the path inside the MFS for the metadata
         describing this DAG
+    :param float saveDelay: changes made within this delay are saved
+        together (0: save after each change)
+    :param float saveMaxDelay: max delay before a pending save is done
+    :param bool sharding: store the shardedMaps as sharded nodes. This
+        changes the DAG's format: peers running a version that doesn't
+        read sharded DAGs would not see the maps' content
     """
 
     # TODO: use AsyncSignal() for all the EDAG core signals
@@ -351,11 +413,21 @@ class EvolvingDAG(QObject, DAGOperations):
 
     keyCidLatest = 'cidlatest'
 
+    # Paths of the maps stored as HAMT-style sharded nodes, when
+    # sharding is enabled (maps with less than shardMinKeys keys
+    # are stored in-line). Sharded DAGs are always readable.
+    shardedMaps: list = []
+    shardMinKeys: int = 256
+    shardBucketKeys: int = 128
+
     def __init__(self, dagMetaMfsPath, dagMetaHistoryMax=12, offline=False,
                  unpinOnUpdate=False, autoPreviousNode=True,
                  cipheredMeta=False,
                  autoUpdateDates=False, loop=None,
-                 portalCacheTtl=60):
+                 portalCacheTtl=60,
+                 saveDelay=0.3,
+                 saveMaxDelay=3.0,
+                 sharding=False):
         super().__init__()
 
         self.loop = loop if loop else asyncio.get_event_loop()
@@ -375,10 +447,24 @@ class EvolvingDAG(QObject, DAGOperations):
         self._autoUpdateDates = autoUpdateDates
         self._cipheredMeta = cipheredMeta
 
+        self.saveDelay = saveDelay
+        self.saveMaxDelay = saveMaxDelay
+        self._saveHandle = None
+        self._saveRequested = None
+        self._savedFingerprint = None
+
+        self.sharding = sharding
+        self.shardsLayout = {}
+        self._shards = DAGShardsWriter(
+            self._shardPut,
+            minKeys=self.shardMinKeys,
+            bucketKeys=self.shardBucketKeys
+        )
+
         self.dagUpdated = AsyncSignal(str)
         self.available = AsyncSignal(object)
 
-        self.changed.connect(partialEnsure(self.ipfsSave))
+        self.changed.connect(self.scheduleSave)
 
     @property
     def wLock(self):
@@ -456,7 +542,11 @@ class EvolvingDAG(QObject, DAGOperations):
             if latest:
                 self.dagCid = latest
                 self.debug('Getting DAG: {cid}'.format(cid=self.dagCid))
-                self._dagRoot = await op.dagGet(self.dagCid)
+                self._dagRoot, self.shardsLayout = await readShards(
+                    await op.dagGet(self.dagCid),
+                    op.dagGet,
+                    writer=self._shards
+                )
 
                 if self.dagRoot:
                     if self.updateDagSchema(self.dagRoot) is True:
@@ -483,12 +573,84 @@ class EvolvingDAG(QObject, DAGOperations):
         self.parser = traverseParser(self.dagRoot)
         await self.available.emit(self.dagRoot)
 
+    def scheduleSave(self):
+        """
+        Schedule a save of the DAG. Successive changes are coalesced
+        in a single save (done at most saveMaxDelay seconds after
+        the first change).
+        """
+
+        if self.saveDelay <= 0:
+            ensure(self.ipfsSave())
+            return
+
+        now = self.loop.time()
+
+        if self._saveRequested is None:
+            self._saveRequested = now
+
+        if self._saveHandle:
+            self._saveHandle.cancel()
+
+        self._saveHandle = self.loop.call_later(
+            max(0, min(self.saveDelay,
+                       self._saveRequested + self.saveMaxDelay - now)),
+            self._savePending
+        )
+
+    def _savePending(self):
+        self._saveHandle = None
+        self._saveRequested = None
+
+        ensure(self.ipfsSave())
+
+    async def flush(self):
+        """
+        Save now if a save is pending
+        """
+
+        if self._saveHandle:
+            self._saveHandle.cancel()
+            self._saveHandle = None
+            self._saveRequested = None
+
+            await self.ipfsSave()
+
+    @ipfsOp
+    async def _shardPut(self, op, node):
+        return await op.dagPut(node, pin=False, offline=self._offline)
+
+    def _contentFingerprint(self, stored):
+        # Fingerprint of the stored tree, excluding what's updated
+        # by every save
+        return objFingerprint({
+            k: v for k, v in stored.items()
+            if k not in ['previous', 'datemodified']
+        }) if isinstance(stored, dict) else objFingerprint(stored)
+
     @ipfsOp
     async def ipfsSave(self, op, emitDataChanged=True):
         self.debug('Saving (acquiring lock)')
 
         async with self.wLock:
             prevCid = self.dagCid
+
+            if self.sharding and self.shardedMaps and \
+                    isinstance(self.dagRoot, dict):
+                try:
+                    stored, layout = await self._shards.write(
+                        self.dagRoot, self.shardedMaps)
+                except Exception as err:
+                    self.debug(f'Could not write shards: {err}')
+                    return False
+            else:
+                stored, layout = self.dagRoot, {}
+
+            fingerprint = self._contentFingerprint(stored)
+
+            if prevCid and fingerprint == self._savedFingerprint:
+                self.debug('Unchanged, not saving')
+                return True
             history = self.dagMeta.setdefault('history', [])
             maxItems = self.dagMetaMaxHistoryItems
 
@@ -501,12 +663,20 @@ class EvolvingDAG(QObject, DAGOperations):
                 if 'datemodified' in self.dagRoot:
                     self.dagRoot['datemodified'] = utcDatetimeIso()
 
+            if stored is not self.dagRoot:
+                for key in ['previous', 'datemodified']:
+                    if key in self.dagRoot:
+                        stored[key] = self.dagRoot[key]
+
             # We always PIN the latest DAG and do a pin update using the
             # previous item in the history
 
-            cid = await op.dagPut(self.dagRoot, pin=True,
+            cid = await op.dagPut(stored, pin=True,
                                   offline=self._offline)
             if cid is not None:
+                self.shardsLayout = layout
+                self._savedFingerprint = fingerprint
+
                 if prevCid is not None and prevCid not in history:
                     if len(history) > maxItems:
                         # Purge old items
@@ -589,7 +759,9 @@ class EvolvingDAG(QObject, DAGOperations):
 
                 # Save metadata, and save this DAG, replacing dagRoot
                 # Do the pin update
-                self._dagRoot = pDag
+                self._dagRoot, self.shardsLayout = await readShards(
+                    pDag, ipfsop.dagGet, writer=self._shards)
+                self._savedFingerprint = None
                 await self.saveNewCid(newCid)
 
                 await ipfsop.waitFor(
@@ -621,7 +793,8 @@ class EvolvingDAG(QObject, DAGOperations):
         Return a read-only portal, its context manager uses the read lock
         """
         return DAGPortal(dagCid=self.dagCid, dagRoot=self.dagRoot,
-                         lock=self.rLock)
+                         lock=self.rLock,
+                         shardsLayout=self.shardsLayout)
 
     @async_enterable
     @selfcachedcoromethod('portalCache')
@@ -634,4 +807,5 @@ class EvolvingDAG(QObject, DAGOperations):
 
     @async_enterable
     async def portal(self):
-        return DAGPortal(dagCid=self.dagCid, dagRoot=self.dagRoot)
+        return DAGPortal(dagCid=self.dagCid, dagRoot=self.dagRoot,
+                         shardsLayout=self.shardsLayout)
@@ -0,0 +1,238 @@
+"""
+HAMT-style sharding of the maps of an EDAG.
+
+A sharded map is stored as a node linking to buckets, the keys being
+distributed in the buckets by the hex prefix of their hash:
+
+    {"_hamt": {"b0": {"/": cid}, "b1": {"/": cid}, ...}}
+
+The depth of a map (length of the hash prefix) depends on the number
+of keys. Since the buckets are content-addressed, only the buckets
+that changed since the last save have to be put again.
+"""
+
+import asyncio
+import hashlib
+import orjson
+
+from typing import Awaitable
+from typing import Callable
+
+
+keyHamt = '_hamt'
+keyShardsLayout = '_edagshards'
+
+
+def keyHash(key: str) -> str:
+    return hashlib.blake2b(key.encode(), digest_size=8).hexdigest()
+
+
+def bucketName(key: str, depth: int) -> str:
+    return 'b' + keyHash(key)[0:depth]
+
+
+def mapDepth(count: int, bucketKeys: int) -> int:
+    """
+    Returns the depth (hash prefix length) so that the buckets of
+    a map with count keys hold about bucketKeys keys at most
+    """
+
+    depth = 0
+    while count > bucketKeys * (16 ** depth) and depth < 4:
+        depth += 1
+
+    return depth
+
+
+def splitMap(m: dict, depth: int) -> dict:
+    buckets = {}
+
+    for key, value in m.items():
+        buckets.setdefault(bucketName(key, depth), {})[key] = value
+
+    return buckets
+
+
+def objFingerprint(obj) -> str:
+    return hashlib.blake2b(
+        orjson.dumps(obj, option=orjson.OPT_SORT_KEYS),
+        digest_size=16
+    ).hexdigest()
+
+
+def pathComps(path: str) -> list:
+    return [comp for comp in path.split('/') if comp]
+
+
+def getIn(tree, comps: list):
+    cur = tree
+
+    for comp in comps:
+        if not isinstance(cur, dict) or comp not in cur:
+            return None
+
+        cur = cur[comp]
+
+    return cur
+
+
+async def replaceIn(tree, comps: list,
+                    fn: Callable[[object], Awaitable[object]]):
+    """
+    Returns a copy of tree where the value at comps is replaced
+    by the result of fn(value). Only the dicts on the path are
+    copied (the original tree is left untouched).
+    """
+
+    if not comps:
+        return await fn(tree)
+
+    head = comps[0]
+
+    if not isinstance(tree, dict) or head not in tree:
+        return tree
+
+    copy = dict(tree)
+    copy[head] = await replaceIn(tree[head], comps[1:], fn)
+    return copy
+
+
+def physicalPath(layout: dict, path: str) -> str:
+    """
+    Translates a path in the (unsharded) tree to the path in the
+    stored DAG, given the shards layout (sharded map path -> depth)
+    """
+
+    if not layout:
+        return path
+
+    comps = pathComps(path)
+    out = []
+
+    for idx, comp in enumerate(comps):
+        depth = layout.get('/'.join(comps[:idx]))
+
+        if depth is not None:
+            out += [keyHamt, bucketName(comp, depth)]
+
+        out.append(comp)
+
+    return '/'.join(out)
+
+
+class DAGShardsWriter:
+    """
+    Writes the sharded maps of a tree. The CIDs of the buckets are
+    cached by content fingerprint, so unchanged buckets are not put
+    again.
+
+    :param putNode: coroutine storing a DAG node and returning its CID
+    """
+
+    def __init__(self, putNode: Callable[[dict], Awaitable[str]],
+                 minKeys: int = 256,
+                 bucketKeys: int = 128):
+        self.putNode = putNode
+        self.minKeys = minKeys
+        self.bucketKeys = bucketKeys
+        self.cids = {}
+        self.puts = 0
+
+    def remember(self, bucket: dict, cid: str):
+        self.cids[objFingerprint(bucket)] = cid
+
+    async def bucketCid(self, bucket: dict, used: dict) -> str:
+        fp = objFingerprint(bucket)
+        cid = self.cids.get(fp)
+
+        if not cid:
+            cid = await self.putNode(bucket)
+            if not cid:
+                raise ValueError('Could not store bucket')
+
+            self.puts += 1
+
+        used[fp] = cid
+        return cid
+
+    async def write(self, root: dict, paths: list):
+        """
+        Returns the tree to store for root (with the maps at the
+        given paths sharded), and the shards layout
+        """
+
+        layout = {}
+        used = {}
+
+        for path in sorted(paths, key=lambda p: -len(pathComps(p))):
+            comps = pathComps(path)
+            m = getIn(root, comps)
+
+            if not isinstance(m, dict) or len(m) < self.minKeys:
+                continue
+
+            depth = mapDepth(len(m), self.bucketKeys)
+
+            async def shard(value, depth=depth):
+                buckets = splitMap(value, depth)
+                cids = await asyncio.gather(*[
+                    self.bucketCid(bucket, used)
+                    for bucket in buckets.values()
+                ])
+
+                return {
+                    keyHamt: {
+                        bname: {'/': cid}
+                        for bname, cid in zip(buckets.keys(), cids)
+                    }
+                }
+
+            root = await replaceIn(root, comps, shard)
+            layout['/'.join(comps)] = depth
+
+        # Only keep the CIDs of the buckets in use
+        self.cids = used
+
+        if layout:
+            root = dict(root)
+            root[keyShardsLayout] = layout
+
+        return root, layout
+
+
+async def readShards(root: dict,
+                     getNode: Callable[[str], Awaitable[dict]],
+                     writer: DAGShardsWriter = None):
+    """
+    Inlines the sharded maps of a stored tree. Returns the tree and
+    the shards layout.
+    """
+
+    if not isinstance(root, dict) or keyShardsLayout not in root:
+        return root, {}
+
+    layout = root.pop(keyShardsLayout)
+
+    for path, depth in layout.items():
+        node = getIn(root, pathComps(path))
+
+        if not isinstance(node, dict) or keyHamt not in node:
+            continue
+
+        links = [link['/'] for link in node[keyHamt].values()]
+        buckets = await asyncio.gather(*[getNode(cid) for cid in links])
+        merged = {}
+
+        for cid, bucket in zip(links, buckets):
+            if not isinstance(bucket, dict):
+                raise ValueError(f'Cannot load bucket {cid} of {path}')
+
+            if writer:
+                writer.remember(bucket, cid)
+
+            merged.update(bucket)
+
+        node.clear()
+        node.update(merged)
+
+    return root, layout
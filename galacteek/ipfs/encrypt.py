@@ -1,6 +1,8 @@
+import os
 import json
 import orjson
 import base64
+import aiofiles
 from io import BytesIO
 from cachetools import LRUCache
 
@@ -12,6 +14,8 @@ from jwcrypto.common import json_encode
 from galacteek.ipfs.wrappers import ipfsOp
 from galacteek.ipfs.cidhelpers import cidValid
 from galacteek.core.asynclib import asyncReadFile
+from galacteek.core.tmpf import TmpFile
+from galacteek.crypto.rsa import STREAM_CHUNK_SIZE
 from galacteek import log
 
 import aioipfs
@@ -101,6 +105,10 @@ class IpfsRSAAgent:
         return await self.rsaExec.decryptData(BytesIO(data),
                                               await self._privateKey())
 
+    async def decryptBatch(self, datas: list):
+        return await self.rsaExec.decryptBatch(datas,
+                                               await self._privateKey())
+
     @ipfsOp
     async def storeSelf(self, op, data, offline=False, wrap=False):
         """
@@ -129,6 +137,111 @@ class IpfsRSAAgent:
         except aioipfs.APIError as err:
             self.debug('IPFS error {}'.format(err.message))
 
+    async def encryptFileStreamed(self, path, pubKey=None,
+                                  chunkSize=STREAM_CHUNK_SIZE):
+        """
+        Async generator yielding the streamed encryption
+        (see RSAExecutor.encryptStream) of the file at path
+        """
+
+        async def readChunks():
+            async with aiofiles.open(path, 'rb') as fd:
+                while True:
+                    buff = await fd.read(chunkSize)
+                    if not buff:
+                        break
+
+                    yield buff
+
+        async for record in self.rsaExec.encryptStream(
+                readChunks(),
+                pubKey if pubKey else self.pubKeyPem):
+            yield record
+
+    @ipfsOp
+    async def storeSelfFileStreamed(self, op, path, offline=False):
+        """
+        Encrypt a file with our pubkey (streamed encryption, the file
+        is never loaded entirely in memory) and store it in IPFS
+
+        Returns the IPFS entry (returned by 'add') of the encrypted file
+
+        :param str path: path of the file to encrypt
+        :param bool offline: offline mode (no announce)
+
+        :rtype: dict
+        """
+
+        tmpPath = None
+
+        try:
+            with TmpFile(mode='wb', delete=False) as file:
+                tmpPath = file.name
+
+                async for record in self.encryptFileStreamed(path):
+                    await op.sleep()
+                    file.write(record)
+
+            entry = await op.addPath(tmpPath, wrap=False, offline=offline)
+
+            if entry:
+                self.debug(
+                    'storeSelfFileStreamed: encoded to {0}'.format(
+                        entry['Hash'])
+                )
+                return entry
+        except aioipfs.APIError as err:
+            self.debug('IPFS error {}'.format(err.message))
+        except Exception as err:
+            self.debug(f'storeSelfFileStreamed({path}): error: {err}')
+        finally:
+            if tmpPath and os.path.exists(tmpPath):
+                os.remove(tmpPath)
+
+    async def decryptStreamed(self, op, path, chunkTimeout=30):
+        """
+        Async generator yielding the decrypted chunks of an IPFS
+        object encrypted with the streamed encryption format
+
+        Not wrapped with ipfsOp (the wrapper awaits the result),
+        the IPFS operator is passed by the caller.
+        """
+
+        async def readChunks():
+            async for cno, data in op.catChunked(
+                    path,
+                    chunkSize=STREAM_CHUNK_SIZE,
+                    chunkTimeout=chunkTimeout):
+                yield data
+
+        async for chunk in self.rsaExec.decryptStream(
+                readChunks(), await self._privateKey()):
+            yield chunk
+
+    @ipfsOp
+    async def decryptStreamedToTmpFile(self, op, path):
+        """
+        Decrypts an IPFS object encrypted with the streamed encryption
+        format to a temporary file, whose path is returned.
+        The caller is responsible for removing that file.
+        """
+
+        tmpPath = None
+
+        try:
+            with TmpFile(mode='wb', delete=False) as file:
+                tmpPath = file.name
+
+                async for chunk in self.decryptStreamed(op, path):
+                    file.write(chunk)
+
+            return tmpPath
+        except Exception as err:
+            self.debug(f'decryptStreamedToTmpFile({path}): error: {err}')
+
+            if tmpPath and os.path.exists(tmpPath):
+                os.remove(tmpPath)
+
     @ipfsOp
     async def encryptToMfs(self, op, data, mfsPath):
         try:
@@ -4,20 +4,40 @@ from datetime import timedelta
 
 from galacteek import log
 from galacteek import database
+from galacteek import ensure
 
+from galacteek.config import configParentHandle
+from galacteek.core.asynclib.scheduler import DueScheduler
 from galacteek.ipfs import crawl
 from galacteek.ipfs.ipfsops import *  # noqa
 from galacteek.ipfs.wrappers import ipfsOp
 from galacteek.ipfs.cidhelpers import IPFSPath
 
 
+followerConfig = configParentHandle(__name__, prefix='feeds.follower')
+
+
 class FeedFollower(object):
     """
     IPNS object follower
+
+    Each active feed is scheduled by its own next-due time (feeds
+    are resolved concurrently, up to feeds.follower.concurrency at
+    once). Unreachable feeds are retried with exponential backoff.
+    The paths already registered by a feed are indexed in memory.
     """
 
     def __init__(self, app):
         self.app = app
+        self.scheduler = DueScheduler(
+            concurrency=followerConfig.get('concurrency'),
+            interval=followerConfig.get('retryDelay'),
+            backoffFactor=followerConfig.get('backoffFactor'),
+            backoffMax=followerConfig.get('backoffMax')
+        )
+
+        # feed id -> set of the paths registered by the feed
+        self._seen = {}
 
     async def process(self):
         try:
@@ -30,68 +50,125 @@ class FeedFollower(object):
             log.debug('IPNS follower: unknown error ocurred: {}'.format(
                 str(err)))
 
-    @ipfsOp
-    async def processIpnsFeeds(self, op):
+    async def processIpnsFeeds(self):
+        syncTask = ensure(self.feedsSyncTask())
+
+        try:
+            await self.scheduler.run(self.feedProcess)
+        finally:
+            syncTask.cancel()
+
+    async def feedsSync(self):
+        """
+        Schedule the active feeds that are not scheduled yet,
+        according to their next resolve date
+        """
+
+        now = datetime.now()
+        active = set()
+
+        for feed in await database.ipnsFeedsActive():
+            active.add(feed.id)
+
+            if feed.id in self.scheduler or \
+                    self.scheduler.isRunning(feed.id):
+                continue
+
+            delay = 0
+            if feed.resolvenext:
+                delay = max(0, (feed.resolvenext - now).total_seconds())
+
+            self.scheduler.schedule(feed.id, delay)
+
+        for feedId in list(self._seen.keys()):
+            if feedId not in active:
+                self.feedForget(feedId)
+
+    async def feedsSyncTask(self):
         while True:
-            now = datetime.now()
+            try:
+                await self.feedsSync()
+            except asyncio.CancelledError:
+                raise
+            except Exception as err:
+                log.debug(f'IPNS follower: feeds sync error: {err}')
+
+            await asyncio.sleep(followerConfig.get('syncInterval'))
+
+    def feedForget(self, feedId):
+        self.scheduler.remove(feedId)
+        self._seen.pop(feedId, None)
+
+    async def feedSeen(self, feed, path: str):
+        seen = self._seen.get(feed.id)
+
+        if seen is None:
+            seen = self._seen[feed.id] = set(
+                await database.ipnsFeedMarkPaths(feed))
+
+        return path in seen
+
+    @ipfsOp
+    async def feedProcess(self, op, feedId):
+        """
+        Scheduler handler: resolves a single feed and registers
+        the resolved object if it's new. Returns the delay until
+        the next resolve, or False if the feed could not be resolved.
+        """
 
-            feeds = await database.ipnsFeedsNeedSync(minutes=2)
+        feed = await database.ipnsFeedGet(feedId)
 
-            for feed in feeds:
-                await feed.fetch_related('feedhashmark')
+        if not feed or not feed.active:
+            self.feedForget(feedId)
+            return None
 
-                autoPin = feed.autopin
+        ipnsPath = feed.feedhashmark.path
 
-                feedMarks = await feed.entries()
+        resolved = await op.nameResolveStreamFirst(
+            ipnsPath,
+            timeout=followerConfig.get('resolveTimeout')
+        )
 
-                resolved = await op.nameResolveStreamFirst(
-                    feed.feedhashmark.path,
-                    timeout=15
-                )
+        if not resolved:
+            log.debug(f'IPNS follower: could not resolve {ipnsPath}')
+            return False
 
-                if not resolved:
-                    log.debug('Could not resolve {0}'.format(
-                        feed.feedhashmark.path))
-                    continue
+        resolvedPathRaw = resolved.get('Path', None)
+        if not resolvedPathRaw:
+            log.debug(f'Could not resolve {ipnsPath}: invalid path')
+            return False
 
-                resolvedPathRaw = resolved.get('Path', None)
-                if not resolvedPathRaw:
-                    log.debug(
-                        'Could not resolve {0}: invalid path'.format(ipnsp))
-                    continue
+        resolvedPath = IPFSPath(resolvedPathRaw, autoCidConv=True)
+        if not resolvedPath.valid:
+            return False
 
-                resolvedPath = IPFSPath(resolvedPathRaw, autoCidConv=True)
-                if not resolvedPath.valid:
-                    continue
+        now = datetime.now()
+        feed.resolvedlast = now
+        feed.resolvenext = now + timedelta(seconds=feed.resolveevery)
+        await feed.save()
 
-                feed.resolvedlast = now
-                feed.resolvenext = now + timedelta(seconds=feed.resolveevery)
-                await feed.save()
+        self.scheduler.clearFailures(feedId)
 
-                exists = False
-                for mark in feedMarks:
-                    if mark.path == str(resolvedPath):
-                        # already registered
-                        exists = True
-                        break
+        if await self.feedSeen(feed, str(resolvedPath)):
+            # already registered
+            return feed.resolveevery
 
-                if exists:
-                    continue
+        # Register the hashmark
+        title = await crawl.getTitle(op.client, str(resolvedPath))
 
-                # Register the hashmark
-                title = await crawl.getTitle(op.client, str(resolvedPath))
+        mark = await database.hashmarkAdd(
+            resolvedPath.objPath, title=title,
+            parent=feed.feedhashmark
+        )
 
-                mark = await database.hashmarkAdd(
-                    resolvedPath.objPath, title=title,
-                    parent=feed.feedhashmark
-                )
+        self._seen[feed.id].add(str(resolvedPath))
 
-                await database.IPNSFeedMarkAdded.emit(feed, mark)
+        await database.IPNSFeedMarkAdded.emit(feed, mark)
 
-                if autoPin:
-                    log.debug('Feed follower, autopinning {}'.format(
-                        resolvedPath))
-                    await self.app.ipfsCtx.pinner.queue(resolvedPath.objPath,
-                                                        True, None)
+        if feed.autopin:
+            log.debug('Feed follower, autopinning {}'.format(
+                resolvedPath))
+            await self.app.ipfsCtx.pinner.queue(resolvedPath.objPath,
+                                                True, None)
 
-            await asyncio.sleep(60)
+        return feed.resolveevery
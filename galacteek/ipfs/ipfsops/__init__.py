@@ -1,11 +1,10 @@
 import time
-import io
 import os.path
 import os
 import orjson
 import hashlib
 import uuid
-import aiofiles
+import functools
 import asyncio
 import aiohttp
 import re
@@ -17,7 +16,6 @@ from aiohttp.web_exceptions import HTTPOk
 from yarl import URL
 from pathlib import Path
 from datetime import datetime
-from cachetools import TTLCache
 
 from PyQt5.QtCore import QFile
 
@@ -28,21 +26,24 @@ from galacteek.ipfs.cidhelpers import joinIpfs
 from galacteek.ipfs.cidhelpers import joinIpns
 from galacteek.ipfs.cidhelpers import stripIpfs
 from galacteek.ipfs.cidhelpers import cidConvertBase32
+from galacteek.ipfs.cidhelpers import cidValid
 from galacteek.ipfs.cidhelpers import IPFSPath
 
 from galacteek.ipfs.multi import multiAddrTcp4
 from galacteek.ipfs.stat import StatInfo
 from galacteek.ipfs.stat import UnixFsStatInfo
+from galacteek.ipfs.walk import UnixFSWalker
+from galacteek.ipfs.walk import TYPE_FILE
 
-from galacteek.config import cGet
+from galacteek.config import configHandle
 
 from galacteek.core.asynccache import amlrucache
-from galacteek.core.asynccache import cachedcoromethod
 from galacteek.core.asynclib import loopTime
 from galacteek.core.asynclib import async_enterable
 from galacteek.core.jtraverse import traverseParser
 
 from galacteek.core.tmpf import TmpFile
+from galacteek.core.instrument import instruments
 from galacteek.core.asynclib import asyncRmTree
 from galacteek.ld import asyncjsonld as jsonld
 from galacteek.ld.iri import ipfsPeerUrn
@@ -59,6 +60,11 @@ from .pinops import RemotePinningServiceOps
 from .ldops import LinkedDataOps
 
 
+opsModConfig = configHandle(__name__)
+opsConfig = opsModConfig.sub('ops')
+ipfsConfig = configHandle('galacteek.ipfs')
+
+
 GFILES_ROOT_PATH = '/galacteek/'
 
 
@@ -268,10 +274,6 @@ class APIErrorDecoder:
         return self.exc.message == 'unknown node type'
 
 
-# Stream-resolve cache
-sResolveCache = TTLCache(512, 15)
-
-
 class IPFSOperator(RemotePinningOps,
                    RemotePinningServiceOps,
                    LinkedDataOps):
@@ -352,15 +354,14 @@ class IPFSOperator(RemotePinningOps,
 
     @property
     def unixFsWrapRules(self):
-        return cGet('unixfs.dirWrapRules',
-                    mod='galacteek.ipfs')
+        return ipfsConfig.get('unixfs.dirWrapRules')
 
     @property
     def cNsCache(self):
-        return cGet('nsCache')
+        return opsModConfig.get('nsCache')
 
     def opConfig(self, opName):
-        return cGet(f'ops.{opName}')
+        return opsConfig.get(opName)
 
     def debug(self, msg):
         log.debug('IPFSOp({0}): {1}'.format(self.uid, msg))
@@ -1049,10 +1050,29 @@ class IPFSOperator(RemotePinningOps,
             if isinstance(diff, dict) and 'Changes' in diff:
                 return diff['Changes']
 
+    def pinSetUpdate(self, result, pinType=None, remove=False):
+        """
+        Update the pinset index with the 'Pins' of a pin API result
+        """
+
+        if not self.pinSet or not isinstance(result, dict):
+            return
+
+        pins = result.get('Pins')
+
+        if isinstance(pins, list):
+            if remove:
+                self.pinSet.remove(pins)
+            else:
+                self.pinSet.add(pins, pinType=pinType)
+
     async def purge(self, hashRef, rungc=False):
         """ Unpins an object and optionally runs the garbage collector """
         try:
-            await self.client.pin.rm(hashRef, recursive=True)
+            self.pinSetUpdate(
+                await self.client.pin.rm(hashRef, recursive=True),
+                remove=True
+            )
             if rungc:
                 await self.client.repo.gc()
             return True
@@ -1068,16 +1088,50 @@ class IPFSOperator(RemotePinningOps,
         """
         return await self.client.repo.gc(quiet=quiet)
 
+    @property
+    def pinSet(self):
+        return self.ctx.pinSet if self.ctx else None
+
+    async def pinLsStream(self, pinType='all'):
+        """
+        Streamed listing of the pins of a given type (async generator
+        yielding {'Cid': cid, 'Type': type} entries)
+        """
+
+        async for entry in self.client.pin.mjson_decode(
+                self.client.pin.url('pin/ls'),
+                params={'type': pinType, 'stream': 'true'}):
+            yield entry
+
     async def isPinned(self, path: str, pinType=None):
         """
         Returns True if the IPFS object referenced by path is pinned,
         False otherwise
+
+        Answered from the pinset index when it's loaded and knows the
+        answer (the daemon is asked to resolve paths that are not plain
+        CIDs, and for the indirect pins when they're not indexed).
+
+        Without a pinType, objects missing from the index are checked
+        by the daemon (pin ls walks all the recursive pins to find
+        indirect pins): pass pinType='recursive' or 'direct' when
+        indirect pins don't matter, to never leave the index.
         """
         try:
-            cid = stripIpfs(await self.resolve(path, recursive=True))
+            cid = stripIpfs(path)
+
+            if not cidValid(cid):
+                cid = stripIpfs(await self.resolve(path, recursive=True))
+
             if not cid:
                 raise ValueError(f'Could not resolve: {path}')
 
+            if self.pinSet and self.pinSet.ready:
+                pinned = self.pinSet.lookup(cid, pinType=pinType)
+
+                if pinned is not None:
+                    return pinned
+
             result = await self.client.pin.ls(path)
             assert isinstance(result, dict)
 
@@ -1122,6 +1176,10 @@ class IPFSOperator(RemotePinningOps,
                         continue
                     if isinstance(pins, list) and len(pins) > 0:
                         # Ya estamos
+                        self.pinSetUpdate(
+                            pinStatus,
+                            pinType='recursive' if rec else 'direct'
+                        )
                         return True
                 return False
             except aioipfs.APIError as err:
@@ -1153,6 +1211,10 @@ class IPFSOperator(RemotePinningOps,
 
                 if isinstance(pins, list) and len(pins) > 0:
                     # Ya estamos
+                    self.pinSetUpdate(
+                        pinStatus,
+                        pinType='recursive' if recursive else 'direct'
+                    )
                     yield path, 1, progress
                     break
 
@@ -1175,6 +1237,7 @@ class IPFSOperator(RemotePinningOps,
             self.debug('unpin error: {}'.format(e.message))
             return None
         else:
+            self.pinSetUpdate(result, remove=True)
             self.debug('unpin success: {}'.format(result))
             return result
 
@@ -1189,6 +1252,12 @@ class IPFSOperator(RemotePinningOps,
             self.debug('pinUpdate error: {}'.format(e.message))
             return None
         else:
+            if self.pinSet:
+                if unpin:
+                    self.pinSet.remove([stripIpfs(old)])
+
+                self.pinSet.add([stripIpfs(new)], pinType='recursive')
+
             self.debug('pinUpdate success: {}'.format(result))
             return result
 
@@ -1489,27 +1558,23 @@ class IPFSOperator(RemotePinningOps,
             return returnEntry
 
     async def addFileEncrypted(self, path):
+        """
+        Encrypts the file at path with our RSA key and imports it.
+        The file is encrypted by chunks, and never loaded entirely
+        in memory.
+        """
+
         basename = os.path.basename(path)
-        buffSize = 262144
-        readTotal = 0
-        whole = io.BytesIO()
 
-        try:
-            async with aiofiles.open(path, 'rb') as fd:
-                while True:
-                    buff = await fd.read(buffSize)
-                    if not buff:
-                        break
-                    await self.sleep()
-                    readTotal += len(buff)
-                    whole.write(buff)
-        except:
+        logUser.info('{n}: encrypting'.format(n=basename))
+
+        entry = await self.rsaAgent.storeSelfFileStreamed(path)
+
+        if not entry:
             self.debug('Error occured while encrypting {path}'.format(
                 path=path))
-        else:
-            whole.seek(0, 0)
-            logUser.info('{n}: encrypting'.format(n=basename))
-            return await self.rsaAgent.storeSelf(whole)
+
+        return entry
 
     async def addBytes(self, data, cidversion=1, **kw):
         try:
@@ -1587,33 +1652,27 @@ class IPFSOperator(RemotePinningOps,
         elif isinstance(cid, dict) and 'Hash' in cid:
             return {"/": cid['Hash']}
 
-    @cachedcoromethod(sResolveCache)
+    @property
+    def nsResolver(self):
+        return self.nsCache.resolver
+
     async def objectPathMapCacheResolve(self, path):
         """
-        Simple async TTL cache for results from nameResolveStreamFirst()
+        Resolves an IPNS path with the IPNS resolution service
+        (merged lookups, stale-while-revalidate)
         """
-        return await self.nameResolveStreamFirst(path, debug=False)
-
-    def sResolveCacheClear(self, time=None):
-        sResolveCache.expire(time)
-
-    def sResolveCacheLog(self):
-        self.debug('sResolveCacheDump: start')
-
-        for path, r in sResolveCache.items():
-            self.debug(f'sResolveCache: path {path} => {r}')
-
-        self.debug('sResolveCacheDump: end')
+        return await self.nsResolver.resolve(self, path)
 
     async def objectPathMapper(self, path):
         ipfsPath = path if isinstance(path, IPFSPath) else \
             IPFSPath(path, autoCidConv=True)
 
         if ipfsPath.isIpns:
-            resolved = await self.objectPathMapCacheResolve(path)
+            resolved = await self.objectPathMapCacheResolve(
+                ipfsPath.objPath)
 
             if resolved:
-                return resolved['Path']
+                return resolved
             else:
                 self.debug(
                     'objectPathMapper: {o}: stream-resolve failed'.format(
@@ -1706,28 +1765,53 @@ class IPFSOperator(RemotePinningOps,
         except (aioipfs.APIError, aioipfs.UnknownAPIError):
             pass
 
-    async def walk(self, path):
+    async def walkLinks(self, path, timeout=None):
+        """
+        Returns the UnixFS links of the object at path (used by
+        the walker), or None if the listing failed
+        """
+
+        result = await self.listObject(path, timeout=timeout)
+
+        if not result:
+            return None
+
+        objects = result.get('Objects', [])
+        return objects[-1].get('Links', []) if objects else []
+
+    def walker(self, **kw):
+        """
+        Returns a concurrent UnixFS walker (see galacteek.ipfs.walk)
+        """
+
+        cfg = self.opConfig('walk')
+
+        kw.setdefault('concurrency', cfg.concurrency)
+        return UnixFSWalker(
+            functools.partial(self.walkLinks, timeout=cfg.timeout),
+            **kw
+        )
+
+    async def walkEntries(self, path, **kw):
+        """
+        Walks breadth-first over the UnixFS tree at path and yields
+        (path, entry) tuples. Keyword arguments are passed to
+        the walker (types, minSize, maxSize, maxDepth ..)
+        """
+
+        async for value in self.walker(**kw).walk(str(path)):
+            yield value
+
+    async def walk(self, path, maxDepth=None):
         """
         Walks over UnixFS nodes and yields only paths of
-        file objects.
+        file objects (as (filePath, parentPath) tuples)
         """
-        try:
-            result = await self.listObject(path)
-        except aioipfs.APIError:
-            pass
-        else:
-            _olist = result.get('Objects', [])
-            if len(_olist) > 0:
-                links = _olist.pop()['Links']
-
-                for entry in links:
-                    if entry['Type'] == 1:
-                        async for value in self.walk(entry['Hash']):
-                            yield value
-                    elif entry['Type'] == 2:
-                        fPath = IPFSPath(path).child(entry['Name'])
-                        if fPath.valid:
-                            yield (str(fPath), path)
+
+        async for fPath, entry in self.walkEntries(
+                path, types=[TYPE_FILE], maxDepth=maxDepth):
+            if IPFSPath(fPath).valid:
+                yield (fPath, entry.parent)
 
     async def dagPut(self, data, pin=True, offline=False):
         """
@@ -2272,3 +2356,7 @@ class GalacteekOperator(IPFSOperator):
         except Exception as err:
             self.debug(str(err))
             return None
+
+
+# Time the operator calls when instrumentation is enabled
+instruments.instrumentClass(GalacteekOperator, 'ipfsop')
@@ -1,18 +1,21 @@
 import json
 import aiofiles
 import asyncio
+import os
 import time
 import traceback
 from pathlib import Path
 
 from galacteek import log
 from galacteek.core import jsonSchemaValidate
-from galacteek.config import cParentGet
+from galacteek.config import configParentHandle
 
 from galacteek.ipfs.cidhelpers import joinIpns
 from galacteek.ipfs.cidhelpers import stripIpns
 from galacteek.ipfs.cidhelpers import ipnsKeyCidV1
 
+nsCacheConfig = configParentHandle(__name__)
+
 ppRe = r"^(/ipns/[\w<>\:\;\,\?\!\*\%\&\=\@\$\~/\s\.\-_\\\'\(\)\+]{1,1024}$)"
 nsCacheSchema = {
     "title": "NS cache",
@@ -40,15 +43,64 @@ class InvalidCacheError(Exception):
     pass
 
 
+def nsPathSplit(path: str):
+    """
+    Splits an IPNS path into its name root and its sub-path
+
+    nsPathSplit('/ipns/name/a/b') -> ('/ipns/name', '/a/b')
+    """
+
+    comps = stripIpns(path).strip('/').split('/', 1)
+    subPath = '/' + comps[1] if len(comps) > 1 and comps[1] else ''
+    return joinIpns(comps[0]), subPath
+
+
+def nsPathJoin(resolved: str, subPath: str):
+    if resolved and subPath:
+        return resolved.rstrip('/') + subPath
+
+    return resolved
+
+
 class IPNSCache:
+    """
+    IPNS cache, persisted as JSON.
+
+    Writes are debounced: a set marks the cache as dirty and the
+    cache is saved once no set happened for saveDelay seconds
+    (or at most saveMaxDelay seconds after the first unsaved set).
+
+    Entries are keyed by IPNS name root (sub-paths are appended to the
+    resolved path on lookup). The cache holds at most maxEntries
+    entries (least recently used entries are evicted first), and
+    entries not refreshed for maxLifetime seconds are dropped.
+
+    An entry is only served if it's younger than the maxCacheLifetime
+    of its origin (and of the lifetime asked by the caller).
+    """
+
     def __init__(self, path: Path):
         self.nsCachePath = path
         self._lock = asyncio.Lock()
+        self._saveHandle = None
+        self._dirtySince = None
+        self._resolver = None
         self.cache = {}
 
     @property
     def cNsCache(self):
-        return cParentGet('nsCache')
+        return nsCacheConfig.get('nsCache')
+
+    @property
+    def dirty(self):
+        return self._dirtySince is not None
+
+    @property
+    def resolver(self):
+        if not self._resolver:
+            self._resolver = IPNSResolver(self)
+
+        return self._resolver
 
     def nsCacheLoad(self):
         try:
@@ -66,41 +118,261 @@ class IPNSCache:
         else:
             log.warning(f'IPNS cache: loaded from {self.nsCachePath}')
             self.cache = cache
+            self.nsCacheEvict()
+
+    def nsCacheEvict(self):
+        """
+        Drops the expired entries, and the least recently used entries
+        above maxEntries
+        """
+
+        maxLifetime = self.cNsCache.get('maxLifetime', 86400 * 7)
+        maxEntries = self.cNsCache.get('maxEntries', 4096)
+        now = int(time.time())
+
+        for path in [path for path, entry in self.cache.items() if
+                     not isinstance(entry, dict) or
+                     now - entry.get('resolvedLast', 0) > maxLifetime]:
+            del self.cache[path]
+
+        while len(self.cache) > maxEntries:
+            # Dicts are ordered: the first entry is the least recently used
+            del self.cache[next(iter(self.cache))]
+
+    def originLifetime(self, origin):
+        """
+        Max lifetime of the cache entries of the given origin (seconds)
+        """
+
+        cfg = self.cNsCache.origins.get(origin if origin else 'unknown')
+        if not cfg:
+            cfg = self.cNsCache.origins.unknown
+
+        return cfg.maxCacheLifetime
 
     async def nsCacheSave(self):
         if not self.nsCachePath or not isinstance(self.cache, dict):
             return
 
         async with self._lock:
-            async with aiofiles.open(str(self.nsCachePath), 'w+t') as fd:
-                await fd.write(json.dumps(self.cache))
+            self._dirtySince = None
+            self.nsCacheEvict()
+            data = json.dumps(self.cache)
+            tmpPath = str(self.nsCachePath) + '.tmp'
 
-    def nsCacheGet(self, path, maxLifetime=None, knownOrigin=False):
-        entry = self.cache.get(path)
+            try:
+                # Write to a temporary file and replace, so that an
+                # interrupted write never leaves a truncated cache
+                async with aiofiles.open(tmpPath, 'w+t') as fd:
+                    await fd.write(data)
+
+                os.replace(tmpPath, str(self.nsCachePath))
+            except Exception as err:
+                log.warning(f'IPNS cache: could not save: {err}')
+
+    def nsCacheScheduleSave(self):
+        """
+        Schedules a (debounced) save of the cache
+        """
+
+        try:
+            loop = asyncio.get_event_loop()
+        except RuntimeError:
+            return
+
+        now = loop.time()
+        saveDelay = self.cNsCache.get('saveDelay', 5)
+        saveMaxDelay = self.cNsCache.get('saveMaxDelay', 30)
+
+        if self._dirtySince is None:
+            self._dirtySince = now
+
+        if self._saveHandle:
+            self._saveHandle.cancel()
+
+        delay = max(0, min(
+            saveDelay,
+            saveMaxDelay - (now - self._dirtySince)
+        ))
+
+        self._saveHandle = loop.call_later(delay, self._saveScheduled)
+
+    def _saveScheduled(self):
+        self._saveHandle = None
+        asyncio.ensure_future(self.nsCacheSave())
+
+    async def nsCacheFlush(self):
+        """
+        Saves the cache now if it has unsaved changes
+        """
+
+        if self._saveHandle:
+            self._saveHandle.cancel()
+            self._saveHandle = None
+
+        if self.dirty:
+            await self.nsCacheSave()
+
+    def _entryUse(self, root):
+        entry = self.cache.get(root)
 
         if isinstance(entry, dict):
-            rLast = entry['resolvedLast']
+            # Move it to the end (most recently used)
+            self.cache[root] = self.cache.pop(root)
+            return entry
+
+    def nsCacheEntry(self, path, maxLifetime=None, knownOrigin=False):
+        """
+        Returns a (resolved, age) tuple for path, or None if there's
+        no usable entry for this path
+
+        :param int maxLifetime: max age of the entry (seconds). The
+            maxCacheLifetime of the entry's origin always applies
+        :param bool knownOrigin: ignore entries of unknown origin
+        """
+
+        root, subPath = nsPathSplit(path)
+        entry = self._entryUse(root)
+
+        if not entry:
+            return None
 
-            if knownOrigin is True and entry.get('cacheOrigin') == 'unknown':
-                return None
+        origin = entry.get('cacheOrigin')
 
-            if not maxLifetime or (int(time.time()) - rLast) < maxLifetime:
-                return entry['resolved']
+        if knownOrigin is True and origin in (None, 'unknown'):
+            return None
+
+        age = int(time.time()) - entry['resolvedLast']
+        lifetime = self.originLifetime(origin)
+
+        if maxLifetime:
+            lifetime = min(lifetime, maxLifetime)
+
+        if age < lifetime:
+            return nsPathJoin(entry['resolved'], subPath), age
+
+    def nsCacheGet(self, path, maxLifetime=None, knownOrigin=False):
+        entry = self.nsCacheEntry(path, maxLifetime=maxLifetime,
+                                  knownOrigin=knownOrigin)
+        if entry:
+            return entry[0]
 
     async def nsCacheSet(self, path, resolved, origin=None):
-        self.cache[path] = {
+        root, subPath = nsPathSplit(path)
+
+        if subPath:
+            # Only cache the resolution of the name root
+            if not resolved or not resolved.rstrip('/').endswith(subPath):
+                return
+
+            resolved = resolved.rstrip('/')[:-len(subPath)]
+
+        entry = {
             'resolved': resolved,
             'resolvedLast': int(time.time()),
             'cacheOrigin': origin
         }
 
+        roots = [root]
+
         # Cache v1
-        v1 = ipnsKeyCidV1(stripIpns(path))
-        if v1:
-            self.cache[joinIpns(v1)] = {
-                'resolved': resolved,
-                'resolvedLast': int(time.time()),
-                'cacheOrigin': origin
-            }
+        v1 = ipnsKeyCidV1(stripIpns(root))
+        if v1 and joinIpns(v1) != root:
+            roots.append(joinIpns(v1))
+
+        for key in roots:
+            self.cache.pop(key, None)
+            self.cache[key] = dict(entry)
+
+        while len(self.cache) > self.cNsCache.get('maxEntries', 4096):
+            del self.cache[next(iter(self.cache))]
+
+        self.nsCacheScheduleSave()
+
+
+class IPNSResolver:
+    """
+    IPNS resolution service, shared by all the operators using
+    the same NS cache.
+
+    Concurrent resolutions of the same name are merged into a single
+    lookup. Records younger than freshLifetime are served from the
+    cache. Records younger than staleLifetime are served from the
+    cache immediately, and refreshed in the background.
+
+    Names are resolved (and cached) by name root, the sub-path is
+    appended to the resolved path.
+    """
+
+    def __init__(self, nsCache: IPNSCache):
+        self.nsCache = nsCache
+        self._inflight = {}
+
+    @property
+    def cResolver(self):
+        return nsCacheConfig.get('nsCache.resolver')
+
+    def inflight(self, path):
+        root, _ = nsPathSplit(path)
+        fut = self._inflight.get((id(asyncio.get_event_loop()), root))
+        return fut is not None and not fut.done()
+
+    async def resolve(self, ipfsop, path: str):
+        """
+        Resolves the IPNS path and returns the resolved path, or None
+
+        :param str path: IPNS path
+        """
+
+        cfg = self.cResolver
+        root, subPath = nsPathSplit(path)
+        entry = self.nsCache.nsCacheEntry(
+            root, maxLifetime=cfg.staleLifetime, knownOrigin=True)
+
+        if entry:
+            resolved, age = entry
+
+            if age >= cfg.freshLifetime:
+                # Stale-while-revalidate
+                self.lookup(ipfsop, root)
+
+            return nsPathJoin(resolved, subPath)
+
+        # Shield the lookup: another caller may be waiting on it
+        resolved = await asyncio.shield(self.lookup(ipfsop, root))
+        return nsPathJoin(resolved, subPath)
+
+    def lookup(self, ipfsop, path: str):
+        """
+        Returns the future of the lookup for path (a name root),
+        starting it if no lookup for this name is in progress
+        """
+
+        # Futures are bound to a loop (operators can run in other loops)
+        key = (id(asyncio.get_event_loop()), path)
+
+        fut = self._inflight.get(key)
+        if fut and not fut.done():
+            return fut
+
+        fut = asyncio.ensure_future(self._lookup(ipfsop, path))
+        fut.add_done_callback(
+            lambda f: self._inflight.pop(key, None)
+            if self._inflight.get(key) is f else None
+        )
+        self._inflight[key] = fut
+        return fut
+
+    async def _lookup(self, ipfsop, path: str):
+        try:
+            result = await ipfsop.nameResolveStreamFirst(path, debug=False)
+        except asyncio.CancelledError:
+            raise
+        except Exception as err:
+            log.debug(f'IPNS resolver: {path}: lookup error: {err}')
+            return None
 
-        await self.nsCacheSave()
+        if result and result.get('Path'):
+            await self.nsCache.nsCacheSet(
+                path, result['Path'], origin='resolver')
+            return result['Path']
@@ -16,6 +16,7 @@ from galacteek.ipfs.ipfsops import APIErrorDecoder
 from galacteek.core.asynclib import asyncReadFile
 from galacteek.core import inPyInstaller
 from galacteek.core import pyInstallerBundleFolder
+from galacteek.crypto.rsa import STREAM_MAGIC
 
 
 iMagic = None
@@ -195,6 +196,9 @@ mimeTypeDagPb = MIMEType('ipfs/dag-pb')
 mimeTypeDagUnknown = MIMEType('ipfs/dag-unknown')
 mimeTypeWasm = MIMEType('application/wasm')
 
+# Objects encrypted with the streamed encryption format
+mimeTypeStreamEncrypted = MIMEType('application/x-galacteek-encrypted')
+
 
 def magicInstance():
     global iMagic
@@ -234,6 +238,9 @@ def mimeTypeProcess(mTypeText, buff, info=None):
             log.warning('Detected WASM binary, version {}'.format(version))
             return mimeTypeWasm
 
+        if buff[0:len(STREAM_MAGIC)] == STREAM_MAGIC:
+            return mimeTypeStreamEncrypted
+
     return MIMEType(mTypeText)
 
 
@@ -1,8 +1,11 @@
+import re
 import secrets
 import json
 import orjson
 import attr
+import aiofiles
 import zlib
+import gzip
 import traceback
 import collections
 
@@ -24,6 +27,12 @@ from galacteek.core.asynclib import loopTime
 from galacteek.ipfs.tunnel import P2PListener
 from galacteek.ipfs.p2pservices import P2PService
 from galacteek.ld.rdf import BaseGraph
+from galacteek.ld.rdf.snapshot import GraphSnapshotCache
+from galacteek.ld.rdf.sync.reconcile import graphRecordIds
+from galacteek.ld.rdf.sync.reconcile import graphRecords
+from galacteek.ld.sparql.workers import GraphOpenError
+from galacteek.ld.sparql.workers import QueryCPUTimeExceeded
+from galacteek.ld.sparql.workers import QueryResultTooLarge
 
 
 MIME_N3 = 'text/rdf+n3'
@@ -35,6 +44,14 @@ MIME_RESULTS_XML = 'application/sparql-results+xml'
 MIME_XTTL = 'application/x-turtle'
 MIME_RDFXML = 'application/rdf+xml'
 MIME_JSONLD = 'application/ld+json'
+MIME_NQUADS = 'application/n-quads'
+
+MIME_EXPORTS = {
+    'nt': MIME_NTRIPLES,
+    'nq': MIME_NQUADS,
+    'ttl': MIME_TTL,
+    'xml': MIME_RDFXML
+}
 
 
 class ProcessTimeLimitException(Exception):
@@ -45,7 +62,11 @@ class ProcessTimeLimitException(Exception):
 class SparQLServiceConfig:
     uri: str = ''
     exportsAllow: bool = False
-    exportFormats: list = ['ttl', 'xml']
+    exportFormats: list = ['nt', 'nq', 'ttl', 'xml']
+
+    # Exports are served from a snapshot of the graph, rebuilt when
+    # the graph changes (at most every exportSnapshotMinAge seconds)
+    exportSnapshotMinAge: float = 30.0
 
     # The maximum CPU process time (in msecs per minute) that a remote
     # peer is allowed to use for SparQL queries on this service
@@ -53,6 +74,16 @@ class SparQLServiceConfig:
 
     processTimeQueueSize: int = 8
 
+    # Set reconciliation endpoints
+    reconcileAllow: bool = True
+    reconcileMaxPrefixes: int = 4096
+    reconcileMaxDepth: int = 3
+    reconcileMaxIds: int = 4096
+    reconcileMaxRecords: int = 256
+
+    # How long we keep the record IDs set (seconds)
+    reconcileIdsCacheTtl: int = 30
+
 
 class SparQLWebApp(web.Application):
     pass
@@ -73,6 +104,17 @@ class SparQLSiteHandler:
         self.app = runningApp()
         self.processTime = {}
 
+        # Set to False if the SparQL workers can't open the graph
+        self.workersUsable = True
+
+        self.recordIdsCache = TTLCache(
+            8, self.cfg.reconcileIdsCacheTtl)
+        self.snapshots = GraphSnapshotCache(
+            self.service.graph,
+            minAge=self.cfg.exportSnapshotMinAge,
+            executor=self.app.executor
+        )
+
     @property
     def cfg(self):
         return self.service.config
@@ -204,7 +246,11 @@ class SparQLSiteHandler:
 
     async def export(self, request):
         """
-        Export the graph in ttl/xml, via a GET method
+        Export the graph (N-Triples, N-Quads, ttl or xml), via a GET method
+
+        The export is streamed (chunked) from a gzip-compressed
+        snapshot of the graph, shared by all the requests made while
+        the graph doesn't change.
         """
 
         if not self.service.config.exportsAllow:
@@ -213,35 +259,178 @@ class SparQLSiteHandler:
         fmt = request.query.get('fmt', 'xml')
         compress = request.query.get('compress', 'gzip')
 
-        graph = self.service.graph
+        if fmt not in self.cfg.exportFormats:
+            return await self.msgError(error='Invalid format')
 
         async with self.throttler:
             try:
-                if fmt == 'xml':
-                    data = await graph.xmlize()
-                    ctype = 'application/rdf+xml'
-                elif fmt == 'ttl':
-                    data = await graph.ttlize()
-                    ctype = MIME_TTL
-                else:
-                    return await self.msgError(error='Invalid format')
-
-                if compress == 'gzip':
-                    ctype = 'application/gzip'
-
-                    return web.Response(
-                        content_type=ctype,
-                        body=zlib.compress(data)
-                    )
-                else:
-                    return web.Response(
-                        content_type=ctype,
-                        text=data.decode()
-                    )
+                snapshot = await self.snapshots.snapshot(fmt)
             except Exception as err:
                 log.debug(f'Export error: {err}')
                 return await self.msgError(error='Export error')
 
+        resp = None
+
+        try:
+            if compress == 'gzip':
+                ctype = 'application/gzip'
+                dobj = None
+            else:
+                ctype = MIME_EXPORTS.get(fmt, MIME_NTRIPLES)
+                dobj = zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+
+            resp = web.StreamResponse(headers={
+                hdrs.CONTENT_TYPE: ctype
+            })
+            resp.enable_chunked_encoding()
+            await resp.prepare(request)
+
+            async with aiofiles.open(str(snapshot.path), 'rb') as fd:
+                while True:
+                    chunk = await fd.read(65536)
+                    if not chunk:
+                        break
+
+                    await resp.write(
+                        dobj.decompress(chunk) if dobj else chunk)
+
+            await resp.write_eof()
+            return resp
+        except Exception as err:
+            log.debug(f'Export error: {err}')
+
+            if resp is None or not resp.prepared:
+                return await self.msgError(error='Export error')
+
+            return resp
+        finally:
+            snapshot.release()
+
+    async def recordIds(self, recordType: str = None):
+        """
+        Returns the (cached) set of record IDs of the graph
+        """
+
+        ids = self.recordIdsCache.get(recordType)
+
+        if ids is None:
+            ids = await self.app.loop.run_in_executor(
+                self.app.executor,
+                graphRecordIds,
+                self.service.graph,
+                recordType
+            )
+            self.recordIdsCache[recordType] = ids
+
+        return ids
+
+    async def reconcileRequest(self, request):
+        if not self.cfg.reconcileAllow:
+            raise web.HTTPForbidden()
+
+        payload = await request.json()
+        assert isinstance(payload, dict)
+
+        prefixes = payload.get('prefixes', [''])
+        rtype = payload.get('type')
+
+        assert isinstance(prefixes, list)
+        assert len(prefixes) <= self.cfg.reconcileMaxPrefixes
+        assert all(isinstance(p, str) and re.match(r'^[0-9a-f]{0,64}$', p)
+                   for p in prefixes)
+        assert rtype is None or (isinstance(rtype, str) and len(rtype) < 512)
+
+        return payload, prefixes, rtype
+
+    async def reconcileSummary(self, request):
+        """
+        Set reconciliation: return the summary (count and digest)
+        of the record IDs buckets under the requested prefixes
+        """
+
+        async with self.throttler:
+            try:
+                payload, prefixes, rtype = await self.reconcileRequest(
+                    request)
+                depth = int(payload.get('depth', 2))
+
+                assert 0 < depth <= self.cfg.reconcileMaxDepth
+
+                ids = await self.recordIds(rtype)
+                summary = await self.app.loop.run_in_executor(
+                    self.app.executor, ids.summary, prefixes, depth)
+
+                return web.json_response({
+                    'buckets': summary
+                })
+            except web.HTTPForbidden:
+                return await self.msgError(status=403)
+            except Exception as err:
+                log.debug(f'Reconcile summary error: {err}')
+                return await self.msgError(error='Invalid request')
+
+    async def reconcileIds(self, request):
+        """
+        Set reconciliation: return the record IDs in the
+        requested buckets
+        """
+
+        async with self.throttler:
+            try:
+                payload, prefixes, rtype = await self.reconcileRequest(
+                    request)
+
+                ids = (await self.recordIds(rtype)).ids(prefixes)
+
+                if len(ids) > self.cfg.reconcileMaxIds:
+                    return await self.msgError(error='Too many IDs')
+
+                return web.json_response({
+                    'ids': ids
+                })
+            except web.HTTPForbidden:
+                return await self.msgError(status=403)
+            except Exception as err:
+                log.debug(f'Reconcile ids error: {err}')
+                return await self.msgError(error='Invalid request')
+
+    async def reconcileRecords(self, request):
+        """
+        Set reconciliation: return the triples of the requested
+        records, with their blank nodes (N-Triples, gzip-compressed)
+        """
+
+        def records(graph, ids):
+            return gzip.compress(
+                graphRecords(graph, ids).serialize(format='nt'))
+
+        if not self.cfg.reconcileAllow:
+            return await self.msgError(status=403)
+
+        async with self.throttler:
+            try:
+                payload = await request.json()
+                ids = payload.get('ids')
+
+                assert isinstance(ids, list)
+                assert len(ids) <= self.cfg.reconcileMaxRecords
+                assert all(isinstance(i, str) for i in ids)
+
+                data = await self.app.loop.run_in_executor(
+                    self.app.executor,
+                    records,
+                    self.service.graph,
+                    ids
+                )
+
+                return web.Response(
+                    content_type='application/gzip',
+                    body=data
+                )
+            except Exception as err:
+                log.debug(f'Reconcile records error: {err}')
+                return await self.msgError(error='Invalid request')
+
     def isAllowedSparqlQuery(self, query: str):
         try:
             parseQuery(query)
@@ -249,6 +438,68 @@ class SparQLSiteHandler:
         except Exception:
             return False
 
+    def resultsFormat(self, acceptl: list):
+        """
+        Returns the serialization format and content type of the
+        results for the given Accept header values
+        """
+
+        if 'application/json' in acceptl:
+            return 'json', MIME_RESULTS_JSON
+        elif MIME_JSONLD in acceptl:
+            return 'json-ld', MIME_JSONLD
+        elif 'application/xml' in acceptl or MIME_RDFXML in acceptl:
+            return 'xml', MIME_RDFXML
+        elif MIME_TTL in acceptl or MIME_XTTL in acceptl:
+            return 'turtle', MIME_TTL
+        elif MIME_N3 in acceptl:
+            return 'n3', MIME_N3
+
+        return None, None
+
+    async def sparqlWorkerRun(self, auth: BasicAuth, q: str, acceptl: list):
+        """
+        Run the query in the SparQL workers pool. The results are
+        serialized by the worker.
+
+        Returns None if the workers can't open the graph's store (the
+        query is then run in the application's process).
+        """
+
+        fmt, ctype = self.resultsFormat(acceptl)
+
+        if not fmt or not isinstance(q, str):
+            return await self.msgError(error='Invalid query')
+
+        try:
+            data, ptime = await self.service.queryPool.query(
+                self.service.graph.location, q, fmt=fmt)
+        except QueryCPUTimeExceeded:
+            self.ptimeDataForLogin(auth.login).appendleft(
+                (loopTime(), self.service.queryPool.cpuTimeLimit * 1e9))
+
+            return await self.msgError(error='Query CPU time exceeded',
+                                       status=429)
+        except QueryResultTooLarge:
+            return await self.msgError(error='Result too large',
+                                       status=413)
+        except GraphOpenError as err:
+            log.warning(f'SparQL workers: {err}, running queries '
+                        'in-process')
+            self.workersUsable = False
+            return None
+        except Exception as err:
+            log.debug(f'Query error: {err}')
+            return await self.msgError(error='Invalid query')
+
+        self.ptimeDataForLogin(auth.login).appendleft((loopTime(), ptime))
+
+        return web.Response(
+            body=data,
+            content_type=ctype,
+            status=200
+        )
+
     async def sparql(self, request):
         """
         Run a SparQL query on the graph associated with the
@@ -289,6 +540,13 @@ class SparQLSiteHandler:
                 return await self.msgError(
                     error='Invalid request: method should be POST')
 
+            if self.service.queryPool and self.service.graph.location and \
+                    self.workersUsable:
+                resp = await self.sparqlWorkerRun(auth, q, acceptl)
+
+                if resp is not None:
+                    return resp
+
             try:
                 assert isinstance(q, str)
                 # assert self.isAllowedSparqlQuery(q) is True
@@ -428,9 +686,10 @@ class P2PSmartQLService(P2PService):
 
     """
 
-    def __init__(self, chainEnv, graph, config=None):
+    def __init__(self, chainEnv, graph, config=None, queryPool=None):
         self.graph = graph
         self.config = config if config else SparQLServiceConfig()
+        self.queryPool = queryPool
 
         self.mwAuth = SmartQLPeerBasedAuthMiddleware()
 
@@ -445,6 +704,14 @@ class P2PSmartQLService(P2PService):
 
 
 class SparQLListener(P2PListener):
+    handler = None
+
+    async def close(self):
+        await super().close()
+
+        if self.handler:
+            self.handler.snapshots.close()
+
     async def createServer(self, host='127.0.0.1', portRange=[]):
         for port in portRange:
             try:
@@ -460,6 +727,14 @@ class SparQLListener(P2PListener):
 
                 self.webapp.router.add_get('/export', self.handler.export)
 
+                # Set reconciliation endpoints
+                self.webapp.router.add_post(
+                    '/reconcile/summary', self.handler.reconcileSummary)
+                self.webapp.router.add_post(
+                    '/reconcile/ids', self.handler.reconcileIds)
+                self.webapp.router.add_post(
+                    '/reconcile/records', self.handler.reconcileRecords)
+
                 # SmartQL endpoints
                 self.webapp.router.add_route(
                     '*',
@@ -203,7 +203,9 @@ class PinningMaster(Configurable):
             path=path, rec=recursive, qname=qname))
 
         if self._checkPinned:
-            if await op.isPinned(path):
+            if await op.isPinned(
+                    path,
+                    pinType='recursive' if recursive else 'direct'):
                 # Already pinned
                 self.debug('Already pinned: {path}'.format(path=path))
                 await self.pathDelete(path)
@@ -269,6 +271,11 @@ class PinningMaster(Configurable):
             pins = pItem['status'].get('Pins', None)
             if pins and isinstance(pins, list):
                 # 'Pins' is a list of CIDs, mark it as pinned
+                op.pinSetUpdate(
+                    pItem['status'],
+                    pinType='recursive' if recursive else 'direct'
+                )
+
                 now = int(time.time())
                 pItem['pinned'] = True
                 pItem['ts_pinned'] = now
@@ -0,0 +1,73 @@
+import asyncio
+
+from galacteek import log
+from galacteek import ensure
+from galacteek.ipfs.wrappers import ipfsOp
+
+
+class BoundedPinQueue:
+    """
+    Pins objects with a fixed number of workers (at most workers
+    pins in progress on the daemon). Submitting waits when the
+    queue is full (backpressure).
+
+    :param int workers: number of concurrent pins
+    :param int maxsize: queue size
+    :param int timeout: timeout for a pin
+    """
+
+    def __init__(self, workers: int = 4, maxsize: int = 256,
+                 timeout: int = 60):
+        self.workers = workers
+        self.timeout = timeout
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self._pending = set()
+        self._tasks = []
+
+    def _start(self):
+        self._tasks = [t for t in self._tasks if not t.done()]
+
+        while len(self._tasks) < self.workers:
+            self._tasks.append(ensure(self._worker()))
+
+    async def submit(self, cid: str, recursive: bool = False):
+        if cid in self._pending:
+            return
+
+        self._start()
+        self._pending.add(cid)
+
+        try:
+            await self.queue.put((cid, recursive))
+        except asyncio.CancelledError:
+            self._pending.discard(cid)
+            raise
+
+    async def join(self):
+        await self.queue.join()
+
+    @ipfsOp
+    async def _pin(self, ipfsop, cid: str, recursive: bool):
+        if not await ipfsop.pin(cid, recursive=recursive,
+                                timeout=self.timeout):
+            log.debug(f'Bounded pin queue: could not pin {cid}')
+
+    async def _worker(self):
+        while True:
+            cid, recursive = await self.queue.get()
+
+            try:
+                await self._pin(cid, recursive)
+            except asyncio.CancelledError:
+                raise
+            except Exception as err:
+                log.debug(f'Bounded pin queue: {cid}: error {err}')
+            finally:
+                self._pending.discard(cid)
+                self.queue.task_done()
+
+    def stop(self):
+        for task in self._tasks:
+            task.cancel()
+
+        self._tasks = []
@@ -0,0 +1,169 @@
+import asyncio
+
+from galacteek import log
+from galacteek.ipfs.cidhelpers import cidConvertBase32
+
+
+PIN_RECURSIVE = 'recursive'
+PIN_DIRECT = 'direct'
+PIN_INDIRECT = 'indirect'
+
+
+def pinKey(cid: str):
+    try:
+        return cidConvertBase32(cid)
+    except Exception:
+        return None
+
+
+class PinSetIndex:
+    """
+    Local index of the daemon's pinset (CID -> pin type), loaded
+    from a streamed pin listing, updated by our own pin/unpin
+    operations and reconciled periodically with the daemon.
+
+    Indirect pins are not indexed by default: listing them means
+    walking every recursively pinned DAG on each reload. lookup()
+    returns None for the questions the index can't answer (is this
+    object pinned indirectly ?), which should be asked to the daemon.
+
+    When the indirect pins are indexed, removing a recursive pin
+    leaves its children marked as indirect until the next reload, so
+    lookup() treats the indirect pins as unknown until then.
+
+    :param bool indirect: also index the indirect pins
+    """
+
+    def __init__(self, indirect: bool = False):
+        self.indirect = indirect
+        self.indirectStale = False
+        self.loaded = asyncio.Event()
+        self._pins = {}
+
+        # Changes made while (re)loading, replayed after the swap
+        self._loading = False
+        self._journal = []
+
+    @property
+    def ready(self):
+        return self.loaded.is_set()
+
+    def __len__(self):
+        return len(self._pins)
+
+    def __contains__(self, cid):
+        return pinKey(cid) in self._pins
+
+    def pinType(self, cid: str):
+        return self._pins.get(pinKey(cid))
+
+    def isPinned(self, cid: str, pinType: str = None) -> bool:
+        ptype = self.pinType(cid)
+
+        if ptype is None:
+            return False
+        elif pinType in [PIN_RECURSIVE, PIN_DIRECT, PIN_INDIRECT]:
+            return ptype == pinType
+
+        return True
+
+    def lookup(self, cid: str, pinType: str = None):
+        """
+        Returns True or False if the index knows whether the object is
+        pinned (with the given pin type), or None if it doesn't (the
+        daemon should be asked)
+        """
+
+        ptype = self.pinType(cid)
+
+        if ptype in [PIN_RECURSIVE, PIN_DIRECT]:
+            return pinType is None or ptype == pinType
+        elif pinType in [PIN_RECURSIVE, PIN_DIRECT]:
+            return False
+        elif not self.indirect or self.indirectStale:
+            # Indirect pins not indexed, or possibly stale
+            return None
+
+        return ptype is not None
+
+    def counts(self) -> dict:
+        counts = {PIN_RECURSIVE: 0, PIN_DIRECT: 0, PIN_INDIRECT: 0}
+
+        for ptype in self._pins.values():
+            counts[ptype] = counts.get(ptype, 0) + 1
+
+        return counts
+
+    def add(self, cids: list, pinType: str = PIN_RECURSIVE):
+        for cid in cids:
+            key = pinKey(cid)
+            if not key:
+                continue
+
+            # Recursive > direct > indirect
+            if pinType == PIN_INDIRECT and key in self._pins:
+                continue
+
+            self._pins[key] = pinType
+
+            if self._loading:
+                self._journal.append(('add', key, pinType))
+
+    def remove(self, cids: list):
+        for cid in cids:
+            key = pinKey(cid)
+            if not key:
+                continue
+
+            if self._pins.pop(key, None) == PIN_RECURSIVE and \
+                    self.indirect:
+                # Its children may not be pinned anymore
+                self.indirectStale = True
+
+            if self._loading:
+                self._journal.append(('remove', key, None))
+
+    async def load(self, ipfsop):
+        """
+        (Re)load the pinset from the daemon
+        """
+
+        types = [PIN_RECURSIVE, PIN_DIRECT]
+        if self.indirect:
+            types.append(PIN_INDIRECT)
+
+        pins = {}
+        self._loading = True
+        self._journal = []
+
+        try:
+            for ptype in types:
+                async for entry in ipfsop.pinLsStream(ptype):
+                    key = pinKey(entry.get('Cid'))
+
+                    if key and key not in pins:
+                        pins[key] = ptype
+        except Exception as err:
+            log.debug(f'Pinset index: load failed: {err}')
+            return False
+        finally:
+            self._loading = False
+
+        for op, key, ptype in self._journal:
+            if op == 'add':
+                pins[key] = ptype
+            else:
+                pins.pop(key, None)
+
+        self._journal = []
+        self._pins = pins
+        self.indirectStale = False
+        self.loaded.set()
+
+        log.debug(f'Pinset index: loaded {len(pins)} pins')
+        return True
+
+    async def reconcileTask(self, ipfsop, interval: int = 600):
+        while True:
+            await self.load(ipfsop)
+            await asyncio.sleep(interval)
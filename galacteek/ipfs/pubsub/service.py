@@ -29,6 +29,7 @@ from galacteek.core.asynclib import loopTime
 from galacteek.core.asynclib import asyncify
 from galacteek.core.asynclib import async_enterable
 from galacteek.core.ipfsmarks import IPFSMarks
+from galacteek.core.instrument import instruments
 
 from galacteek.core.ps import keyPsJson
 from galacteek.core.ps import keyPsEncJson
@@ -52,6 +53,18 @@ PS_ENCTYPE_RSA_AES = 2
 PS_ENCTYPE_CURVE25519 = 3
 
 
+def decryptedToJson(dec: bytes):
+    """
+    Decode the JSON object of a decrypted message
+    """
+    try:
+        assert dec is not None
+        return orjson.loads(dec.decode())
+    except Exception as err:
+        logger.debug(f'Could not decode encrypted message: {err}')
+        return None
+
+
 class MsgSpy(object):
     def __init__(self, psDbManager, msgRecord, msgType, name, value):
         self.psDbManager = psDbManager
@@ -452,6 +465,9 @@ class JSONPubsubService(PubsubService):
     jsonMessageReceived = AsyncSignal(str, str, bytes)
     hubKey = keyPsJson
 
+    # Max number of queued messages decoded in one batch
+    decodeBatchSize = 16
+
     def config(self):
         base = super().config()
         jsonConfig = cParentGet('serviceTypes.json')
@@ -471,7 +487,15 @@ class JSONPubsubService(PubsubService):
             logger.debug('Could not decode JSON message data')
             return None
 
-    async def processMessages(self):
+    async def msgsDataToJson(self, datas: list):
+        """
+        Decode the JSON data of a list of pubsub messages, returning
+        the list of decoded objects (None for invalid messages).
+
+        Services handling encrypted messages override this to decrypt
+        the messages waiting in the queue in one batch.
+        """
+
         try:
             asyncConv = getattr(self, 'asyncMsgDataToJson')
         except Exception:
@@ -479,54 +503,39 @@ class JSONPubsubService(PubsubService):
         else:
             useAsyncConv = asyncio.iscoroutinefunction(asyncConv)
 
+        if useAsyncConv is True:
+            return [await asyncConv(data) for data in datas]
+        else:
+            return [self.msgDataToJson(data) for data in datas]
+
+    async def processMessages(self):
         try:
             while not self._shuttingDown:
-                data = await self.inQueue.get()
+                batch = [await self.inQueue.get()]
 
-                if data is None:
-                    continue
+                # Decode the messages already waiting in one batch
+                while len(batch) < self.decodeBatchSize and \
+                        not self.inQueue.empty():
+                    batch.append(self.inQueue.get_nowait())
+
+                datas = [data for data in batch if data is not None]
+                msgs = await self.msgsDataToJson(datas) if datas else None
 
-                async with self.throttler:
-                    if self._shuttingDown:
-                        return
-
-                    if useAsyncConv is True:
-                        msg = await asyncConv(data)
-                    else:
-                        msg = self.msgDataToJson(data)
-
-                    if msg is None:
-                        self.debug('Invalid JSON message')
-                        continue
-
-                    sender = data['from'] if isinstance(
-                        data['from'], str) else data['from'].decode()
-
-                    try:
-                        if self.hubPublish:
-                            gHub.publish(
-                                self.hubKey, (sender, self.topic(), msg))
-
-                        if self._metrics:
-                            rec = await self.psDbManager.recordMessage(
-                                sender,
-                                len(data['data']),
-                                seqNo=data['seqno']
-                            )
-                        else:
-                            rec = None
-
-                        await self.processJsonMessage(
-                            sender, msg,
-                            msgDbRecord=rec
-                        )
-                    except Exception as exc:
-                        self.debug(
-                            'processJsonMessage error: {}'.format(str(exc)))
-                        traceback.print_exc()
-                        await self.errorsQueue.put((msg, exc))
-                        self._errorsCount += 1
+                if not msgs:
+                    msgs = [None] * len(datas)
 
+                for data, msg in zip(datas, msgs):
+                    async with self.throttler:
+                        if self._shuttingDown:
+                            return
+
+                        if msg is None:
+                            self.debug('Invalid JSON message')
+                            continue
+
+                        await self.processDecoded(data, msg)
+
+                for item in batch:
                     self.inQueue.task_done()
 
         except asyncio.CancelledError:
@@ -535,6 +544,37 @@ class JSONPubsubService(PubsubService):
             self.debug('JSON process exception: {}'.format(
                 str(err)))
 
+    async def processDecoded(self, data, msg):
+        sender = data['from'] if isinstance(
+            data['from'], str) else data['from'].decode()
+
+        try:
+            if self.hubPublish:
+                gHub.publish(
+                    self.hubKey, (sender, self.topic(), msg))
+
+            if self._metrics:
+                rec = await self.psDbManager.recordMessage(
+                    sender,
+                    len(data['data']),
+                    seqNo=data['seqno']
+                )
+            else:
+                rec = None
+
+            with instruments.timer(
+                    f'pubsub.{self.topic()}'):
+                await self.processJsonMessage(
+                    sender, msg,
+                    msgDbRecord=rec
+                )
+        except Exception as exc:
+            self.debug(
+                'processJsonMessage error: {}'.format(str(exc)))
+            traceback.print_exc()
+            await self.errorsQueue.put((msg, exc))
+            self._errorsCount += 1
+
     async def processJsonMessage(self, sender, msg, msgDbRecord=None):
         """ Implement this method to process incoming JSON messages"""
         return True
@@ -676,14 +716,15 @@ class RSAEncryptedJSONPubsubService(JSONPubsubService):
         return configMerge(base, cParentGet('serviceTypes.rsaEncJson'))
 
     @ipfsOp
-    async def asyncMsgDataToJson(self, ipfsop, msg):
+    async def msgsDataToJson(self, ipfsop, datas: list):
         try:
-            dec = await ipfsop.rsaAgent.decrypt(
-                base64.b64decode(msg['data']))
-            return orjson.loads(dec.decode())
+            decs = await ipfsop.rsaAgent.decryptBatch(
+                [base64.b64decode(msg['data']) for msg in datas])
         except Exception as err:
-            logger.debug(f'Could not decode encrypted message: {err}')
-            return None
+            logger.debug(f'Could not decrypt messages: {err}')
+            return [None] * len(datas)
+
+        return [decryptedToJson(dec) for dec in decs]
 
     async def peerEncFilter(self, piCtx, msg):
         return False
@@ -755,41 +796,50 @@ class Curve25519JSONPubsubService(JSONPubsubService):
             return None
 
     @ipfsOp
-    async def asyncMsgDataToJson(self, ipfsop, msg):
-        try:
+    async def msgsDataToJson(self, ipfsop, datas: list):
+        results = [None] * len(datas)
+        bySender = {}
+
+        for idx, msg in enumerate(datas):
             sender = msg['from'] if isinstance(msg['from'], str) else \
                 msg['from'].decode()
 
-            if len(self._authorizedPeers) > 0 and \
-               sender not in self._authorizedPeers:
-                raise Exception(f'Unauthorized message from {sender} '
-                                'on curve25519 topic {self.topic()}')
+            bySender.setdefault(sender, []).append(idx)
 
-            # Load the peer context
-            piCtx = ipfsop.ctx.peers.getByPeerId(sender)
-            if not piCtx:
-                raise Exception('Cannot find peer')
+        privKey = await self.getPrivEccKey()
 
-            # Get the peer's default curve25519 public key
-            pubKey = await piCtx.defaultCurve25519PubKey()
-
-            # curve25519 decryption
-            dec = await ipfsop.ctx.curve25Exec.decrypt(
-                base64.b64decode(msg['data']),
-                await self.getPrivEccKey(),
-                pubKey
-            )
+        # Messages from the same sender are decrypted in one batch
+        for sender, idxs in bySender.items():
+            try:
+                if len(self._authorizedPeers) > 0 and \
+                   sender not in self._authorizedPeers:
+                    raise Exception(f'Unauthorized message from {sender} '
+                                    'on curve25519 topic {self.topic()}')
+
+                # Load the peer context
+                piCtx = ipfsop.ctx.peers.getByPeerId(sender)
+                if not piCtx:
+                    raise Exception('Cannot find peer')
+
+                # Get the peer's default curve25519 public key
+                pubKey = await piCtx.defaultCurve25519PubKey()
+
+                # curve25519 decryption
+                decs = await ipfsop.ctx.curve25Exec.decryptBatch(
+                    [base64.b64decode(datas[idx]['data']) for idx in idxs],
+                    privKey,
+                    pubKey
+                )
+            except Exception as err:
+                logger.debug(
+                    f'{self.topic()}: Could not decode encrypted messages '
+                    f'from {sender}: {err}')
+                continue
 
-            if not dec:
-                raise ValueError(
-                    f'Curve25519 decryption failed : '
-                    f'sender is: {sender}')
+            for idx, dec in zip(idxs, decs):
+                results[idx] = decryptedToJson(dec)
 
-            return orjson.loads(dec.decode())
-        except Exception as err:
-            logger.debug(
-                f'{self.topic()}: Could not decode encrypted message: {err}')
-            return None
+        return results
 
     async def peerEncFilter(self, piCtx, msg):
         return False
@@ -0,0 +1,233 @@
+"""
+Manifest of the resources imported in the IPFS repository at startup
+"""
+
+import aiofiles
+import asyncio
+import hashlib
+import orjson
+import os
+import time
+from pathlib import Path
+
+from galacteek import log
+from galacteek.config import configParentHandle
+
+
+rscConfig = configParentHandle(__name__, prefix='rscManifest')
+
+
+def fileHash(path: str) -> str:
+    h = hashlib.blake2b(digest_size=20)
+
+    with open(path, 'rb') as fd:
+        for chunk in iter(lambda: fd.read(65536), b''):
+            h.update(chunk)
+
+    return h.hexdigest()
+
+
+class ResourceManifest:
+    """
+    Records, for each resource (a file tree or some bytes) imported
+    in the repository on startup, the fingerprint of its content and
+    the entry the import produced. When the content did not change
+    (and the object is still pinned), the recorded entry is reused
+    instead of calling 'ipfs add' again.
+
+    File hashes are cached by (mtime, size), so fingerprinting an
+    unchanged tree only costs a stat per file.
+
+    :param Path path: path of the manifest (JSON)
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.manifest = {
+            'files': {},
+            'nodes': {}
+        }
+        self._lock = asyncio.Lock()
+        self._loaded = False
+
+    @property
+    def enabled(self):
+        return rscConfig.get('enabled') is not False
+
+    def load(self):
+        try:
+            with open(str(self.path), 'rb') as fd:
+                manifest = orjson.loads(fd.read())
+
+            assert isinstance(manifest.get('files'), dict)
+            assert isinstance(manifest.get('nodes'), dict)
+        except FileNotFoundError:
+            pass
+        except Exception as err:
+            log.debug(f'Resource manifest: invalid manifest: {err}')
+        else:
+            self.manifest = manifest
+
+        self._loaded = True
+
+    async def save(self):
+        async with self._lock:
+            tmpPath = str(self.path) + '.tmp'
+
+            try:
+                async with aiofiles.open(tmpPath, 'wb') as fd:
+                    await fd.write(orjson.dumps(self.manifest))
+
+                os.replace(tmpPath, str(self.path))
+            except Exception as err:
+                log.debug(f'Resource manifest: could not save: {err}')
+
+    def fileFingerprint(self, path: str) -> str:
+        st = os.stat(path)
+        cached = self.manifest['files'].get(path)
+
+        if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            return cached[2]
+
+        digest = fileHash(path)
+        self.manifest['files'][path] = [st.st_mtime_ns, st.st_size, digest]
+        return digest
+
+    def treeFingerprint(self, path: str, extra: list = None) -> str:
+        """
+        Fingerprint of a file or directory tree (relative paths and
+        content hashes). extra: other files that affect the import
+        (ignore rules ..)
+        """
+
+        h = hashlib.blake2b(digest_size=20)
+        root = Path(path)
+
+        if root.is_file():
+            files = [root]
+        else:
+            files = sorted(p for p in root.rglob('*') if p.is_file())
+
+        for fp in files + [Path(e) for e in extra or [] if e]:
+            try:
+                rel = str(fp.relative_to(root)) if fp != root else fp.name
+            except ValueError:
+                rel = str(fp)
+
+            h.update(rel.encode())
+            h.update(self.fileFingerprint(str(fp)).encode())
+
+        return h.hexdigest()
+
+    async def nodeResources(self, ipfsop) -> dict:
+        if not self._loaded:
+            self.load()
+
+        peerId = await ipfsop.nodeId()
+        node = self.manifest['nodes'].setdefault(
+            peerId if peerId else 'unknown', {})
+
+        node.setdefault('resources', {})
+        node.setdefault('published', {})
+        return node
+
+    async def entryValid(self, ipfsop, record: dict, fingerprint: str):
+        if not record or record.get('fingerprint') != fingerprint:
+            return False
+
+        entry = record.get('entry')
+        if not entry or not entry.get('Hash'):
+            return False
+
+        # The object could have been removed from the repo
+        return await ipfsop.isPinned(entry['Hash'], pinType='recursive')
+
+    async def addPath(self, ipfsop, name: str, path, **addOpts):
+        """
+        Imports the file or directory at path (if it changed since
+        the last import), and returns the top-level entry
+        """
+
+        if not self.enabled:
+            return await ipfsop.addPath(str(path), **addOpts)
+
+        opts = sorted((k, str(v)) for k, v in addOpts.items())
+
+        fingerprint = await asyncio.get_event_loop().run_in_executor(
+            None,
+            self.treeFingerprint,
+            str(path),
+            [addOpts.get('ignRulesPath')]
+        )
+        fingerprint = f'{fingerprint}:{opts}'
+
+        return await self._import(
+            ipfsop, name, fingerprint,
+            ipfsop.addPath(str(path), **addOpts)
+        )
+
+    async def addBytes(self, ipfsop, name: str, data: bytes, **addOpts):
+        """
+        Imports data (if it changed since the last import), and
+        returns the entry
+        """
+
+        if not self.enabled:
+            return await ipfsop.addBytes(data, **addOpts)
+
+        fingerprint = hashlib.blake2b(data, digest_size=20).hexdigest()
+
+        return await self._import(
+            ipfsop, name, fingerprint,
+            ipfsop.addBytes(data, **addOpts)
+        )
+
+    async def _import(self, ipfsop, name, fingerprint, coro):
+        node = await self.nodeResources(ipfsop)
+        record = node['resources'].get(name)
+
+        if await self.entryValid(ipfsop, record, fingerprint):
+            coro.close()
+            log.debug(f'Resource manifest: {name}: unchanged, '
+                      f'using {record["entry"]["Hash"]}')
+            return record['entry']
+
+        entry = await coro
+
+        if entry and entry.get('Hash'):
+            node['resources'][name] = {
+                'fingerprint': fingerprint,
+                'entry': entry,
+                'dateImported': int(time.time())
+            }
+
+            await self.save()
+
+        return entry
+
+    async def publish(self, ipfsop, cid: str, key: str, **kw):
+        """
+        Publishes cid on the IPNS key, unless it was already published
+        there recently
+        """
+
+        node = await self.nodeResources(ipfsop)
+        last = node['published'].get(key)
+        republishAfter = rscConfig.get('republishAfter') or 0
+
+        if self.enabled and last and last.get('cid') == cid and \
+                (time.time() - last.get('date', 0)) < republishAfter:
+            log.debug(f'Resource manifest: {key}: {cid} already published')
+            return True
+
+        result = await ipfsop.publish(cid, key=key, **kw)
+
+        if result:
+            node['published'][key] = {
+                'cid': cid,
+                'date': int(time.time())
+            }
+
+            await self.save()
+
+        return result
@@ -0,0 +1,185 @@
+"""
+Breadth-first, concurrent walker for UnixFS trees
+"""
+
+import asyncio
+
+from typing import AsyncIterator
+from typing import Callable
+
+from galacteek import log
+from galacteek.ipfs.paths import posixIpfsPath
+
+
+# UnixFS link types, as returned by 'ls'
+TYPE_RAW = 0
+TYPE_DIRECTORY = 1
+TYPE_FILE = 2
+TYPE_METADATA = 3
+TYPE_SYMLINK = 4
+
+
+class WalkEntry:
+    __slots__ = ('path', 'parent', 'name', 'cid', 'type', 'size', 'depth')
+
+    def __init__(self, path: str, parent: str, link: dict, depth: int):
+        self.path = path
+        self.parent = parent
+        self.name = link.get('Name')
+        self.cid = link.get('Hash')
+        self.type = link.get('Type')
+        self.size = link.get('Size', 0)
+        self.depth = depth
+
+    @property
+    def isDir(self):
+        return self.type == TYPE_DIRECTORY
+
+    @property
+    def isFile(self):
+        return self.type in [TYPE_FILE, TYPE_RAW]
+
+    def __repr__(self):
+        return f'WalkEntry({self.path}, type: {self.type})'
+
+
+class UnixFSWalker:
+    """
+    Walks a UnixFS tree breadth-first, listing up to concurrency
+    directories at the same time, and streams the (path, entry)
+    results as the listings arrive.
+
+    :param lister: coroutine function returning the links of a
+        directory (the 'Links' of an ls call), or None on error
+    :param int concurrency: max number of concurrent directory listings
+    :param list types: only yield entries of these UnixFS types
+    :param int minSize: only yield entries of at least this size
+    :param int maxSize: only yield entries of at most this size
+    :param int maxDepth: don't list directories deeper than this
+        (the entries of the root directory are at depth 1)
+    :param int maxEntries: stop after yielding this many entries
+    """
+
+    def __init__(self, lister: Callable,
+                 concurrency: int = 8,
+                 types: list = None,
+                 minSize: int = None,
+                 maxSize: int = None,
+                 maxDepth: int = None,
+                 maxEntries: int = None):
+        self.lister = lister
+        self.concurrency = max(1, concurrency)
+        self.types = types
+        self.minSize = minSize
+        self.maxSize = maxSize
+        self.maxDepth = maxDepth
+        self.maxEntries = maxEntries
+
+        self.dirsListed = 0
+        self.errors = 0
+        self._cancelled = asyncio.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def accept(self, entry: WalkEntry) -> bool:
+        if self.types is not None and entry.type not in self.types:
+            return False
+
+        if self.minSize is not None and entry.size < self.minSize:
+            return False
+
+        if self.maxSize is not None and entry.size > self.maxSize:
+            return False
+
+        return True
+
+    async def _worker(self, dirs: asyncio.Queue, results: asyncio.Queue):
+        while True:
+            path, depth = await dirs.get()
+
+            try:
+                if self.cancelled:
+                    continue
+
+                try:
+                    links = await self.lister(path)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as err:
+                    log.debug(f'Walker: error listing {path}: {err}')
+                    links = None
+
+                if links is None:
+                    self.errors += 1
+                    continue
+
+                self.dirsListed += 1
+
+                for link in links:
+                    entry = WalkEntry(
+                        posixIpfsPath.join(path, link.get('Name', '')),
+                        path, link, depth + 1
+                    )
+
+                    if entry.isDir and (self.maxDepth is None or
+                                        entry.depth < self.maxDepth):
+                        dirs.put_nowait((entry.path, entry.depth))
+
+                    if self.accept(entry):
+                        await results.put(entry)
+            finally:
+                dirs.task_done()
+
+    async def walk(self, root: str) -> AsyncIterator[tuple]:
+        """
+        Async generator yielding (path, entry) tuples. Closing the
+        generator, cancelling the consuming task or calling cancel()
+        stops the workers.
+        """
+
+        dirs = asyncio.Queue()
+        results = asyncio.Queue(maxsize=self.concurrency * 64)
+        count = 0
+
+        dirs.put_nowait((root, 0))
+
+        workers = [asyncio.ensure_future(self._worker(dirs, results))
+                   for _ in range(self.concurrency)]
+
+        async def done():
+            await dirs.join()
+            await results.put(None)
+
+        watcher = asyncio.ensure_future(done())
+        cancelled = asyncio.ensure_future(self._cancelled.wait())
+
+        try:
+            while not self.cancelled:
+                get = asyncio.ensure_future(results.get())
+
+                finished, _pending = await asyncio.wait(
+                    [get, cancelled],
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+
+                if get not in finished:
+                    get.cancel()
+                    break
+
+                entry = get.result()
+                if entry is None:
+                    break
+
+                yield entry.path, entry
+
+                count += 1
+                if self.maxEntries and count >= self.maxEntries:
+                    break
+        finally:
+            for task in workers + [watcher, cancelled]:
+                task.cancel()
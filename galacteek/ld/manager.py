@@ -12,7 +12,8 @@ from galacteek.core.fswatcher import FileWatcher
 
 
 class LDSchemasImporter:
-    def __init__(self):
+    def __init__(self, rscManifest=None):
+        self.rscManifest = rscManifest
         self._fsWatcherContexts = FileWatcher()
         self._fsWatcherContexts.pathChanged.connect(
             self.onLdContextsChanged)
@@ -101,12 +102,18 @@ class LDSchemasImporter:
         if ipfsIgnorePath:
             log.debug(f'ips: ({distName}): ipfsignore {ipfsIgnorePath}')
 
-        entry = await ipfsop.addPath(
-            str(contextsPath),
-            recursive=True,
-            hidden=False,
-            ignRulesPath=str(ipfsIgnorePath) if ipfsIgnorePath else None
-        )
+        addOpts = {
+            'recursive': True,
+            'hidden': False,
+            'ignRulesPath': str(ipfsIgnorePath) if ipfsIgnorePath else None
+        }
+
+        if self.rscManifest:
+            entry = await self.rscManifest.addPath(
+                ipfsop, f'ldcontexts:{distName}', contextsPath, **addOpts)
+        else:
+            entry = await ipfsop.addPath(str(contextsPath), **addOpts)
+
         if entry:
             ldKeyName = distName
             ldCid = entry.get('Hash')
@@ -126,11 +133,20 @@ class LDSchemasImporter:
                 else:
                     log.debug(f'{ldKeyName}: key creation was successfull')
 
-            ensure(ipfsop.publish(
-                entry['Hash'],
-                key=ldKeyName,
-                allow_offline=True
-            ))
+            if self.rscManifest:
+                # Only republish when the CID changed
+                ensure(self.rscManifest.publish(
+                    ipfsop,
+                    entry['Hash'],
+                    ldKeyName,
+                    allow_offline=True
+                ))
+            else:
+                ensure(ipfsop.publish(
+                    entry['Hash'],
+                    key=ldKeyName,
+                    allow_offline=True
+                ))
 
             self._fsWatcherContexts.clear()
             self._fsWatcherContexts.watch(str(contextsPath))
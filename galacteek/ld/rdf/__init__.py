@@ -23,6 +23,7 @@ from galacteek.core.ps import hubPublish
 from galacteek.core.ps import makeKeyService
 from galacteek.ld import gLdDefaultContext
 from galacteek.ld.iri import urnParse
+from galacteek.ld.sparql.native import nativeQueryBackend
 
 
 # Default NS bindings used by BaseGraph
@@ -90,6 +91,54 @@ class GraphCommonMixin(object):
         self.synchronizerSettings: dict = {}
         self._guardian = kw.pop('guardian', None)
 
+        # Writes counter
+        self.version = 0
+
+        # Store location (GraphLocation), used by the SparQL workers
+        self.location = None
+
+        # Native (store) query evaluator, if the store has one
+        self.nativeQueries = True
+        self._nativeBackend = None
+
+    def add(self, *args, **kw):
+        self.version += 1
+        return super().add(*args, **kw)
+
+    def addN(self, *args, **kw):
+        self.version += 1
+        return super().addN(*args, **kw)
+
+    def remove(self, *args, **kw):
+        self.version += 1
+        return super().remove(*args, **kw)
+
+    @ property
+    def nativeBackend(self):
+        if self._nativeBackend is None:
+            self._nativeBackend = nativeQueryBackend(self) or False
+
+        return self._nativeBackend
+
+    def query(self, query, *args, **kw):
+        """
+        Runs the query with the store's native evaluator when possible
+        (Oxigraph), falling back to rdflib's evaluator
+        """
+
+        backend = self.nativeBackend if self.nativeQueries else None
+
+        if backend and isinstance(query, str) and not args and \
+                set(kw.keys()).issubset({'initBindings'}):
+            try:
+                return backend.query(query,
+                                     initBindings=kw.get('initBindings'))
+            except Exception as err:
+                log.debug(f'Graph {self.identifier}: native query '
+                          f'failed ({err}), using rdflib')
+
+        return super().query(query, *args, **kw)
+
     @ property
     def guardian(self):
         return self._guardian
@@ -194,13 +243,20 @@ class GraphCommonMixin(object):
             event
         )
 
-    def publishUpdateEvent(self, srcGraph: Graph):
+    def publishUpdateEvent(self, srcGraph: Graph,
+                           subjectsUris: list = None):
         """
         Publish a graph update notification: this graph
         was updated with the contents of srcGraph
+
+        :param list subjectsUris: URIs of the updated subjects
+            (computed from srcGraph if not passed)
         """
 
-        suris = list(set([str(subj) for subj in srcGraph.subjects()]))
+        if subjectsUris is not None:
+            suris = subjectsUris
+        else:
+            suris = list(set([str(subj) for subj in srcGraph.subjects()]))
 
         log.warning(f'Publish GraphUpdateEvent for graph: {self.identifier}')
 
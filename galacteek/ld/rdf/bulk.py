@@ -0,0 +1,210 @@
+import tarfile
+
+from pathlib import Path
+from typing import Iterator
+
+from rdflib import BNode
+from rdflib import Graph
+from rdflib import URIRef
+from rdflib.plugins.parsers.ntriples import NTriplesParser
+from rdflib.plugins.parsers.ntriples import ParseError
+
+from galacteek import log
+
+
+class _TripleSink:
+    def __init__(self):
+        self.triples = []
+
+    def triple(self, s, p, o):
+        self.triples.append((s, p, o))
+
+
+class NTriplesTarReader:
+    """
+    Streams the triples of the N-Triples (.nt) members of a
+    tarball, line by line (the tarball is never extracted
+    nor loaded in memory).
+
+    :param Path tarPath: path of the tarball
+    :param bool bnodes: allow triples with blank nodes
+    """
+
+    def __init__(self, tarPath: Path, bnodes: bool = False):
+        self.tarPath = tarPath
+        self.bnodes = bnodes
+        self.errors = 0
+
+    def lines(self) -> Iterator[str]:
+        # Stream mode: members are read sequentially
+        with tarfile.open(str(self.tarPath), mode='r|*') as tar:
+            for member in tar:
+                if not member.isfile() or not member.name.endswith('.nt'):
+                    continue
+
+                fd = tar.extractfile(member)
+                if not fd:
+                    continue
+
+                for line in fd:
+                    yield line.decode('utf-8', errors='replace')
+
+    def triples(self, lines: Iterator[str] = None) -> Iterator[tuple]:
+        sink = _TripleSink()
+        parser = NTriplesParser(sink=sink)
+
+        for line in (lines if lines is not None else self.lines()):
+            parser.line = line.rstrip('\r\n')
+
+            try:
+                parser.parseline()
+            except ParseError:
+                self.errors += 1
+                continue
+
+            for s, p, o in sink.triples:
+                if not self.bnodes and (isinstance(s, BNode) or
+                                        isinstance(o, BNode)):
+                    continue
+
+                yield s, p, o
+
+            sink.triples.clear()
+
+    def value(self, subject: URIRef, predicate: URIRef):
+        """
+        Returns the value of (subject, predicate) in the tarball,
+        stopping at the first match. Only the lines starting with
+        the subject and predicate are parsed.
+        """
+
+        prefix = f'{subject.n3()} {predicate.n3()}'
+
+        for s, p, o in self.triples(
+                line for line in self.lines()
+                if line.lstrip().startswith(prefix)):
+            return o
+
+
+class DatasetBulkLoader:
+    """
+    Bulk importer for N-Triples dataset tarballs (runs in a worker
+    thread). Triples are written to the destination graph's store
+    in batches.
+
+    Upgrade strategies:
+
+    - replace: the dataset is loaded in a staging graph (same store),
+      and is swapped in once it was fully loaded: for every
+      (subject, predicate) in the dataset, existing values are
+      replaced. Triples of the destination graph that are not
+      described by the dataset (user data) are kept. The destination
+      graph is left intact if the dataset fails to load.
+    - purge (or purgefirst): same as replace, but the destination
+      graph is cleared before the swap (only for graphs holding
+      nothing but the dataset's content)
+    - mergeReplace: for every (subject, predicate) in the dataset,
+      existing values are replaced (no staging)
+
+    :param Graph graph: destination graph
+    :param int batchSize: number of triples written per batch
+    """
+
+    def __init__(self, graph: Graph, batchSize: int = 20000):
+        self.graph = graph
+        self.batchSize = batchSize
+        self.subjects = set()
+        self.count = 0
+
+    @property
+    def store(self):
+        return self.graph.store
+
+    @property
+    def stagingUri(self):
+        return URIRef(f'{self.graph.identifier}:staging')
+
+    def _commit(self, graph: Graph):
+        if self.store.transaction_aware:
+            graph.commit()
+
+    def _batches(self, triples: Iterator[tuple]):
+        batch = []
+        for triple in triples:
+            batch.append(triple)
+
+            if len(batch) >= self.batchSize:
+                yield batch
+                batch = []
+
+        if batch:
+            yield batch
+
+    def _write(self, graph: Graph, batch: list):
+        graph.addN((s, p, o, graph) for s, p, o in batch)
+        self._commit(graph)
+
+    def _track(self, batch: list):
+        self.count += len(batch)
+        self.subjects.update(
+            str(s) for s, p, o in batch if isinstance(s, URIRef))
+
+    def replace(self, reader: NTriplesTarReader,
+                purge: bool = False) -> bool:
+        staging = Graph(store=self.store, identifier=self.stagingUri)
+
+        # Leftovers from an interrupted import
+        staging.remove((None, None, None))
+
+        for batch in self._batches(reader.triples()):
+            self._write(staging, batch)
+            self._track(batch)
+
+        if self.count == 0:
+            log.warning(f'{self.graph.identifier}: empty dataset, ignoring')
+            return False
+
+        # Swap
+        if purge:
+            self.graph.remove((None, None, None))
+        else:
+            replaced = set()
+
+            for s, p, o in staging:
+                if (s, p) not in replaced:
+                    self.graph.remove((s, p, None))
+                    replaced.add((s, p))
+
+        for batch in self._batches(staging):
+            self._write(self.graph, batch)
+
+        staging.remove((None, None, None))
+        self._commit(staging)
+        return True
+
+    def mergeReplace(self, reader: NTriplesTarReader) -> bool:
+        replaced = set()
+
+        for batch in self._batches(reader.triples()):
+            for s, p, o in batch:
+                if (s, p) not in replaced:
+                    self.graph.remove((s, p, None))
+                    replaced.add((s, p))
+
+            self._write(self.graph, batch)
+            self._track(batch)
+
+        return self.count > 0
+
+    def load(self, reader: NTriplesTarReader,
+             strategy: str = 'mergeReplace') -> bool:
+        if strategy in ['purge', 'purgefirst']:
+            result = self.replace(reader, purge=True)
+        elif strategy == 'replace':
+            result = self.replace(reader)
+        else:
+            result = self.mergeReplace(reader)
+
+        log.info(f'{self.graph.identifier}: bulk-loaded {self.count} '
+                 f'triples ({reader.errors} invalid lines)')
+        return result
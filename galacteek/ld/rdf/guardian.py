@@ -124,7 +124,7 @@ class GuardianTriggerAction:
 
         rsaAgent = ipfsop.rsaAgent
 
-        key = await rsaAgent.rsaExec.importKey(str(pem))
+        key = await rsaAgent.rsaExec.importKeyCached(str(pem))
         if not key:
             return
 
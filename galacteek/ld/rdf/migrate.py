@@ -0,0 +1,107 @@
+from pathlib import Path
+
+from rdflib import ConjunctiveGraph
+from rdflib import Graph
+from rdflib import plugin
+from rdflib.store import Store
+
+from galacteek import log
+
+
+def openStore(storePlugin: str, path: Path, create: bool = False) -> Store:
+    store = plugin.get(storePlugin, Store)()
+    store.open(str(path), create=create)
+    return store
+
+
+def storeCopy(src: Store, dst: Store,
+              batchSize: int = 10000,
+              progress=None) -> int:
+    """
+    Copies all the quads (and the namespace bindings) of the src
+    store to the dst store, by batches of batchSize quads.
+
+    :return: the number of quads copied
+    """
+
+    contexts = {}
+    batch = []
+    count = 0
+
+    def flush():
+        dst.addN(batch)
+        batch.clear()
+
+        if dst.transaction_aware:
+            dst.commit()
+
+        if progress:
+            progress(count)
+
+    for prefix, ns in src.namespaces():
+        dst.bind(prefix, ns)
+
+    for s, p, o, ctx in ConjunctiveGraph(store=src).quads((None, None, None)):
+        dctx = contexts.get(ctx.identifier)
+
+        if dctx is None:
+            dctx = contexts[ctx.identifier] = Graph(
+                store=dst, identifier=ctx.identifier)
+
+        batch.append((s, p, o, dctx))
+        count += 1
+
+        if len(batch) >= batchSize:
+            flush()
+
+    if batch:
+        flush()
+
+    return count
+
+
+def storesMigrate(storesPath: Path,
+                  srcPlugin: str = 'Sleepycat',
+                  dstPlugin: str = 'Oxigraph',
+                  srcDirName: str = 'bsddb',
+                  dstDirName: str = 'oxigraphdb',
+                  batchSize: int = 10000,
+                  progress=None) -> dict:
+    """
+    Migrates the graphs stores found in storesPath (one directory
+    per graph, as created by the pronto service) from one rdflib
+    store plugin to another. Stores that were already migrated
+    are skipped.
+
+    :return: dict: store path -> number of quads copied
+    """
+
+    results = {}
+
+    for rootPath in sorted(storesPath.iterdir()):
+        srcPath = rootPath.joinpath(srcDirName)
+        dstPath = rootPath.joinpath(dstDirName)
+
+        if not srcPath.is_dir():
+            continue
+
+        if dstPath.exists() and any(dstPath.iterdir()):
+            log.info(f'{rootPath}: already migrated, skipping')
+            continue
+
+        dstPath.mkdir(parents=True, exist_ok=True)
+
+        src = openStore(srcPlugin, srcPath)
+        dst = openStore(dstPlugin, dstPath, create=True)
+
+        try:
+            results[str(rootPath)] = storeCopy(
+                src, dst,
+                batchSize=batchSize,
+                progress=progress
+            )
+        finally:
+            src.close()
+            dst.close()
+
+    return results
@@ -0,0 +1,186 @@
+import asyncio
+import gzip
+import os
+import shutil
+import tempfile
+import time
+
+from pathlib import Path
+
+from rdflib import ConjunctiveGraph
+from rdflib.plugins.serializers.nt import _nt_row
+from rdflib.plugins.serializers.nquads import _nq_row
+
+from galacteek import log
+
+
+class GraphSnapshot:
+    """
+    Gzip-compressed export of a graph at a given version, stored
+    in a file. The file is removed once the snapshot is expired and
+    no longer read.
+    """
+
+    def __init__(self, path: Path, fmt: str, version):
+        self.path = path
+        self.fmt = fmt
+        self.version = version
+        self.created = time.monotonic()
+        self.readers = 0
+        self.expired = False
+
+    @property
+    def age(self):
+        return time.monotonic() - self.created
+
+    def acquire(self):
+        self.readers += 1
+        return self
+
+    def release(self):
+        self.readers -= 1
+        self.cleanup()
+
+    def expire(self):
+        self.expired = True
+        self.cleanup()
+
+    def cleanup(self):
+        if self.expired and self.readers <= 0:
+            try:
+                self.path.unlink()
+            except Exception:
+                pass
+
+
+def graphVersion(graph):
+    """
+    Version of a graph: the graph's writes counter and its length
+    (to catch writes made through another graph on the same store)
+    """
+
+    return (getattr(graph, 'version', 0), len(graph))
+
+
+def writeSnapshot(graph, path: Path, fmt: str,
+                  compressLevel: int = 6,
+                  bufferSize: int = 65536):
+    """
+    Writes a gzip-compressed export of graph to path.
+
+    N-Triples and N-Quads are written line by line as the triples
+    are read from the store (no global sort, no in-memory copy).
+    Other formats go through the rdflib serializer.
+    """
+
+    with gzip.open(str(path), 'wb', compresslevel=compressLevel) as gz:
+        if fmt == 'nq' and isinstance(graph, ConjunctiveGraph):
+            rows = (_nq_row((s, p, o), ctx.identifier)
+                    for s, p, o, ctx in graph.quads((None, None, None)))
+        elif fmt in ['nt', 'nq']:
+            rows = (_nt_row(triple)
+                    for triple in graph.triples((None, None, None)))
+        else:
+            graph.serialize(gz, format=fmt)
+            return
+
+        buffer = []
+        size = 0
+
+        for row in rows:
+            buffer.append(row)
+            size += len(row)
+
+            if size >= bufferSize:
+                gz.write(''.join(buffer).encode())
+                buffer.clear()
+                size = 0
+
+        gz.write(''.join(buffer).encode())
+
+
+class GraphSnapshotCache:
+    """
+    Cache of graph snapshots: one snapshot per format, reused as long
+    as the graph's version does not change (or for at least minAge
+    seconds), so that concurrent exports share a single snapshot.
+    """
+
+    def __init__(self, graph, minAge: float = 30.0, executor=None):
+        self.graph = graph
+        self.minAge = minAge
+        self.executor = executor
+        self._snapshots = {}
+        self._building = {}
+        self._dir = None
+
+    @property
+    def snapshotsDir(self) -> Path:
+        if not self._dir:
+            self._dir = Path(tempfile.mkdtemp(prefix='gsnapshots'))
+
+        return self._dir
+
+    def close(self):
+        """
+        Expires all the snapshots and removes the snapshots directory
+        """
+
+        for snapshot in self._snapshots.values():
+            snapshot.expire()
+
+        self._snapshots.clear()
+
+        if self._dir:
+            shutil.rmtree(str(self._dir), ignore_errors=True)
+            self._dir = None
+
+    async def snapshot(self, fmt: str = 'nt') -> GraphSnapshot:
+        """
+        Returns the snapshot of the graph for the given format,
+        building it if needed. The snapshot is acquired: release it
+        once you're done reading it.
+        """
+
+        loop = asyncio.get_event_loop()
+        current = self._snapshots.get(fmt)
+
+        if current and current.age < self.minAge:
+            return current.acquire()
+
+        version = await loop.run_in_executor(
+            self.executor, graphVersion, self.graph)
+
+        if current and current.version == version:
+            return current.acquire()
+
+        fut = self._building.get(fmt)
+
+        if not fut:
+            fut = asyncio.ensure_future(self.build(fmt, version))
+            self._building[fmt] = fut
+            fut.add_done_callback(lambda f: self._building.pop(fmt, None))
+
+        snapshot = await asyncio.shield(fut)
+        return snapshot.acquire()
+
+    async def build(self, fmt: str, version) -> GraphSnapshot:
+        loop = asyncio.get_event_loop()
+        path = self.snapshotsDir.joinpath(
+            f'{fmt}-{os.urandom(8).hex()}.gz')
+
+        await loop.run_in_executor(
+            self.executor, writeSnapshot, self.graph, path, fmt)
+
+        snapshot = GraphSnapshot(path, fmt, version)
+
+        previous = self._snapshots.get(fmt)
+        self._snapshots[fmt] = snapshot
+
+        if previous:
+            previous.expire()
+
+        log.debug(f'Graph {self.graph.identifier}: snapshot ({fmt}) '
+                  f'built for version {version}')
+
+        return snapshot
@@ -1,4 +1,6 @@
 from .cfg import *  # noqa
+from .base import GraphSynchronizersChain  # noqa
 from .export import GraphExportSynchronizer  # noqa
 from .ontolochain import GraphSemChainSynchronizer  # noqa
 from .sparql import GraphSparQLSynchronizer  # noqa
+from .reconcile import GraphReconcileSynchronizer  # noqa
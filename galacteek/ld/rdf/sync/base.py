@@ -43,3 +43,18 @@ class BaseGraphSynchronizer:
                    p2pLibertarianId=None,
                    **kw):
         pass
+
+
+class GraphSynchronizersChain:
+    """
+    Runs several graph synchronizers in order
+    """
+
+    def __init__(self, synchronizers: list):
+        self.synchronizers = synchronizers
+
+    async def syncFromRemote(self, peerId: str, iri: str, p2pEndpoint: str,
+                             **kw):
+        for synchronizer in self.synchronizers:
+            await synchronizer.syncFromRemote(
+                peerId, iri, p2pEndpoint, **kw)
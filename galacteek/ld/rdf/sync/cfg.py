@@ -3,8 +3,8 @@ import attr
 
 @attr.s(auto_attribs=True)
 class GraphSyncConfig:
-    # URI of graph synchronizer
-    use: str
+    # URI of graph synchronizer, or list of URIs (run in order)
+    use: object
 
     hbPeriodicSend: bool = False
     hbIntervalMin: int = 60
@@ -32,3 +32,26 @@ class GraphSemChainSyncConfig:
     recordFetchTimeout: int = 30
     syncIntervalMin: int = 60
     chainSyncIntervalMin: int = 90
+
+
+@attr.s(auto_attribs=True)
+class GraphReconcileSyncConfig:
+    type: str = 'reconcile'
+
+    # Only reconcile the records (subjects) of this RDF type
+    recordType: str = None
+
+    # Number of hex chars added to the buckets prefixes at each round
+    bucketDepth: int = 2
+
+    # Buckets with more IDs than this are split
+    maxBucketIds: int = 256
+
+    recordsPerRequest: int = 128
+
+    # Only store the records whose object (ipfsPath) has a valid
+    # JSON-LD signature
+    verifySignatures: bool = False
+
+    # Store the objects referenced by the records (ipfsPath)
+    storeObjects: bool = False
@@ -1,11 +1,13 @@
-import zlib
+import asyncio
 import aiohttp
+import functools
 
 from galacteek import log
 from galacteek.ipfs import ipfsOp
 from galacteek.services import GService
 
 from ..cfg import GraphExportSyncConfig
+from ..smartqlclient import SmartQLClient
 
 
 class GraphExportSynchronizer:
@@ -33,12 +35,6 @@ class GraphExportSynchronizer:
         if graph is None:
             return
 
-        url = dial.httpUrl('/export')
-        params = {
-            'fmt': self.config.format,
-            'compression': self.config.compression
-        }
-
         creds = None
         if graphDescr:
             creds = graphDescr.get('smartqlCredentials')
@@ -51,19 +47,23 @@ class GraphExportSynchronizer:
         else:
             auth = aiohttp.BasicAuth('smartql', 'password')
 
-        try:
-            async with aiohttp.ClientSession(auth=auth) as session:
-                async with session.get(url, params=params) as resp:
-                    data = await resp.read()
-                    assert data is not None
-
-                    ctype = resp.headers.get('Content-Type')
+        client = SmartQLClient(dial, auth=auth)
+        loop = asyncio.get_event_loop()
 
-                    if ctype == 'application/gzip':
-                        gdata = zlib.decompress(data).decode()
-                    else:
-                        gdata = data.decode()
+        try:
+            data = await client.export(
+                fmt=self.config.format,
+                compress=self.config.compression
+            )
+            assert data is not None
 
-                    graph.parse(data=gdata, format=params['fmt'])
+            await loop.run_in_executor(
+                None,
+                functools.partial(
+                    graph.parse,
+                    data=data.decode(),
+                    format=self.config.format
+                )
+            )
         except Exception as err:
             log.debug(f'Graph export sync error for {iri}: {err}')
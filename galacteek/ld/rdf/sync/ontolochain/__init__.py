@@ -26,7 +26,6 @@ from galacteek.ld.rdf import BaseGraph
 from galacteek.ld import ontolochain
 from galacteek.ld.rdf.terms import *
 from galacteek.ld.sparql import select, where, T, Filter
-from galacteek.ld.signatures import jsonldsig
 
 
 from ..smartqlclient import SmartQLClient
@@ -471,6 +470,15 @@ class GraphSemChainSynchronizer:
                 objPath = str(res['ipfsPath']['value'])
                 vmethod = URIRef(res['vmethod']['value'])
 
+                ex = hGraph.value(subject=uri, predicate=RDF.type)
+
+                if ex:
+                    # Already in hgraph (pulled and verified by the
+                    # reconcile synchronizer, or ours): advance
+                    log.debug(f'{uri}: Already in hgraph')
+                    await self.chainAdvance(hGraph, tracker, uri)
+                    continue
+
                 obj = await ipfsop.dagGet(objPath, timeout=10)
                 if not obj:
                     raise Exception(
@@ -486,12 +494,12 @@ class GraphSemChainSynchronizer:
 
                 await asyncio.sleep(0.05)
 
-                # JSON-LD signature verification
-                verif = jsonldsig.verifysa(
+                # JSON-LD signature verification (in the crypto runtime)
+                verif, = await ipfsop.ctx.rsaExec.jsonldVerifyBatch([(
                     obj,
                     str(res['sigjws']['value']),
                     pem
-                )
+                )])
 
                 if verif is not True:
                     log.debug(f'JSON-LD signature for {uri} is wrong')
@@ -500,66 +508,35 @@ class GraphSemChainSynchronizer:
                 else:
                     log.debug(f'JSON-LD signature for {uri} is correct')
 
-                ex = hGraph.value(subject=uri, predicate=RDF.type)
-                if not ex:
-                    # Fetch the object record
-                    gttl = await smartql.resource(
-                        str(uri),
-                        context=str(tUriOntoloChainRecord),
-                        timeout=self.config.recordFetchTimeout
-                    )
-
-                    await asyncio.sleep(0.05)
+                # Fetch the object record
+                gttl = await smartql.resource(
+                    str(uri),
+                    context=str(tUriOntoloChainRecord),
+                    timeout=self.config.recordFetchTimeout
+                )
 
-                    if not gttl:
-                        # Can't fetch the record's graph ..
-                        log.debug(
-                            f'ontoloSync({chainUri}): '
-                            f'{uri} record: failed to fetch!')
-                        raise Exception(
-                            f'{uri}: failed to pull graph from peer')
-
-                    if await self.processObject(uri, gttl, trace=False):
-                        # Eat
-                        async with hGraph.lock:
-                            hGraph.parse(data=gttl, format='ttl')
-
-                        await asyncio.sleep(0.05)
-                    else:
-                        # Should be fatal here ?
-                        log.debug(f'{uri}: failed to process ?!')
-                        break
-                else:
-                    log.debug(f'{uri}: Already in hgraph')
+                await asyncio.sleep(0.05)
 
-                try:
-                    # Lock the hgraph and advance the chain
+                if not gttl:
+                    # Can't fetch the record's graph ..
+                    log.debug(
+                        f'ontoloSync({chainUri}): '
+                        f'{uri} record: failed to fetch!')
+                    raise Exception(
+                        f'{uri}: failed to pull graph from peer')
 
+                if await self.processObject(uri, gttl, trace=False):
+                    # Eat
                     async with hGraph.lock:
-                        # Store URI of new record
-                        tracker.remove(
-                            p=predCurObj
-                        )
-                        tracker.add(
-                            p=predCurObj,
-                            o=uri
-                        )
+                        hGraph.parse(data=gttl, format='ttl')
 
-                        # Store sync date
-                        tracker.remove(
-                            p=tUriOntoloChainDateSynced
-                        )
-                        tracker.add(
-                            p=tUriOntoloChainDateSynced,
-                            o=Literal(utcDatetimeIso(),
-                                      datatype=XSD.dateTime)
-                        )
-                except Exception as err:
-                    log.debug(
-                        f'{chainUri}: update to {uri} error: {err}')
+                    await asyncio.sleep(0.05)
                 else:
-                    log.debug(
-                        f'{chainUri}: advanced record to {uri}')
+                    # Should be fatal here ?
+                    log.debug(f'{uri}: failed to process ?!')
+                    break
+
+                await self.chainAdvance(hGraph, tracker, uri)
 
             if objCount == 0:
                 log.debug(f'{chainUri}: sync finished')
@@ -567,6 +544,36 @@ class GraphSemChainSynchronizer:
 
         return True
 
+    async def chainAdvance(self, hGraph, tracker, uri: URIRef):
+        try:
+            # Lock the hgraph and advance the chain
+
+            async with hGraph.lock:
+                # Store URI of new record
+                tracker.remove(
+                    p=tUriSemObjCurrent
+                )
+                tracker.add(
+                    p=tUriSemObjCurrent,
+                    o=uri
+                )
+
+                # Store sync date
+                tracker.remove(
+                    p=tUriOntoloChainDateSynced
+                )
+                tracker.add(
+                    p=tUriOntoloChainDateSynced,
+                    o=Literal(utcDatetimeIso(),
+                              datatype=XSD.dateTime)
+                )
+        except Exception as err:
+            log.debug(
+                f'{tracker.identifier}: update to {uri} error: {err}')
+        else:
+            log.debug(
+                f'{tracker.identifier}: advanced record to {uri}')
+
     async def processObject(self, uri: URIRef, oTtl: str,
                             trace=True):
         app = runningApp()
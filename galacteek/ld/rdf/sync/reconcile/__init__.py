@@ -0,0 +1,261 @@
+import asyncio
+
+from rdflib import BNode
+from rdflib import Namespace
+from rdflib import RDF
+from rdflib import URIRef
+
+from galacteek import log
+from galacteek.services import GService
+
+from galacteek.core import runningApp
+from galacteek.ipfs.cidhelpers import IPFSPath
+from galacteek.ld.rdf import BaseGraph
+from galacteek.ld.rdf.terms import tUriIpfsPath
+from galacteek.ld.rdf.terms import tUriOntoRecordOutputGraph
+from galacteek.ld.rdf.sync.base import BaseGraphSynchronizer
+from galacteek.ld.rdf.sync.ontolochain import rsaPubKeyPemFromKeyId
+from galacteek.ld.rdf.sync.cfg import GraphReconcileSyncConfig
+from galacteek.ld.rdf.sync.smartqlclient import SmartQLClient
+
+from .buckets import IDBuckets
+from .buckets import reconcile
+
+
+SEC = Namespace('https://w3id.org/security#')
+
+
+def graphRecordIds(graph, recordType: str = None) -> IDBuckets:
+    """
+    Returns the IDs of the records (subjects) stored in a graph,
+    optionally restricted to a given RDF type
+    """
+
+    if recordType:
+        subjects = graph.subjects(RDF.type, URIRef(recordType))
+    else:
+        subjects = graph.subjects()
+
+    return IDBuckets(
+        str(s) for s in subjects if isinstance(s, URIRef)
+    )
+
+
+def recordPath(uri: URIRef, graph):
+    """
+    Returns the IPFS path of the object referenced by a record, or
+    None if it has no valid ipfsPath
+    """
+
+    path = graph.value(uri, tUriIpfsPath)
+
+    if path is not None:
+        ipfsPath = IPFSPath(str(path))
+
+        if ipfsPath.valid:
+            return ipfsPath
+
+
+def graphRecords(graph, ids: list):
+    """
+    Returns a graph with the triples of the records (subjects) with
+    the given IDs, and of the blank nodes they reference (their
+    signatures for example)
+    """
+
+    rgraph = BaseGraph()
+    subjects = [URIRef(rid) for rid in ids]
+    seen = set()
+
+    while subjects:
+        subject = subjects.pop()
+
+        if subject in seen:
+            continue
+
+        seen.add(subject)
+
+        for p, o in graph.predicate_objects(subject):
+            rgraph.add((subject, p, o))
+
+            if isinstance(o, BNode):
+                subjects.append(o)
+
+    return rgraph
+
+
+class GraphReconcileSynchronizer(BaseGraphSynchronizer):
+    """
+    Set reconciliation synchronizer: the peers exchange summaries of
+    their sets of record IDs, and only the records that are missing
+    locally are transferred.
+
+    When verifySignatures is set, a record is only stored if the
+    JSON-LD signature of the object referenced by its ipfsPath is
+    valid. When storeObjects is set, the referenced objects are
+    stored (in the record's output graph).
+    """
+
+    def __init__(self, config=None):
+        self.config = config if config else GraphReconcileSyncConfig()
+
+    @property
+    def pronto(self):
+        return GService.byDotName.get('ld.pronto')
+
+    async def missingRecords(self, client: SmartQLClient, graph) -> list:
+        loop = asyncio.get_event_loop()
+        rtype = self.config.recordType
+
+        local = await loop.run_in_executor(
+            None, graphRecordIds, graph, rtype)
+
+        return await reconcile(
+            local,
+            lambda prefixes, depth: client.reconcileSummary(
+                prefixes, depth, recordType=rtype),
+            lambda prefixes: client.reconcileIds(
+                prefixes, recordType=rtype),
+            depth=self.config.bucketDepth,
+            maxBucketIds=self.config.maxBucketIds
+        )
+
+    async def pullRecords(self, client: SmartQLClient, ids: list):
+        """
+        Async generator yielding the graphs of the records with the
+        given IDs, fetched by chunks, as (chunk IDs, graph) tuples
+        """
+
+        count = self.config.recordsPerRequest
+
+        for idx in range(0, len(ids), count):
+            chunk = ids[idx:idx + count]
+            graph = await client.records(chunk)
+
+            if graph is not None:
+                yield chunk, graph
+
+    async def recordsAccepted(self, ipfsop, ids: list, graph):
+        """
+        Returns a graph containing only the triples of the pulled
+        records with the given (requested) IDs that pass the checks
+        (see recordsVerified). Anything else the peer sent is dropped.
+        """
+
+        loop = asyncio.get_event_loop()
+        rtype = self.config.recordType
+        records = [URIRef(rid) for rid in ids]
+
+        if self.config.verifySignatures or self.config.storeObjects:
+            records = [
+                uri for uri in records
+                if not rtype or (uri, RDF.type, URIRef(rtype)) in graph
+            ]
+
+            if self.config.verifySignatures:
+                records = await self.recordsVerified(ipfsop, records, graph)
+
+            if self.config.storeObjects:
+                records = [
+                    uri for uri in records
+                    if await self.recordStore(uri, graph)
+                ]
+
+        return await loop.run_in_executor(
+            None, graphRecords, graph, [str(uri) for uri in records])
+
+    async def recordsVerified(self, ipfsop, records: list, graph) -> list:
+        """
+        Returns the records whose referenced object (ipfsPath) has a
+        valid JSON-LD signature. The signatures are verified in one
+        batch by the crypto runtime.
+        """
+
+        items, candidates = [], []
+
+        for uri in records:
+            path = recordPath(uri, graph)
+            vmethod = graph.value(uri, SEC.verificationMethod)
+            signature = graph.value(uri, SEC.signature)
+            jws = graph.value(signature, SEC.signatureValue) \
+                if signature else None
+            pem = rsaPubKeyPemFromKeyId(
+                self.pronto.graphByUri('urn:ipg:i:am'), vmethod) \
+                if vmethod else None
+
+            if not path or not jws or not pem:
+                log.debug(f'Record {uri}: no signature or public key')
+                continue
+
+            obj = await ipfsop.dagGet(str(path), timeout=10)
+
+            if not obj:
+                log.debug(f'Record {uri}: cannot fetch object')
+                continue
+
+            items.append((obj, str(jws), pem))
+            candidates.append(uri)
+
+        if not items:
+            return []
+
+        results = await ipfsop.ctx.rsaExec.jsonldVerifyBatch(items)
+        verified = []
+
+        for uri, valid in zip(candidates, results):
+            if valid is True:
+                verified.append(uri)
+            else:
+                log.debug(f'Record {uri}: invalid signature')
+
+        return verified
+
+    async def recordStore(self, uri: URIRef, graph) -> bool:
+        """
+        Stores the object referenced by a pulled record
+        """
+
+        path = recordPath(uri, graph)
+
+        if not path:
+            return False
+
+        await runningApp().s.rdfStore(
+            path,
+            trace=False,
+            outputGraph=graph.value(uri, tUriOntoRecordOutputGraph)
+        )
+
+        return True
+
+    async def sync(self, ipfsop, peerId, iri, dial,
+                   auth, p2pLibertarianId=None,
+                   **kw):
+        localGraph = self.pronto.graphByUri(iri)
+
+        if localGraph is None:
+            return False
+
+        loop = asyncio.get_event_loop()
+        client = SmartQLClient(dial, auth=auth)
+
+        def merge(graph):
+            localGraph.__iadd__(graph)
+
+        try:
+            missing = await self.missingRecords(client, localGraph)
+
+            log.debug(f'Reconcile sync for graph {iri}: '
+                      f'{len(missing)} missing records')
+
+            async for ids, graph in self.pullRecords(client, missing):
+                graph = await self.recordsAccepted(ipfsop, ids, graph)
+
+                await loop.run_in_executor(None, merge, graph)
+        except Exception as err:
+            log.debug(f'Reconcile sync for graph {iri}: error: {err}')
+            return False
+        finally:
+            await client.spql.close()
+
+        return True
@@ -0,0 +1,159 @@
+import bisect
+import hashlib
+
+from typing import Awaitable
+from typing import Callable
+from typing import Iterable
+
+
+def idHash(recordId: str) -> str:
+    return hashlib.sha256(recordId.encode()).hexdigest()
+
+
+class IDBuckets:
+    """
+    Set of record IDs, grouped in buckets by the hex prefix of
+    the IDs hashes (a hash tree over the sorted hashes).
+
+    The summary of a bucket is the number of IDs in the bucket and
+    the XOR of their hashes, so two peers can compare their sets
+    bucket by bucket, and only descend in the buckets that differ.
+
+    The hashes are kept sorted, so the IDs under a prefix are found
+    by bisection, and the buckets summaries are cached (until the
+    set changes).
+    """
+
+    def __init__(self, ids: Iterable[str] = None):
+        # hash -> id
+        self._ids = {}
+        self._hashes = None
+        self._summaries = {}
+
+        for recordId in (ids if ids else []):
+            self.add(recordId)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, recordId):
+        return idHash(recordId) in self._ids
+
+    @property
+    def hashes(self) -> list:
+        if self._hashes is None:
+            self._hashes = sorted(self._ids)
+
+        return self._hashes
+
+    def add(self, recordId: str):
+        self._ids[idHash(recordId)] = recordId
+        self._hashes = None
+        self._summaries.clear()
+
+    def _matching(self, prefix: str):
+        hashes = self.hashes
+
+        if not prefix:
+            return hashes
+
+        # 'g' sorts after the hex digits
+        return hashes[bisect.bisect_left(hashes, prefix):
+                      bisect.bisect_left(hashes, prefix + 'g')]
+
+    def bucketSummary(self, prefix: str, depth: int) -> dict:
+        """
+        Summary of the buckets under a prefix (cached)
+        """
+
+        summary = self._summaries.get((prefix, depth))
+
+        if summary is None:
+            buckets = {}
+            length = len(prefix) + depth
+
+            for h in self._matching(prefix):
+                bucket = buckets.setdefault(h[0:length], [0, 0])
+                bucket[0] += 1
+                bucket[1] ^= int(h, 16)
+
+            summary = self._summaries[(prefix, depth)] = {
+                key: [count, format(digest, '064x')]
+                for key, (count, digest) in buckets.items()
+            }
+
+        return summary
+
+    def summary(self, prefixes: list = None, depth: int = 2) -> dict:
+        """
+        Returns the summary of the buckets under prefixes, each
+        bucket prefix being depth hex chars longer than its parent
+
+        :rtype: dict
+        :return: a dict: bucket prefix -> [count, digest]
+        """
+
+        summary = {}
+
+        for prefix in (prefixes if prefixes else ['']):
+            summary.update(self.bucketSummary(prefix, depth))
+
+        return summary
+
+    def ids(self, prefixes: list = None) -> list:
+        return [self._ids[h] for prefix in (prefixes if prefixes else [''])
+                for h in self._matching(prefix)]
+
+
+async def reconcile(local: IDBuckets,
+                    remoteSummary: Callable[[list, int], Awaitable[dict]],
+                    remoteIds: Callable[[list], Awaitable[list]],
+                    depth: int = 2,
+                    maxBucketIds: int = 256,
+                    maxRounds: int = 8) -> list:
+    """
+    Returns the IDs of the remote set that are missing in the local set.
+
+    The buckets that differ are split until they hold less than
+    maxBucketIds remote IDs, then their IDs are fetched. The
+    exchanged data is proportional to the difference between the
+    two sets, not to their size.
+
+    :param IDBuckets local: local IDs
+    :param remoteSummary: coroutine returning the remote summary
+        for (prefixes, depth)
+    :param remoteIds: coroutine returning the remote IDs for prefixes
+    """
+
+    missing = []
+    pending = ['']
+
+    for roundn in range(0, maxRounds):
+        if not pending:
+            break
+
+        remote = await remoteSummary(pending, depth)
+        if not isinstance(remote, dict):
+            break
+
+        mine = local.summary(pending, depth)
+
+        differing = [
+            prefix for prefix, bucket in remote.items()
+            if mine.get(prefix) != bucket
+        ]
+
+        # Fetch the IDs of the small buckets, split the big ones
+        fetch = [p for p in differing if remote[p][0] <= maxBucketIds]
+        pending = [p for p in differing if remote[p][0] > maxBucketIds]
+
+        if roundn == maxRounds - 1:
+            fetch += pending
+
+        if fetch:
+            ids = await remoteIds(fetch)
+
+            missing += [rid for rid in (ids if ids else [])
+                        if rid not in local]
+
+    return missing
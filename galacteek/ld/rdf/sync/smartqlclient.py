@@ -7,6 +7,11 @@ from galacteek.ld.rdf import BaseGraph
 from galacteek.ld.sparql.aioclient import Sparkie
 
 
+def decompress(data: bytes) -> bytes:
+    # Accepts both gzip and zlib streams
+    return zlib.decompress(data, zlib.MAX_WBITS | 32)
+
+
 class SmartQLClient:
     def __init__(self, dialCtx, auth: aiohttp.BasicAuth = None):
         self.dial = dialCtx
@@ -38,7 +43,7 @@ class SmartQLClient:
                         ctype = resp.headers.get('Content-Type')
 
                         if ctype == 'application/gzip':
-                            gdata = zlib.decompress(data).decode()
+                            gdata = decompress(data).decode()
                         else:
                             gdata = data.decode()
 
@@ -48,3 +53,92 @@ class SmartQLClient:
         else:
             log.debug(f'resource graph pull for {iri}: success')
             return gdata
+
+    async def export(self, fmt: str = 'xml', compress: str = 'gzip',
+                     timeout=600) -> bytes:
+        """
+        Returns the (uncompressed) export of the remote graph
+        """
+
+        url = self.dial.httpUrl('/export')
+        params = {
+            'fmt': fmt,
+            'compress': compress
+        }
+
+        try:
+            with async_timeout.timeout(timeout):
+                async with aiohttp.ClientSession(auth=self.auth) as session:
+                    async with session.get(url, params=params) as resp:
+                        assert resp.status == 200
+                        data = await resp.read()
+
+                        if resp.content_type == 'application/gzip':
+                            return decompress(data)
+                        else:
+                            return data
+        except Exception as err:
+            log.debug(f'{url}: export error: {err}')
+
+    async def reconcilePost(self, path: str, payload: dict, timeout=60):
+        url = self.dial.httpUrl(path)
+
+        try:
+            with async_timeout.timeout(timeout):
+                async with aiohttp.ClientSession(auth=self.auth) as session:
+                    async with session.post(url, json=payload) as resp:
+                        assert resp.status == 200
+
+                        if resp.content_type == 'application/gzip':
+                            return decompress(await resp.read())
+                        else:
+                            return await resp.json()
+        except Exception as err:
+            log.debug(f'{url}: reconcile request error: {err}')
+
+    async def reconcileSummary(self, prefixes: list, depth: int,
+                               recordType: str = None):
+        """
+        Returns the summary of the remote record IDs buckets
+        """
+
+        reply = await self.reconcilePost('/reconcile/summary', {
+            'prefixes': prefixes,
+            'depth': depth,
+            'type': recordType
+        })
+
+        if isinstance(reply, dict):
+            return reply.get('buckets')
+
+    async def reconcileIds(self, prefixes: list, recordType: str = None):
+        """
+        Returns the remote record IDs in the given buckets
+        """
+
+        reply = await self.reconcilePost('/reconcile/ids', {
+            'prefixes': prefixes,
+            'type': recordType
+        })
+
+        if isinstance(reply, dict):
+            return reply.get('ids')
+
+    async def records(self, ids: list):
+        """
+        Returns a graph containing the remote records with the given IDs
+        """
+
+        data = await self.reconcilePost('/reconcile/records', {
+            'ids': ids
+        })
+
+        if isinstance(data, bytes):
+            graph = BaseGraph()
+
+            try:
+                graph.parse(data=data.decode(), format='nt')
+            except Exception as err:
+                log.debug(f'records: invalid graph: {err}')
+            else:
+                return graph
@@ -61,8 +61,9 @@ def sign_rs256(payload, private_key):
 
 def verify_rs256(payload, signature, public_key):
     """
-    Verifies a RS256 signature
+    Verifies a RS256 signature (public_key can be a parsed RSA key)
     """
-    key = RSA.importKey(public_key)
+    key = public_key if isinstance(public_key, RSA.RsaKey) else \
+        RSA.importKey(public_key)
     verifier = PKCS1_v1_5.new(key)
     return verifier.verify(SHA256.new(payload), signature)
@@ -0,0 +1,245 @@
+"""
+Native SparQL evaluation for graphs stored with Oxigraph (pyoxigraph):
+queries are sent to Oxigraph's evaluator, and the results are converted
+to rdflib query results.
+"""
+
+import re
+
+from rdflib import BNode
+from rdflib import Graph
+from rdflib import ConjunctiveGraph
+from rdflib import Literal
+from rdflib import URIRef
+from rdflib import Variable
+from rdflib.namespace import XSD
+from rdflib.query import Result
+
+try:
+    import pyoxigraph
+except ImportError:
+    haveOxigraph = False
+else:
+    haveOxigraph = True
+
+
+def oxigraphStore(store):
+    """
+    Returns the pyoxigraph store wrapped by an (oxrdflib) rdflib store,
+    or None
+    """
+
+    if not haveOxigraph:
+        return None
+
+    for attr in ['_inner', '_store']:
+        inner = getattr(store, attr, None)
+
+        if isinstance(inner, pyoxigraph.Store):
+            return inner
+
+
+def rdflibTerm(term):
+    if isinstance(term, pyoxigraph.NamedNode):
+        return URIRef(term.value)
+    elif isinstance(term, pyoxigraph.BlankNode):
+        return BNode(term.value)
+    elif isinstance(term, pyoxigraph.Literal):
+        if term.language:
+            return Literal(term.value, lang=term.language)
+        elif term.datatype.value == str(XSD.string):
+            return Literal(term.value)
+
+        return Literal(term.value, datatype=URIRef(term.datatype.value))
+
+
+def valuesClause(initBindings: dict) -> str:
+    """
+    Returns a VALUES clause for the initial bindings
+    """
+
+    names = list(initBindings.keys())
+    values = ' '.join(initBindings[name].n3() for name in names)
+    variables = ' '.join(f'?{name}' for name in names)
+
+    return f'VALUES ({variables}) {{ ({values}) }}'
+
+
+def queryTokens(query: str):
+    """
+    Yields (position, token) for the braces and the keywords of a
+    SparQL query, skipping strings, IRIs and comments
+    """
+
+    pos, length = 0, len(query)
+
+    while pos < length:
+        char = query[pos]
+
+        if char == '#':
+            end = query.find('\n', pos)
+            pos = length if end < 0 else end
+        elif char in '"\'':
+            quote = query[pos:pos + 3] if \
+                query[pos:pos + 3] == char * 3 else char
+            end = pos + len(quote)
+
+            while end < length and not query.startswith(quote, end):
+                end += 2 if query[end] == '\\' else 1
+
+            pos = end + len(quote)
+        elif char == '<':
+            match = iriRe.match(query, pos)
+            pos = match.end() if match else pos + 1
+        elif char in '{}':
+            yield pos, char
+            pos += 1
+        elif char.isalpha():
+            match = wordRe.match(query, pos)
+            yield pos, match.group(0).upper()
+            pos = match.end()
+        elif char in '?$':
+            # Variable: skip its name
+            match = wordRe.match(query, pos + 1)
+            pos = match.end() if match else pos + 1
+        else:
+            pos += 1
+
+
+iriRe = re.compile(r'<[^<>"{}|^`\\\s]*>')
+wordRe = re.compile(r'[\w:-]+')
+
+
+def valuesInline(query: str, initBindings: dict) -> str:
+    """
+    Returns the query with the initial bindings inlined as a VALUES
+    clause at the start of the WHERE group of the query and of its
+    subqueries (so that they are visible from the filters, as rdflib's
+    initBindings are)
+
+    :raises ValueError: if the WHERE group can't be found
+    """
+
+    tokens = list(queryTokens(query))
+    keywords = [token for pos, token in tokens]
+    points = []
+
+    def groupAfter(idx):
+        # Position of the first '{' after the token
+        for pos, token in tokens[idx + 1:]:
+            if token == '{':
+                return pos
+
+    if 'SELECT' in keywords:
+        for idx, token in enumerate(keywords):
+            if token == 'SELECT':
+                points.append(groupAfter(idx))
+    elif 'WHERE' in keywords:
+        points.append(groupAfter(keywords.index('WHERE')))
+    elif 'ASK' in keywords:
+        points.append(groupAfter(keywords.index('ASK')))
+
+    points = sorted(pos for pos in points if pos is not None)
+
+    if not points:
+        raise ValueError('Cannot find the query pattern')
+
+    values = valuesClause(initBindings)
+    selects = {pos for pos, token in tokens if token == 'SELECT'}
+    parts = []
+    last = 0
+
+    for pos in points:
+        parts.append(query[last:pos + 1])
+        last = pos + 1
+
+        # A group made of a subquery can't have anything else
+        nextTokens = [p for p, token in tokens if p > pos]
+
+        if not nextTokens or nextTokens[0] not in selects:
+            parts.append(f' {values} ')
+
+    parts.append(query[last:])
+    return ''.join(parts)
+
+
+class OxigraphQueryBackend:
+    """
+    Runs SparQL queries on a graph with Oxigraph's native evaluator.
+
+    The graph's namespace bindings are declared as prefixes (as rdflib
+    does) and initial bindings are passed as a VALUES clause, inlined
+    in the query's WHERE group.
+
+    :param Graph graph: rdflib graph (Oxigraph store)
+    """
+
+    def __init__(self, graph: Graph):
+        self.graph = graph
+        self.inner = oxigraphStore(graph.store)
+
+    def prologue(self) -> str:
+        return ''.join(
+            f'PREFIX {prefix}: <{ns}>\n'
+            for prefix, ns in self.graph.namespaces()
+        )
+
+    def query(self, query: str, initBindings: dict = None) -> Result:
+        if initBindings:
+            query = valuesInline(query, initBindings)
+
+        q = self.prologue() + query
+
+        if isinstance(self.graph, ConjunctiveGraph):
+            results = self.inner.query(q, use_default_graph_as_union=True)
+        else:
+            graphNode = pyoxigraph.NamedNode(str(self.graph.identifier))
+
+            try:
+                results = self.inner.query(q, default_graph=graphNode)
+            except TypeError:
+                # pyoxigraph < 0.2
+                results = self.inner.query(
+                    q, default_graph_uris=[graphNode])
+
+        return self.result(results)
+
+    def result(self, results) -> Result:
+        if isinstance(results, bool):
+            result = Result('ASK')
+            result.askAnswer = results
+        elif isinstance(results, pyoxigraph.QuerySolutions):
+            variables = [Variable(v.value) for v in results.variables]
+
+            result = Result('SELECT')
+            result.vars = variables
+            result.bindings = [
+                {
+                    var: rdflibTerm(solution[idx])
+                    for idx, var in enumerate(variables)
+                    if solution[idx] is not None
+                }
+                for solution in results
+            ]
+        else:
+            result = Result('CONSTRUCT')
+            result.graph = Graph()
+
+            for triple in results:
+                result.graph.add((
+                    rdflibTerm(triple.subject),
+                    rdflibTerm(triple.predicate),
+                    rdflibTerm(triple.object)
+                ))
+
+        return result
+
+
+def nativeQueryBackend(graph: Graph):
+    """
+    Returns a native query backend for the graph if its store
+    supports it, otherwise None (rdflib's evaluator is used)
+    """
+
+    if oxigraphStore(graph.store) is not None:
+        return OxigraphQueryBackend(graph)
@@ -0,0 +1,214 @@
+import asyncio
+import attr
+import concurrent.futures
+import multiprocessing
+import signal
+import sys
+import time
+
+from concurrent.futures.process import BrokenProcessPool
+
+from rdflib import ConjunctiveGraph
+from rdflib import Graph
+from rdflib import URIRef
+from rdflib import plugin
+from rdflib.store import Store
+from rdflib.store import VALID_STORE
+
+from galacteek import log
+
+
+class QueryLimitError(Exception):
+    pass
+
+
+class QueryCPUTimeExceeded(QueryLimitError):
+    pass
+
+
+class QueryResultTooLarge(QueryLimitError):
+    pass
+
+
+class GraphOpenError(Exception):
+    """
+    The worker could not open the graph's store
+    """
+
+
+@attr.s(auto_attribs=True, frozen=True)
+class GraphLocation:
+    """
+    Where a graph is stored (rdflib store plugin and path), so that
+    a worker process can open its own handle on the store
+    """
+
+    storePlugin: str
+    storePath: str
+    graphUri: str
+    conjunctive: bool = False
+
+
+# Store plugins the workers can open read-only. Oxigraph stores are
+# not supported: the pinned oxrdflib (pyoxigraph 0.2) can't open
+# a store held by another process
+workersStorePlugins = ['Sleepycat']
+
+# Per-process store handles (worker side)
+_graphs = {}
+
+
+def _openStore(location: GraphLocation):
+    """
+    Opens a read-only handle on a BerkeleyDB (Sleepycat) store.
+
+    The rdflib store has no read-only mode, its databases are opened
+    with the store module's DBOPENFLAGS: DB_RDONLY is added there,
+    which only affects this (worker) process. The environment
+    (Concurrent Data Store) is shared with the application's process.
+    """
+
+    storeClass = plugin.get(location.storePlugin, Store)
+    storeMod = sys.modules[storeClass.__module__]
+    storeMod.DBOPENFLAGS = storeMod.db.DB_THREAD | storeMod.db.DB_RDONLY
+
+    store = storeClass()
+
+    if store.open(location.storePath, create=False) != VALID_STORE:
+        raise ValueError('Invalid store')
+
+    return store
+
+
+def _workerGraph(location: GraphLocation):
+    graph = _graphs.get(location)
+
+    if graph is None:
+        try:
+            store = _openStore(location)
+        except Exception as err:
+            raise GraphOpenError(
+                f'{location.graphUri}: cannot open store: {err}')
+
+        if location.conjunctive:
+            graph = ConjunctiveGraph(store=store)
+        else:
+            graph = Graph(store=store, identifier=URIRef(location.graphUri))
+
+        _graphs[location] = graph
+
+    return graph
+
+
+def _cpuTimeExceeded(signum, frame):
+    raise QueryCPUTimeExceeded('CPU time limit exceeded')
+
+
+def _serialize(results, fmt: str) -> bytes:
+    if fmt == 'json-ld':
+        g = Graph()
+        g.parse(data=results.serialize(format='xml'), format='xml')
+        return g.serialize(format='json-ld')
+    elif fmt == 'turtle':
+        return results.serialize(format='turtle')
+
+    return results.serialize(format=fmt)
+
+
+def workerQuery(location: GraphLocation,
+                query: str,
+                fmt: str,
+                cpuTimeLimit: float,
+                maxResultSize: int):
+    """
+    Runs a SparQL query in a worker process and returns the
+    serialized results and the CPU time spent (in nanoseconds)
+    """
+
+    graph = _workerGraph(location)
+    pstart = time.process_time_ns()
+
+    useTimer = hasattr(signal, 'setitimer')
+
+    if useTimer:
+        signal.signal(signal.SIGPROF, _cpuTimeExceeded)
+        signal.setitimer(signal.ITIMER_PROF, cpuTimeLimit)
+
+    try:
+        data = _serialize(graph.query(query), fmt)
+    finally:
+        if useTimer:
+            signal.setitimer(signal.ITIMER_PROF, 0)
+
+    if len(data) > maxResultSize:
+        raise QueryResultTooLarge(f'Result size: {len(data)}')
+
+    return data, time.process_time_ns() - pstart
+
+
+class SparQLWorkersPool:
+    """
+    Pool of processes running SparQL queries on read-only handles
+    of the graphs stores, isolated from the application's process
+    (queries don't contend for the GIL with the UI).
+
+    :param int processes: number of worker processes
+    :param float cpuTimeLimit: max CPU time per query (seconds)
+    :param int maxResultSize: max size of serialized results (bytes)
+    """
+
+    def __init__(self, processes: int = 2,
+                 cpuTimeLimit: float = 5.0,
+                 maxResultSize: int = 4 * 1048576):
+        self.processes = processes
+        self.cpuTimeLimit = cpuTimeLimit
+        self.maxResultSize = maxResultSize
+        self._executor = None
+
+    @property
+    def executor(self):
+        if not self._executor:
+            # Don't fork the Qt application
+            self._executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.processes,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+
+        return self._executor
+
+    async def query(self, location: GraphLocation, query: str,
+                    fmt: str = 'json'):
+        """
+        Runs the query in a worker and returns a (data, ptime) tuple
+
+        :raises QueryLimitError: the query exceeded the CPU time or
+            result size limits
+        :raises GraphOpenError: the worker could not open the store
+        """
+
+        loop = asyncio.get_event_loop()
+
+        if location.storePlugin not in workersStorePlugins:
+            raise GraphOpenError(
+                f'{location.graphUri}: unsupported store '
+                f'{location.storePlugin}')
+
+        try:
+            return await loop.run_in_executor(
+                self.executor,
+                workerQuery,
+                location,
+                query,
+                fmt,
+                self.cpuTimeLimit,
+                self.maxResultSize
+            )
+        except BrokenProcessPool:
+            log.warning('SparQL workers pool broken, restarting')
+            self.shutdown()
+            raise
+
+    def shutdown(self):
+        if self._executor:
+            self._executor.shutdown(wait=False)
+            self._executor = None
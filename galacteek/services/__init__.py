@@ -1,5 +1,6 @@
 import asyncio
 import shutil
+import time
 import os.path
 import importlib
 
@@ -18,6 +19,7 @@ from galacteek.core.ps import hubLdPublish
 from galacteek.core.ps import makeKeyService
 
 from galacteek.core.pkglister import pkgListPackages
+from galacteek.core.startupprof import startupProfiler
 
 from galacteek.config import configModRegCallback
 from galacteek.config import configForModule
@@ -149,6 +151,17 @@ class GService(Service, KeyListener):
         await self.add_runtime_dependency(service)
         await self.app.ipfsCtx.p2p.register(service)
 
+    async def start(self) -> None:
+        startedAt = time.perf_counter()
+
+        try:
+            await super().start()
+        finally:
+            startupProfiler.serviceStarted(
+                self.dotPath if self.dotPath else self.name,
+                time.perf_counter() - startedAt
+            )
+
     async def on_start(self) -> None:
         log.debug(f'Creating service directory: {self.rootPath}')
 
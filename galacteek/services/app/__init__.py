@@ -4,8 +4,10 @@ import asyncio
 from rdflib import URIRef
 
 from galacteek import log
+from galacteek import AsyncSignal
 
 from galacteek.core.ps import makeKeyService
+from galacteek.core.startupprof import startupProfiler
 
 from galacteek.ipfs.cidhelpers import IPFSPath
 from galacteek.ipfs import ipfsOp
@@ -13,10 +15,6 @@ from galacteek.ipfs import ipfsOp
 from galacteek.ld import gLdDefaultContext
 from galacteek.services import GService
 from galacteek.services import cached_property
-from galacteek.services.net.bitmessage.service import BitMessageClientService
-from galacteek.services.net.tor.service import TorService
-from galacteek.services.net.tor.service import TorServiceRuntimeConfig
-from galacteek.services.dweb.ethereum.__service__ import EthereumService
 
 from mode.utils.graphs.formatter import *  # noqa
 from mode.utils.objects import _label
@@ -60,34 +58,57 @@ class AppGraphFormatter(GraphFormatter):
 class AppService(GService):
     """
     Main service
+
+    Services are started in two stages: the core, dweb and ld services
+    first (sServiceStarted is emitted once they're running), then,
+    deferredStartDelay seconds later, the optional network services
+    (bitmessage, tor, ethereum), whose modules are only imported then.
     """
 
     name = 'app'
 
+    # Delay before starting the deferred services
+    deferredStartDelay: float = 3.0
+
     # Bitmessage service
-    bmService: BitMessageClientService = None
+    bmService: 'BitMessageClientService' = None
 
     # Tor service
-    torService: TorService = None
+    torService: 'TorService' = None
 
     # Eth
-    ethService: EthereumService = None
+    ethService: 'EthereumService' = None
+
+    def __init__(self, *args, **kw):
+        super().__init__(*args, **kw)
+
+        self.sDeferredServicesStarted = AsyncSignal()
 
     @cached_property
-    def bmService(self) -> BitMessageClientService:
+    def bmService(self) -> 'BitMessageClientService':
+        from galacteek.services.net.bitmessage.service import \
+            BitMessageClientService
+
         return BitMessageClientService(
             dataPath=self.app._bitMessageDataLocation,
             dotPath='net.bitmessage'
         )
 
     @cached_property
-    def ethService(self) -> EthereumService:
+    def ethService(self) -> 'EthereumService':
+        from galacteek.services.dweb.ethereum.__service__ import \
+            EthereumService
+
         return EthereumService(
             self.app._ethDataLocation
         )
 
     @cached_property
-    def torService(self) -> TorService:
+    def torService(self) -> 'TorService':
+        from galacteek.services.net.tor.service import TorService
+        from galacteek.services.net.tor.service import \
+            TorServiceRuntimeConfig
+
         return TorService(
             dataPath=self.app.dataPathForService('tor'),
             dotPath='net.tor',
@@ -102,19 +123,35 @@ class AppService(GService):
 
         log.debug('Starting main application service')
 
-        # Dependencies
-        await self.add_runtime_dependency(self.bmService)
-        await self.add_runtime_dependency(self.torService)
-        await self.add_runtime_dependency(self.ethService)
-
         # Walk the line
         await self.walkServices('core', add=True)
         await self.walkServices('dweb', add=True)
         await self.walkServices('ld', add=True)
 
+        startupProfiler.mark('services: core services started')
+
         # Blast
         await self.sServiceStarted.emit()
 
+    @GService.task
+    async def deferredStartTask(self):
+        await asyncio.sleep(self.deferredStartDelay)
+
+        log.debug('Starting deferred services')
+
+        for service in [self.bmService, self.torService, self.ethService]:
+            if self.should_stop:
+                return
+
+            try:
+                await self.add_runtime_dependency(service)
+            except Exception as err:
+                log.warning(f'Could not start service {service}: {err}')
+
+        startupProfiler.mark('services: deferred services started')
+
+        await self.sDeferredServicesStarted.emit()
+
     async def on_stop(self) -> None:
         await super().on_stop()
 
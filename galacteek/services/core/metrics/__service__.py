@@ -0,0 +1,129 @@
+from aiohttp import web
+
+from galacteek import log
+from galacteek.core.instrument import instruments
+from galacteek.core.stallwatch import stallWatchdog
+from galacteek.services import GService
+
+
+class MetricsService(GService):
+    """
+    Applies the instrumentation settings, and serves the latency
+    metrics on a local HTTP endpoint (unix socket in the service's
+    directory):
+
+        curl --unix-socket metrics.sock http://localhost/metrics
+
+    Routes:
+
+    - GET /metrics: histograms (Prometheus text format)
+    - GET /metrics.json: histograms and slow callbacks (JSON)
+    - GET /report: text report
+    - POST /instrument/on, POST /instrument/off: switch instrumentation
+    - GET /stalls: event loop stalls recorded by the stall watchdog
+      (JSON, see StallWatchdog.snapshot())
+    - POST /stalls/clear: clear the stalls buffer
+    """
+
+    name = 'metrics'
+    configModuleName = 'galacteek.services.core.metrics'
+
+    def on_init(self):
+        self.socketPath = self.rootPath.joinpath('metrics.sock')
+        self.runner = None
+        self._cfgEnabled = None
+
+    async def on_start(self):
+        await super().on_start()
+
+        self.instrumentConfigure()
+
+        if self.serviceConfig.endpoint.enabled:
+            await self.endpointStart()
+
+    async def on_stop(self):
+        await self.endpointStop()
+
+        instruments.disable()
+
+    async def onConfigChangedAsync(self):
+        self.instrumentConfigure()
+
+    def instrumentConfigure(self):
+        cfg = self.serviceConfig.instrument
+
+        instruments.slowCallbackThreshold = cfg.slowCallbackThreshold
+        instruments.lagInterval = cfg.lagInterval
+
+        # Only follow changes of the setting (instrumentation
+        # can also be switched from the UI or the endpoint)
+        if cfg.enabled != self._cfgEnabled:
+            self._cfgEnabled = cfg.enabled
+
+            if cfg.enabled:
+                instruments.enable()
+            else:
+                instruments.disable()
+
+    def createApp(self):
+        app = web.Application()
+        app.router.add_routes([
+            web.get('/metrics', self.onMetrics),
+            web.get('/metrics.json', self.onMetricsJson),
+            web.get('/report', self.onReport),
+            web.post('/instrument/{state:on|off}', self.onInstrument),
+            web.get('/stalls', self.onStalls),
+            web.post('/stalls/clear', self.onStallsClear)
+        ])
+        return app
+
+    async def endpointStart(self):
+        try:
+            if self.socketPath.exists():
+                self.socketPath.unlink()
+
+            self.runner = web.AppRunner(self.createApp())
+            await self.runner.setup()
+
+            site = web.UnixSite(self.runner, str(self.socketPath))
+            await site.start()
+        except Exception as err:
+            log.warning(f'Metrics endpoint: could not start: {err}')
+            self.runner = None
+        else:
+            log.debug(f'Metrics endpoint: serving on {self.socketPath}')
+
+    async def endpointStop(self):
+        if self.runner:
+            await self.runner.cleanup()
+            self.runner = None
+
+    async def onMetrics(self, request):
+        return web.Response(text=instruments.exposition(),
+                            content_type='text/plain')
+
+    async def onMetricsJson(self, request):
+        return web.json_response(instruments.snapshot())
+
+    async def onReport(self, request):
+        return web.Response(text=instruments.report() + '\n',
+                            content_type='text/plain')
+
+    async def onInstrument(self, request):
+        if request.match_info['state'] == 'on':
+            instruments.enable()
+        else:
+            instruments.disable()
+
+        return web.json_response({'enabled': instruments.enabled})
+
+    async def onStalls(self, request):
+        return web.json_response(stallWatchdog.snapshot())
+
+    async def onStallsClear(self, request):
+        stallWatchdog.clear()
+        return web.json_response(stallWatchdog.snapshot())
+
+
+def serviceCreate(dotPath, config, parent: GService):
+    return MetricsService(dotPath=dotPath, config=config)
@@ -1,5 +1,4 @@
 import asyncio
-import tarfile
 import traceback
 
 from pathlib import Path
@@ -13,7 +12,8 @@ from galacteek.core.asynclib import asyncReadFile
 from galacteek.core.asynclib.fetch import assetFetch
 from galacteek.core.asynclib.fetch import httpFetch
 
-from galacteek.ld.rdf import BaseGraph
+from galacteek.ld.rdf.bulk import DatasetBulkLoader
+from galacteek.ld.rdf.bulk import NTriplesTarReader
 
 from galacteek.ld.rdf.terms import DATASET
 
@@ -38,53 +38,39 @@ class ProntoDataSetsManagerMixin:
                 subject=opSubject,
                 predicate=DATASET.revision
             )
+            cfg = self.serviceConfig.get('datasetsLoader', {})
+            loop = asyncio.get_event_loop()
 
             try:
-                tar = tarfile.open(str(tarfp))
-                names = tar.getnames()
-                g = BaseGraph()
+                reader = NTriplesTarReader(tarfp)
 
-                for name in names:
-                    if not name.endswith('.nt'):
-                        continue
-
-                    try:
-                        file = tar.extractfile(name)
-                        g.parse(file)
-                    except Exception as err:
-                        log.debug(f'dsProcess: {name} failed: {err}')
-                        continue
-
-                tar.close()
-
-                thisRevision = g.value(
-                    subject=opSubject,
-                    predicate=DATASET.revision
+                # Read the dataset's revision first
+                thisRevision = await loop.run_in_executor(
+                    None, reader.value, opSubject, DATASET.revision
                 )
 
                 if lastRevision and thisRevision == lastRevision:
                     log.debug(f'Dataset {opSubject}: same revision')
                     return False
 
-                if upgradeStrategy in ['mergeReplace', 'replace']:
-                    await ograph.guardian.mergeReplace(
-                        g,
-                        ograph
-                    )
-                elif upgradeStrategy in ['purge', 'purgefirst']:
-                    for s, p, o in ograph:
-                        ograph.remove((s, p, o))
+                loader = DatasetBulkLoader(
+                    ograph,
+                    batchSize=cfg.get('batchSize', 20000)
+                )
+
+                if not await loop.run_in_executor(
+                        None, loader.load, reader, upgradeStrategy):
+                    return False
 
-                    await ograph.guardian.mergeReplace(
-                        g,
-                        ograph
+                if thisRevision:
+                    ograph.replace(
+                        opSubject,
+                        DATASET.processedRevision,
+                        thisRevision
                     )
 
-                ograph.add((
-                    opSubject,
-                    DATASET.processedRevision,
-                    thisRevision
-                ))
+                ograph.publishUpdateEvent(
+                    ograph, subjectsUris=list(loader.subjects))
             except asyncio.CancelledError:
                 pass
             except Exception:
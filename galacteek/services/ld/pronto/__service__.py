@@ -11,6 +11,7 @@ from omegaconf import OmegaConf
 
 from galacteek import log
 from galacteek import ensure
+from galacteek import cached_property
 from galacteek.services import GService
 
 from galacteek.ipfs import ipfsOp
@@ -35,6 +36,8 @@ from galacteek.ld.rdf import IGraph
 from galacteek.ld.rdf import IConjunctiveGraph
 from galacteek.ld.rdf.guardian import GraphGuardian
 from galacteek.ld.rdf.watch import GraphActivityListener
+from galacteek.ld.sparql.workers import GraphLocation
+from galacteek.ld.sparql.workers import SparQLWorkersPool
 
 from rdflib import plugin
 from rdflib import URIRef
@@ -75,6 +78,17 @@ class RDFStoresService(ProntoServiceModels,
     def chainEnv(self):
         return self.app.cmdArgs.prontoChainEnv
 
+    @cached_property
+    def sparqlWorkers(self):
+        cfg = self.serviceConfig.get('sparqlWorkers', {})
+
+        if cfg.get('enabled', True) is True:
+            return SparQLWorkersPool(
+                processes=cfg.get('processes', 2),
+                cpuTimeLimit=cfg.get('cpuTimeLimit', 5.0),
+                maxResultSize=cfg.get('maxResultSize', 4194304)
+            )
+
     @property
     def defaultStorePlugin(self):
         return self.serviceConfig.defaultRdflibStorePlugin
@@ -162,6 +176,11 @@ class RDFStoresService(ProntoServiceModels,
 
     def graphStoragePath(self, rootPath: Path, storePlugin: str):
         if storePlugin == 'Oxigraph':
+            if rootPath.joinpath('bsddb').is_dir() and \
+                    not rootPath.joinpath('oxigraphdb').exists():
+                log.warning(f'{rootPath}: Sleepycat store found, migrate '
+                            'it with galacteek-pronto-migrate')
+
             return rootPath.joinpath('oxigraphdb')
         elif storePlugin == 'Sleepycat':
             return rootPath.joinpath('bsddb')
@@ -217,6 +236,8 @@ class RDFStoresService(ProntoServiceModels,
             log.warning(f'Cannot open graph {uri} from path {dbPath}')
             return None
 
+        graph.location = GraphLocation(storePlugin, str(dbPath), uri)
+
         # XXX: NS bind
         graph.iNsBind()
 
@@ -273,6 +294,9 @@ class RDFStoresService(ProntoServiceModels,
                 f'Cannot open conjunctive graph {uri} from path {dbPath}')
             return None
 
+        cgraph.location = GraphLocation(
+            storePlugin, str(dbPath), uri, conjunctive=True)
+
         cgraph.iNsBind()
 
         for subguri, subgcfg in subgraphs.items():
@@ -292,6 +316,8 @@ class RDFStoresService(ProntoServiceModels,
                     name=subgname,
                     identifier=subguri
                 )
+                graph.location = GraphLocation(
+                    storePlugin, str(dbPath), subguri)
             elif gtype == 'conjunctive':
                 # Recursive
                 graph = await self.registerConjunctive(
@@ -332,12 +358,19 @@ class RDFStoresService(ProntoServiceModels,
 
                 await self.ipfsP2PService(
                     p2psmartql.P2PSmartQLService(
-                        self.chainEnv, graph, config=spconfig)
+                        self.chainEnv, graph, config=spconfig,
+                        queryPool=self.sparqlWorkers)
                 )
             elif srvtype == 'sync':
                 try:
                     scfg = GraphSyncConfig(**cfg)
-                    synchronizer = self._synchros.get(scfg.use, None)
+
+                    if isinstance(scfg.use, str):
+                        synchronizer = self._synchros.get(scfg.use, None)
+                    else:
+                        synchronizer = GraphSynchronizersChain(
+                            [self._synchros[use] for use in scfg.use])
+
                     assert synchronizer is not None
                 except Exception:
                     log.warning(
@@ -406,6 +439,9 @@ class RDFStoresService(ProntoServiceModels,
             elif stype == 'ontolochain':
                 synccfg = GraphSemChainSyncConfig(**cfg)
                 self._synchros[uri] = GraphSemChainSynchronizer(synccfg)
+            elif stype == 'reconcile':
+                synccfg = GraphReconcileSyncConfig(**cfg)
+                self._synchros[uri] = GraphReconcileSynchronizer(synccfg)
 
         guardians = self._cfgAgents.get('guardians', {})
 
@@ -533,6 +569,9 @@ class RDFStoresService(ProntoServiceModels,
     async def on_stop(self):
         log.debug('RDF stores: closing')
 
+        if self.sparqlWorkers:
+            self.sparqlWorkers.shutdown()
+
         for gn, graph in self._graphs.items():
             try:
                 log.debug(f'RDF stores: closing {graph.identifier}')
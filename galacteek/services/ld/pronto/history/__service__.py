@@ -1,6 +1,5 @@
 import hashlib
 import asyncio
-import aiohttp
 
 from rdflib import URIRef
 
@@ -8,7 +7,6 @@ from galacteek import log
 from galacteek.services import GService
 
 from galacteek.core import utcDatetimeIso
-from galacteek.core import runningApp
 
 from galacteek.ipfs.cidhelpers import IPFSPath
 
@@ -17,84 +15,9 @@ from galacteek.ipfs.pubsub.messages.ld import SparQLHeartbeatMessage
 
 from galacteek.ld import gLdDefaultContext
 from galacteek.ld import ontolochain
-from galacteek.ld.sparql.aioclient import Sparkie
 from galacteek.ld.signatures import jsonldsig
 
 
-class GraphHistorySynchronizer:
-    def __init__(self, hGraph):
-        self.hGraph = hGraph
-
-    @ipfsOp
-    async def syncFromRemote(self, ipfsop, iri: str, p2pEndpoint: str):
-        async with ipfsop.p2pDialerFromAddr(p2pEndpoint) as dial:
-            if dial.failed:
-                # Bummer
-                return
-
-            await self.syncFromExport(ipfsop, iri, dial)
-
-    async def storedObjectsIds(self):
-        return self.hGraph.subject_objects(
-            predicate='ips://galacteek.ld/ipfsPath'
-        )
-
-    def idsMinus(self, ids):
-        q = "MINUS {\n"
-        for rec in ids:
-            q += f'?uri gs:ipfsPath "{rec[1]}" .\n'
-        q += "}\n"
-        return q
-
-    async def syncFromExport(self, ipfsop, iri, dial):
-        rdfService = GService.byDotName.get('ld.pronto')
-        graph = rdfService.graphByUri(iri)
-        if graph is None:
-            return
-
-        url = dial.httpUrl('/export')
-
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as resp:
-                    data = await resp.read()
-                    assert data is not None
-
-                    graph.parse(data=data.decode(), format='xml')
-        except Exception as err:
-            print(str(err))
-        else:
-            print(f'Graph with IRI {iri}: synced from export')
-
-    async def syncSparql(self, ipfsop, dial):
-        sparql = Sparkie(dial.httpUrl('/sparql'))
-
-        ids = await self.storedObjectsIds()
-
-        q = """
-            PREFIX gs: <ips://galacteek.ld/>
-            SELECT ?uri ?dateCreated ?ipfsPath
-            WHERE {
-                ?uri a gs:OntoloChainRecord ;
-                  gs:ipfsPath ?ipfsPath ;
-                  gs:dateCreated ?dateCreated .
-        """ + self.idsMinus(ids) + """
-            }
-        """
-
-        reply = await sparql.query(q)
-
-        try:
-            for res in reply['results']['bindings']:
-                path = IPFSPath(res['ipfsPath']['value'])
-
-                await runningApp().s.rdfStore(path)
-        except Exception as err:
-            log.debug(f'Sync error: {err}')
-
-        await sparql.close()
-
-
 class GraphingHistoryService(GService):
     name = 'history'
 
@@ -113,10 +36,6 @@ class GraphingHistoryService(GService):
     def on_init(self):
         self.trail = None
 
-    async def on_start(self):
-        await super().on_start()
-        self.synchro = GraphHistorySynchronizer(self.hGraph)
-
     async def ontoloChainCreate(self, ipid, chainId, peerId):
         from galacteek.ld.ontolochain import create
 
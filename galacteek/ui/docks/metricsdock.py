@@ -0,0 +1,122 @@
+import time
+
+from PyQt5.QtWidgets import QWidget
+from PyQt5.QtWidgets import QDockWidget
+from PyQt5.QtWidgets import QVBoxLayout
+from PyQt5.QtWidgets import QHBoxLayout
+from PyQt5.QtWidgets import QCheckBox
+from PyQt5.QtWidgets import QPushButton
+from PyQt5.QtWidgets import QLineEdit
+from PyQt5.QtWidgets import QTableWidget
+from PyQt5.QtWidgets import QTableWidgetItem
+from PyQt5.QtWidgets import QHeaderView
+from PyQt5.QtWidgets import QTextEdit
+from PyQt5.QtWidgets import QSplitter
+
+from PyQt5.QtCore import Qt
+from PyQt5.QtCore import QTimer
+
+from galacteek.core.instrument import instruments
+
+
+class MetricsDock(QDockWidget):
+    """
+    Debug dock showing the latency histograms (see
+    galacteek.core.instrument) and the slow event loop callbacks
+    """
+
+    columns = ['Name', 'Count', 'Mean (ms)', 'p50 (ms)', 'p90 (ms)',
+               'p99 (ms)', 'Max (ms)']
+    keys = ['count', 'mean', 'p50', 'p90', 'p99', 'max']
+
+    def __init__(self, refreshInterval=2000, parent=None):
+        super().__init__('Metrics', parent)
+
+        self.setObjectName('metricsDock')
+
+        widget = QWidget()
+        layout = QVBoxLayout(widget)
+        hLayout = QHBoxLayout()
+
+        self.enableCheck = QCheckBox('Instrumentation')
+        self.enableCheck.setChecked(instruments.enabled)
+        self.enableCheck.toggled.connect(self.onToggled)
+
+        self.filterLine = QLineEdit()
+        self.filterLine.setPlaceholderText('Filter')
+        self.filterLine.textChanged.connect(self.refresh)
+
+        self.resetButton = QPushButton('Reset')
+        self.resetButton.clicked.connect(self.onReset)
+
+        hLayout.addWidget(self.enableCheck)
+        hLayout.addWidget(self.filterLine)
+        hLayout.addWidget(self.resetButton)
+
+        self.table = QTableWidget(0, len(self.columns))
+        self.table.setHorizontalHeaderLabels(self.columns)
+        self.table.setSortingEnabled(True)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.verticalHeader().hide()
+        self.table.horizontalHeader().setSectionResizeMode(
+            0, QHeaderView.Stretch)
+
+        self.slowView = QTextEdit()
+        self.slowView.setReadOnly(True)
+
+        splitter = QSplitter(Qt.Vertical)
+        splitter.addWidget(self.table)
+        splitter.addWidget(self.slowView)
+
+        layout.addLayout(hLayout)
+        layout.addWidget(splitter)
+
+        self.setWidget(widget)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(refreshInterval)
+
+    def onToggled(self, checked):
+        if checked:
+            instruments.enable()
+        else:
+            instruments.disable()
+
+    def onReset(self):
+        instruments.reset()
+        self.refresh()
+
+    def refresh(self):
+        if not self.isVisible():
+            return
+
+        self.enableCheck.blockSignals(True)
+        self.enableCheck.setChecked(instruments.enabled)
+        self.enableCheck.blockSignals(False)
+
+        filterText = self.filterLine.text().lower()
+        rows = [(name, hist.summary()) for name, hist in
+                list(instruments.histograms.items())
+                if filterText in name.lower()]
+
+        self.table.setSortingEnabled(False)
+        self.table.setRowCount(len(rows))
+
+        for row, (name, summary) in enumerate(rows):
+            self.table.setItem(row, 0, QTableWidgetItem(name))
+
+            for col, key in enumerate(self.keys, start=1):
+                item = QTableWidgetItem()
+                item.setData(Qt.DisplayRole, round(summary[key], 3))
+                self.table.setItem(row, col, item)
+
+        self.table.setSortingEnabled(True)
+
+        self.slowView.setPlainText('\n'.join(
+            '{date} {duration:8.1f} ms  {name}  ({location})'.format(
+                date=time.strftime('%H:%M:%S', time.localtime(cb['date'])),
+                duration=cb['duration'] * 1000,
+                name=cb['name'],
+                location=cb['location']
+            ) for cb in reversed(instruments.slowCallbacks)))
@@ -62,6 +62,7 @@ from galacteek.core.models.mfs import MFSItem
 from galacteek.core.models.mfs import MFSNameItem
 from galacteek.core.models.mfs import MFSTimeFrameItem
 from galacteek.core.models.mfs import MFSRootItem
+from galacteek.core.models.unixfs import unixFsEntriesFramed
 
 from galacteek.did.ipid import IPService
 
@@ -1936,19 +1937,22 @@ class FileManager(QWidget):
         else:
             parentItemHash = None
 
-        modelParent = None
-
         if autoexpand is True:
             self.mfsTree.expand(parentItem.index())
 
-        eCount = 0
-        async for entries in op.listStreamed(stat['Hash'], egenCount=16):
-            for entry in entries:
-                eCount += 1
-                entryExists = False
+        # Entries are regrouped in frames, and the entries of a frame
+        # are inserted in the model with one rows insertion per parent
+        eGenerator = op.listStreamed(stat['Hash'], egenCount=16)
 
-                if divmod(eCount, 8)[1] == 0:
-                    await asyncio.sleep(0)
+        async for frame in unixFsEntriesFramed(
+                op, eGenerator,
+                frameMaxEntries=cGet('fileManager.list.frameMaxEntries'),
+                frameMaxTime=cGet('fileManager.list.frameMaxTime')):
+            frameParents = []
+            frameDirs = []
+
+            for entry in frame:
+                entryExists = False
 
                 cidString = entry['Hash']
 
@@ -2030,45 +2034,56 @@ class FileManager(QWidget):
                     nItemName.path = posixIpfsPath.join(
                         parentItem.path, entry['Name'])
 
-                    # Store the entry in the item
-                    modelParent.storeEntry(nItemName, nItemSize)
-
-                    if 0:
-                        self.mfsTree.scrollTo(nItemName.index())
-
-                if entry['Type'] == 1:  # directory
-                    if autoexpand is True:
-                        self.mfsTree.setExpanded(nItemName.index(), True)
-
-                    if maxdepth > (depth + 1) or maxdepth == 0:
-                        # We used to await listPath() here but it sucks
-                        # tremendously if you have a dead CID in the MFS
-                        # which # will make the ls timeout and hang the
-                        # filemanager.
-                        # Instead, use listPathWithTimeout() in another task.
-                        # The FM status will be set to ready before potential
-                        # subfolders are being listed in background tasks,
-                        # which is fine
-
-                        coro = self.listPathWithTimeout(
-                            op,
-                            nItemName.path,
-                            nItemName,
-                            maxdepth=maxdepth, depth=depth + 1,
-                            timeout=timeout,
-                            searching=searching,
-                            subTask=subTask)
-
-                        if subTask is True:
-                            ensure(coro)
-                        else:
-                            # Used for searching (all directories are expanded)
-                            await coro
+                    # Queue the entry in the item
+                    modelParent.queueEntry(nItemName, nItemSize)
+
+                if modelParent not in frameParents:
+                    frameParents.append(modelParent)
+
+                if entry['Type'] == 1 and nItemName:  # directory
+                    frameDirs.append(nItemName)
+
+            # Insert the frame's entries
+            for modelParent in frameParents:
+                modelParent.flushEntries()
+
+            # Directories can be expanded or listed once in the model
+            for nItemName in frameDirs:
+                if autoexpand is True:
+                    self.mfsTree.setExpanded(nItemName.index(), True)
+
+                if maxdepth > (depth + 1) or maxdepth == 0:
+                    # We used to await listPath() here but it sucks
+                    # tremendously if you have a dead CID in the MFS
+                    # which # will make the ls timeout and hang the
+                    # filemanager.
+                    # Instead, use listPathWithTimeout() in another task.
+                    # The FM status will be set to ready before potential
+                    # subfolders are being listed in background tasks,
+                    # which is fine
+
+                    coro = self.listPathWithTimeout(
+                        op,
+                        nItemName.path,
+                        nItemName,
+                        maxdepth=maxdepth, depth=depth + 1,
+                        timeout=timeout,
+                        searching=searching,
+                        subTask=subTask)
+
+                    if subTask is True:
+                        ensure(coro)
+                    else:
+                        # Used for searching (all directories are expanded)
+                        await coro
 
+            for modelParent in frameParents:
                 if isinstance(modelParent, MFSTimeFrameItem):
                     if modelParent.isToday() or modelParent.isPast3Days():
                         self.mfsTree.expand(modelParent.index())
 
+            await asyncio.sleep(0)
+
         if autoexpand is True:
             self.mfsTree.expand(parentItem.index())
 
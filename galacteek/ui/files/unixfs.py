@@ -29,6 +29,7 @@ from PyQt5.QtCore import pyqtSignal
 
 from galacteek.core.models.unixfs import UnixFSEntryInfo
 from galacteek.core.models.unixfs import UnixFSDirectoryModel
+from galacteek.core.models.unixfs import unixFsEntriesFramed
 
 from galacteek.config import cParentGet
 
@@ -800,16 +801,15 @@ class IPFSHashExplorerWidget(QWidget):
         """
 
         # Settings
-        entryBatchCount = self.cUnixFs.list.entryBatchSize
+        frameMaxEntries = self.cUnixFs.list.frameMaxEntries
+        frameMaxTime = self.cUnixFs.list.frameMaxTime
         entryProgressEvery = self.cUnixFs.list.entryProgressEvery
-        entryProcessSleep = self.cUnixFs.list.entryProcessSleep
         entryListSleep = self.cUnixFs.list.entryListSleep
         genTimeout = self.cUnixFs.list.entryFetchTimeout
 
         eCount = 0  # entry count
-        wiStart, wiEnd = None, None
+        progressCount = 0
         startLt = self.app.loop.time()
-        stCount, stLt = None, None
 
         _cp, dePath, deExists = self.app.multihashDb.pathDirEntries(
             self.rootPath.objPath)
@@ -821,76 +821,44 @@ class IPFSHashExplorerWidget(QWidget):
         else:
             eGenerator = ipfsop.listStreamed(path, resolve_type)
 
-        fetching = True
-        while fetching:
-            try:
-                entries = await ipfsop.waitFor(
-                    eGenerator.__anext__(),
-                    genTimeout
+        # Entries are inserted in the model by frames (one rows insertion
+        # per frame), the model exposes them lazily to the view
+        async for frame in unixFsEntriesFramed(
+                ipfsop, eGenerator,
+                frameMaxEntries=frameMaxEntries,
+                frameMaxTime=frameMaxTime,
+                genTimeout=genTimeout):
+            eInfos = []
+
+            for entry in frame:
+                entryInfo = UnixFSEntryInfo(entry, self.rootHash)
+                entryInfo.mimeFromDb(self.app.mimeDb)
+                eInfos.append(entryInfo)
+
+            self.model.appendEntries(eInfos)
+            eCount += len(eInfos)
+
+            if eCount - progressCount >= entryProgressEvery:
+                progressCount = eCount
+
+                self.loadingCube.clip.setSpeed(
+                    min(
+                        self.loadingCube.clip.speed() + 5,
+                        400
+                    )
                 )
 
-                if entries is None:
-                    # No entries were produced
-                    raise UnixFSTimeoutError()
-
-                for entry in entries:
-                    if entry is None:
-                        continue
-
-                    eCount += 1
-
-                    rowCount = self.model.rowCount(QModelIndex())
-                    rowStart = max(0, rowCount - 1)
-                    rowEnd = rowStart + 1
-
-                    # Set start window index for the first time
-                    if wiStart is None:
-                        wiStart = self.model.index(rowStart, 0, QModelIndex())
-
-                    # Set end window index
-                    wiEnd = self.model.index(rowEnd, 0, QModelIndex())
-
-                    # Create the entry and add it to the model
-                    entryInfo = UnixFSEntryInfo(entry, self.rootHash)
-                    entryInfo.mimeFromDb(self.app.mimeDb)
-                    self.model.entries.append(entryInfo)
-
-                    # Emit dataChanged() periodically
-                    if divmod(eCount, entryBatchCount)[1] == 0:
-                        self.model.dataChanged.emit(wiStart, wiEnd)
+                entriesPerSec = int(
+                    eCount / max(self.app.loop.time() - startLt, 0.001))
+                self.setInfo(iLoadedEntries(eCount, entriesPerSec))
 
-                        # The model was refreshed, update the window index
-                        wiStart = self.model.index(rowStart, 0, QModelIndex())
-
-                    if divmod(eCount, entryProgressEvery)[1] == 0:
-                        self.loadingCube.clip.setSpeed(
-                            min(
-                                self.loadingCube.clip.speed() + 5,
-                                400
-                            )
-                        )
-
-                        stCount, stLt = eCount, self.app.loop.time()
-
-                        entriesPerSec = int(stCount / (stLt - startLt))
-                        self.setInfo(iLoadedEntries(eCount, entriesPerSec))
-
-                    await ipfsop.sleep(entryProcessSleep)
-
-                # Give it some deserved sleep
-                await ipfsop.sleep(entryListSleep)
-
-            except StopAsyncIteration:
-                fetching = False
+            # Give it some deserved sleep
+            await ipfsop.sleep(entryListSleep)
 
         #
-        # The CID was fully listed
-        # Emit dataChanged() and serialize the entries
+        # The CID was fully listed, serialize the entries
         #
 
-        if wiStart and wiEnd:
-            self.model.dataChanged.emit(wiStart, wiEnd)
-
         # Pin the directory
         # TODO: add a config section by mimetype, to decide what gets
         # pinned automatically
@@ -17,6 +17,7 @@ from galacteek import services
 from galacteek.core.modelhelpers import UneditableItem
 from galacteek import database
 from galacteek.config import cGet
+from galacteek.database.urlhistory import URLHistoryWriter
 
 
 from ..i18n import iUnknown
@@ -30,15 +31,29 @@ class ResultCategoryItem(UneditableItem):
 class URLHistory(QObject):
     historyConfigChanged = pyqtSignal(bool)
 
+    def __init__(self, parent=None):
+        super().__init__(parent)
+
+        self.writer = URLHistoryWriter(
+            flushInterval=cGet('writer.flushInterval'),
+            collapseWindow=cGet('writer.collapseWindow'),
+            cacheSize=cGet('writer.cacheSize'),
+            maxPending=cGet('writer.maxPending')
+        )
+
     @property
     def enabled(self):
         return cGet('enabled')
 
     def record(self, url, title):
         if self.enabled:
-            ensure(database.urlHistoryRecord(url, title))
+            self.writer.record(url, title)
+
+    async def flush(self):
+        await self.writer.flush()
 
     def clear(self):
+        self.writer.clear()
         ensure(database.urlHistoryClear())
 
     async def match(self, input):
@@ -87,6 +87,7 @@ from .widgets.toolbar import BasicToolBar
 from .widgets.torcontrol import TorControllerButton
 
 from .docks.appdock import *
+from .docks.metricsdock import MetricsDock
 
 from .dialogs import *
 from ..appsettings import *
@@ -647,6 +648,7 @@ class MainWindow(QMainWindow, KeyListener):
         self._app = app
         self._allTabs = []
         self._lastFeedMark = None
+        self.metricsDock = None
 
         self.menuBar().hide()
 
@@ -835,6 +837,8 @@ class MainWindow(QMainWindow, KeyListener):
         if self.app.debugEnabled:
             menu.addAction(settingsIcon, iEventLog(),
                            self.onOpenEventLog)
+            menu.addAction(settingsIcon, iMetrics(),
+                           self.onOpenMetrics)
 
         menu.addAction(getIcon('lock-and-key.png'), iKeys(),
                        self.onIpfsKeysClicked)
@@ -1118,6 +1122,14 @@ class MainWindow(QMainWindow, KeyListener):
     def onOpenEventLog(self):
         self.addEventLogTab(current=True)
 
+    def onOpenMetrics(self):
+        if not self.metricsDock:
+            self.metricsDock = MetricsDock(parent=self)
+            self.addDockWidget(Qt.RightDockWidgetArea, self.metricsDock)
+
+        self.metricsDock.show()
+        self.metricsDock.refresh()
+
     def onShowUserLogs(self, checked):
         lowerPos = self.mapToGlobal(QPoint(self.width(), self.height()))
 
@@ -1255,6 +1267,12 @@ class MainWindow(QMainWindow, KeyListener):
     def onPinItemsCount(self, count):
         statusMsg = iItemsInPinningQueue(count)
 
+        pinSet = self.app.ipfsCtx.pinSet
+        if pinSet.ready:
+            counts = pinSet.counts()
+            statusMsg += '\n' + iPinSetCounts(
+                counts['recursive'], counts['direct'], counts['indirect'])
+
         if count > 0:
             self.pinningStatusButton.setIcon(self.pinIconLoading)
             self.pinningStatusButton.setProperty('pinning', True)
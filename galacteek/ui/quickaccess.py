@@ -211,7 +211,8 @@ class QuickAccessToolBar(SmartToolBar,
             icon = await getIconFromIpfs(ipfsop, mIcon.objPath)
 
             if icon:
-                if not await ipfsop.isPinned(mIcon.objPath):
+                if not await ipfsop.isPinned(mIcon.objPath,
+                                             pinType='direct'):
                     log.debug(f'Pinning icon: {mIcon}')
 
                     await ipfsop.ctx.pin(mIcon.objPath)
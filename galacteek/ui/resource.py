@@ -40,6 +40,7 @@ from galacteek.ipfs.mimetype import MIMEType
 from galacteek.ipfs.mimetype import detectMimeType
 from galacteek.ipfs.mimetype import detectMimeTypeFromBuffer
 from galacteek.ipfs.mimetype import mimeTypeDagUnknown
+from galacteek.ipfs.mimetype import mimeTypeStreamEncrypted
 
 from galacteek.ipfs.cidhelpers import IPFSPath
 
@@ -246,12 +247,25 @@ class IPFSResourceOpener(QObject):
             )
             return
 
+        if mimeType == mimeTypeStreamEncrypted and not fromEncrypted:
+            # Streamed encryption (detected from the first chunk),
+            # decrypt to a temporary file
+            profile = ipfsop.ctx.currentProfile
+
+            if profile:
+                opened = await self.openStreamEncrypted(
+                    ipfsop, profile, ipfsPath)
+
+                if opened:
+                    return opened
+
         if mimeType.type == 'application/octet-stream' and not fromEncrypted:
             # Try to decode it with our key if it's a small file
             if statInfo is None:
                 statInfo = StatInfo(await ipfsop.objStat(rscPath, timeout=5))
 
             profile = ipfsop.ctx.currentProfile
+
             if profile and statInfo.valid and \
                     (statInfo.dataSmallerThan(megabytes(8)) or tryDecrypt):
                 data = await ipfsop.catObject(ipfsPath.objPath, timeout=30)
@@ -259,7 +273,18 @@ class IPFSResourceOpener(QObject):
                     # XXX
                     return
 
-                decrypted = await profile.rsaAgent.decrypt(data)
+                if profile.rsaAgent.rsaExec.isStreamEncrypted(data):
+                    # Streamed encryption (MIME type cached before
+                    # the format was detected)
+                    opened = await self.openStreamEncrypted(
+                        ipfsop, profile, ipfsPath)
+
+                    if opened:
+                        return opened
+
+                    decrypted = None
+                else:
+                    decrypted = await profile.rsaAgent.decrypt(data)
 
                 if decrypted:
                     #
@@ -376,6 +401,39 @@ class IPFSResourceOpener(QObject):
         else:
             await self.needUserConfirm.emit(ipfsPath, mimeType, False)
 
+    async def openStreamEncrypted(self, ipfsop, profile, ipfsPath):
+        """
+        Decrypts an object encrypted with the streamed encryption format
+        in a temporary file, imports it offline and opens it
+        """
+
+        tmpPath = await profile.rsaAgent.decryptStreamedToTmpFile(
+            ipfsPath.objPath)
+
+        if not tmpPath:
+            logUser.debug(
+                '{path}: decryption impossible'.format(path=ipfsPath))
+            return
+
+        try:
+            logUser.info('{path}: RSA OK'.format(path=ipfsPath))
+
+            # This one won't be announced or pinned
+            entry = await ipfsop.addPath(tmpPath, wrap=False,
+                                         offline=True, pin=False)
+        finally:
+            os.remove(tmpPath)
+
+        if not entry:
+            logUser.info(
+                '{path}: cannot import decrypted file'.format(
+                    path=ipfsPath))
+            return
+
+        return ensure(self.open(entry['Hash'],
+                                fromEncrypted=True,
+                                burnAfterReading=True))
+
     async def onNeedUserConfirm(self, ipfsPath, mimeType, secureFlag):
         await runDialogAsync(
             ResourceOpenConfirmDialog, ipfsPath, mimeType, secureFlag,
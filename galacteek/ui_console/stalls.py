@@ -0,0 +1,77 @@
+"""
+Console helpers to inspect the event loop stalls recorded by the
+stall watchdog (galacteek.core.stallwatch) of a running galacteek
+instance. The stalls are read from the instance's metrics endpoint
+(unix socket), the helpers are coroutines:
+
+    await stalls(stacks=True)
+    await stalls(profile='other')
+"""
+
+from pathlib import Path
+
+import aiohttp
+
+from PyQt5.QtCore import QStandardPaths
+
+from galacteek.core.stallwatch import stallsReport
+
+
+def metricsSocketPath(profile: str = 'main') -> Path:
+    """
+    Path of the metrics endpoint's socket of the instance running
+    with the given profile (in the metrics service's directory)
+    """
+
+    dataLocation = Path(QStandardPaths.writableLocation(
+        QStandardPaths.DataLocation))
+
+    return dataLocation.joinpath(
+        profile, 'services', 'core.metrics', 'metrics.sock')
+
+
+async def metricsRequest(path: str, method: str = 'GET',
+                         profile: str = 'main'):
+    """
+    Sends a request to the metrics endpoint and returns the JSON
+    response, or None if the endpoint can't be reached
+    """
+
+    sockPath = metricsSocketPath(profile)
+
+    try:
+        connector = aiohttp.UnixConnector(path=str(sockPath))
+
+        async with aiohttp.ClientSession(connector=connector) as session:
+            async with session.request(
+                    method, f'http://localhost{path}') as resp:
+                resp.raise_for_status()
+                return await resp.json()
+    except aiohttp.ClientError as err:
+        print(f'Cannot reach the metrics endpoint ({sockPath}): {err}')
+
+
+async def stalls(last: int = 10, stacks: bool = False,
+                 profile: str = 'main'):
+    """
+    Print the last recorded stalls (with the sampled stacks
+    if stacks is True)
+    """
+
+    snapshot = await metricsRequest('/stalls', profile=profile)
+
+    if snapshot:
+        print(stallsReport(snapshot, last=last, stacks=stacks))
+
+
+async def stallsRecords(profile: str = 'main'):
+    """
+    Returns the recorded stalls (list of dicts), oldest first
+    """
+
+    snapshot = await metricsRequest('/stalls', profile=profile)
+    return snapshot['records'] if snapshot else []
+
+
+async def stallsClear(profile: str = 'main'):
+    await metricsRequest('/stalls/clear', method='POST', profile=profile)
@@ -349,6 +349,7 @@ install_reqs_ui_pyqt_513 = reqs_parse('requirements-ui-pyqt-5.13.txt')
 install_reqs_ui_pyqt_515 = reqs_parse('requirements-ui-pyqt-5.15.txt')
 install_reqs_ld_schemas = reqs_parse('requirements-ld-schemas.txt')
 install_reqs_rdf_bsddb = reqs_parse('requirements-rdf-bsddb.txt')
+install_reqs_rdf_oxigraph = reqs_parse('requirements-rdf-oxigraph.txt')
 install_reqs_trafficshaping = reqs_parse('requirements-trafficshaping.txt')
 
 
@@ -380,6 +381,7 @@ setup(
         'ui-pyqt-5.13': install_reqs_ui_pyqt_513,
         'ui-pyqt-5.15': install_reqs_ui_pyqt_515,
         'rdf-bsddb': install_reqs_rdf_bsddb,
+        'rdf-oxigraph': install_reqs_rdf_oxigraph,
         'trafficshaping': install_reqs_trafficshaping,
         'matplotlib': install_reqs_extra_matplotlib,
         'docs': install_reqs_docs,
@@ -426,7 +428,9 @@ setup(
         'console_scripts': [
             'galacteek-eth-master = galacteek.entrypoints.ethtool:ethTool',
             'galacteek-rdfifier = galacteek.entrypoints.rdfifier:rdfifier',
-            'galacteek-eterna = galacteek.entrypoints.rdfifier:rdfifier'
+            'galacteek-eterna = galacteek.entrypoints.rdfifier:rdfifier',
+            'galacteek-pronto-migrate = '
+            'galacteek.entrypoints.prontostores:prontoStoresMigrate'
         ]
     },
     classifiers=[
@@ -0,0 +1,86 @@
+import tracemalloc
+from pathlib import Path
+
+from galacteek.config import cGet
+from galacteek.config import cSet
+from galacteek.config import cSetSavePath
+from galacteek.config import configHandle
+from galacteek.config import regConfigFromFile
+
+
+configYaml = '''
+envs:
+  default:
+    ops:
+      catObject:
+        timeout: 60
+      listObject:
+        timeout: 90
+    nsCache:
+      resolver:
+        maxInflight: 8
+    items:
+      - a
+      - b
+    home: ${oc.env:HOME}
+'''
+
+
+def registerConfig(tmpdir, mod):
+    cSetSavePath(Path(str(tmpdir.join('config'))))
+
+    path = Path(str(tmpdir.join(f'{mod}.yaml')))
+    path.write_text(configYaml)
+
+    return regConfigFromFile(mod, path, revmerge=True)
+
+
+class TestConfigHandles:
+    def test_handles(self, tmpdir):
+        mod = 'gtest.handles'
+        registerConfig(tmpdir, mod)
+
+        handle = configHandle(mod)
+        ops = handle.sub('ops')
+
+        assert ops.get('catObject').timeout == 60
+        assert ops.get('listObject.timeout') == 90
+        assert ops.get('unknown') is None
+        assert handle.get('nsCache.resolver.maxInflight') == 8
+        assert handle.get('items.1') == 'b'
+        assert handle.get('home') == cGet('home', mod=mod)
+        assert cGet('ops.catObject.timeout', mod=mod) == 60
+
+        # Changes invalidate the snapshots
+        cSet('ops.catObject.timeout', 120, mod=mod, noCallbacks=True)
+        assert ops.get('catObject.timeout') == 120
+        assert cGet('ops.catObject.timeout', mod=mod) == 120
+
+        cSet('ops.unknown', {'timeout': 5}, mod=mod, noCallbacks=True)
+        assert ops.get('unknown').timeout == 5
+
+    def test_lookup_allocations(self, tmpdir):
+        mod = 'gtest.bench'
+        cEntry = registerConfig(tmpdir, mod)
+        ops = configHandle(mod, prefix='ops')
+        rounds = 20000
+
+        ops.get('catObject')
+
+        # Lookups don't allocate
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+
+        for x in range(rounds):
+            ops.get('catObject')
+            ops.get('listObject')
+
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+
+        allocated = sum(
+            stat.size_diff for stat in after.compare_to(before, 'filename')
+            if stat.traceback[0].filename.endswith('config/__init__.py')
+        )
+        assert cEntry
+        assert allocated <= 0
@@ -0,0 +1,173 @@
+import pytest
+import os
+import struct
+from io import BytesIO
+
+from galacteek.crypto.rsa import RSAExecutor
+from galacteek.crypto.rsa import STREAM_RECORD_MAXLEN
+from galacteek.ipfs.encrypt import IpfsRSAAgent
+from galacteek.ipfs.ipfsops import IPFSOpRegistry
+
+
+@pytest.fixture
+def rsaExec():
+    return RSAExecutor()
+
+
+class CatOperator:
+    """
+    Operator serving the objects in a dict, for catChunked()
+    """
+
+    def __init__(self, objects):
+        self.objects = objects
+
+    async def catChunked(self, path, chunkSize=65535, chunkTimeout=30):
+        data = self.objects[path]
+
+        for cno, pos in enumerate(range(0, len(data), chunkSize)):
+            yield cno, data[pos:pos + chunkSize]
+
+
+@pytest.fixture
+def catOperator():
+    prev = IPFSOpRegistry.getDefault()
+    op = CatOperator({})
+    IPFSOpRegistry.regDefault(op)
+    yield op
+    IPFSOpRegistry.regDefault(prev)
+
+
+async def chunksOf(data, size):
+    for pos in range(0, len(data), size):
+        yield data[pos:pos + size]
+
+
+async def collect(agen):
+    return b''.join([chunk async for chunk in agen])
+
+
+class TestRSAStreams:
+    @pytest.mark.parametrize('size', [0, 1, 65536, 1048576 * 3 + 7])
+    @pytest.mark.asyncio
+    async def test_stream_roundtrip(self, rsaExec, size):
+        privKey, pubKey = await rsaExec.genKeys()
+        key = await rsaExec.importKey(privKey)
+        data = os.urandom(size)
+
+        encrypted = await collect(
+            rsaExec.encryptStream(chunksOf(data, 65536), pubKey))
+        assert rsaExec.isStreamEncrypted(encrypted)
+
+        # Decrypt with an input chunk size unrelated to the record size
+        decrypted = await collect(
+            rsaExec.decryptStream(chunksOf(encrypted, 1000), key))
+        assert decrypted == data
+
+    @pytest.mark.asyncio
+    async def test_stream_tampered(self, rsaExec):
+        privKey, pubKey = await rsaExec.genKeys()
+        key = await rsaExec.importKey(privKey)
+
+        encrypted = await collect(
+            rsaExec.encryptStream(chunksOf(os.urandom(4096), 1024), pubKey))
+
+        # Truncated stream (last record missing)
+        with pytest.raises(ValueError):
+            await collect(rsaExec.decryptStream(
+                chunksOf(encrypted[0:-1050], 4096), key))
+
+        # Altered ciphertext
+        altered = bytearray(encrypted)
+        altered[-20] ^= 0xff
+
+        with pytest.raises(ValueError):
+            await collect(rsaExec.decryptStream(
+                chunksOf(bytes(altered), 4096), key))
+
+    @pytest.mark.asyncio
+    async def test_stream_record_length(self, rsaExec):
+        privKey, pubKey = await rsaExec.genKeys()
+        key = await rsaExec.importKey(privKey)
+        data = os.urandom(STREAM_RECORD_MAXLEN + 10)
+
+        # Chunks larger than the max record length are split
+        encrypted = await collect(
+            rsaExec.encryptStream(chunksOf(data, len(data)), pubKey))
+        assert await collect(
+            rsaExec.decryptStream(chunksOf(encrypted, 65536), key)) == data
+
+        # A record announcing an oversized ciphertext is rejected
+        # without buffering it
+        hdrLen = 12 + key.size_in_bytes()
+        forged = encrypted[0:hdrLen] + struct.pack(
+            '>BI', 1, STREAM_RECORD_MAXLEN + 1)
+
+        with pytest.raises(ValueError):
+            await collect(rsaExec.decryptStream(
+                chunksOf(forged, 4096), key))
+
+
+class TestRSAAgent:
+    @pytest.mark.asyncio
+    async def test_stream_roundtrip(self, rsaExec, catOperator, tmpdir):
+        privKey, pubKey = await rsaExec.genKeys()
+        keyPath = tmpdir.join('priv.key')
+        keyPath.write_binary(privKey)
+
+        agent = IpfsRSAAgent(rsaExec, pubKey, str(keyPath))
+
+        data = os.urandom(1048576 * 2 + 100)
+        srcPath = tmpdir.join('src.bin')
+        srcPath.write_binary(data)
+
+        catOperator.objects['/ipfs/enc'] = await collect(
+            agent.encryptFileStreamed(str(srcPath), chunkSize=65536))
+
+        tmpPath = await agent.decryptStreamedToTmpFile('/ipfs/enc')
+        assert tmpPath is not None
+
+        with open(tmpPath, 'rb') as fd:
+            assert fd.read() == data
+
+        os.remove(tmpPath)
+
+
+class TestCryptoRuntime:
+    @pytest.mark.asyncio
+    async def test_keystore(self, rsaExec):
+        privKey, pubKey = await rsaExec.genKeys()
+
+        k1 = await rsaExec.importKeyCached(pubKey)
+        k2 = await rsaExec.importKeyCached(pubKey)
+        assert k1 is k2
+
+        key = await rsaExec.importKey(privKey)
+        sig = await rsaExec.pssSign(b'msg', key)
+
+        assert await rsaExec.pssVerif(b'msg', sig, pubKey) is True
+
+        metrics = rsaExec.runtime.metrics()
+        assert metrics['pool']['completed'] > 0
+        assert metrics['keyStore']['hits'] > 0
+
+    @pytest.mark.asyncio
+    async def test_batch(self, rsaExec):
+        privKey, pubKey = await rsaExec.genKeys()
+        key = await rsaExec.importKey(privKey)
+
+        messages = [os.urandom(64) for i in range(8)]
+        sigs = [await rsaExec.pssSign(msg, key) for msg in messages]
+        sigs[3] = sigs[2]
+
+        results = await rsaExec.pssVerifBatch(
+            [(msg, sig, pubKey) for msg, sig in zip(messages, sigs)])
+        assert results == [True] * 3 + [False] + [True] * 4
+
+        encs = [await rsaExec.encryptData(BytesIO(msg), pubKey)
+                for msg in messages]
+        encs[5] = b'garbage'
+
+        decs = await rsaExec.decryptBatch(encs, key)
+        assert decs[5] is None
+        assert decs[0:5] + decs[6:] == messages[0:5] + messages[6:]
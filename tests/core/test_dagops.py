@@ -0,0 +1,89 @@
+import asyncio
+import pytest
+
+from galacteek.ipfs.dag import DAGOperations
+from galacteek.ipfs.ipfsops import IPFSOpRegistry
+
+
+CID_ROOT = 'bafyreigtestroot'
+CID_A = 'bafyreigtesta'
+CID_B = 'bafyreigtestb'
+
+
+class ResolveOperator:
+    """
+    Operator resolving paths from a dict (path -> CID)
+    """
+
+    def __init__(self, paths):
+        self.paths = paths
+        self.resolved = []
+        self.active = 0
+        self.maxActive = 0
+
+    async def resolve(self, path, recursive=False):
+        self.active += 1
+        self.maxActive = max(self.active, self.maxActive)
+
+        try:
+            await asyncio.sleep(0.01)
+            self.resolved.append(path)
+            return '/ipfs/' + self.paths[path]
+        finally:
+            self.active -= 1
+
+
+@pytest.fixture
+def resolveOperator():
+    prev = IPFSOpRegistry.getDefault()
+    op = ResolveOperator({})
+    IPFSOpRegistry.regDefault(op)
+    yield op
+    IPFSOpRegistry.regDefault(prev)
+
+
+class MockDAG(DAGOperations):
+    def __init__(self, root):
+        self.dagCid = CID_ROOT
+        self.dagRoot = root
+
+
+class TestDAGOperations:
+    @pytest.mark.asyncio
+    async def test_resolve_many(self, resolveOperator):
+        dag = MockDAG({
+            'links': {
+                'a': {'/': CID_A}
+            },
+            'data': {
+                'b': 'value'
+            }
+        })
+        resolveOperator.paths[f'{CID_ROOT}/data/b'] = CID_B
+
+        resolved = await dag.resolveMany([
+            'links/a', 'data/b', 'data/missing'])
+
+        assert resolved == {
+            'links/a': CID_A,
+            'data/b': CID_B,
+            'data/missing': None
+        }
+
+        # IPLD links of the loaded DAG are not resolved by the daemon
+        assert sorted(resolveOperator.resolved) == [
+            f'{CID_ROOT}/data/b', f'{CID_ROOT}/data/missing']
+
+    @pytest.mark.asyncio
+    async def test_resolve_many_concurrency(self, resolveOperator):
+        dag = MockDAG({})
+        paths = [f'p{idx}' for idx in range(16)]
+
+        for path in paths:
+            resolveOperator.paths[f'{CID_ROOT}/{path}'] = CID_A
+
+        resolved = await dag.resolveMany(paths, concurrency=4)
+
+        assert len(resolved) == 16
+        assert all(cid == CID_A for cid in resolved.values())
+        assert resolveOperator.maxActive == 4
@@ -0,0 +1,67 @@
+import orjson
+import pytest
+
+from galacteek.ipfs.dagshards import DAGShardsWriter
+from galacteek.ipfs.dagshards import objFingerprint
+from galacteek.ipfs.dagshards import physicalPath
+from galacteek.ipfs.dagshards import readShards
+from galacteek.ipfs.dagshards import keyHamt
+
+
+class MemoryBlocks:
+    def __init__(self):
+        self.blocks = {}
+
+    async def put(self, node):
+        cid = 'cid' + objFingerprint(node)
+        self.blocks[cid] = orjson.dumps(node)
+        return cid
+
+    async def get(self, cid):
+        return orjson.loads(self.blocks[cid])
+
+
+class TestDAGShards:
+    @pytest.mark.asyncio
+    async def test_shards_write_read(self):
+        mem = MemoryBlocks()
+        writer = DAGShardsWriter(mem.put, minKeys=16, bucketKeys=8)
+
+        root = {
+            'params': {'a': 1},
+            'nodes': {f'node{i}': {'link': i} for i in range(200)}
+        }
+
+        stored, layout = await writer.write(root, ['nodes'])
+        assert layout == {'nodes': 2}
+        assert keyHamt in stored['nodes']
+        assert len(root['nodes']) == 200
+
+        puts = writer.puts
+        assert puts == len(stored['nodes'][keyHamt])
+
+        # Change one key: only its bucket is put again
+        root['nodes']['node5']['link'] = 'changed'
+        await writer.write(root, ['nodes'])
+        assert writer.puts == puts + 1
+
+        loaded, rlayout = await readShards(dict(stored), mem.get)
+        assert rlayout == layout
+        assert len(loaded['nodes']) == 200
+        assert loaded['nodes']['node5'] == {'link': 5}
+
+        path = physicalPath(layout, 'nodes/node7/link')
+        comps = path.split('/')
+        assert comps[0:2] == ['nodes', keyHamt]
+        assert comps[3:] == ['node7', 'link']
+
+    @pytest.mark.asyncio
+    async def test_small_maps_inline(self):
+        mem = MemoryBlocks()
+        writer = DAGShardsWriter(mem.put, minKeys=16)
+
+        root = {'nodes': {'a': 1}}
+        stored, layout = await writer.write(root, ['nodes'])
+
+        assert stored is root
+        assert layout == {}
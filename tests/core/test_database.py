@@ -1,8 +1,16 @@
+import asyncio
 import pytest
+from pathlib import Path
 
+from tortoise.transactions import in_transaction
 
 from galacteek import database
 from galacteek.database.models import *
+from galacteek.database.urlhistory import URLHistoryWriter
+from galacteek.database.connections import readPool
+from galacteek.database.connections import readDb
+from galacteek.database.connections import INDEXES
+from galacteek.database import bench
 from galacteek.hashmarks import *
 from galacteek.ipfs.cidhelpers import *
 from galacteek.core import iptags
@@ -100,8 +108,104 @@ class TestDatabase:
         assert visit.historyitem.id == item.id
         assert visit.historyitem.url == p.ipfsUrl
 
-        # TODO
-        await database.urlHistorySearch(title)
+        await database.urlHistoryRecord('https://example.org/docs', 'Docs')
+        await database.urlHistoryRecord('https://example.org/docs', 'Docs')
+        await database.urlHistoryRecord('https://example.org/blog', 'Blog')
+
+        res = await database.urlHistorySearch('brok')
+        assert res[0]['url'] == p.ipfsUrl
+        assert res[0]['title'] == title
+
+        res = await database.urlHistorySearch('exam')
+        assert [r['url'] for r in res] == [
+            'https://example.org/docs', 'https://example.org/blog']
+        assert res[0]['visits'] == 2
+        assert res[0]['frecency'] > res[1]['frecency']
+
+        assert len(await database.urlHistorySearch('example.org/bl')) == 1
+        assert await database.urlHistorySearch('nomatch') == []
+
+        await database.urlHistoryClear()
+        assert await database.urlHistorySearch('exam') == []
+
+        await database.closeOrm()
+
+    @pytest.mark.asyncio
+    async def test_hashmarks_search(self, dbpath):
+        await database.initOrm(dbpath)
+
+        await database.hashmarkAdd(
+            '/ipfs/QmT1TPVjdZ9CRnqwyQ9WygDoRgRRibFrEyWufenu92SuUV',
+            title='Interplanetary wiki',
+            description='Distributed planets encyclopedia')
+        mark = await database.hashmarkAdd(
+            'ens://planets.eth', title='Planets')
+
+        res = await database.hashmarksSearch('interplan')
+        assert len(res) == 1
+        assert res[0].title == 'Interplanetary wiki'
+
+        # Title matches rank first
+        res = await database.hashmarksSearch('plan')
+        assert [m.title for m in res] == ['Planets', 'Interplanetary wiki']
+
+        assert len(await database.hashmarksSearch('encyclo')) == 1
+        assert len(await database.hashmarksSearch('planets.eth')) == 1
+
+        mark.title = 'Moons'
+        await mark.save()
+        assert len(await database.hashmarksSearch('moon')) == 1
+
+        await database.hashmarkDelete('ens://planets.eth')
+        assert await database.hashmarksSearch('moon') == []
+
+        # Same score: the most visited hashmark ranks first
+        for idx, visits in enumerate([0, 50, 5]):
+            mark = await database.hashmarkAdd(
+                f'ens://comets{idx}.eth', title='Comets')
+            mark.visitcount = visits
+            await mark.save()
+
+        res = await database.hashmarksSearch('comets')
+        assert [m.visitcount for m in res] == [50, 5, 0]
+
+        await database.closeOrm()
+
+    @pytest.mark.asyncio
+    async def test_history_search_large(self, dbpath):
+        await database.initOrm(dbpath)
+
+        conn = database.fts.ftsConnection()
+        words = ['galaxy', 'planet', 'nebula', 'comet', 'orbit',
+                 'quasar', 'pulsar', 'meteor', 'aurora', 'zenith']
+
+        # 100k visits on 20k URLs
+        async with in_transaction() as tx:
+            await tx.execute_many(
+                'INSERT INTO urlhistoryitem (url, scheme, rootcidv, '
+                'datecreated) VALUES (?, ?, 0, datetime())',
+                [[f'https://{words[i % 10]}{i % 97}.org/{words[i % 7]}/{i}',
+                  'https'] for i in range(20000)]
+            )
+            await tx.execute_many(
+                'INSERT INTO urlhistoryvisit (title, dateaccess, '
+                'historyitem_id) VALUES (?, datetime("now", ?), ?)',
+                [[f'{words[i % 9]} {words[i % 4]}', f'-{i % 365} days',
+                  (i % 20000) + 1] for i in range(100000)]
+            )
+
+        rows = await conn.execute_query_dict(
+            'SELECT sum(visits) AS visits FROM urlhistory_frecency')
+        assert rows[0]['visits'] == 100000
+
+        # Latencies are measured by galacteek.database.bench
+        for query in ['h', 'https', 'gal', 'planet3', 'org/orb',
+                      'comet nebula', 'zenith9']:
+            res = await database.urlHistorySearch(query)
+            assert 0 < len(res) <= 16
+
+            frecencies = [entry['frecency'] for entry in res]
+            assert frecencies == sorted(frecencies, reverse=True)
 
         await database.closeOrm()
 
@@ -115,6 +219,133 @@ class TestDatabase:
         assert iptags.ipTagsFormat('@Mars#test') == '@Mars#test'
 
 
+class TestURLHistoryWriter:
+    @pytest.mark.asyncio
+    async def test_writer(self, dbpath):
+        await database.initOrm(dbpath)
+
+        writer = URLHistoryWriter(flushInterval=60, collapseWindow=30)
+
+        assert writer.record('https://example.org/a', 'A') is True
+        assert writer.record('https://example.org/a', 'A (2)') is False
+        assert writer.record('https://example.org/b', 'B') is True
+        assert writer.pendingCount == 2
+
+        assert await writer.flush() == 2
+        assert writer.pendingCount == 0
+
+        # Visited again within the collapse window
+        assert writer.record('https://example.org/a', 'A') is False
+
+        res = await database.urlHistorySearch('example')
+        assert len(res) == 2
+        assert {r['title'] for r in res} == {'A (2)', 'B'}
+        assert await URLHistoryVisit.all().count() == 2
+
+        # Item IDs are served from the cache. A stale ID makes the
+        # batch fail, the visits are written again with fresh IDs
+        writer.collapseWindow = 0
+        writer.record('https://example.org/a', 'A')
+        writer.record('https://example.org/c', 'C')
+        writer._itemIds['https://example.org/a'] = -1
+        assert await writer.flush() == 2
+        assert await URLHistoryVisit.filter(
+            historyitem_id=-1).count() == 0
+        assert writer._itemIds['https://example.org/a'] != -1
+        assert await URLHistoryVisit.all().count() == 4
+
+        writer.record('https://example.org/a', 'A')
+        await writer.flush()
+        assert await URLHistoryItem.all().count() == 3
+        assert await URLHistoryVisit.all().count() == 5
+
+        # Flushed when maxPending visits are queued
+        writer.maxPending = 4
+        for idx in range(4):
+            writer.record(f'https://example.org/p{idx}', 'P')
+
+        await asyncio.sleep(0.1)
+        assert writer.pendingCount == 0
+        assert await URLHistoryItem.all().count() == 7
+
+        await database.closeOrm()
+
+    @pytest.mark.asyncio
+    async def test_writer_failures(self, dbpath):
+        await database.initOrm(dbpath)
+
+        class Writer(URLHistoryWriter):
+            async def writeVisits(self, visits):
+                if 'https://example.org/bad' in visits:
+                    raise ValueError('Bad URL')
+
+                return await super().writeVisits(visits)
+
+        writer = Writer(flushInterval=60, maxAttempts=2)
+        writer.record('https://example.org/a', 'A')
+        writer.record('https://example.org/bad', 'Bad')
+        writer.record('https://example.org/b', 'B')
+
+        # Only the offending visit is queued again
+        assert await writer.flush() == 2
+        assert list(writer._pending.keys()) == ['https://example.org/bad']
+        assert await URLHistoryVisit.all().count() == 2
+
+        # Dropped after maxAttempts failures
+        assert await writer.flush() == 0
+        assert writer.pendingCount == 0
+
+        writer.clear()
+        await database.closeOrm()
+
+
+class TestDatabasePerf:
+    @pytest.mark.asyncio
+    async def test_profile(self, dbpath):
+        await database.initOrm(dbpath)
+
+        writer = database.fts.ftsConnection()
+        rows = await writer.execute_query_dict('PRAGMA journal_mode')
+        assert rows[0]['journal_mode'] == 'wal'
+        rows = await writer.execute_query_dict('PRAGMA synchronous')
+        assert rows[0]['synchronous'] == 1
+
+        rows = await writer.execute_query_dict(
+            "SELECT name FROM sqlite_master WHERE type = 'index'")
+        names = [row['name'] for row in rows]
+        for name, table, columns in INDEXES:
+            assert f'idx_{name}' in names
+
+        assert readPool.opened
+        reader = readDb()
+        assert reader is not writer
+
+        await database.hashmarkAdd('/ipfs/QmT1TPVjdZ9CRnqwyQ9WygDoRgRRibF'
+                                   'rEyWufenu92SuUV', title='Read me')
+        assert await database.hashmarksCount() == 1
+
+        with pytest.raises(Exception):
+            await reader.execute_script('DELETE FROM hashmark')
+
+        await database.closeOrm()
+        assert not readPool.opened
+
+    @pytest.mark.asyncio
+    async def test_bench(self, tmpdir):
+        results = await bench.benchmark(
+            Path(str(tmpdir.join('bench.sqlite3'))),
+            size=500, iterations=10)
+
+        assert 'History search' in results
+        assert 'History search (during writes)' in results
+
+        for name, (before, after) in results.items():
+            assert before > 0 and after > 0
+
+        report = bench.benchReport(results)
+        assert len(report.splitlines()) == len(results) + 1
+
+
 class TestCatalogLoader:
     @pytest.mark.asyncio
     async def test_modloader(self, dbpath):
@@ -0,0 +1,54 @@
+import pytest
+import asyncio
+
+from galacteek.ipfs import feeds
+
+
+class Feed:
+    def __init__(self, id):
+        self.id = id
+        self.resolvenext = None
+
+
+class TestFeedFollower:
+    @pytest.mark.asyncio
+    async def test_sync_pending(self, monkeypatch):
+        active = [Feed(n) for n in range(4)]
+
+        async def ipnsFeedsActive():
+            return active
+
+        monkeypatch.setattr(feeds.database, 'ipnsFeedsActive',
+                            ipnsFeedsActive)
+
+        follower = feeds.FeedFollower(None)
+        follower.scheduler.concurrency = 1
+        calls, running, overlaps = [], set(), []
+        stop = False
+
+        async def feedProcess(feedId):
+            if feedId in running:
+                overlaps.append(feedId)
+
+            running.add(feedId)
+            calls.append(feedId)
+
+            # Slow resolve, the other feeds wait for a slot
+            await asyncio.sleep(0.05)
+            running.discard(feedId)
+            return 3600
+
+        await follower.feedsSync()
+
+        task = asyncio.ensure_future(follower.scheduler.run(
+            feedProcess, shouldStop=lambda: stop, idleWait=0.02))
+
+        for i in range(10):
+            await asyncio.sleep(0.02)
+            await follower.feedsSync()
+
+        stop = True
+        await task
+
+        assert not overlaps
+        assert sorted(calls) == [0, 1, 2, 3]
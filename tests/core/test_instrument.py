@@ -0,0 +1,92 @@
+import asyncio
+import time
+import pytest
+
+from galacteek.core.instrument import Instruments
+from galacteek.core.instrument import LatencyHistogram
+from galacteek.core.instrument import nullTimer
+
+
+class Operator:
+    async def call(self, delay):
+        await asyncio.sleep(delay)
+        return delay
+
+    async def _private(self):
+        return True
+
+
+def blocking(seconds):
+    time.sleep(seconds)
+
+
+class TestInstrument:
+    def test_histogram(self):
+        hist = LatencyHistogram()
+
+        for value in range(1, 10001):
+            hist.record(value / 1000000)
+
+        assert hist.count == 10000
+        assert hist.max == 10000
+
+        # Relative error below 1/16
+        for pct in [50, 90, 99]:
+            expected = 10000 * pct / 100
+            assert abs(hist.percentile(pct) - expected) / expected < 0.0625
+
+        summary = hist.summary()
+        assert summary['count'] == 10000
+        assert summary['p99'] == pytest.approx(9.9, rel=0.0625)
+
+    @pytest.mark.asyncio
+    async def test_switch(self):
+        instruments = Instruments(slowCallbackThreshold=0.02,
+                                  lagInterval=0.01)
+        run = asyncio.events.Handle._run
+        call = Operator.call
+        private = Operator._private
+
+        instruments.instrumentClass(Operator, 'op')
+
+        # Disabled: no-op timers, nothing patched
+        assert instruments.timer('t') is nullTimer
+        assert Operator.call is call
+        assert asyncio.events.Handle._run is run
+
+        instruments.enable()
+
+        assert Operator.call is not call
+        assert Operator._private is private
+
+        with instruments.timer('block'):
+            await asyncio.sleep(0.01)
+
+        assert await Operator().call(0.01) == 0.01
+
+        async def stall():
+            blocking(0.05)
+
+        await asyncio.ensure_future(stall())
+        await asyncio.sleep(0.05)
+
+        assert instruments.histograms['block'].count == 1
+        assert instruments.histograms['op.call'].count == 1
+        assert 'loop.lag' in instruments.histograms
+
+        slow = [cb for cb in instruments.slowCallbacks
+                if cb['name'].endswith('stall')]
+        assert len(slow) == 1
+        assert slow[0]['duration'] >= 0.05
+        assert slow[0]['name'].startswith('task.')
+
+        assert 'op.call' in instruments.report()
+        assert 'name="op.call"' in instruments.exposition()
+
+        instruments.disable()
+
+        assert Operator.call is call
+        assert asyncio.events.Handle._run is run
+
+        await Operator().call(0)
+        assert instruments.histograms['op.call'].count == 1
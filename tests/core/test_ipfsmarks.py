@@ -1,3 +1,5 @@
+import asyncio
+import os
 import pytest
 
 
@@ -151,6 +153,67 @@ class TestMarks:
         assert bmarks.isValid()
         assert bmarks.insertMark(mark2, 'test/invalid') is False
 
+    @pytest.mark.asyncio
+    async def test_autosave(self, tmpdir):
+        path = str(tmpdir.join('bmsave'))
+        root = '/ipfs/QmT1TPVjdZ9CRnqwyQ9WygDoRgRRibFrEyWufenu92SuUV'
+
+        marks = IPFSMarks(path, autosave=True, backup=True, saveDelay=0.2)
+
+        # The changes are saved at once, after the delay
+        for idx in range(500):
+            assert marks.add(f'{root}/bulk/{idx}', title=f'Mark {idx}',
+                             category=f'bulk/c{idx % 10}')
+
+        assert marks.unsaved is True
+        assert not os.path.exists(path)
+
+        await asyncio.sleep(0.5)
+
+        assert marks.unsaved is False
+        assert not os.path.exists(path + '.tmp')
+        assert os.path.exists(path + '.bkp')
+
+        marks.add(f'{root}/last', title='Last')
+        await marks.flush()
+        assert marks.unsaved is False
+
+        loaded = IPFSMarks(path, autosave=False)
+        assert loaded.find(f'{root}/bulk/499').title == 'Mark 499'
+        assert loaded.find(f'{root}/last') is not None
+        assert len(loaded.getAll()) == 501
+
+        await asyncio.sleep(0.3)
+
+    @pytest.mark.asyncio
+    async def test_searchindex(self, bmarks):
+        root = '/ipfs/QmT1TPVjdZ9CRnqwyQ9WygDoRgRRibFrEyWufenu92SuUV'
+
+        for idx in range(2000):
+            bmarks.add(f'{root}/s/{idx}',
+                       title=f'Page {idx} planet{idx % 50}',
+                       description='Interplanetary' if idx % 2 else 'Docs',
+                       category=f'search/c{idx % 20}')
+
+        async def search(metadata):
+            return [mark.path async for mark in
+                    bmarks.searchAllByMetadata(metadata)]
+
+        assert len(await search({'title': 'planet7'})) == 40
+        assert len(await search({'title': 'PLANET49'})) == 40
+        assert len(await search({'title': 'planet4[0-9]'})) == 400
+        assert len(await search({'title': 'page 1999'})) == 1
+        assert len(await search({'description': 'planet'})) == 1000
+        assert len(await search({'path': 's/1999$'})) == 1
+        assert len(await search({'title': 'c++'})) == 0
+
+        # Changes invalidate the index
+        bmarks.delete(f'{root}/s/7')
+        assert len(await search({'title': 'planet7'})) == 39
+
+        bmarks.add(f'{root}/s/new', title='Planet7 again')
+        assert f'{root}/s/new' in await search({'title': 'planet7'})
+
 
 class TestHashPlones:
     @pytest.mark.parametrize(
@@ -0,0 +1,61 @@
+import sys
+
+import pytest
+
+from galacteek.core.lazyimport import lazyImport
+from galacteek.core.startupprof import StartupProfiler
+
+
+@pytest.fixture
+def modDir(tmpdir):
+    tmpdir.join('glazytest1.py').write(
+        'import sys\nsys.glazyLoaded = True\nvalue = 42\n')
+    tmpdir.join('glazytest2.py').write(
+        'import glazytest3\nvalue = glazytest3.value + 1\n')
+    tmpdir.join('glazytest3.py').write('value = 1\n')
+
+    sys.path.insert(0, str(tmpdir))
+    yield tmpdir
+    sys.path.remove(str(tmpdir))
+
+    for name in ['glazytest1', 'glazytest2', 'glazytest3']:
+        sys.modules.pop(name, None)
+
+    if hasattr(sys, 'glazyLoaded'):
+        del sys.glazyLoaded
+
+
+class TestLazyImport:
+    def test_lazy(self, modDir):
+        mod = lazyImport('glazytest1')
+        assert not hasattr(sys, 'glazyLoaded')
+        assert mod.value == 42
+        assert sys.glazyLoaded is True
+
+        assert lazyImport('glazytest1') is sys.modules['glazytest1']
+
+        with pytest.raises(ImportError):
+            lazyImport('glazytest_missing')
+
+    def test_profiler(self, modDir):
+        profiler = StartupProfiler()
+        profiler.install()
+
+        try:
+            import glazytest2  # noqa
+        finally:
+            profiler.uninstall()
+
+        profiler.mark('imported')
+        profiler.serviceStarted('core.test', 0.5)
+
+        assert 'glazytest2' in profiler.modules
+        assert 'glazytest3' in profiler.modules
+
+        cumulative, selfTime = profiler.modules['glazytest2']
+        assert cumulative >= profiler.modules['glazytest3'][0]
+        assert selfTime <= cumulative
+
+        report = profiler.report()
+        assert 'glazytest2' in report
+        assert 'core.test' in report
@@ -0,0 +1,76 @@
+import tarfile
+
+from rdflib import ConjunctiveGraph
+from rdflib import Graph
+from rdflib import Literal
+from rdflib import URIRef
+
+from galacteek.ld.rdf.bulk import DatasetBulkLoader
+from galacteek.ld.rdf.bulk import NTriplesTarReader
+
+
+dsUri = URIRef('urn:glk:datasets:test')
+revision = URIRef('ips://galacteek.ld/DataSet#revision')
+pred = URIRef('urn:p')
+
+
+def dsTar(tmpdir):
+    nt = tmpdir.join('ds.nt')
+    nt.write('\n'.join([
+        f'<{dsUri}> <{revision}> "2" .',
+        '<urn:s1> <urn:p> "new1" .',
+        '<urn:s2> <urn:p> "new2" .',
+        '_:b1 <urn:p> "bnode" .',
+        'invalid line'
+    ]))
+
+    path = str(tmpdir.join('ds.tar.gz'))
+    with tarfile.open(path, 'w:gz') as tar:
+        tar.add(str(nt), arcname='ds.nt')
+
+    return path
+
+
+def graph():
+    g = Graph(store=ConjunctiveGraph().store, identifier=URIRef('urn:g'))
+    g.add((URIRef('urn:s1'), pred, Literal('old')))
+    g.add((URIRef('urn:s3'), pred, Literal('keep')))
+    return g
+
+
+class TestDatasetBulkLoader:
+    def test_revision(self, tmpdir):
+        reader = NTriplesTarReader(dsTar(tmpdir))
+        assert reader.value(dsUri, revision) == Literal('2')
+
+    def test_merge_replace(self, tmpdir):
+        g = graph()
+        reader = NTriplesTarReader(dsTar(tmpdir))
+        loader = DatasetBulkLoader(g, batchSize=2)
+
+        assert loader.load(reader, 'mergeReplace') is True
+        assert reader.errors == 1
+        assert loader.count == 3
+        assert set(g.objects(URIRef('urn:s1'), pred)) == {Literal('new1')}
+        assert g.value(URIRef('urn:s3'), pred) == Literal('keep')
+
+    def test_replace(self, tmpdir):
+        g = graph()
+        loader = DatasetBulkLoader(g, batchSize=2)
+
+        assert loader.load(NTriplesTarReader(dsTar(tmpdir)), 'replace')
+        assert len(g) == 4
+        assert set(g.objects(URIRef('urn:s1'), pred)) == {Literal('new1')}
+
+        # User triples are kept
+        assert g.value(URIRef('urn:s3'), pred) == Literal('keep')
+        assert len(Graph(store=g.store, identifier=loader.stagingUri)) == 0
+
+    def test_purge(self, tmpdir):
+        g = graph()
+        loader = DatasetBulkLoader(g, batchSize=2)
+
+        assert loader.load(NTriplesTarReader(dsTar(tmpdir)), 'purge')
+        assert len(g) == 3
+        assert g.value(URIRef('urn:s3'), pred) is None
+        assert len(Graph(store=g.store, identifier=loader.stagingUri)) == 0
@@ -0,0 +1,102 @@
+import pytest
+
+from rdflib import ConjunctiveGraph
+from rdflib import Graph
+from rdflib import Literal
+from rdflib import URIRef
+from rdflib import plugin
+from rdflib.store import Store
+
+from galacteek.ld.rdf.migrate import storeCopy
+from galacteek.ld.sparql.native import OxigraphQueryBackend
+from galacteek.ld.sparql.native import valuesInline
+
+
+class TestNativeQueries:
+    def test_oxigraph_select(self):
+        pytest.importorskip('oxrdflib')
+
+        graph = Graph(store='Oxigraph', identifier=URIRef('urn:g'))
+        graph.bind('ex', 'urn:ex:')
+
+        for i in range(10):
+            graph.add((URIRef(f'urn:ex:s{i}'),
+                       URIRef('urn:ex:p'),
+                       Literal(i)))
+
+        backend = OxigraphQueryBackend(graph)
+        q = 'SELECT ?s ?o WHERE { ?s ex:p ?o . }'
+
+        native = backend.query(q)
+        assert sorted(native) == sorted(graph.query(q))
+
+        rows = list(backend.query(
+            q, initBindings={'s': URIRef('urn:ex:s3')}))
+        assert rows == [(URIRef('urn:ex:s3'), Literal(3))]
+
+        assert backend.query('ASK { ?s ex:p 9 }').askAnswer is True
+
+    def test_oxigraph_filter_bindings(self):
+        pytest.importorskip('oxrdflib')
+
+        graph = Graph(store='Oxigraph', identifier=URIRef('urn:g'))
+        graph.bind('ex', 'urn:ex:')
+
+        for i, title in enumerate(['Hello world', 'hello there', 'bye']):
+            graph.add((URIRef(f'urn:ex:s{i}'),
+                       URIRef('urn:ex:title'),
+                       Literal(title)))
+
+        backend = OxigraphQueryBackend(graph)
+
+        # The bound variable is only used in a filter (not projected)
+        q = """
+        SELECT ?s WHERE {
+          ?s ex:title ?title .
+          FILTER(regex(str(?title), str(?searchQuery), "i"))
+        }"""
+        bindings = {'searchQuery': Literal('hello')}
+
+        rows = sorted(backend.query(q, initBindings=bindings))
+        assert rows == [(URIRef('urn:ex:s0'),), (URIRef('urn:ex:s1'),)]
+        assert rows == sorted(graph.query(q, initBindings=bindings))
+
+        # Subquery
+        q = """
+        SELECT ?s { { SELECT ?s WHERE {
+          ?s ex:title ?title . FILTER(?title = ?t) } } }"""
+        rows = list(backend.query(q, initBindings={'t': Literal('bye')}))
+        assert rows == [(URIRef('urn:ex:s2'),)]
+
+
+class TestValuesInline:
+    def test_inline(self):
+        bindings = {'x': Literal('a"{')}
+
+        q = valuesInline(
+            'CONSTRUCT { ?s <urn:p> "{" } WHERE { ?s ?p ?x } # {',
+            bindings)
+        assert q == ('CONSTRUCT { ?s <urn:p> "{" } WHERE { '
+                     'VALUES (?x) { ("a\\"{") }  ?s ?p ?x } # {')
+
+        q = valuesInline('ASK { ?s ?p ?x }', bindings)
+        assert q.startswith('ASK { VALUES (?x)')
+
+        with pytest.raises(ValueError):
+            valuesInline('DESCRIBE <urn:s>', bindings)
+
+
+class TestStoreMigration:
+    def test_store_copy(self):
+        src = plugin.get('IOMemory', Store)()
+        dst = plugin.get('IOMemory', Store)()
+
+        for i in range(25):
+            Graph(store=src, identifier=URIRef(f'urn:g{i % 3}')).add((
+                URIRef(f'urn:s{i}'), URIRef('urn:p'), Literal(i)))
+
+        assert storeCopy(src, dst, batchSize=7) == 25
+
+        cgraph = ConjunctiveGraph(store=dst)
+        assert len(cgraph) == 25
+        assert len(list(cgraph.contexts())) == 3
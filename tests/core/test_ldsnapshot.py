@@ -0,0 +1,53 @@
+import gzip
+import pytest
+
+from rdflib import Graph
+from rdflib import Literal
+from rdflib import URIRef
+
+from galacteek.ld.rdf.snapshot import GraphSnapshotCache
+
+
+class TestGraphSnapshots:
+    @pytest.mark.asyncio
+    async def test_snapshot_cache(self):
+        graph = Graph()
+        graph.add((URIRef('urn:s'), URIRef('urn:p'), Literal('o')))
+
+        cache = GraphSnapshotCache(graph, minAge=0)
+
+        s1 = await cache.snapshot('nt')
+        s2 = await cache.snapshot('nt')
+        assert s1 is s2
+
+        with gzip.open(str(s1.path), 'rb') as fd:
+            parsed = Graph().parse(data=fd.read().decode(), format='nt')
+            assert len(parsed) == 1
+
+        s1.release()
+        s2.release()
+
+        graph.add((URIRef('urn:s'), URIRef('urn:p'), Literal('o2')))
+
+        s3 = await cache.snapshot('nt')
+        assert s3 is not s1
+        assert not s1.path.exists()
+
+        s3.release()
+
+    @pytest.mark.asyncio
+    async def test_snapshot_cache_close(self):
+        graph = Graph()
+        graph.add((URIRef('urn:s'), URIRef('urn:p'), Literal('o')))
+
+        cache = GraphSnapshotCache(graph, minAge=0)
+
+        snapshot = await cache.snapshot('nt')
+        sdir = cache.snapshotsDir
+        snapshot.release()
+
+        assert snapshot.path.exists()
+
+        cache.close()
+        assert not snapshot.path.exists()
+        assert not sdir.exists()
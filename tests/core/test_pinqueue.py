@@ -0,0 +1,106 @@
+import asyncio
+import pytest
+
+from galacteek.ipfs.ipfsops import IPFSOpRegistry
+from galacteek.ipfs.pinning.bounded import BoundedPinQueue
+
+
+class PinOperator:
+    """
+    Operator whose pins only complete once the release event is set
+    """
+
+    def __init__(self):
+        self.pinned = []
+        self.active = 0
+        self.maxActive = 0
+        self.release = asyncio.Event()
+
+    async def pin(self, cid, recursive=False, timeout=0):
+        self.active += 1
+        self.maxActive = max(self.active, self.maxActive)
+
+        try:
+            await self.release.wait()
+            self.pinned.append((cid, recursive))
+            return True
+        finally:
+            self.active -= 1
+
+
+@pytest.fixture
+def pinOperator():
+    prev = IPFSOpRegistry.getDefault()
+    op = PinOperator()
+    IPFSOpRegistry.regDefault(op)
+    yield op
+    IPFSOpRegistry.regDefault(prev)
+
+
+class TestBoundedPinQueue:
+    @pytest.mark.asyncio
+    async def test_workers_bound(self, pinOperator):
+        queue = BoundedPinQueue(workers=2, maxsize=16)
+
+        for idx in range(8):
+            await queue.submit(f'cid{idx}')
+
+        await asyncio.sleep(0.1)
+        assert pinOperator.active == 2
+
+        pinOperator.release.set()
+        await asyncio.wait_for(queue.join(), 5)
+
+        assert pinOperator.maxActive == 2
+        assert len(pinOperator.pinned) == 8
+        queue.stop()
+
+    @pytest.mark.asyncio
+    async def test_duplicates(self, pinOperator):
+        queue = BoundedPinQueue(workers=1, maxsize=16)
+
+        await queue.submit('cid0', recursive=True)
+        await queue.submit('cid0', recursive=True)
+        await queue.submit('cid1')
+        await queue.submit('cid0')
+
+        pinOperator.release.set()
+        await asyncio.wait_for(queue.join(), 5)
+
+        assert pinOperator.pinned == [('cid0', True), ('cid1', False)]
+
+        # Once pinned, the CID can be submitted again
+        await queue.submit('cid0')
+        await asyncio.wait_for(queue.join(), 5)
+        assert len(pinOperator.pinned) == 3
+        queue.stop()
+
+    @pytest.mark.asyncio
+    async def test_backpressure(self, pinOperator):
+        queue = BoundedPinQueue(workers=1, maxsize=1)
+
+        # The worker takes cid0, cid1 fills the queue
+        await queue.submit('cid0')
+        await asyncio.sleep(0.05)
+        await queue.submit('cid1')
+
+        blocked = asyncio.ensure_future(queue.submit('cid2'))
+        await asyncio.sleep(0.1)
+        assert not blocked.done()
+
+        # A cancelled submission is not left pending
+        blocked.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await blocked
+
+        blocked = asyncio.ensure_future(queue.submit('cid2'))
+        await asyncio.sleep(0.1)
+        assert not blocked.done()
+
+        pinOperator.release.set()
+        await asyncio.wait_for(blocked, 5)
+        await asyncio.wait_for(queue.join(), 5)
+
+        assert [cid for cid, r in pinOperator.pinned] == [
+            'cid0', 'cid1', 'cid2']
+        queue.stop()
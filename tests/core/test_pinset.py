@@ -0,0 +1,96 @@
+import asyncio
+import pytest
+
+from galacteek.ipfs.pinning.pinset import PinSetIndex
+
+
+CID_A = 'bafybeigdyrzt5sfp7udm7hu76uh7y26nf3efuylqabf3oclgtqy55fbzdi'
+CID_B = 'bafkreihdwdcefgh4dqkjv67uzcmw7ojee6xedzdetojuzjevtenxquvyku'
+CID_C = 'QmPZ9gcCEpqKTo6aq61g2nXGUhM4iCL3ewB6LDXZCtioEB'
+
+
+class MockOperator:
+    def __init__(self, pins):
+        self.pins = pins
+        self.listing = asyncio.Event()
+        self.proceed = asyncio.Event()
+        self.proceed.set()
+
+    async def pinLsStream(self, pinType):
+        self.listing.set()
+        await self.proceed.wait()
+
+        for cid, ptype in self.pins:
+            if ptype == pinType:
+                yield {'Cid': cid, 'Type': ptype}
+
+
+class TestPinSetIndex:
+    @pytest.mark.asyncio
+    async def test_pinset(self):
+        op = MockOperator([(CID_A, 'recursive'), (CID_C, 'indirect')])
+        index = PinSetIndex(indirect=True)
+
+        assert not index.ready
+        assert await index.load(op)
+        assert index.ready
+
+        assert index.isPinned(CID_A)
+        assert index.isPinned(CID_A, pinType='recursive')
+        assert not index.isPinned(CID_A, pinType='direct')
+        assert index.isPinned(CID_C, pinType='indirect')
+        assert not index.isPinned(CID_B)
+
+        index.add([CID_B], pinType='direct')
+        assert index.isPinned(CID_B, pinType='direct')
+        assert index.counts() == {
+            'recursive': 1, 'direct': 1, 'indirect': 1}
+
+        index.remove([CID_A])
+        assert not index.isPinned(CID_A)
+
+    @pytest.mark.asyncio
+    async def test_changes_during_reload(self):
+        op = MockOperator([(CID_A, 'recursive')])
+        op.proceed.clear()
+
+        index = PinSetIndex(indirect=False)
+        task = asyncio.ensure_future(index.load(op))
+
+        await op.listing.wait()
+        index.add([CID_B], pinType='recursive')
+        op.proceed.set()
+
+        await task
+
+        assert index.isPinned(CID_A)
+        assert index.isPinned(CID_B)
+
+    @pytest.mark.asyncio
+    async def test_lookup(self):
+        op = MockOperator([(CID_A, 'recursive'), (CID_C, 'indirect')])
+
+        index = PinSetIndex()
+        assert await index.load(op)
+
+        assert index.lookup(CID_A) is True
+        assert index.lookup(CID_A, pinType='direct') is False
+        assert index.lookup(CID_B, pinType='recursive') is False
+
+        # Indirect pins not indexed: ask the daemon
+        assert index.lookup(CID_C) is None
+        assert index.lookup(CID_B, pinType='indirect') is None
+
+        index = PinSetIndex(indirect=True)
+        assert await index.load(op)
+
+        assert index.lookup(CID_C, pinType='indirect') is True
+        assert index.lookup(CID_B) is False
+
+        # Unpinning a DAG makes the indirect pins stale until reloaded
+        index.remove([CID_A])
+        assert index.lookup(CID_A) is None
+        assert index.lookup(CID_C) is None
+
+        assert await index.load(op)
+        assert index.lookup(CID_C) is True
@@ -0,0 +1,116 @@
+import pytest
+import random
+
+from rdflib import BNode
+from rdflib import Graph
+from rdflib import Literal
+from rdflib import RDF
+from rdflib import URIRef
+
+from galacteek.ld.rdf.sync.cfg import GraphReconcileSyncConfig
+from galacteek.ld.rdf.sync.reconcile import SEC
+from galacteek.ld.rdf.sync.reconcile import GraphReconcileSynchronizer
+from galacteek.ld.rdf.sync.reconcile import graphRecords
+from galacteek.ld.rdf.sync.reconcile.buckets import IDBuckets
+from galacteek.ld.rdf.sync.reconcile.buckets import reconcile
+
+
+class TestReconcile:
+    @pytest.mark.parametrize('missingCount', [0, 1, 50])
+    @pytest.mark.asyncio
+    async def test_reconcile(self, missingCount):
+        ids = [f'urn:ontolorecord:{n}' for n in range(5000)]
+        missing = random.sample(ids, missingCount)
+
+        remote = IDBuckets(ids)
+        local = IDBuckets(i for i in ids if i not in missing)
+        local.add('urn:ontolorecord:localonly')
+
+        exchanged = []
+
+        async def remoteSummary(prefixes, depth):
+            summary = remote.summary(prefixes, depth)
+            exchanged.append(len(summary))
+            return summary
+
+        async def remoteIds(prefixes):
+            ids = remote.ids(prefixes)
+            exchanged.append(len(ids))
+            return ids
+
+        result = await reconcile(local, remoteSummary, remoteIds,
+                                 depth=2, maxBucketIds=32)
+
+        assert sorted(result) == sorted(missing)
+
+        # Cost depends on the difference, not on the size of the sets
+        assert sum(exchanged) < 256 + ((missingCount + 1) * (256 + 32))
+
+    def test_summary(self):
+        buckets = IDBuckets(f'urn:ontolorecord:{n}' for n in range(2000))
+        summary = buckets.summary([''], 2)
+
+        assert sum(count for count, digest in summary.values()) == 2000
+
+        prefixes = sorted(summary.keys())[0:3]
+        sub = buckets.summary(prefixes, 1)
+
+        assert all(key[0:2] in prefixes for key in sub)
+        assert sum(count for count, digest in sub.values()) == \
+            sum(summary[p][0] for p in prefixes)
+        assert len(buckets.ids(prefixes)) == \
+            sum(summary[p][0] for p in prefixes)
+
+        # The cached summaries are invalidated by changes
+        buckets.add('urn:ontolorecord:new')
+        assert sum(count for count, digest in
+                   buckets.summary([''], 2).values()) == 2001
+
+    def test_records(self):
+        graph = Graph()
+        record = URIRef('urn:ontolorecord:1')
+        signature = BNode()
+
+        graph.add((record, SEC.signature, signature))
+        graph.add((signature, SEC.signatureValue, Literal('jws')))
+        graph.add((record, URIRef('urn:p'), Literal(1)))
+        graph.add((URIRef('urn:ontolorecord:2'), URIRef('urn:p'), Literal(2)))
+
+        rgraph = graphRecords(graph, [str(record)])
+
+        assert len(rgraph) == 3
+        assert rgraph.value(rgraph.value(record, SEC.signature),
+                            SEC.signatureValue) == Literal('jws')
+
+    @pytest.mark.parametrize('verify', [False, True])
+    @pytest.mark.asyncio
+    async def test_records_accepted(self, verify):
+        rtype = 'urn:type:record'
+        graph = Graph()
+
+        for n in range(3):
+            record = URIRef(f'urn:ontolorecord:{n}')
+            graph.add((record, RDF.type, URIRef(rtype)))
+            graph.add((record, URIRef('urn:p'), Literal(n)))
+
+        # Triples about a subject that was not requested
+        graph.add((URIRef('urn:other'), URIRef('urn:p'), Literal('x')))
+
+        sync = GraphReconcileSynchronizer(GraphReconcileSyncConfig(
+            recordType=rtype, verifySignatures=verify))
+
+        async def recordsVerified(ipfsop, records, graph):
+            return [uri for uri in records
+                    if uri != URIRef('urn:ontolorecord:1')]
+
+        sync.recordsVerified = recordsVerified
+
+        rgraph = await sync.recordsAccepted(
+            None, ['urn:ontolorecord:0', 'urn:ontolorecord:1'], graph)
+
+        subjects = set(str(s) for s in rgraph.subjects())
+
+        if verify:
+            assert subjects == {'urn:ontolorecord:0'}
+        else:
+            assert subjects == {'urn:ontolorecord:0', 'urn:ontolorecord:1'}
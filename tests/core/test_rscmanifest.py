@@ -0,0 +1,82 @@
+import pytest
+
+from pathlib import Path
+
+from galacteek.ipfs.rscmanifest import ResourceManifest
+
+
+class MockOperator:
+    def __init__(self):
+        self.added = 0
+        self.published = 0
+        self.pinned = set()
+
+    async def nodeId(self):
+        return '12D3KooWTest'
+
+    async def isPinned(self, cid, pinType=None):
+        return cid in self.pinned
+
+    async def addPath(self, path, **kw):
+        self.added += 1
+        cid = f'bafy{self.added}'
+        self.pinned.add(cid)
+        return {'Name': Path(path).name, 'Hash': cid}
+
+    async def addBytes(self, data, **kw):
+        return await self.addPath('bytes')
+
+    async def publish(self, path, key='self', **kw):
+        self.published += 1
+        return {'Name': key, 'Value': path}
+
+
+class TestResourceManifest:
+    @pytest.mark.asyncio
+    async def test_manifest(self, tmpdir):
+        root = Path(str(tmpdir)).joinpath('tree')
+        root.joinpath('sub').mkdir(parents=True)
+        root.joinpath('a.txt').write_text('a')
+        root.joinpath('sub', 'b.txt').write_text('b')
+
+        mPath = Path(str(tmpdir)).joinpath('manifest.json')
+        op = MockOperator()
+
+        manifest = ResourceManifest(mPath)
+        entry = await manifest.addPath(op, 'tree', root, recursive=True)
+        assert entry['Hash'] == 'bafy1'
+
+        # Unchanged: reused, also after reloading the manifest
+        manifest = ResourceManifest(mPath)
+        entry = await manifest.addPath(op, 'tree', root, recursive=True)
+        assert entry['Hash'] == 'bafy1'
+        assert op.added == 1
+
+        # Different import options
+        await manifest.addPath(op, 'tree', root, recursive=False)
+        assert op.added == 2
+
+        root.joinpath('sub', 'b.txt').write_text('b2')
+        entry = await manifest.addPath(op, 'tree', root, recursive=False)
+        assert entry['Hash'] == 'bafy3'
+
+        # Removed from the repo
+        op.pinned.clear()
+        await manifest.addPath(op, 'tree', root, recursive=False)
+        assert op.added == 4
+
+        await manifest.addBytes(op, 'qrc:/icon.png', b'icon')
+        await manifest.addBytes(op, 'qrc:/icon.png', b'icon')
+        assert op.added == 5
+
+    @pytest.mark.asyncio
+    async def test_publish(self, tmpdir):
+        op = MockOperator()
+        manifest = ResourceManifest(Path(str(tmpdir)).joinpath('m.json'))
+
+        assert await manifest.publish(op, 'bafy1', 'galacteek.ld')
+        assert await manifest.publish(op, 'bafy1', 'galacteek.ld')
+        assert op.published == 1
+
+        await manifest.publish(op, 'bafy2', 'galacteek.ld')
+        assert op.published == 2
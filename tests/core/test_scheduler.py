@@ -0,0 +1,107 @@
+import pytest
+import asyncio
+
+from galacteek.core.asynclib.scheduler import DueScheduler
+
+
+class TestDueScheduler:
+    @pytest.mark.asyncio
+    async def test_schedule_backoff(self):
+        sched = DueScheduler(concurrency=2, interval=0.05,
+                             backoffFactor=2, backoffMax=0.2)
+        calls = []
+        running, maxRunning = 0, 0
+        stop = False
+
+        async def handler(key):
+            nonlocal running, maxRunning
+
+            running += 1
+            maxRunning = max(maxRunning, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+            calls.append(key)
+            return key != 'unresponsive'
+
+        for key in ['a', 'b', 'c', 'unresponsive']:
+            sched.schedule(key)
+
+        task = asyncio.ensure_future(
+            sched.run(handler, shouldStop=lambda: stop, idleWait=0.05))
+
+        await asyncio.sleep(0.4)
+        stop = True
+        await task
+
+        assert maxRunning == 2
+        assert calls.count('a') > calls.count('unresponsive')
+        assert sched.failures('unresponsive') > 0
+        assert sched.failures('a') == 0
+
+    def test_due_order(self):
+        now = 0
+        sched = DueScheduler(clock=lambda: now)
+
+        sched.schedule('late', 10)
+        sched.schedule('soon', 5)
+        sched.schedule('now')
+
+        assert sched.popDue() == ['now']
+
+        now = 11
+        assert sched.popDue() == ['soon', 'late']
+
+        sched.schedule('x', 1)
+        sched.remove('x')
+        assert 'x' not in sched
+        assert sched.nextDueIn() is None
+
+    def test_failures(self):
+        now = 0
+        sched = DueScheduler(interval=10, backoffFactor=2,
+                             backoffMax=100, clock=lambda: now)
+
+        sched.reschedule('feed', False)
+        sched.reschedule('feed', False)
+        assert sched.failures('feed') == 2
+        assert sched.backoffDelay('feed') == 40
+
+        # A custom delay keeps the failures count until cleared
+        sched.reschedule('feed', 3600)
+        assert sched.failures('feed') == 2
+
+        sched.clearFailures('feed')
+        assert sched.failures('feed') == 0
+        assert not sched.isRunning('feed')
+
+    @pytest.mark.asyncio
+    async def test_pending_running(self):
+        sched = DueScheduler(concurrency=1, interval=10)
+        running = {}
+        maxRunning = {}
+        stop = False
+
+        async def handler(key):
+            running[key] = running.get(key, 0) + 1
+            maxRunning[key] = max(maxRunning.get(key, 0), running[key])
+            await asyncio.sleep(0.05)
+            running[key] -= 1
+
+        sched.schedule('a')
+        sched.schedule('b')
+
+        task = asyncio.ensure_future(
+            sched.run(handler, shouldStop=lambda: stop, idleWait=0.05))
+
+        await asyncio.sleep(0.02)
+
+        # 'b' waits for a slot: it's neither scheduled nor free
+        assert 'b' not in sched
+        assert sched.isRunning('b')
+
+        await asyncio.sleep(0.15)
+        stop = True
+        await task
+
+        assert maxRunning == {'a': 1, 'b': 1}
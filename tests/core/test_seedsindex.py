@@ -0,0 +1,61 @@
+import re
+
+from galacteek.core import parseDate
+from galacteek.core.edags.seedsindex import SeedsIndex
+from galacteek.core.edags.seedsindex import regexpLiterals
+from galacteek.core.edags.seedsindex import seedsDagEntries
+
+
+def seedsMap(names, date='2021-06-01T10:00:00Z', tags=None):
+    return {
+        'all': {
+            name: [{
+                '_metadata': {
+                    'datecreated': date,
+                    'tags': tags if tags else [],
+                    'keywords': []
+                },
+                'seedlink': {'/': f'bafy{idx}'}
+            }]
+            for idx, name in enumerate(names)
+        }
+    }
+
+
+class TestSeedsIndex:
+    def test_literals(self):
+        assert regexpLiterals(re.compile('linux.*iso')) == ['linux', 'iso']
+        assert regexpLiterals(re.compile('deb|rpm')) == []
+        assert regexpLiterals(re.compile('a.b')) == []
+
+    def test_search(self):
+        index = SeedsIndex()
+        index.indexNode('udh1', 'cid1', seedsDagEntries(
+            'udh1', seedsMap(['Debian ISO', 'Music album'])))
+        index.indexNode('udh2', 'cid2', seedsDagEntries(
+            'udh2', seedsMap(['Linux kernel'], tags=['debian'],
+                             date='2020-01-01T10:00:00Z')))
+
+        def names(regexp, **kw):
+            return sorted(e.name for e in index.search(
+                re.compile(regexp, re.IGNORECASE), **kw))
+
+        assert names('debian') == ['Debian ISO', 'Linux kernel']
+        assert names('deb.*iso') == ['Debian ISO']
+        assert names('album|kernel') == ['Linux kernel', 'Music album']
+        assert names('debian', nodes={'udh1'}) == ['Debian ISO']
+
+        assert names(
+            'debian',
+            dateFrom=parseDate('2021-01-01T00:00:00Z'),
+            dateTo=parseDate('2022-01-01T00:00:00Z')) == ['Debian ISO']
+
+        # Reindex a node
+        index.indexNode('udh1', 'cid1b', seedsDagEntries(
+            'udh1', seedsMap(['Fedora ISO'])))
+        assert index.nodeCid('udh1') == 'cid1b'
+        assert names('iso') == ['Fedora ISO']
+        assert len(index) == 2
+
+        index.removeNode('udh2')
+        assert names('kernel') == []
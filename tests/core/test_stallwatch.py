@@ -0,0 +1,63 @@
+import asyncio
+import threading
+import time
+import pytest
+
+from galacteek.core.instrument import instruments
+from galacteek.core.stallwatch import StallWatchdog
+from galacteek.core.stallwatch import stallsReport
+
+
+def blockingWork(seconds):
+    time.sleep(seconds)
+
+
+class TestStallWatchdog:
+    @pytest.mark.asyncio
+    async def test_stall(self, monkeypatch):
+        recorded = []
+        monkeypatch.setattr(
+            instruments, 'record',
+            lambda name, seconds: recorded.append(
+                (name, threading.get_ident()))
+        )
+
+        watchdog = StallWatchdog(threshold=0.05, interval=0.02,
+                                 sampleInterval=0.002)
+        watchdog.start()
+
+        async def stalling():
+            blockingWork(0.3)
+
+        try:
+            # No stall
+            await asyncio.sleep(0.2)
+            assert len(watchdog.records) == 0
+
+            await asyncio.ensure_future(stalling())
+            await asyncio.sleep(0.1)
+        finally:
+            watchdog.stop()
+
+        assert watchdog.running is False
+        assert len(watchdog.records) == 1
+
+        # The stall duration is recorded from the loop's thread
+        assert recorded == [('loop.stall', threading.get_ident())]
+
+        record = watchdog.records[0]
+        assert record['duration'] >= 0.25
+        assert record['samples'] > 0
+        assert record['coroutine'].endswith('stalling')
+        assert 'blockingWork' in record['site']
+        assert 'blockingWork' in record['stack'][0]
+
+        report = watchdog.report(stacks=True)
+        assert '1 stall(s) detected' in report
+        assert 'stalling' in report
+
+        # Snapshot, as served by the metrics endpoint
+        snapshot = watchdog.snapshot()
+        assert snapshot['count'] == 1
+        assert snapshot['records'] == [record]
+        assert stallsReport(snapshot, stacks=True) == report
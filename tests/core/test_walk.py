@@ -0,0 +1,98 @@
+import asyncio
+import pytest
+
+from galacteek.ipfs.walk import UnixFSWalker
+from galacteek.ipfs.walk import TYPE_DIRECTORY
+from galacteek.ipfs.walk import TYPE_FILE
+
+
+def mockTree(dirs=4, files=3, depth=3):
+    tree = {}
+
+    def build(path, level):
+        links = []
+        for idx in range(files):
+            links.append({'Name': f'f{idx}', 'Hash': f'{path}-f{idx}',
+                          'Type': TYPE_FILE, 'Size': idx * 10})
+
+        if level < depth:
+            for idx in range(dirs):
+                name = f'd{idx}'
+                links.append({'Name': name, 'Hash': f'{path}-{name}',
+                              'Type': TYPE_DIRECTORY, 'Size': 0})
+                build(f'{path}/{name}', level + 1)
+
+        tree[path] = links
+
+    build('/ipfs/root', 1)
+    return tree
+
+
+class MockLister:
+    def __init__(self, tree, delay=0.01):
+        self.tree = tree
+        self.delay = delay
+        self.active = 0
+        self.maxActive = 0
+
+    async def __call__(self, path):
+        self.active += 1
+        self.maxActive = max(self.active, self.maxActive)
+
+        try:
+            await asyncio.sleep(self.delay)
+            return self.tree.get(path)
+        finally:
+            self.active -= 1
+
+
+class TestWalker:
+    @pytest.mark.asyncio
+    async def test_walk(self):
+        tree = mockTree()
+        lister = MockLister(tree)
+        walker = UnixFSWalker(lister, concurrency=4, types=[TYPE_FILE])
+
+        paths = [path async for path, entry in walker.walk('/ipfs/root')]
+
+        # 1 + 4 + 16 directories, 3 files each
+        assert len(paths) == 21 * 3
+        assert '/ipfs/root/d1/d2/f0' in paths
+        assert walker.dirsListed == 21
+        assert 1 < lister.maxActive <= 4
+
+    @pytest.mark.asyncio
+    async def test_filters(self):
+        lister = MockLister(mockTree())
+
+        walker = UnixFSWalker(lister, types=[TYPE_FILE], maxDepth=1)
+        paths = [p async for p, e in walker.walk('/ipfs/root')]
+        assert sorted(paths) == [
+            '/ipfs/root/f0', '/ipfs/root/f1', '/ipfs/root/f2']
+
+        walker = UnixFSWalker(lister, types=[TYPE_FILE], minSize=15)
+        entries = [e async for p, e in walker.walk('/ipfs/root')]
+        assert all(e.name == 'f2' for e in entries)
+
+        walker = UnixFSWalker(lister, types=[TYPE_DIRECTORY], maxDepth=2)
+        entries = [e async for p, e in walker.walk('/ipfs/root')]
+        assert len(entries) == 4 + 16
+        assert all(e.isDir and e.depth <= 2 for e in entries)
+
+    @pytest.mark.asyncio
+    async def test_cancel(self):
+        lister = MockLister(mockTree(depth=5))
+        walker = UnixFSWalker(lister, concurrency=2)
+        count = 0
+
+        async for path, entry in walker.walk('/ipfs/root'):
+            count += 1
+            if count == 10:
+                walker.cancel()
+
+        assert count < 50
+        await asyncio.sleep(0.05)
+        assert lister.active == 0
+
+        walker = UnixFSWalker(lister, maxEntries=5)
+        assert len([p async for p, e in walker.walk('/ipfs/root')]) == 5